@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+"""Microbenchmark of metadata extraction from knowledge_search tool responses.
+
+Compares the extractor from utils.rag_metadata with the regex and
+ast.literal_eval based parsing previously done by the query and streaming
+query endpoints.
+"""
+
+import argparse
+import ast
+import re
+import sys
+import timeit
+from typing import Any
+
+from utils.rag_metadata import clear_cache, extract_metadata
+
+# patterns previously used by the query and streaming query endpoints
+QUERY_PATTERN = r"Metadata:\s*({.*?})(?:\n|$)"
+STREAMING_PATTERN = re.compile(r"\nMetadata: (\{.+})\n")
+
+
+def legacy_query(text: str) -> list[dict[str, Any]]:
+    """Parse metadata the way the query endpoint did."""
+    return [ast.literal_eval(b) for b in re.findall(QUERY_PATTERN, text, re.DOTALL)]
+
+
+def legacy_streaming(text: str) -> list[dict[str, Any]]:
+    """Parse metadata the way the streaming query endpoint did."""
+    return [ast.literal_eval(b) for b in STREAMING_PATTERN.findall(text)]
+
+
+def uncached(text: str) -> tuple[dict[str, Any], ...]:
+    """Extract metadata without the benefit of memoization."""
+    clear_cache()
+    return extract_metadata(text)
+
+
+def knowledge_search_response(chunks: int) -> str:
+    """Generate knowledge_search tool response with the given number of chunks."""
+    results = "".join(
+        f"Result {i}\nContent: {'Lorem ipsum dolor sit amet. ' * 40}\n"
+        f"Metadata: {{'docs_url': 'https://docs.example.com/guide/{i}', "
+        f"'title': 'Guide chapter {i}', 'document_id': 'doc-{i}', "
+        f"'source': None, 'score': 0.{i + 10}}}\n"
+        for i in range(1, chunks + 1)
+    )
+    return (
+        f"knowledge_search tool found {chunks} chunks:\n"
+        f"BEGIN of knowledge_search tool results.\n{results}"
+        "END of knowledge_search tool results.\n"
+    )
+
+
+def main() -> int:
+    """Entry point to this tool."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--chunks", type=int, default=20, help="Number of chunks in the response."
+    )
+    parser.add_argument(
+        "--number", type=int, default=2000, help="Number of extractions per run."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs.")
+    args = parser.parse_args()
+
+    text = knowledge_search_response(args.chunks)
+    expected = legacy_query(text)
+    if list(uncached(text)) != expected or legacy_streaming(text) != expected:
+        print("Extracted metadata differ", file=sys.stderr)
+        return 1
+
+    candidates = {
+        "legacy query": legacy_query,
+        "legacy streaming": legacy_streaming,
+        "extractor (uncached)": uncached,
+        "extractor (memoized)": extract_metadata,
+    }
+    baseline = None
+    for name, func in candidates.items():
+        best = min(
+            timeit.repeat(
+                lambda f=func: f(text), number=args.number, repeat=args.repeat
+            )
+        )
+        per_call = best / args.number * 1e6
+        baseline = baseline or per_call
+        print(f"{name:<22} {per_call:10.1f} us/call {baseline / per_call:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,7 @@ from llama_stack_client import APIConnectionError, NotFoundError
 from app.database import get_session
 from authentication import get_auth_dependency
 from authorization.middleware import authorize
+from cache.response_cache import ResponseCache
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from models.config import Action
@@ -30,6 +31,7 @@ from utils.endpoints import (
     can_access_conversation,
     retrieve_conversation,
 )
+from utils.agent_pool import AgentPool
 from utils.suid import check_suid
 
 logger = logging.getLogger("app.endpoints.handlers")
@@ -429,6 +431,9 @@ async def delete_conversation_endpoint_handler(
         session_id = str(agent_sessions[0].get("session_id"))
 
         await client.agents.session.delete(agent_id=agent_id, session_id=session_id)
+        AgentPool().invalidate(conversation_id)
+        # cached answers are returned in their original conversation
+        ResponseCache().invalidate_conversation(conversation_id)
 
         logger.info("Successfully deleted conversation %s", conversation_id)
 
@@ -10,6 +10,7 @@ from llama_stack_client import APIConnectionError
 from authentication import get_auth_dependency
 from authentication.interface import AuthTuple
 from authorization.middleware import authorize
+from catalog.model_catalog import ModelCatalog
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from models.config import Action
@@ -57,7 +58,8 @@ async def models_endpoint_handler(
     Handle requests to the /models endpoint.
 
     Process GET requests to the /models endpoint, returning a list of available
-    models from the Llama Stack service.
+    models from the Llama Stack service. The list is served from the model
+    catalog, so Llama Stack is contacted only when the cached list expires.
 
     Raises:
         HTTPException: If unable to connect to the Llama Stack server or if
@@ -81,7 +83,7 @@ async def models_endpoint_handler(
         # try to get Llama Stack client
         client = AsyncLlamaStackClientHolder().get_client()
         # retrieve models
-        models = await client.models.list()
+        models = await ModelCatalog().get(client)
         m = [dict(m) for m in models]
         return ModelsResponse(models=m)
 
@@ -1,11 +1,11 @@
 """Handler for REST API call to provide answer to query."""
 
-import ast
+import asyncio
 import json
 import logging
-import re
 from datetime import UTC, datetime
-from typing import Annotated, Any, Optional, cast
+from functools import partial
+from typing import Annotated, Any, Awaitable, Optional, cast
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from litellm.exceptions import RateLimitError
@@ -14,12 +14,11 @@ from llama_stack_client import (
     AsyncLlamaStackClient,  # type: ignore
 )
 from llama_stack_client.lib.agents.event_logger import interleaved_content_as_str
-from llama_stack_client.types import Shield, UserMessage  # type: ignore
+from llama_stack_client.types import UserMessage  # type: ignore
 from llama_stack_client.types.agents.turn import Turn
 from llama_stack_client.types.agents.turn_create_params import (
     Toolgroup,
     ToolgroupAgentToolGroupWithArgs,
-    Document,
 )
 from llama_stack_client.types.model_list_response import ModelListResponse
 from llama_stack_client.types.shared.interleaved_content_item import TextContentItem
@@ -31,6 +30,15 @@ from app.database import get_session
 from authentication import get_auth_dependency
 from authentication.interface import AuthTuple
 from authorization.middleware import authorize
+from cache.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    cache_bypass,
+    response_cache_key,
+)
+from catalog.model_catalog import ModelCatalog, ModelIndex
+from catalog.shield_catalog import ShieldCatalog
+from catalog.vector_store_catalog import VectorStoreCatalog
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from models.cache_entry import CacheEntry
@@ -47,6 +55,7 @@ from models.responses import (
 )
 from utils.endpoints import (
     check_configuration_loaded,
+    create_agent_turn,
     get_agent,
     get_topic_summary_system_prompt,
     get_temp_agent,
@@ -55,19 +64,42 @@ from utils.endpoints import (
     validate_conversation_ownership,
     validate_model_provider_override,
 )
+from utils.prompt_size import check_prompt_size
+from utils.rag_metadata import extract_metadata
 from utils.quota import (
     get_available_quotas,
     check_tokens_available,
     consume_tokens,
 )
+from utils.fair_scheduler import FairScheduler, user_roles
 from utils.mcp_headers import handle_mcp_headers_with_toolgroups, mcp_headers_dependency
+from utils.attachments import AttachmentIndex, turn_input
+from utils.concurrency import run_concurrently
+from utils.concurrency_limiter import LlamaStackLimiter
+from utils.deadline import (
+    STAGE_AGENT_INIT,
+    STAGE_MODEL_LISTING,
+    STAGE_TOPIC_SUMMARY,
+    STAGE_TURN_CREATION,
+    deadline_stage,
+    run_stage,
+    stage_timeout,
+)
+from utils.single_flight import SingleFlight
+from utils.stage_timer import STAGE_PERSISTENCE, STAGE_QUOTA, stage_timer, timed
 from utils.transcripts import store_transcript
+from utils.write_behind import WriteBehindQueue
 from utils.types import TurnSummary
 from utils.token_counter import extract_and_update_token_metrics, TokenCounter
 
 logger = logging.getLogger("app.endpoints.handlers")
 router = APIRouter(tags=["query"])
 
+# identical stateless queries processed at the same time share one LLM call
+query_flights: SingleFlight[
+    tuple[TurnSummary, str, list[ReferencedDocument], TokenCounter, Optional[str]]
+] = SingleFlight("query")
+
 query_response: dict[int | str, dict[str, Any]] = {
     200: {
         "conversation_id": "123e4567-e89b-12d3-a456-426614174000",
@@ -88,6 +120,13 @@ query_response: dict[int | str, dict[str, Any]] = {
         "description": "Client does not have permission to access conversation",
         "model": ForbiddenResponse,
     },
+    413: {
+        "detail": {
+            "response": "Prompt is too long",
+            "cause": "The prompt has about 140000 tokens, the context size of "
+            "model provider/model is 128000 tokens.",
+        }
+    },
     429: {
         "description": "The quota has been exceeded",
         "model": QuotaExceededResponse,
@@ -220,6 +259,448 @@ async def get_topic_summary(
     )
 
 
+def start_topic_summary(
+    get_topic_summary_func: Any,
+    query_request: QueryRequest,
+    client: AsyncLlamaStackClient,
+    model_id: str,
+) -> Optional[asyncio.Task[str]]:
+    """Start generating the topic summary speculatively for a new conversation.
+
+    The topic summary depends only on the question, so for requests that
+    start a new conversation it is generated concurrently with the main LLM
+    call instead of after it.
+
+    Returns:
+        The task generating the summary, or None when the request continues
+        an existing conversation.
+    """
+    if query_request.conversation_id:
+        return None
+    task = asyncio.create_task(
+        get_topic_summary_func(query_request.query, client, model_id)
+    )
+    # the result might never be awaited (e.g. when the client disconnects
+    # before the streamed answer is complete), so failures are logged here
+    task.add_done_callback(_log_topic_summary_failure)
+    return task
+
+
+def _log_topic_summary_failure(task: asyncio.Task[str]) -> None:
+    """Log failure of the speculative topic summary generation."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Topic summary generation failed: %s", task.exception())
+
+
+def cancel_topic_summary(topic_summary_task: Optional[asyncio.Task[str]]) -> None:
+    """Cancel the speculative topic summary generation if it is still running."""
+    if topic_summary_task is not None and not topic_summary_task.done():
+        topic_summary_task.cancel()
+
+
+async def resolve_topic_summary(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    topic_summary_task: Optional[asyncio.Task[str]],
+    get_topic_summary_func: Any,
+    conversation_id: str,
+    question: str,
+    client: AsyncLlamaStackClient,
+    model_id: str,
+) -> Optional[str]:
+    """Retrieve the topic summary to be stored with a conversation.
+
+    When the summary has been started speculatively, wait for it at most
+    the topic summary stage timeout (`TOPIC_SUMMARY_DEADLINE` seconds for
+    requests without deadline); the conversation is stored without summary
+    when it is not available in time or its generation fails. Otherwise the
+    summary is generated only when the conversation is not yet known in the
+    database, within the topic summary stage of the request deadline.
+    """
+    if topic_summary_task is not None:
+        timeout = stage_timeout(STAGE_TOPIC_SUMMARY)
+        if timeout is None:
+            timeout = constants.TOPIC_SUMMARY_DEADLINE
+        try:
+            with stage_timer(STAGE_TOPIC_SUMMARY):
+                return await asyncio.wait_for(topic_summary_task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Topic summary for conversation %s not ready in %s seconds",
+                conversation_id,
+                timeout,
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning(
+                "Unable to generate topic summary for conversation %s: %s",
+                conversation_id,
+                e,
+            )
+        return None
+
+    with get_session() as session:
+        existing_conversation = (
+            session.query(UserConversation).filter_by(id=conversation_id).first()
+        )
+    if existing_conversation:
+        return None
+    return await run_stage(
+        STAGE_TOPIC_SUMMARY, get_topic_summary_func(question, client, model_id)
+    )
+
+
+def stateless_query_key(
+    query_request: QueryRequest,
+    model_id: str,
+    provider_id: str,
+    user_id: Optional[str] = None,
+) -> Optional[str]:
+    """Compute key identifying identical stateless queries.
+
+    The key is used by the response cache and to coalesce identical queries
+    processed at the same time. Only queries without conversation ID are
+    considered, and only when the response cache is enabled. With the user
+    ID, only queries of that user are identical.
+
+    Returns:
+        The key or None when the query must always be answered by the LLM.
+    """
+    if not ResponseCache().enabled or query_request.conversation_id:
+        return None
+    toolgroups = [mcp_server.name for mcp_server in configuration.mcp_servers] + [
+        byok_rag.vector_db_id for byok_rag in configuration.configuration.byok_rag
+    ]
+    return response_cache_key(
+        model_id,
+        provider_id,
+        get_system_prompt(query_request, configuration),
+        query_request,
+        toolgroups,
+        user_id,
+    )
+
+
+def request_cache_control(request: Request) -> Optional[str]:
+    """Return the Cache-Control header of the request when responses are cached."""
+    if not ResponseCache().enabled:
+        return None
+    return request.headers.get("Cache-Control")
+
+
+async def generate_response(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    retrieve_response_func: Any,
+    get_topic_summary_func: Any,
+    client: AsyncLlamaStackClient,
+    model_id: str,
+    provider_id: str,
+    query_request: QueryRequest,
+    token: str,
+    mcp_headers: dict[str, dict[str, str]],
+) -> tuple[TurnSummary, str, list[ReferencedDocument], TokenCounter, Optional[str]]:
+    """Retrieve the LLM response together with the topic summary.
+
+    The topic summary of a new conversation is generated concurrently with
+    the main LLM call.
+
+    Returns:
+        Tuple of the turn summary, conversation ID, referenced documents,
+        token usage and topic summary.
+    """
+    topic_summary_task = start_topic_summary(
+        get_topic_summary_func, query_request, client, model_id
+    )
+    try:
+        summary, conversation_id, referenced_documents, token_usage = (
+            await retrieve_response_func(
+                client,
+                model_id,
+                query_request,
+                token,
+                mcp_headers=mcp_headers,
+                provider_id=provider_id,
+            )
+        )
+    except BaseException:
+        cancel_topic_summary(topic_summary_task)
+        raise
+
+    topic_summary = await resolve_topic_summary(
+        topic_summary_task,
+        get_topic_summary_func,
+        conversation_id,
+        query_request.query,
+        client,
+        model_id,
+    )
+    return summary, conversation_id, referenced_documents, token_usage, topic_summary
+
+
+async def answer_query(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    retrieve_response_func: Any,
+    get_topic_summary_func: Any,
+    client: AsyncLlamaStackClient,
+    llama_stack_model_id: str,
+    provider_id: str,
+    query_request: QueryRequest,
+    token: str,
+    mcp_headers: dict[str, dict[str, str]],
+    cache_control: Optional[str] = None,
+    *,
+    user_id: str,
+) -> tuple[
+    TurnSummary, str, list[ReferencedDocument], TokenCounter, Optional[str], bool
+]:
+    """Answer the query from the response cache or by the LLM.
+
+    Identical stateless queries are answered from the response cache or
+    share one in-flight LLM call, as allowed by the response cache
+    configuration and by the `Cache-Control` request header.
+
+    A reused answer is returned in the conversation it was generated in,
+    so the conversation history in Llama Stack contains it and follow-up
+    queries see it. Answers are therefore shared only among queries of the
+    same user, who owns that conversation.
+
+    Returns:
+        Tuple of the turn summary, conversation ID, referenced documents,
+        token usage, topic summary and flag whether the answer generated for
+        another request was reused.
+    """
+    query_key = stateless_query_key(
+        query_request, llama_stack_model_id, provider_id, user_id
+    )
+    skip_lookup, skip_store = cache_bypass(cache_control) if query_key else (True, True)
+    cached_response = (
+        None if skip_lookup or query_key is None else ResponseCache().get(query_key)
+    )
+    if cached_response is not None:
+        logger.info("Using response from the response cache")
+        # the reused answer keeps its original token usage
+        return (
+            cached_response.summary,
+            cached_response.conversation_id,
+            cached_response.referenced_documents,
+            cached_response.token_usage,
+            cached_response.topic_summary,
+            True,
+        )
+
+    generate = partial(
+        generate_response,
+        retrieve_response_func,
+        get_topic_summary_func,
+        client,
+        llama_stack_model_id,
+        provider_id,
+        query_request,
+        token,
+        mcp_headers,
+    )
+    reused = False
+    if query_key and ResponseCache().single_flight:
+        # identical queries in flight share one LLM call
+        result, reused = await query_flights.do(query_key, generate)
+    else:
+        result = await generate()
+    summary, conversation_id, referenced_documents, token_usage, topic_summary = result
+    if query_key and not reused and not skip_store:
+        ResponseCache().put(
+            query_key,
+            CachedResponse(
+                summary=summary,
+                conversation_id=conversation_id,
+                referenced_documents=referenced_documents,
+                input_tokens=token_usage.input_tokens,
+                output_tokens=token_usage.output_tokens,
+                topic_summary=topic_summary,
+            ),
+        )
+    return (
+        summary,
+        conversation_id,
+        referenced_documents,
+        token_usage,
+        topic_summary,
+        reused,
+    )
+
+
+async def persist_query_turn(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    user_id: str,
+    conversation_id: str,
+    model_id: str,
+    provider_id: str,
+    query_request: QueryRequest,
+    summary: TurnSummary,
+    referenced_documents: list[ReferencedDocument],
+    topic_summary: Optional[str],
+    *,
+    started_at: str,
+    skip_userid_check: bool,
+    consumed_tokens: Optional[TokenCounter],
+) -> None:
+    """Store the transcript, conversation details and cache entry of one turn.
+
+    Blocking bookkeeping is handed over to the write-behind queue.
+
+    Args:
+        consumed_tokens: Token usage to charge to the quota limiters, or None
+            when no tokens are charged for this turn.
+    """
+    # Convert RAG chunks to dictionary format once for reuse
+    logger.info("Processing RAG chunks...")
+    rag_chunks_dict = [chunk.model_dump() for chunk in summary.rag_chunks]
+
+    completed_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    cache_entry = CacheEntry(
+        query=query_request.query,
+        response=summary.llm_response,
+        provider=provider_id,
+        model=model_id,
+        started_at=started_at,
+        completed_at=completed_at,
+        referenced_documents=referenced_documents if referenced_documents else None,
+    )
+
+    write_behind = WriteBehindQueue()
+    bookkeeping: list[Awaitable[None]] = []
+
+    if not is_transcripts_enabled():
+        logger.debug("Transcript collection is disabled in the configuration")
+    else:
+        bookkeeping.append(
+            write_behind.submit(
+                conversation_id,
+                store_transcript,
+                user_id=user_id,
+                conversation_id=conversation_id,
+                model_id=model_id,
+                provider_id=provider_id,
+                query_is_valid=True,  # TODO(lucasagomes): implement as part of query validation
+                query=query_request.query,
+                query_request=query_request,
+                summary=summary,
+                rag_chunks=rag_chunks_dict,
+                truncated=summary.truncated,
+                attachments=query_request.attachments or [],
+            )
+        )
+
+    logger.info("Persisting conversation details...")
+    bookkeeping.append(
+        write_behind.submit(
+            conversation_id,
+            persist_user_conversation_details,
+            user_id=user_id,
+            conversation_id=conversation_id,
+            model=model_id,
+            provider_id=provider_id,
+            topic_summary=topic_summary,
+        )
+    )
+
+    if consumed_tokens is not None:
+        bookkeeping.append(
+            write_behind.submit(
+                conversation_id,
+                consume_tokens,
+                configuration.quota_limiters,
+                user_id,
+                input_tokens=consumed_tokens.input_tokens,
+                output_tokens=consumed_tokens.output_tokens,
+            )
+        )
+
+    bookkeeping.append(
+        write_behind.submit(
+            conversation_id,
+            store_conversation_into_cache,
+            configuration,
+            user_id,
+            conversation_id,
+            cache_entry,
+            skip_userid_check,
+            topic_summary,
+        )
+    )
+    with stage_timer(STAGE_PERSISTENCE):
+        await asyncio.gather(*bookkeeping)
+
+
+async def record_cancelled_turn(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    user_id: str,
+    conversation_id: str,
+    model_id: str,
+    provider_id: str,
+    query_request: QueryRequest,
+    summary: TurnSummary,
+) -> None:
+    """Store the transcript of a turn cancelled because the client went away.
+
+    The partial response is marked as cancelled. The turn is not stored
+    into the conversation cache, it was never completed.
+    """
+    summary.cancelled = True
+    if not conversation_id:
+        logger.debug("Cancelled turn has no conversation, nothing to record")
+        return
+    if not is_transcripts_enabled():
+        logger.debug("Transcript collection is disabled in the configuration")
+        return
+    await WriteBehindQueue().submit(
+        conversation_id,
+        store_transcript,
+        user_id=user_id,
+        conversation_id=conversation_id,
+        model_id=model_id,
+        provider_id=provider_id,
+        query_is_valid=True,  # TODO(lucasagomes): implement as part of query validation
+        query=query_request.query,
+        query_request=query_request,
+        summary=summary,
+        rag_chunks=[chunk.model_dump() for chunk in summary.rag_chunks],
+        truncated=summary.truncated,
+        attachments=query_request.attachments or [],
+    )
+
+
+def build_query_response(
+    conversation_id: str,
+    summary: TurnSummary,
+    referenced_documents: list[ReferencedDocument],
+    token_usage: TokenCounter,
+    available_quotas: dict[str, int],
+) -> QueryResponse:
+    """Build the query response from the turn summary."""
+    # Convert tool calls to response format
+    logger.info("Processing tool calls...")
+    tool_calls = [
+        ToolCall(
+            tool_name=tc.name,
+            arguments=(
+                tc.args if isinstance(tc.args, dict) else {"query": str(tc.args)}
+            ),
+            result=(
+                {"response": tc.response}
+                if tc.response and tc.name != constants.DEFAULT_RAG_TOOL
+                else None
+            ),
+        )
+        for tc in summary.tool_calls
+    ]
+
+    return QueryResponse(
+        conversation_id=conversation_id,
+        response=summary.llm_response,
+        rag_chunks=summary.rag_chunks if summary.rag_chunks else [],
+        tool_calls=tool_calls if tool_calls else None,
+        referenced_documents=referenced_documents,
+        truncated=summary.truncated,
+        input_tokens=token_usage.input_tokens,
+        output_tokens=token_usage.output_tokens,
+        available_quotas=available_quotas,
+    )
+
+
 async def query_endpoint_handler_base(  # pylint: disable=R0914
     request: Request,
     query_request: QueryRequest,
@@ -227,6 +708,7 @@ async def query_endpoint_handler_base(  # pylint: disable=R0914
     mcp_headers: dict[str, dict[str, str]],
     retrieve_response_func: Any,
     get_topic_summary_func: Any,
+    prefetch_vector_stores: bool = False,
 ) -> QueryResponse:
     """
     Handle query endpoints (shared by Agent API and Responses API).
@@ -246,6 +728,8 @@ async def query_endpoint_handler_base(  # pylint: disable=R0914
         mcp_headers: MCP headers from dependency
         retrieve_response_func: The retrieve_response function to use (Agent or Responses API)
         get_topic_summary_func: The get_topic_summary function to use (Agent or Responses API)
+        prefetch_vector_stores: Whether to load the vector store catalog in the
+            pre-inference stage, for retrieve_response functions using it
 
     Returns:
         QueryResponse: Contains the conversation ID and the LLM-generated response.
@@ -261,20 +745,45 @@ async def query_endpoint_handler_base(  # pylint: disable=R0914
     user_id, _, _skip_userid_check, token = auth
 
     started_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
-    user_conversation: UserConversation | None = None
     if query_request.conversation_id:
         logger.debug(
             "Conversation ID specified in query: %s", query_request.conversation_id
         )
-        user_conversation = validate_conversation_ownership(
-            user_id=user_id,
-            conversation_id=query_request.conversation_id,
-            others_allowed=(
-                Action.QUERY_OTHERS_CONVERSATIONS in request.state.authorized_actions
+    else:
+        logger.debug("Query does not contain conversation ID")
+
+    try:
+        # try to get Llama Stack client
+        client = AsyncLlamaStackClientHolder().get_client()
+
+        # independent steps performed before the LLM call run concurrently,
+        # blocking database calls are offloaded to worker threads
+        pre_inference_steps: dict[str, Awaitable[Any]] = {
+            "quota": timed(
+                STAGE_QUOTA,
+                asyncio.to_thread(
+                    check_tokens_available, configuration.quota_limiters, user_id
+                ),
             ),
-        )
+            "models": run_stage(STAGE_MODEL_LISTING, ModelCatalog().get(client)),
+        }
+        if prefetch_vector_stores and not query_request.no_tools:
+            # the snapshot is then used by retrieve_response without waiting
+            pre_inference_steps["vector_stores"] = VectorStoreCatalog().get(client)
+        if query_request.conversation_id:
+            pre_inference_steps["conversation"] = asyncio.to_thread(
+                validate_conversation_ownership,
+                user_id=user_id,
+                conversation_id=query_request.conversation_id,
+                others_allowed=(
+                    Action.QUERY_OTHERS_CONVERSATIONS
+                    in request.state.authorized_actions
+                ),
+            )
+        pre_inference = await run_concurrently("pre_inference", pre_inference_steps)
 
-        if user_conversation is None:
+        user_conversation: UserConversation | None = pre_inference.get("conversation")
+        if query_request.conversation_id and user_conversation is None:
             logger.warning(
                 "Conversation %s not found for user %s",
                 query_request.conversation_id,
@@ -287,130 +796,70 @@ async def query_endpoint_handler_base(  # pylint: disable=R0914
                     "cause": "The requested conversation does not exist.",
                 },
             )
-    else:
-        logger.debug("Query does not contain conversation ID")
 
-    try:
-        check_tokens_available(configuration.quota_limiters, user_id)
-        # try to get Llama Stack client
-        client = AsyncLlamaStackClientHolder().get_client()
         llama_stack_model_id, model_id, provider_id = select_model_and_provider_id(
-            await client.models.list(),
+            pre_inference["models"],
             *evaluate_model_hints(
                 user_conversation=user_conversation, query_request=query_request
             ),
         )
-        summary, conversation_id, referenced_documents, token_usage = (
-            await retrieve_response_func(
+        await asyncio.to_thread(
+            check_prompt_size,
+            query_request,
+            llama_stack_model_id,
+            model_id,
+            provider_id,
+        )
+        # turns of different users are admitted fairly, see utils.fair_scheduler
+        async with FairScheduler().turn(user_id, user_roles(request.state)):
+            (
+                summary,
+                conversation_id,
+                referenced_documents,
+                token_usage,
+                topic_summary,
+                reused,
+            ) = await answer_query(
+                retrieve_response_func,
+                get_topic_summary_func,
                 client,
                 llama_stack_model_id,
+                provider_id,
                 query_request,
                 token,
-                mcp_headers=mcp_headers,
-                provider_id=provider_id,
-            )
-        )
-
-        # Get the initial topic summary for the conversation
-        topic_summary = None
-        with get_session() as session:
-            existing_conversation = (
-                session.query(UserConversation).filter_by(id=conversation_id).first()
-            )
-            if not existing_conversation:
-                topic_summary = await get_topic_summary_func(
-                    query_request.query, client, llama_stack_model_id
-                )
-        # Convert RAG chunks to dictionary format once for reuse
-        logger.info("Processing RAG chunks...")
-        rag_chunks_dict = [chunk.model_dump() for chunk in summary.rag_chunks]
-
-        if not is_transcripts_enabled():
-            logger.debug("Transcript collection is disabled in the configuration")
-        else:
-            store_transcript(
+                mcp_headers,
+                request_cache_control(request),
                 user_id=user_id,
-                conversation_id=conversation_id,
-                model_id=model_id,
-                provider_id=provider_id,
-                query_is_valid=True,  # TODO(lucasagomes): implement as part of query validation
-                query=query_request.query,
-                query_request=query_request,
-                summary=summary,
-                rag_chunks=rag_chunks_dict,
-                truncated=False,  # TODO(lucasagomes): implement truncation as part of quota work
-                attachments=query_request.attachments or [],
             )
 
-        logger.info("Persisting conversation details...")
-        persist_user_conversation_details(
-            user_id=user_id,
-            conversation_id=conversation_id,
-            model=model_id,
-            provider_id=provider_id,
-            topic_summary=topic_summary,
-        )
-
-        completed_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        cache_entry = CacheEntry(
-            query=query_request.query,
-            response=summary.llm_response,
-            provider=provider_id,
-            model=model_id,
-            started_at=started_at,
-            completed_at=completed_at,
-            referenced_documents=referenced_documents if referenced_documents else None,
-        )
-
-        consume_tokens(
-            configuration.quota_limiters,
-            user_id,
-            input_tokens=token_usage.input_tokens,
-            output_tokens=token_usage.output_tokens,
-        )
-
-        store_conversation_into_cache(
-            configuration,
+        await persist_query_turn(
             user_id,
             conversation_id,
-            cache_entry,
-            _skip_userid_check,
+            model_id,
+            provider_id,
+            query_request,
+            summary,
+            referenced_documents,
             topic_summary,
+            started_at=started_at,
+            skip_userid_check=_skip_userid_check,
+            # reused responses do not consume any tokens
+            consumed_tokens=None if reused else token_usage,
         )
 
-        # Convert tool calls to response format
-        logger.info("Processing tool calls...")
-        tool_calls = [
-            ToolCall(
-                tool_name=tc.name,
-                arguments=(
-                    tc.args if isinstance(tc.args, dict) else {"query": str(tc.args)}
-                ),
-                result=(
-                    {"response": tc.response}
-                    if tc.response and tc.name != constants.DEFAULT_RAG_TOOL
-                    else None
-                ),
-            )
-            for tc in summary.tool_calls
-        ]
-
         logger.info("Using referenced documents from response...")
 
-        available_quotas = get_available_quotas(configuration.quota_limiters, user_id)
+        available_quotas = await asyncio.to_thread(
+            get_available_quotas, configuration.quota_limiters, user_id
+        )
 
         logger.info("Building final response...")
-        response = QueryResponse(
-            conversation_id=conversation_id,
-            response=summary.llm_response,
-            rag_chunks=summary.rag_chunks if summary.rag_chunks else [],
-            tool_calls=tool_calls if tool_calls else None,
-            referenced_documents=referenced_documents,
-            truncated=False,  # TODO: implement truncation detection
-            input_tokens=token_usage.input_tokens,
-            output_tokens=token_usage.output_tokens,
-            available_quotas=available_quotas,
+        response = build_query_response(
+            conversation_id,
+            summary,
+            referenced_documents,
+            token_usage,
+            available_quotas,
         )
         logger.info("Query processing completed successfully!")
         return response
@@ -466,7 +915,9 @@ async def query_endpoint_handler(
 
 
 def select_model_and_provider_id(
-    models: ModelListResponse, model_id: str | None, provider_id: str | None
+    models: ModelListResponse | ModelIndex,
+    model_id: str | None,
+    provider_id: str | None,
 ) -> tuple[str, str, str]:
     """
     Select the model ID and provider ID based on the request or available models.
@@ -479,6 +930,10 @@ def select_model_and_provider_id(
     available, selects the first available LLM model from the provided model
     list. Validates that the selected model exists among the available models.
 
+    Models can be passed either as a plain list returned by Llama Stack or as
+    a `ModelIndex` snapshot from the model catalog; the latter avoids
+    re-indexing the list on every request.
+
     Returns:
         A tuple containing the combined model ID (in the format
         "provider/model"), and its separated parts: the model label and the provider ID.
@@ -486,6 +941,8 @@ def select_model_and_provider_id(
     Raises:
         HTTPException: If no suitable LLM model is found or the selected model is not available.
     """
+    index = models if isinstance(models, ModelIndex) else ModelIndex(models)
+
     # If model_id and provider_id are provided in the request, use them
 
     # If model_id is not provided in the request, check the configuration
@@ -504,18 +961,8 @@ def select_model_and_provider_id(
             "No model ID or provider ID specified in request or configuration, "
             "using the first available LLM"
         )
-        try:
-            model = next(
-                m
-                for m in models
-                if m.model_type == "llm"  # pyright: ignore[reportAttributeAccessIssue]
-            )
-            model_id = model.identifier
-            provider_id = model.provider_id
-            logger.info("Selected model: %s", model)
-            model_label = model_id.split("/", 1)[1] if "/" in model_id else model_id
-            return model_id, model_label, provider_id
-        except (StopIteration, AttributeError) as e:
+        model = index.default_llm
+        if model is None:
             message = "No LLM model found in available models"
             logger.error(message)
             raise HTTPException(
@@ -524,15 +971,20 @@ def select_model_and_provider_id(
                     "response": constants.UNABLE_TO_PROCESS_RESPONSE,
                     "cause": message,
                 },
-            ) from e
+            )
+        model_identifier: str = model.identifier
+        logger.info("Selected model: %s", model)
+        model_label = (
+            model_identifier.split("/", 1)[1]
+            if "/" in model_identifier
+            else model_identifier
+        )
+        return model_identifier, model_label, model.provider_id
 
     llama_stack_model_id = f"{provider_id}/{model_id}"
     # Validate that the model_id and provider_id are in the available models
     logger.debug("Searching for model: %s, provider: %s", model_id, provider_id)
-    if not any(
-        m.identifier == llama_stack_model_id and m.provider_id == provider_id
-        for m in models
-    ):
+    if (provider_id, llama_stack_model_id) not in index:
         message = f"Model {model_id} from provider {provider_id} not found in available models"
         logger.error(message)
         raise HTTPException(
@@ -546,48 +998,6 @@ def select_model_and_provider_id(
     return llama_stack_model_id, model_id, provider_id
 
 
-def _is_inout_shield(shield: Shield) -> bool:
-    """
-    Determine if the shield identifier indicates an input/output shield.
-
-    Parameters:
-        shield (Shield): The shield to check.
-
-    Returns:
-        bool: True if the shield identifier starts with "inout_", otherwise False.
-    """
-    return shield.identifier.startswith("inout_")
-
-
-def is_output_shield(shield: Shield) -> bool:
-    """
-    Determine if the shield is for monitoring output.
-
-    Return True if the given shield is classified as an output or
-    inout shield.
-
-    A shield is considered an output shield if its identifier
-    starts with "output_" or "inout_".
-    """
-    return _is_inout_shield(shield) or shield.identifier.startswith("output_")
-
-
-def is_input_shield(shield: Shield) -> bool:
-    """
-    Determine if the shield is for monitoring input.
-
-    Return True if the shield is classified as an input or inout
-    shield.
-
-    Parameters:
-        shield (Shield): The shield identifier to classify.
-
-    Returns:
-        bool: True if the shield is for input or both input/output monitoring; False otherwise.
-    """
-    return _is_inout_shield(shield) or not is_output_shield(shield)
-
-
 def parse_metadata_from_text_item(
     text_item: TextContentItem,
 ) -> Optional[ReferencedDocument]:
@@ -601,23 +1011,19 @@ def parse_metadata_from_text_item(
         ReferencedDocument: A ReferencedDocument object containing 'doc_url' and 'doc_title'
         representing the referenced documents found in the metadata.
     """
-    docs: list[ReferencedDocument] = []
     if not isinstance(text_item, TextContentItem):
-        return docs
+        return None
 
-    metadata_blocks = re.findall(
-        r"Metadata:\s*({.*?})(?:\n|$)", text_item.text, re.DOTALL
-    )
-    for block in metadata_blocks:
-        try:
-            data = ast.literal_eval(block)
-            url = data.get("docs_url")
-            title = data.get("title")
-            if url and title:
+    for data in extract_metadata(text_item.text):
+        url = data.get("docs_url")
+        title = data.get("title")
+        if url and title:
+            try:
                 return ReferencedDocument(doc_url=url, doc_title=title)
-            logger.debug("Invalid metadata block (missing url or title): %s", block)
-        except (ValueError, SyntaxError) as e:
-            logger.debug("Failed to parse metadata block: %s | Error: %s", block, e)
+            except ValueError as e:
+                logger.debug("Invalid metadata: %s | Error: %s", data, e)
+        else:
+            logger.debug("Invalid metadata (missing url or title): %s", data)
     return None
 
 
@@ -687,40 +1093,46 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
         a summary of the LLM or agent's response
         content, the conversation ID, the list of parsed referenced documents, and token usage information.
     """
-    available_input_shields = [
-        shield.identifier
-        for shield in filter(is_input_shield, await client.shields.list())
-    ]
-    available_output_shields = [
-        shield.identifier
-        for shield in filter(is_output_shield, await client.shields.list())
-    ]
-    if not available_input_shields and not available_output_shields:
-        logger.info("No available shields. Disabling safety")
-    else:
-        logger.info(
-            "Available input shields: %s, output shields: %s",
+    # shields, vector databases and the agent are set up within one stage
+    async with deadline_stage(STAGE_AGENT_INIT):
+        # shields and vector databases do not depend on each other
+        agent_setup_steps: dict[str, Awaitable[Any]] = {
+            "shields": ShieldCatalog().get(client)
+        }
+        if not query_request.no_tools:
+            agent_setup_steps["vector_dbs"] = client.vector_dbs.list()
+        agent_setup = await run_concurrently("agent_setup", agent_setup_steps)
+
+        shields = agent_setup["shields"]
+        available_input_shields = shields.input_shields
+        available_output_shields = shields.output_shields
+        if not available_input_shields and not available_output_shields:
+            logger.info("No available shields. Disabling safety")
+        else:
+            logger.info(
+                "Available input shields: %s, output shields: %s",
+                available_input_shields,
+                available_output_shields,
+            )
+        # use system prompt from request or default one
+        system_prompt = get_system_prompt(query_request, configuration)
+        logger.debug("Using system prompt: %s", system_prompt)
+
+        # TODO(lucasagomes): redact attachments content before sending to LLM
+        # if attachments are provided, validate them
+        if query_request.attachments:
+            validate_attachments_metadata(query_request.attachments)
+
+        agent_args = (
+            client,
+            model_id,
+            system_prompt,
             available_input_shields,
             available_output_shields,
+            query_request.conversation_id,
+            query_request.no_tools or False,
         )
-    # use system prompt from request or default one
-    system_prompt = get_system_prompt(query_request, configuration)
-    logger.debug("Using system prompt: %s", system_prompt)
-
-    # TODO(lucasagomes): redact attachments content before sending to LLM
-    # if attachments are provided, validate them
-    if query_request.attachments:
-        validate_attachments_metadata(query_request.attachments)
-
-    agent, conversation_id, session_id = await get_agent(
-        client,
-        model_id,
-        system_prompt,
-        available_input_shields,
-        available_output_shields,
-        query_request.conversation_id,
-        query_request.no_tools or False,
-    )
+        agent, conversation_id, session_id = await get_agent(*agent_args)
 
     logger.debug("Conversation ID: %s, session ID: %s", conversation_id, session_id)
     # bypass tools and MCP servers if no_tools is True
@@ -748,7 +1160,7 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
         }
 
         vector_db_ids = [
-            vector_db.identifier for vector_db in await client.vector_dbs.list()
+            vector_db.identifier for vector_db in agent_setup["vector_dbs"]
         ]
         toolgroups = (get_rag_toolgroups(vector_db_ids) or []) + [
             mcp_server.name for mcp_server in configuration.mcp_servers
@@ -757,24 +1169,32 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
         if not toolgroups:
             toolgroups = None
 
-    # TODO: LCORE-881 - Remove if Llama Stack starts to support these mime types
-    documents: list[Document] = [
-        (
-            {"content": doc["content"], "mime_type": "text/plain"}
-            if doc["mime_type"].lower() in ("application/json", "application/xml")
-            else doc
-        )
-        for doc in query_request.get_documents()
-    ]
+    # attachments sent earlier in the conversation are only referenced
+    attachment_index = AttachmentIndex()
+    message, documents = turn_input(
+        query_request.query,
+        query_request.attachments,
+        attachment_index.known(conversation_id),
+    )
 
-    response = await agent.create_turn(
-        messages=[UserMessage(role="user", content=query_request.query)],
-        session_id=session_id,
-        documents=documents,
-        stream=False,
-        toolgroups=toolgroups,
+    # a pooled agent is rebuilt when its conversation was deleted meanwhile
+    rebuild_agent = (
+        partial(get_agent, *agent_args) if query_request.conversation_id else None
     )
+    async with deadline_stage(STAGE_TURN_CREATION), LlamaStackLimiter().slot():
+        response = await create_agent_turn(
+            agent,
+            session_id,
+            rebuild_agent,
+            messages=[UserMessage(role="user", content=message)],
+            documents=documents,
+            stream=False,
+            toolgroups=toolgroups,
+        )
     response = cast(Turn, response)
+    attachment_index.remember(
+        conversation_id, query_request.attachments, previous=conversation_id
+    )
 
     summary = TurnSummary(
         llm_response=(
@@ -0,0 +1,411 @@
+"""Handler for REST API call to answer a batch of independent queries."""
+
+import asyncio
+import json
+import logging
+from datetime import UTC, datetime
+from typing import Annotated, Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from litellm.exceptions import RateLimitError
+from llama_stack_client import (
+    APIConnectionError,
+    AsyncLlamaStackClient,  # type: ignore
+)
+
+import metrics
+from app.endpoints.query import (
+    answer_query,
+    build_query_response,
+    evaluate_model_hints,
+    get_topic_summary,
+    persist_query_turn,
+    request_cache_control,
+    retrieve_response,
+    select_model_and_provider_id,
+)
+from authentication import get_auth_dependency
+from authentication.interface import AuthTuple
+from authorization.middleware import authorize
+from catalog.model_catalog import ModelCatalog, ModelIndex
+from client import AsyncLlamaStackClientHolder
+from configuration import configuration
+from constants import MEDIA_TYPE_NDJSON
+from models.config import Action
+from models.requests import BatchQueryRequest, QueryRequest
+from models.responses import (
+    ForbiddenResponse,
+    QueryResponse,
+    QuotaExceededResponse,
+    UnauthorizedResponse,
+)
+from utils.concurrency import run_concurrently
+from utils.deadline import STAGE_MODEL_LISTING, run_stage
+from utils.endpoints import (
+    check_configuration_loaded,
+    validate_conversation_ownership,
+    validate_model_provider_override,
+)
+from utils.fair_scheduler import FairScheduler, user_roles
+from utils.mcp_headers import mcp_headers_dependency
+from utils.prompt_size import check_prompt_size
+from utils.quota import check_tokens_available, consume_tokens, get_available_quotas
+from utils.stage_timer import STAGE_QUOTA, timed
+from utils.stream_cancellation import run_detached
+from utils.token_counter import TokenCounter
+from utils.write_behind import WriteBehindQueue
+
+logger = logging.getLogger("app.endpoints.handlers")
+router = APIRouter(tags=["query"])
+
+batch_query_responses: dict[int | str, dict[str, Any]] = {
+    200: {
+        "description": "Results of the queries streamed as NDJSON in completion order",
+        "content": {
+            MEDIA_TYPE_NDJSON: {
+                "example": (
+                    '{"index": 1, "response": {"conversation_id": '
+                    '"123e4567-e89b-12d3-a456-426614174000", "response": "LLM answer"}}\n'
+                    '{"index": 0, "error": {"status_code": 404, "detail": '
+                    '{"response": "Conversation not found"}}}\n'
+                    '{"summary": {"succeeded": 1, "failed": 1, "input_tokens": 150, '
+                    '"output_tokens": 50, "available_quotas": {}}}\n'
+                )
+            }
+        },
+    },
+    400: {
+        "description": "Missing or invalid credentials provided by client",
+        "model": UnauthorizedResponse,
+    },
+    403: {
+        "description": "User is not authorized",
+        "model": ForbiddenResponse,
+    },
+    413: {
+        "detail": {
+            "response": "Too many queries in batch",
+            "cause": "The batch contains 2000 queries, at most 1000 are allowed.",
+        }
+    },
+    429: {
+        "description": "The quota has been exceeded",
+        "model": QuotaExceededResponse,
+    },
+    500: {
+        "detail": {
+            "response": "Unable to connect to Llama Stack",
+            "cause": "Connection error.",
+        }
+    },
+}
+
+
+def batch_item_error(error: Exception) -> dict[str, Any]:
+    """Convert error raised while answering one query into NDJSON error object.
+
+    Errors are reported with the same status codes and details as the
+    /query endpoint would use.
+    """
+    if isinstance(error, HTTPException):
+        return {"status_code": error.status_code, "detail": error.detail}
+    if isinstance(error, APIConnectionError):
+        # Update metrics for the LLM call failure
+        metrics.llm_calls_failures_total.inc()
+        logger.error("Unable to connect to Llama Stack: %s", error)
+        return {
+            "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "detail": {
+                "response": "Unable to connect to Llama Stack",
+                "cause": str(error),
+            },
+        }
+    if isinstance(error, RateLimitError):
+        used_model = getattr(error, "model", "unknown")
+        return {
+            "status_code": status.HTTP_429_TOO_MANY_REQUESTS,
+            "detail": {
+                "response": "Model quota exceeded",
+                "cause": f"The token quota for model {used_model} has been exceeded.",
+            },
+        }
+    logger.exception("Unable to process query from batch")
+    return {
+        "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+        "detail": {
+            "response": "Unable to process query",
+            "cause": str(error),
+        },
+    }
+
+
+async def answer_batch_item(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    request: Request,
+    query_request: QueryRequest,
+    auth: AuthTuple,
+    mcp_headers: dict[str, dict[str, str]],
+    client: AsyncLlamaStackClient,
+    models: ModelIndex,
+) -> tuple[QueryResponse, TokenCounter | None]:
+    """Answer one query of the batch.
+
+    Authentication, quota check and model listing are shared by the whole
+    batch, so only the query specific steps are performed here. Tokens are
+    not charged to quota limiters; they are returned to be charged once for
+    the whole batch.
+
+    Returns:
+        Tuple of the query response and the token usage to be charged, or
+        None when no tokens were consumed (reused response).
+    """
+    validate_model_provider_override(query_request, request.state.authorized_actions)
+
+    user_id, _, skip_userid_check, token = auth
+    started_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    user_conversation = None
+    if query_request.conversation_id:
+        user_conversation = await asyncio.to_thread(
+            validate_conversation_ownership,
+            user_id=user_id,
+            conversation_id=query_request.conversation_id,
+            others_allowed=(
+                Action.QUERY_OTHERS_CONVERSATIONS in request.state.authorized_actions
+            ),
+        )
+        if user_conversation is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "response": "Conversation not found",
+                    "cause": "The requested conversation does not exist.",
+                },
+            )
+
+    llama_stack_model_id, model_id, provider_id = select_model_and_provider_id(
+        models,
+        *evaluate_model_hints(
+            user_conversation=user_conversation, query_request=query_request
+        ),
+    )
+    await asyncio.to_thread(
+        check_prompt_size,
+        query_request,
+        llama_stack_model_id,
+        model_id,
+        provider_id,
+    )
+    # queries of the batch are admitted as turns of the user
+    async with FairScheduler().turn(user_id, user_roles(request.state)):
+        (
+            summary,
+            conversation_id,
+            referenced_documents,
+            token_usage,
+            topic_summary,
+            reused,
+        ) = await answer_query(
+            retrieve_response,
+            get_topic_summary,
+            client,
+            llama_stack_model_id,
+            provider_id,
+            query_request,
+            token,
+            mcp_headers,
+            request_cache_control(request),
+            user_id=user_id,
+        )
+
+    await persist_query_turn(
+        user_id,
+        conversation_id,
+        model_id,
+        provider_id,
+        query_request,
+        summary,
+        referenced_documents,
+        topic_summary,
+        started_at=started_at,
+        skip_userid_check=skip_userid_check,
+        # tokens are charged once for the whole batch
+        consumed_tokens=None,
+    )
+
+    response = build_query_response(
+        conversation_id, summary, referenced_documents, token_usage, {}
+    )
+    return response, None if reused else token_usage
+
+
+async def stream_batch_results(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    request: Request,
+    batch_request: BatchQueryRequest,
+    auth: AuthTuple,
+    mcp_headers: dict[str, dict[str, str]],
+    client: AsyncLlamaStackClient,
+    models: ModelIndex,
+    concurrency: int,
+) -> AsyncIterator[str]:
+    """Answer queries of the batch and yield their results as NDJSON lines.
+
+    At most `concurrency` queries are answered at the same time and results
+    are yielded in completion order, each tagged with the index of the query
+    in the batch. The last line contains a summary of the whole batch. Tokens
+    consumed by all queries are charged to quota limiters in one update, also
+    when the client disconnects before the batch is complete.
+    """
+    user_id = auth[0]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(index: int, query_request: QueryRequest) -> tuple[int, Any]:
+        async with semaphore:
+            try:
+                return index, await answer_batch_item(
+                    request, query_request, auth, mcp_headers, client, models
+                )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                return index, e
+
+    tasks = [
+        asyncio.create_task(answer(index, query_request))
+        for index, query_request in enumerate(batch_request.queries)
+    ]
+    succeeded = failed = input_tokens = output_tokens = 0
+    charged = False
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            index, result = await next_result
+            if isinstance(result, Exception):
+                failed += 1
+                line: dict[str, Any] = {
+                    "index": index,
+                    "error": batch_item_error(result),
+                }
+            else:
+                succeeded += 1
+                response, consumed = result
+                if consumed is not None:
+                    input_tokens += consumed.input_tokens
+                    output_tokens += consumed.output_tokens
+                line = {"index": index, "response": response.model_dump(mode="json")}
+            yield json.dumps(line) + "\n"
+
+        # once queued, the tokens are charged even if the client goes away
+        # while waiting for the write
+        charged = True
+        if input_tokens or output_tokens:
+            await WriteBehindQueue().submit(
+                user_id,
+                consume_tokens,
+                configuration.quota_limiters,
+                user_id,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+            )
+        available_quotas = await asyncio.to_thread(
+            get_available_quotas, configuration.quota_limiters, user_id
+        )
+        summary = {
+            "succeeded": succeeded,
+            "failed": failed,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "available_quotas": available_quotas,
+        }
+        yield json.dumps({"summary": summary}) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        if not charged and (input_tokens or output_tokens):
+            # the client went away, tokens consumed so far are still charged;
+            # the generator is being closed, so the write runs in background
+            run_detached(
+                asyncio.to_thread(
+                    consume_tokens,
+                    configuration.quota_limiters,
+                    user_id,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                )
+            )
+
+
+@router.post("/query/batch", responses=batch_query_responses)
+@authorize(Action.QUERY)
+async def batch_query_endpoint_handler(
+    request: Request,
+    batch_request: BatchQueryRequest,
+    auth: Annotated[AuthTuple, Depends(get_auth_dependency())],
+    mcp_headers: dict[str, dict[str, str]] = Depends(mcp_headers_dependency),
+) -> StreamingResponse:
+    """
+    Handle request to the /query/batch endpoint.
+
+    Answers a batch of independent queries using Agent API. Authentication,
+    quota check and model listing are performed once for the whole batch,
+    queries are answered concurrently (up to the configured limit) and the
+    results are streamed back as NDJSON in completion order, with errors
+    reported per query.
+
+    Returns:
+        StreamingResponse: NDJSON stream with one line per query followed
+        by a summary line.
+    """
+    check_configuration_loaded(configuration)
+
+    batch_configuration = configuration.batch_query_configuration
+    if len(batch_request.queries) > batch_configuration.max_queries:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail={
+                "response": "Too many queries in batch",
+                "cause": (
+                    f"The batch contains {len(batch_request.queries)} queries, "
+                    f"at most {batch_configuration.max_queries} are allowed."
+                ),
+            },
+        )
+
+    user_id = auth[0]
+    try:
+        # try to get Llama Stack client
+        client = AsyncLlamaStackClientHolder().get_client()
+        pre_inference = await run_concurrently(
+            "batch_pre_inference",
+            {
+                "quota": timed(
+                    STAGE_QUOTA,
+                    asyncio.to_thread(
+                        check_tokens_available, configuration.quota_limiters, user_id
+                    ),
+                ),
+                "models": run_stage(STAGE_MODEL_LISTING, ModelCatalog().get(client)),
+            },
+        )
+    # connection to Llama Stack server
+    except APIConnectionError as e:
+        metrics.llm_calls_failures_total.inc()
+        logger.error("Unable to connect to Llama Stack: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "response": "Unable to connect to Llama Stack",
+                "cause": str(e),
+            },
+        ) from e
+
+    logger.info("Processing batch of %d queries", len(batch_request.queries))
+    return StreamingResponse(
+        stream_batch_results(
+            request,
+            batch_request,
+            auth,
+            mcp_headers,
+            client,
+            pre_inference["models"],
+            batch_configuration.concurrency,
+        ),
+        media_type=MEDIA_TYPE_NDJSON,
+    )
@@ -0,0 +1,234 @@
+"""Handlers for REST API calls to submit and retrieve asynchronous query jobs."""
+
+import json
+import logging
+from functools import partial
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+import constants
+from app.endpoints.query import (
+    get_topic_summary,
+    query_endpoint_handler_base,
+    retrieve_response,
+)
+from authentication import get_auth_dependency
+from authentication.interface import AuthTuple
+from authorization.middleware import authorize
+from configuration import configuration
+from models.config import Action
+from models.database.query_jobs import QueryJob
+from models.requests import QueryRequest
+from models.responses import (
+    ForbiddenResponse,
+    QueryJobResponse,
+    QueryResponse,
+    UnauthorizedResponse,
+)
+from utils import suid
+from utils.endpoints import check_configuration_loaded, validate_model_provider_override
+from utils.mcp_headers import mcp_headers_dependency
+from utils.query_jobs import FINISHED_JOB_STATUSES, QueryJobRunner
+
+logger = logging.getLogger("app.endpoints.handlers")
+router = APIRouter(tags=["query_jobs"])
+
+query_job_responses: dict[int | str, dict[str, Any]] = {
+    200: {
+        "job_id": "123e4567-e89b-12d3-a456-426614174000",
+        "status": "succeeded",
+        "response": {
+            "conversation_id": "c5260aec-4d82-4370-9fdf-05cf908b3f16",
+            "response": "LLM answer",
+        },
+    },
+    400: {
+        "description": "Missing or invalid credentials provided by client",
+        "model": UnauthorizedResponse,
+    },
+    403: {
+        "description": "User is not authorized",
+        "model": ForbiddenResponse,
+    },
+    404: {
+        "detail": {
+            "response": "Query job not found",
+            "cause": "Query job 123e4567-e89b-12d3-a456-426614174000 does not exist",
+        }
+    },
+}
+
+submit_query_job_responses: dict[int | str, dict[str, Any]] = {
+    202: {
+        "job_id": "123e4567-e89b-12d3-a456-426614174000",
+        "status": "pending",
+    },
+    400: query_job_responses[400],
+    403: query_job_responses[403],
+    503: {
+        "detail": {
+            "response": "Unable to accept query job",
+            "cause": "Too many query jobs are waiting to be processed.",
+        }
+    },
+}
+
+
+def _to_query_job_response(job: QueryJob) -> QueryJobResponse:
+    """Convert the stored job into the REST API response."""
+    response = None
+    error = None
+    if job.result is not None:
+        result = json.loads(job.result)
+        if job.status == constants.QUERY_JOB_SUCCEEDED:
+            response = QueryResponse.model_validate(result)
+        else:
+            error = {"status_code": job.status_code, "detail": result}
+    return QueryJobResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at.isoformat() if job.created_at else None,
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        completed_at=job.completed_at.isoformat() if job.completed_at else None,
+        response=response,
+        error=error,
+    )
+
+
+async def _get_user_job(job_id: str, user_id: str, wait: float = 0) -> QueryJob:
+    """Retrieve the job of the user, waiting at most `wait` seconds for it to finish.
+
+    Raises:
+        HTTPException: When the job ID is invalid or the job of the user does not exist.
+    """
+    if not suid.check_suid(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "response": "Invalid query job ID format",
+                "cause": f"Query job ID {job_id} has invalid format",
+            },
+        )
+    wait = min(wait, configuration.query_jobs_configuration.max_wait)
+    job = await QueryJobRunner().wait(job_id, wait)
+    # jobs of other users are reported as not existing
+    if job is None or job.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "response": "Query job not found",
+                "cause": f"Query job {job_id} does not exist",
+            },
+        )
+    return job
+
+
+@router.post(
+    "/query/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses=submit_query_job_responses,
+)
+@authorize(Action.QUERY)
+async def submit_query_job_endpoint_handler(
+    request: Request,
+    query_request: QueryRequest,
+    auth: Annotated[AuthTuple, Depends(get_auth_dependency())],
+    mcp_headers: dict[str, dict[str, str]] = Depends(mcp_headers_dependency),
+) -> QueryJobResponse:
+    """
+    Handle request to submit an asynchronous query job.
+
+    The query is answered in the background by a bounded pool of workers,
+    the same way as by the /query endpoint. The job ID is returned right
+    away and the client polls the job status to retrieve the result.
+
+    Returns:
+        QueryJobResponse: The ID and status of the submitted job.
+    """
+    check_configuration_loaded(configuration)
+
+    # Enforce RBAC: optionally disallow overriding model/provider in requests
+    validate_model_provider_override(query_request, request.state.authorized_actions)
+
+    user_id = auth[0]
+    run = partial(
+        query_endpoint_handler_base,
+        request=request,
+        query_request=query_request,
+        auth=auth,
+        mcp_headers=mcp_headers,
+        retrieve_response_func=retrieve_response,
+        get_topic_summary_func=get_topic_summary,
+    )
+    job_id = await QueryJobRunner().submit(user_id, query_request, run)
+    return QueryJobResponse(
+        job_id=job_id,
+        status=constants.QUERY_JOB_PENDING,
+        created_at=None,
+        started_at=None,
+        completed_at=None,
+        response=None,
+        error=None,
+    )
+
+
+@router.get("/query/jobs/{job_id}", responses=query_job_responses)
+@authorize(Action.QUERY)
+async def get_query_job_endpoint_handler(
+    request: Request,  # pylint: disable=unused-argument
+    job_id: str,
+    auth: Annotated[AuthTuple, Depends(get_auth_dependency())],
+    wait: Annotated[
+        float,
+        Query(ge=0, description="Maximum time in seconds to wait for job to finish"),
+    ] = 0,
+) -> QueryJobResponse:
+    """
+    Handle request to retrieve status of an asynchronous query job.
+
+    With the `wait` parameter the request is answered once the job finishes
+    or the waiting time (limited by configuration) elapses (long polling).
+
+    Returns:
+        QueryJobResponse: Status of the job and its result when finished.
+    """
+    check_configuration_loaded(configuration)
+    job = await _get_user_job(job_id, auth[0], wait)
+    return _to_query_job_response(job)
+
+
+@router.get("/query/jobs/{job_id}/result", responses=query_job_responses)
+@authorize(Action.QUERY)
+async def get_query_job_result_endpoint_handler(
+    request: Request,  # pylint: disable=unused-argument
+    job_id: str,
+    auth: Annotated[AuthTuple, Depends(get_auth_dependency())],
+) -> QueryResponse:
+    """
+    Handle request to retrieve the result of an asynchronous query job.
+
+    The response of a succeeded job is returned as by the /query endpoint and
+    the error of a failed job is returned with its original status code.
+
+    Returns:
+        QueryResponse: Response to the query of the job.
+    """
+    check_configuration_loaded(configuration)
+    job = await _get_user_job(job_id, auth[0])
+    if job.status not in FINISHED_JOB_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "response": "Query job not finished",
+                "cause": f"Query job {job_id} is {job.status}",
+            },
+        )
+    job_response = _to_query_job_response(job)
+    if job_response.error is not None:
+        raise HTTPException(
+            status_code=job_response.error["status_code"],
+            detail=job_response.error["detail"],
+        )
+    assert job_response.response is not None
+    return job_response.response
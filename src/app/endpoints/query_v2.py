@@ -14,10 +14,12 @@ from app.endpoints.query import (
     query_endpoint_handler_base,
     validate_attachments_metadata,
 )
+import constants
 from constants import DEFAULT_RAG_TOOL
 from authentication import get_auth_dependency
 from authentication.interface import AuthTuple
 from authorization.middleware import authorize
+from catalog.vector_store_catalog import VectorStoreCatalog
 from configuration import configuration
 import metrics
 from models.config import Action
@@ -29,10 +31,21 @@ from models.responses import (
     UnauthorizedResponse,
     QuotaExceededResponse,
 )
+from utils.attachments import AttachmentIndex, render_query
+from utils.concurrency_limiter import LlamaStackLimiter
+from utils.deadline import (
+    STAGE_AGENT_INIT,
+    STAGE_TOPIC_SUMMARY,
+    STAGE_TURN_CREATION,
+    client_timeout,
+    deadline_stage,
+    stage_timeout,
+)
 from utils.endpoints import (
     get_system_prompt,
     get_topic_summary_system_prompt,
 )
+from utils.history import TOKEN_COUNTERS, HistoryMessage, fit_history, group_turns
 from utils.mcp_headers import mcp_headers_dependency
 from utils.token_counter import TokenCounter
 from utils.types import TurnSummary, ToolCallSummary
@@ -60,6 +73,13 @@ query_v2_response: dict[int | str, dict[str, Any]] = {
         "description": "Client does not have permission to access conversation",
         "model": ForbiddenResponse,
     },
+    413: {
+        "detail": {
+            "response": "Prompt is too long",
+            "cause": "The prompt has about 140000 tokens, the context size of "
+            "model provider/model is 128000 tokens.",
+        }
+    },
     429: {
         "description": "The quota has been exceeded",
         "model": QuotaExceededResponse,
@@ -79,8 +99,11 @@ def _extract_text_from_response_output_item(output_item: Any) -> str:
         return ""
     if getattr(output_item, "role", None) != "assistant":
         return ""
+    return _extract_text_from_message_content(getattr(output_item, "content", None))
 
-    content = getattr(output_item, "content", None)
+
+def _extract_text_from_message_content(content: Any) -> str:
+    """Extract text from content of a Responses API message."""
     if isinstance(content, str):
         return content
 
@@ -264,6 +287,7 @@ async def get_topic_summary(  # pylint: disable=too-many-nested-blocks
             instructions=topic_summary_system_prompt,
             stream=False,
             store=False,  # Don't store topic summary requests
+            timeout=client_timeout(stage_timeout(STAGE_TOPIC_SUMMARY)),
         )
         response = cast(OpenAIResponseObject, response)
 
@@ -292,6 +316,8 @@ async def query_endpoint_handler_v2(
 
     This is a wrapper around query_endpoint_handler_base that provides
     the Responses API specific retrieve_response and get_topic_summary functions.
+    The vector stores used by retrieve_response are loaded concurrently with
+    the other pre-inference steps.
 
     Returns:
         QueryResponse: Contains the conversation ID and the LLM-generated response.
@@ -303,31 +329,24 @@ async def query_endpoint_handler_v2(
         mcp_headers=mcp_headers,
         retrieve_response_func=retrieve_response,
         get_topic_summary_func=get_topic_summary,
+        prefetch_vector_stores=True,
     )
 
 
-async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branches,too-many-arguments
+async def prepare_responses_request(
     client: AsyncLlamaStackClient,
     model_id: str,
     query_request: QueryRequest,
     token: str,
     mcp_headers: dict[str, dict[str, str]] | None = None,
-    *,
-    provider_id: str = "",
-) -> tuple[TurnSummary, str, list[ReferencedDocument], TokenCounter]:
+) -> dict[str, Any]:
     """
-    Retrieve response from LLMs and agents.
+    Prepare arguments of the Responses API call answering the query.
 
-    Retrieves a response from the Llama Stack LLM or agent for a
-    given query, handling shield configuration, tool usage, and
-    attachment validation.
-
-    This function configures system prompts and toolgroups
-    (including RAG and MCP integration) as needed based on
-    the query request and system configuration. It
-    validates attachments, manages conversation and session
-    context, and processes MCP headers for multi-component
-    processing. Corresponding metrics are updated.
+    Configures the system prompt and tools (RAG and MCP integration) based
+    on the query request and system configuration, validates attachments
+    and appends them to the input. Shared by the streaming and
+    non-streaming Responses API endpoints.
 
     Parameters:
         client (AsyncLlamaStackClient): The AsyncLlamaStackClient to use for the request.
@@ -335,12 +354,10 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
         query_request (QueryRequest): The user's query and associated metadata.
         token (str): The authentication token for authorization.
         mcp_headers (dict[str, dict[str, str]], optional): Headers for multi-component processing.
-        provider_id (str): The identifier of the LLM provider to use.
 
     Returns:
-        tuple[TurnSummary, str]: A tuple containing a summary of the LLM or agent's response content
-        and the conversation ID, the list of parsed referenced documents,
-        and token usage information.
+        dict[str, Any]: Keyword arguments for `client.responses.create`
+        except the `stream` flag.
     """
     # TODO(ltomasbo): implement shields support once available in Responses API
     logger.info("Shields are not yet supported in Responses API. Disabling safety")
@@ -358,15 +375,10 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
     toolgroups: list[dict[str, Any]] | None = None
     if not query_request.no_tools:
         toolgroups = []
-        # Get vector stores for RAG tools
-        vector_store_ids = [
-            vector_store.id for vector_store in (await client.vector_stores.list()).data
-        ]
-
         # Add RAG tools if vector stores are available
-        rag_tools = get_rag_tools(vector_store_ids)
-        if rag_tools:
-            toolgroups.extend(rag_tools)
+        vector_stores = await VectorStoreCatalog().get(client)
+        if vector_stores.rag_tools:
+            toolgroups.extend(vector_stores.rag_tools)
 
         # Add MCP server tools
         mcp_tools = get_mcp_tools(configuration.mcp_servers, token, mcp_headers)
@@ -381,29 +393,196 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
         if not toolgroups:
             toolgroups = None
 
-    # Prepare input for Responses API
-    # Convert attachments to text and concatenate with query
-    input_text = query_request.query
-    if query_request.attachments:
-        for attachment in query_request.attachments:
-            # Append attachment content with type label
-            input_text += (
-                f"\n\n[Attachment: {attachment.attachment_type}]\n{attachment.content}"
-            )
-
     # Create OpenAI response using responses API
     create_kwargs: dict[str, Any] = {
-        "input": input_text,
+        # attachments are appended to the query text
+        "input": render_query(query_request.query, query_request.attachments),
         "model": model_id,
         "instructions": system_prompt,
         "tools": cast(Any, toolgroups),
-        "stream": False,
         "store": True,
     }
     if query_request.conversation_id:
         create_kwargs["previous_response_id"] = query_request.conversation_id
+    return create_kwargs
+
+
+def _history_tokens(response: object) -> int | None:
+    """Return tokens of the whole conversation up to the response, if reported.
+
+    Usage is not part of the typed response object, it is sent by Llama
+    Stack as an extra field, either a mapping or an object.
+    """
+    usage = getattr(response, "usage", None)
+    if isinstance(usage, dict):
+        input_tokens = usage.get("input_tokens")
+        output_tokens = usage.get("output_tokens")
+    else:
+        input_tokens = getattr(usage, "input_tokens", None)
+        output_tokens = getattr(usage, "output_tokens", None)
+    if not isinstance(input_tokens, int) or not input_tokens:
+        return None
+    return input_tokens + (output_tokens if isinstance(output_tokens, int) else 0)
+
+
+def _history_messages(items: list[Any]) -> list[HistoryMessage]:
+    """Convert Responses API items to history messages, skipping tool calls."""
+    messages = []
+    for item in items:
+        role = getattr(item, "role", None)
+        if getattr(item, "type", "message") != "message" or role not in (
+            "user",
+            "assistant",
+        ):
+            continue
+        content = _extract_text_from_message_content(getattr(item, "content", None))
+        if content:
+            messages.append(HistoryMessage(role=role, content=content))
+    return messages
+
+
+async def apply_history_budget(
+    client: AsyncLlamaStackClient, model_id: str, create_kwargs: dict[str, Any]
+) -> bool:
+    """Fit history of the continued conversation into the token budget.
+
+    Chained responses send the whole conversation to the model. When the
+    history does not fit into the token budget of the model together with
+    the instructions and the query, the oldest turns are dropped: the kept
+    turns are sent explicitly as input instead of chaining to the previous
+    response. Later turns chain to the new, shorter, conversation.
+
+    Token usage reported with the previous response is used to avoid
+    retrieving the history while it fits into the budget.
+
+    Parameters:
+        client (AsyncLlamaStackClient): The AsyncLlamaStackClient to use for the request.
+        model_id (str): The identifier of the LLM model to use.
+        create_kwargs (dict[str, Any]): Arguments of the Responses API call,
+        updated in place when the history is truncated.
+
+    Returns:
+        bool: True if the oldest turns of the history were dropped.
+    """
+    previous_response_id = create_kwargs.get("previous_response_id")
+    if not previous_response_id:
+        return False
+    history_config = configuration.conversation_history_configuration
+    if not history_config.enabled:
+        return False
+
+    count = TOKEN_COUNTERS[history_config.token_counter]
+    budget = history_config.budget(model_id)
+    query_tokens = count(create_kwargs["input"])
+    previous = await client.responses.retrieve(previous_response_id)
+    history_tokens = _history_tokens(previous)
+    if history_tokens is not None and history_tokens + query_tokens <= budget:
+        return False
+
+    # the most recent items are listed first
+    input_items = await client.responses.input_items.list(
+        previous_response_id, order="desc", limit=constants.HISTORY_ITEMS_LIMIT
+    )
+    items = list(reversed(input_items.data))
+    turns = group_turns(_history_messages(items + list(previous.output)))
+    kept, truncated = fit_history(
+        turns,
+        budget,
+        query_tokens + count(create_kwargs["instructions"] or ""),
+        count,
+    )
+    # older items were not even listed
+    truncated = truncated or len(input_items.data) >= constants.HISTORY_ITEMS_LIMIT
+    if not truncated:
+        return False
+
+    logger.info(
+        "Dropping %d oldest turns of conversation %s to fit %d tokens",
+        len(turns) - len(kept),
+        previous_response_id,
+        budget,
+    )
+    del create_kwargs["previous_response_id"]
+    create_kwargs["input"] = [
+        {"role": message.role, "content": message.content}
+        for turn in kept
+        for message in turn.messages
+    ] + [{"role": "user", "content": create_kwargs["input"]}]
+    return True
+
+
+def reference_sent_attachments(
+    create_kwargs: dict[str, Any], query_request: QueryRequest
+) -> None:
+    """Replace attachments sent earlier in the conversation with references.
+
+    Only responses chained to the previous response see the earlier turns,
+    so nothing is referenced once the history was truncated.
+
+    Parameters:
+        create_kwargs (dict[str, Any]): Arguments of the Responses API call,
+        updated in place when an attachment is referenced.
+        query_request (QueryRequest): The user's query and associated metadata.
+    """
+    known = AttachmentIndex().known(create_kwargs.get("previous_response_id"))
+    if known and query_request.attachments:
+        create_kwargs["input"] = render_query(
+            query_request.query, query_request.attachments, known
+        )
+
+
+async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branches,too-many-arguments
+    client: AsyncLlamaStackClient,
+    model_id: str,
+    query_request: QueryRequest,
+    token: str,
+    mcp_headers: dict[str, dict[str, str]] | None = None,
+    *,
+    provider_id: str = "",
+) -> tuple[TurnSummary, str, list[ReferencedDocument], TokenCounter]:
+    """
+    Retrieve response from LLMs and agents.
+
+    Retrieves a response from the Llama Stack LLM or agent for a
+    given query, handling shield configuration, tool usage, and
+    attachment validation.
+
+    This function configures system prompts and toolgroups
+    (including RAG and MCP integration) as needed based on
+    the query request and system configuration. It
+    validates attachments, manages conversation and session
+    context, and processes MCP headers for multi-component
+    processing. Corresponding metrics are updated.
+
+    Parameters:
+        client (AsyncLlamaStackClient): The AsyncLlamaStackClient to use for the request.
+        model_id (str): The identifier of the LLM model to use.
+        query_request (QueryRequest): The user's query and associated metadata.
+        token (str): The authentication token for authorization.
+        mcp_headers (dict[str, dict[str, str]], optional): Headers for multi-component processing.
+        provider_id (str): The identifier of the LLM provider to use.
 
-    response = await client.responses.create(**create_kwargs)
+    Returns:
+        tuple[TurnSummary, str]: A tuple containing a summary of the LLM or agent's response content
+        and the conversation ID, the list of parsed referenced documents,
+        and token usage information.
+    """
+    async with deadline_stage(STAGE_AGENT_INIT):
+        create_kwargs = await prepare_responses_request(
+            client, model_id, query_request, token, mcp_headers
+        )
+        truncated = await apply_history_budget(client, model_id, create_kwargs)
+        reference_sent_attachments(create_kwargs, query_request)
+    system_prompt = create_kwargs["instructions"]
+
+    # the remaining time is propagated to the client call
+    async with (
+        deadline_stage(STAGE_TURN_CREATION) as timeout,
+        LlamaStackLimiter().slot(),
+    ):
+        response = await client.responses.create(
+            **create_kwargs, stream=False, timeout=client_timeout(timeout)
+        )
     response = cast(OpenAIResponseObject, response)
 
     logger.debug(
@@ -414,6 +593,11 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
 
     # Return the response ID - client can use it for chaining if desired
     conversation_id = response.id
+    AttachmentIndex().remember(
+        conversation_id,
+        query_request.attachments,
+        previous=create_kwargs.get("previous_response_id"),
+    )
 
     # Process OpenAI response format
     llm_response = ""
@@ -437,6 +621,7 @@ async def retrieve_response(  # pylint: disable=too-many-locals,too-many-branche
     summary = TurnSummary(
         llm_response=llm_response,
         tool_calls=tool_calls,
+        truncated=truncated,
     )
 
     # Extract referenced documents and token usage from Responses API response
@@ -576,27 +761,50 @@ def _increment_llm_call_metric(provider: str, model: str) -> None:
         logger.warning("Failed to update LLM call metric: %s", e)
 
 
-def get_rag_tools(vector_store_ids: list[str]) -> list[dict[str, Any]] | None:
+class MCPToolTemplate:  # pylint: disable=too-few-public-methods
+    """MCP tool definitions for Responses API precompiled from configuration.
+
+    Only the authorization headers depend on the request, so the static part
+    of every tool definition is built once per list of MCP servers and just
+    the headers are filled in for each request.
     """
-    Convert vector store IDs to tools format for Responses API.
 
-    Args:
-        vector_store_ids: List of vector store identifiers
+    def __init__(self, mcp_servers: list) -> None:
+        """Precompile tool definitions for given MCP servers."""
+        self.mcp_servers = mcp_servers
+        self._tools: list[tuple[str, dict[str, Any]]] = [
+            (
+                mcp_server.url,
+                {
+                    "type": "mcp",
+                    "server_label": mcp_server.name,
+                    "server_url": mcp_server.url,
+                    "require_approval": "never",
+                },
+            )
+            for mcp_server in mcp_servers
+        ]
 
-    Returns:
-        list[dict[str, Any]] | None: List containing file_search tool configuration,
-        or None if no vector stores provided
-    """
-    if not vector_store_ids:
-        return None
+    def render(
+        self,
+        token: str | None = None,
+        mcp_headers: dict[str, dict[str, str]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return tool definitions with per-request authorization headers."""
+        tools = []
+        for url, template in self._tools:
+            tool_def = dict(template)
+            # Add authentication if headers or token provided (Response API format)
+            headers = (mcp_headers or {}).get(url)
+            if headers:
+                tool_def["headers"] = headers
+            elif token:
+                tool_def["headers"] = {"Authorization": f"Bearer {token}"}
+            tools.append(tool_def)
+        return tools
 
-    return [
-        {
-            "type": "file_search",
-            "vector_store_ids": vector_store_ids,
-            "max_num_results": 10,
-        }
-    ]
+
+_mcp_tool_template = MCPToolTemplate([])
 
 
 def get_mcp_tools(
@@ -616,20 +824,8 @@ def get_mcp_tools(
         list[dict[str, Any]]: List of MCP tool definitions with server
             details and optional auth headers
     """
-    tools = []
-    for mcp_server in mcp_servers:
-        tool_def = {
-            "type": "mcp",
-            "server_label": mcp_server.name,
-            "server_url": mcp_server.url,
-            "require_approval": "never",
-        }
-
-        # Add authentication if headers or token provided (Response API format)
-        headers = (mcp_headers or {}).get(mcp_server.url)
-        if headers:
-            tool_def["headers"] = headers
-        elif token:
-            tool_def["headers"] = {"Authorization": f"Bearer {token}"}
-        tools.append(tool_def)
-    return tools
+    global _mcp_tool_template  # pylint: disable=global-statement
+    # the template is rebuilt only when the configured MCP servers change
+    if _mcp_tool_template.mcp_servers is not mcp_servers:
+        _mcp_tool_template = MCPToolTemplate(mcp_servers)
+    return _mcp_tool_template.render(token, mcp_headers)
@@ -10,6 +10,7 @@ from llama_stack_client import APIConnectionError
 from authentication import get_auth_dependency
 from authentication.interface import AuthTuple
 from authorization.middleware import authorize
+from catalog.shield_catalog import ShieldCatalog
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from models.config import Action
@@ -46,7 +47,8 @@ async def shields_endpoint_handler(
     Handle requests to the /shields endpoint.
 
     Process GET requests to the /shields endpoint, returning a list of available
-    shields from the Llama Stack service.
+    shields from the Llama Stack service. The list is served from the shield
+    catalog, so Llama Stack is contacted only when the cached list expires.
 
     Raises:
         HTTPException: If unable to connect to the Llama Stack server or if
@@ -69,8 +71,8 @@ async def shields_endpoint_handler(
     try:
         # try to get Llama Stack client
         client = AsyncLlamaStackClientHolder().get_client()
-        # retrieve shields
-        shields = await client.shields.list()
+        # retrieve shields from the shared shield catalog
+        shields = await ShieldCatalog().get(client)
         s = [dict(s) for s in shields]
         return ShieldsResponse(shields=s)
 
@@ -1,15 +1,24 @@
 """Handler for REST API call to provide answer to streaming query."""  # pylint: disable=too-many-lines,too-many-locals,W0511
 
-import ast
+import asyncio
 import json
 import logging
-import re
 import uuid
 from datetime import UTC, datetime
-from typing import Annotated, Any, AsyncGenerator, AsyncIterator, Iterator, cast
+from functools import partial
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Iterator,
+    Optional,
+    cast,
+)
 
 from litellm.exceptions import RateLimitError
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 from llama_stack_client import (
     APIConnectionError,
@@ -22,13 +31,9 @@ from llama_stack_client.types.agents.agent_turn_response_stream_chunk import (
 )
 from llama_stack_client.types.shared import ToolCall
 from llama_stack_client.types.shared.interleaved_content_item import TextContentItem
-from llama_stack_client.types.agents.turn_create_params import Document
 
-from app.database import get_session
 from app.endpoints.query import (
     get_rag_toolgroups,
-    is_input_shield,
-    is_output_shield,
     is_transcripts_enabled,
     select_model_and_provider_id,
     validate_attachments_metadata,
@@ -36,15 +41,22 @@ from app.endpoints.query import (
     persist_user_conversation_details,
     evaluate_model_hints,
     get_topic_summary,
+    start_topic_summary,
+    cancel_topic_summary,
+    resolve_topic_summary,
+    record_cancelled_turn,
+    stateless_query_key,
 )
 from authentication import get_auth_dependency
 from authentication.interface import AuthTuple
 from authorization.middleware import authorize
+from cache.response_cache import ResponseCache
+from catalog.model_catalog import ModelCatalog
+from catalog.shield_catalog import ShieldCatalog
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from constants import DEFAULT_RAG_TOOL, MEDIA_TYPE_JSON, MEDIA_TYPE_TEXT
 import metrics
-from metrics.utils import update_llm_token_count_from_turn
 from models.cache_entry import CacheEntry
 from models.config import Action
 from models.database.conversations import UserConversation
@@ -54,24 +66,51 @@ from models.responses import (
     UnauthorizedResponse,
     QuotaExceededResponse,
 )
+from utils.attachments import AttachmentIndex, turn_input
+from utils.coalescing import TokenCoalescing
+from utils.concurrency_limiter import LlamaStackLimiter
+from utils.deadline import (
+    STAGE_AGENT_INIT,
+    STAGE_MODEL_LISTING,
+    STAGE_TURN_CREATION,
+    deadline_stage,
+    run_stage,
+    until_deadline,
+)
 from utils.endpoints import (
     check_configuration_loaded,
     create_referenced_documents_with_metadata,
     create_rag_chunks_dict,
+    create_agent_turn,
     get_agent,
     get_system_prompt,
     store_conversation_into_cache,
     validate_model_provider_override,
 )
+from utils.fair_scheduler import FairScheduler, user_roles
+from utils.keepalive import StreamKeepalive
 from utils.mcp_headers import handle_mcp_headers_with_toolgroups, mcp_headers_dependency
-from utils.token_counter import TokenCounter, extract_token_usage_from_turn
+from utils.prompt_size import check_prompt_size
+from utils.resumable_stream import ResumableStreams
+from utils.rag_metadata import extract_metadata
+from utils.single_flight import SingleFlight, StreamFanOut
+from utils.sse import encode_data, encode_event, token_delta
+from utils.stage_timer import STAGE_PERSISTENCE, stage_timer
+from utils.stream_cancellation import aclose_quietly, run_detached, stream_cancelled
+from utils.token_counter import StreamTokenUsage, TokenCounter
 from utils.transcripts import store_transcript
+from utils.write_behind import WriteBehindQueue
 from utils.types import TurnSummary
 
 
 logger = logging.getLogger("app.endpoints.handlers")
 router = APIRouter(tags=["streaming_query"])
 
+# identical stateless queries streamed at the same time share one LLM stream
+streaming_query_flights: SingleFlight[
+    tuple[StreamFanOut[AgentTurnResponseStreamChunk], str, asyncio.Task[str] | None]
+] = SingleFlight("streaming query")
+
 streaming_query_responses: dict[int | str, dict[str, Any]] = {
     200: {
         "description": "Streaming response with Server-Sent Events",
@@ -80,11 +119,14 @@ streaming_query_responses: dict[int | str, dict[str, Any]] = {
                 "schema": {
                     "type": "string",
                     "example": (
+                        "id: 0c3e1f5a-5b1e-4d0e-9c51-3f1c2a1b7d42:0\n"
                         'data: {"event": "start", '
                         '"data": {"conversation_id": "123e4567-e89b-12d3-a456-426614174000"}}\n\n'
+                        "id: 0c3e1f5a-5b1e-4d0e-9c51-3f1c2a1b7d42:1\n"
                         'data: {"event": "token", "data": {"id": 0, "token": "Hello"}}\n\n'
+                        "id: 0c3e1f5a-5b1e-4d0e-9c51-3f1c2a1b7d42:2\n"
                         'data: {"event": "end", "data": {"referenced_documents": [], '
-                        '"truncated": null, "input_tokens": 0, "output_tokens": 0}, '
+                        '"truncated": false, "input_tokens": 0, "output_tokens": 0}, '
                         '"available_quotas": {}}\n\n'
                     ),
                 }
@@ -109,6 +151,20 @@ streaming_query_responses: dict[int | str, dict[str, Any]] = {
         "description": "Client does not have permission to access conversation",
         "model": ForbiddenResponse,
     },
+    410: {
+        "detail": {
+            "response": "Stream can not be resumed",
+            "cause": "Events following the last received event are not "
+            "available any longer, send the query again.",
+        }
+    },
+    413: {
+        "detail": {
+            "response": "Prompt is too long",
+            "cause": "The prompt has about 140000 tokens, the context size of "
+            "model provider/model is 128000 tokens.",
+        }
+    },
     429: {
         "description": "The quota has been exceeded",
         "model": QuotaExceededResponse,
@@ -122,8 +178,6 @@ streaming_query_responses: dict[int | str, dict[str, Any]] = {
 }
 
 
-METADATA_PATTERN = re.compile(r"\nMetadata: (\{.+})\n")
-
 # OLS-compatible event types
 LLM_TOKEN_EVENT = "token"
 LLM_TOOL_CALL_EVENT = "tool_call"
@@ -140,8 +194,7 @@ def format_stream_data(d: dict) -> str:
     Returns:
         str: The formatted SSE data string.
     """
-    data = json.dumps(d)
-    return f"data: {data}\n\n"
+    return encode_data(d)
 
 
 def stream_start_event(conversation_id: str) -> str:
@@ -170,7 +223,7 @@ def stream_start_event(conversation_id: str) -> str:
 
 def stream_end_event(
     metadata_map: dict,
-    summary: TurnSummary,  # pylint: disable=unused-argument
+    summary: TurnSummary,
     token_usage: TokenCounter,
     media_type: str = MEDIA_TYPE_JSON,
 ) -> str:
@@ -218,7 +271,7 @@ def stream_end_event(
             "data": {
                 "rag_chunks": [],  # TODO(jboos): implement RAG chunks when summary is available
                 "referenced_documents": referenced_docs_dict,
-                "truncated": None,  # TODO(jboos): implement truncated
+                "truncated": summary.truncated,
                 "input_tokens": token_usage.input_tokens,
                 "output_tokens": token_usage.output_tokens,
             },
@@ -247,12 +300,26 @@ def stream_event(data: dict, event_type: str, media_type: str) -> str:
             return f"\nTool result: {json.dumps(data)}\n"
         logger.error("Unknown event type: %s", event_type)
         return ""
-    return format_stream_data(
-        {
-            "event": event_type,
-            "data": data,
-        }
-    )
+    # token events are assembled from precomputed frames, see utils.sse
+    return encode_event(event_type, data)
+
+
+def stream_text_delta(chunk_id: int, text: str, media_type: str) -> str:
+    """Build an item with a delta of the answer text.
+
+    Adjacent deltas can be merged into one item, see utils.coalescing.
+
+    Args:
+        chunk_id: The current chunk ID counter.
+        text: Delta of the answer text.
+        media_type: Media type of the response (e.g. text or JSON).
+
+    Returns:
+        str: The formatted string or JSON to yield.
+    """
+    if media_type == MEDIA_TYPE_TEXT:
+        return token_delta(None, chunk_id, text)
+    return token_delta(LLM_TOKEN_EVENT, chunk_id, text)
 
 
 def stream_build_event(
@@ -271,7 +338,7 @@ def stream_build_event(
     1. turn_start, turn_awaiting_input -> start token
     2. turn_complete -> final output message
     3. step_* with step_type in {"shield_call", "inference", "tool_execution"} -> delegated handlers
-    4. anything else -> heartbeat
+    4. anything else -> nothing, keepalive is sent by utils.keepalive
 
     Args:
         chunk: The streaming chunk from Llama Stack containing event data
@@ -305,7 +372,6 @@ def stream_build_event(
                 event_type,
                 step_type,
             )
-            yield from _handle_heartbeat_event(chunk_id, media_type)
 
 
 # -----------------------------------
@@ -553,13 +619,8 @@ def _handle_inference_event(
                 )
 
         elif chunk.event.payload.delta.type == "text":
-            yield stream_event(
-                data={
-                    "id": chunk_id,
-                    "token": chunk.event.payload.delta.text,
-                },
-                event_type=LLM_TOKEN_EVENT,
-                media_type=media_type,
+            yield stream_text_delta(
+                chunk_id, chunk.event.payload.delta.text, media_type
             )
 
 
@@ -638,16 +699,9 @@ def _handle_tool_execution_event(
                             newline_pos = summary.find("\n")
                             if newline_pos > 0:
                                 summary = summary[:newline_pos]
-                        for match in METADATA_PATTERN.findall(text_content_item.text):
-                            try:
-                                meta = ast.literal_eval(match)
-                                if "document_id" in meta:
-                                    metadata_map[meta["document_id"]] = meta
-                            except Exception:  # pylint: disable=broad-except
-                                logger.debug(
-                                    "An exception was thrown in processing %s",
-                                    match,
-                                )
+                        for meta in extract_metadata(text_content_item.text):
+                            if "document_id" in meta:
+                                metadata_map[meta["document_id"]] = meta
 
                 yield stream_event(
                     data={
@@ -675,33 +729,57 @@ def _handle_tool_execution_event(
                 )
 
 
-# -----------------------------------
-# Catch-all for everything else
-# -----------------------------------
-def _handle_heartbeat_event(
-    chunk_id: int, media_type: str = MEDIA_TYPE_JSON
-) -> Iterator[str]:
+async def close_cancelled_turn(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    stream: AsyncIterator[Any],
+    user_id: str,
+    conversation_id: str,
+    model_id: str,
+    provider_id: str,
+    query_request: QueryRequest,
+    summary: TurnSummary,
+) -> None:
+    """Close the LLM stream of a cancelled turn and record the partial response.
+
+    Closing the stream stops generation of the rest of the answer.
     """
-    Yield a heartbeat event.
+    await aclose_quietly(stream)
+    await record_cancelled_turn(
+        user_id, conversation_id, model_id, provider_id, query_request, summary
+    )
 
-    Yield a heartbeat event as a Server-Sent Event (SSE) for the
-    given chunk ID.
 
-    Parameters:
-        chunk_id (int): The identifier for the current streaming
-        chunk.
+async def start_streaming_response(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    client: AsyncLlamaStackClient,
+    llama_stack_model_id: str,
+    model_id: str,
+    query_request: QueryRequest,
+    token: str,
+    mcp_headers: dict[str, dict[str, str]],
+) -> tuple[StreamFanOut[AgentTurnResponseStreamChunk], str, asyncio.Task[str] | None]:
+    """Start the LLM stream together with the topic summary.
 
-    Yields:
-        str: SSE-formatted heartbeat event string.
+    The topic summary of a new conversation is generated concurrently with
+    the main LLM call. The stream is consumed by a fan-out so it can be
+    delivered to several subscribers.
+
+    Returns:
+        Tuple of the stream fan-out, conversation ID and topic summary task.
     """
-    yield stream_event(
-        data={
-            "id": chunk_id,
-            "token": "heartbeat",
-        },
-        event_type=LLM_TOKEN_EVENT,
-        media_type=media_type,
+    topic_summary_task = start_topic_summary(
+        get_topic_summary, query_request, client, model_id
     )
+    try:
+        response, conversation_id = await retrieve_response(
+            client,
+            llama_stack_model_id,
+            query_request,
+            token,
+            mcp_headers=mcp_headers,
+        )
+    except BaseException:
+        cancel_topic_summary(topic_summary_task)
+        raise
+    return StreamFanOut(response), conversation_id, topic_summary_task
 
 
 @router.post("/streaming_query", responses=streaming_query_responses)
@@ -711,6 +789,7 @@ async def streaming_query_endpoint_handler(  # pylint: disable=too-many-locals,t
     query_request: QueryRequest,
     auth: Annotated[AuthTuple, Depends(get_auth_dependency())],
     mcp_headers: dict[str, dict[str, str]] = Depends(mcp_headers_dependency),
+    last_event_id: Annotated[Optional[str], Header()] = None,
 ) -> StreamingResponse:
     """
     Handle request to the /streaming_query endpoint.
@@ -722,6 +801,10 @@ async def streaming_query_endpoint_handler(  # pylint: disable=too-many-locals,t
     completions, errors, and end-of-stream metadata. Optionally
     stores the conversation transcript if enabled in configuration.
 
+    A client that lost the connection can resume the response by sending
+    the query again with the `Last-Event-ID` header, it receives the events
+    it missed instead of a new answer.
+
     Returns:
         StreamingResponse: An HTTP streaming response yielding
         SSE-formatted events for the query lifecycle.
@@ -744,6 +827,13 @@ async def streaming_query_endpoint_handler(  # pylint: disable=too-many-locals,t
 
     user_id, _user_name, _skip_userid_check, token = auth
 
+    # a reconnected client gets the rest of the response it already started
+    resumed = ResumableStreams().resume(user_id, last_event_id)
+    if resumed is not None:
+        return StreamingResponse(
+            StreamKeepalive().apply(resumed), media_type="text/event-stream"
+        )
+
     user_conversation: UserConversation | None = None
     if query_request.conversation_id:
         user_conversation = validate_conversation_ownership(
@@ -768,18 +858,50 @@ async def streaming_query_endpoint_handler(  # pylint: disable=too-many-locals,t
         # try to get Llama Stack client
         client = AsyncLlamaStackClientHolder().get_client()
         llama_stack_model_id, model_id, provider_id = select_model_and_provider_id(
-            await client.models.list(),
+            await run_stage(STAGE_MODEL_LISTING, ModelCatalog().get(client)),
             *evaluate_model_hints(
                 user_conversation=user_conversation, query_request=query_request
             ),
         )
-        response, conversation_id = await retrieve_response(
+        await asyncio.to_thread(
+            check_prompt_size,
+            query_request,
+            llama_stack_model_id,
+            model_id,
+            provider_id,
+        )
+        generate = partial(
+            start_streaming_response,
             client,
             llama_stack_model_id,
+            model_id,
             query_request,
             token,
-            mcp_headers=mcp_headers,
+            mcp_headers,
         )
+        # the answer is returned in the conversation it was generated in,
+        # so it is shared only among queries of the same user
+        query_key = stateless_query_key(
+            query_request, llama_stack_model_id, provider_id, user_id
+        )
+        shared = False
+        # the permit is held until the response stream ends
+        permit = await FairScheduler().acquire(user_id, user_roles(request.state))
+        try:
+            if query_key and ResponseCache().single_flight:
+                # identical queries in flight share one LLM stream; the flight
+                # stays joinable until the stream is fully received
+                (fanout, conversation_id, topic_summary_task), shared = (
+                    await streaming_query_flights.do(
+                        query_key, generate, linger=lambda result: result[0].finished
+                    )
+                )
+            else:
+                fanout, conversation_id, topic_summary_task = await generate()
+        except BaseException:
+            permit.release()
+            raise
+        response = fanout.subscribe()
         metadata_map: dict[str, dict[str, Any]] = {}
 
         async def response_generator(
@@ -804,121 +926,174 @@ async def streaming_query_endpoint_handler(  # pylint: disable=too-many-locals,t
             # Determine media type for response formatting
             media_type = query_request.media_type or MEDIA_TYPE_JSON
 
-            # Send start event at the beginning of the stream
-            yield stream_start_event(conversation_id)
-
             latest_turn: Any | None = None
+            # deltas of the answer, recorded if the turn is cancelled
+            answer: list[str] = []
+            # tokens of the answer are counted as the deltas arrive
+            token_usage = StreamTokenUsage(
+                model_id,
+                provider_id,
+                get_system_prompt(query_request, configuration),
+            )
 
-            async for chunk in turn_response:
-                if chunk.event is None:
-                    continue
-                p = chunk.event.payload
-                if p.event_type == "turn_complete":
-                    summary.llm_response = interleaved_content_as_str(
-                        p.turn.output_message.content
-                    )
-                    latest_turn = p.turn
-                    system_prompt = get_system_prompt(query_request, configuration)
-                    try:
-                        update_llm_token_count_from_turn(
-                            p.turn, model_id, provider_id, system_prompt
+            try:
+                # Send start event at the beginning of the stream
+                yield stream_start_event(conversation_id)
+
+                async for chunk in turn_response:
+                    if chunk.event is None:
+                        continue
+                    p = chunk.event.payload
+                    if p.event_type == "turn_complete":
+                        summary.llm_response = interleaved_content_as_str(
+                            p.turn.output_message.content
                         )
-                    except Exception:  # pylint: disable=broad-except
-                        logger.exception("Failed to update token usage metrics")
-                elif p.event_type == "step_complete":
-                    if p.step_details.step_type == "tool_execution":
-                        summary.append_tool_calls_from_llama(p.step_details)
-
-                for event in stream_build_event(
-                    chunk, chunk_id, metadata_map, media_type, conversation_id
-                ):
-                    chunk_id += 1
-                    yield event
-
-            # Extract token usage from the turn
-            token_usage = (
-                extract_token_usage_from_turn(latest_turn)
-                if latest_turn is not None
-                else TokenCounter()
-            )
+                        latest_turn = p.turn
+                        token_usage.complete(p.turn)
+                    elif p.event_type == "step_progress" and p.delta.type == "text":
+                        answer.append(p.delta.text)
+                        token_usage.add_output(p.delta.text)
+                    elif p.event_type == "step_complete":
+                        if p.step_details.step_type == "tool_execution":
+                            summary.append_tool_calls_from_llama(p.step_details)
+
+                    for event in stream_build_event(
+                        chunk, chunk_id, metadata_map, media_type, conversation_id
+                    ):
+                        chunk_id += 1
+                        yield event
+            except (asyncio.CancelledError, GeneratorExit):
+                # the client went away, the rest of the answer is not generated
+                cancel_topic_summary(topic_summary_task)
+                if latest_turn is None:
+                    summary.llm_response = "".join(answer)
+                stream_cancelled(
+                    close_cancelled_turn(
+                        turn_response,
+                        user_id,
+                        conversation_id,
+                        model_id,
+                        provider_id,
+                        query_request,
+                        summary,
+                    )
+                )
+                raise
+
+            async def store_turn() -> None:
+                """Generate the topic summary and store the turn."""
+                # Get the initial topic summary for the conversation
+                topic_summary = await resolve_topic_summary(
+                    topic_summary_task,
+                    get_topic_summary,
+                    conversation_id,
+                    query_request.query,
+                    client,
+                    model_id,
+                )
 
-            yield stream_end_event(metadata_map, summary, token_usage, media_type)
+                completed_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
 
-            if not is_transcripts_enabled():
-                logger.debug("Transcript collection is disabled in the configuration")
-            else:
-                store_transcript(
-                    user_id=user_id,
-                    conversation_id=conversation_id,
-                    model_id=model_id,
-                    provider_id=provider_id,
-                    query_is_valid=True,  # TODO(lucasagomes): implement as part of query validation
-                    query=query_request.query,
-                    query_request=query_request,
-                    summary=summary,
-                    rag_chunks=create_rag_chunks_dict(summary),
-                    truncated=False,  # TODO(lucasagomes): implement truncation as part
-                    # of quota work
-                    attachments=query_request.attachments or [],
+                referenced_documents = create_referenced_documents_with_metadata(
+                    summary, metadata_map
                 )
 
-            # Get the initial topic summary for the conversation
-            topic_summary = None
-            with get_session() as session:
-                existing_conversation = (
-                    session.query(UserConversation)
-                    .filter_by(id=conversation_id)
-                    .first()
+                cache_entry = CacheEntry(
+                    query=query_request.query,
+                    response=summary.llm_response,
+                    provider=provider_id,
+                    model=model_id,
+                    started_at=started_at,
+                    completed_at=completed_at,
+                    referenced_documents=(
+                        referenced_documents if referenced_documents else None
+                    ),
                 )
-                if not existing_conversation:
-                    topic_summary = await get_topic_summary(
-                        query_request.query, client, model_id
-                    )
 
-            completed_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+                # blocking bookkeeping is handed over to the write-behind queue
+                write_behind = WriteBehindQueue()
+                bookkeeping: list[Awaitable[None]] = []
 
-            referenced_documents = create_referenced_documents_with_metadata(
-                summary, metadata_map
-            )
-
-            cache_entry = CacheEntry(
-                query=query_request.query,
-                response=summary.llm_response,
-                provider=provider_id,
-                model=model_id,
-                started_at=started_at,
-                completed_at=completed_at,
-                referenced_documents=(
-                    referenced_documents if referenced_documents else None
-                ),
-            )
-
-            store_conversation_into_cache(
-                configuration,
-                user_id,
-                conversation_id,
-                cache_entry,
-                _skip_userid_check,
-                topic_summary,
-            )
+                if not is_transcripts_enabled():
+                    logger.debug(
+                        "Transcript collection is disabled in the configuration"
+                    )
+                else:
+                    bookkeeping.append(
+                        write_behind.submit(
+                            conversation_id,
+                            store_transcript,
+                            user_id=user_id,
+                            conversation_id=conversation_id,
+                            model_id=model_id,
+                            provider_id=provider_id,
+                            # TODO(lucasagomes): implement as part of query validation
+                            query_is_valid=True,
+                            query=query_request.query,
+                            query_request=query_request,
+                            summary=summary,
+                            rag_chunks=create_rag_chunks_dict(summary),
+                            truncated=summary.truncated,
+                            attachments=query_request.attachments or [],
+                        )
+                    )
 
-            persist_user_conversation_details(
-                user_id=user_id,
-                conversation_id=conversation_id,
-                model=model_id,
-                provider_id=provider_id,
-                topic_summary=topic_summary,
+                bookkeeping.append(
+                    write_behind.submit(
+                        conversation_id,
+                        store_conversation_into_cache,
+                        configuration,
+                        user_id,
+                        conversation_id,
+                        cache_entry,
+                        _skip_userid_check,
+                        topic_summary,
+                    )
+                )
+                bookkeeping.append(
+                    write_behind.submit(
+                        conversation_id,
+                        persist_user_conversation_details,
+                        user_id=user_id,
+                        conversation_id=conversation_id,
+                        model=model_id,
+                        provider_id=provider_id,
+                        topic_summary=topic_summary,
+                    )
+                )
+                with stage_timer(STAGE_PERSISTENCE):
+                    await asyncio.gather(*bookkeeping)
+
+            # the turn is stored even when the client leaves right after the
+            # end of the answer
+            stored = run_detached(store_turn())
+            # the LLM call is recorded in metrics only for the request
+            # that made it, others sharing the stream just report its usage
+            yield stream_end_event(
+                metadata_map,
+                summary,
+                await token_usage.finish(record_metrics=not shared),
+                media_type,
             )
+            await asyncio.shield(stored)
 
         # Update metrics for the LLM call
-        metrics.llm_calls_total.labels(provider_id, model_id).inc()
+        if not shared:
+            metrics.llm_calls_total.labels(provider_id, model_id).inc()
 
         # Determine media type for response
         # Note: The HTTP Content-Type header is always text/event-stream for SSE,
         # but the media_type parameter controls how the content is formatted
-        return StreamingResponse(
-            response_generator(response), media_type="text/event-stream"
+        # adjacent tokens are merged if the client asked for it
+        events = TokenCoalescing().apply(
+            response_generator(response), query_request.coalesce_tokens
         )
+        events = permit.hold(events)
+        if (query_request.media_type or MEDIA_TYPE_JSON) == MEDIA_TYPE_JSON:
+            # the response is generated in background and can be resumed
+            events = ResumableStreams().start(user_id, events)
+            events = StreamKeepalive().apply(events)
+        return StreamingResponse(events, media_type="text/event-stream")
     # connection to Llama Stack server
     except APIConnectionError as e:
         # Update metrics for the LLM call failure
@@ -940,6 +1115,9 @@ async def streaming_query_endpoint_handler(  # pylint: disable=too-many-locals,t
                 "cause": f"The token quota for model {used_model} has been exceeded.",
             },
         ) from e
+    except HTTPException:
+        # e.g. exceeded request deadline
+        raise
     except Exception as e:  # pylint: disable=broad-except
         # Handle other errors with OLS-compatible error response
         # This broad exception catch is intentional to ensure all errors
@@ -987,40 +1165,39 @@ async def retrieve_response(
         tuple: A tuple containing the streaming response object
         and the conversation ID.
     """
-    available_input_shields = [
-        shield.identifier
-        for shield in filter(is_input_shield, await client.shields.list())
-    ]
-    available_output_shields = [
-        shield.identifier
-        for shield in filter(is_output_shield, await client.shields.list())
-    ]
-    if not available_input_shields and not available_output_shields:
-        logger.info("No available shields. Disabling safety")
-    else:
-        logger.info(
-            "Available input shields: %s, output shields: %s",
+    # shields, the agent and vector databases are set up within one stage
+    async with deadline_stage(STAGE_AGENT_INIT):
+        shields = await ShieldCatalog().get(client)
+        available_input_shields = shields.input_shields
+        available_output_shields = shields.output_shields
+        if not available_input_shields and not available_output_shields:
+            logger.info("No available shields. Disabling safety")
+        else:
+            logger.info(
+                "Available input shields: %s, output shields: %s",
+                available_input_shields,
+                available_output_shields,
+            )
+        # use system prompt from request or default one
+        system_prompt = get_system_prompt(query_request, configuration)
+        logger.debug("Using system prompt: %s", system_prompt)
+
+        # TODO(lucasagomes): redact attachments content before sending to LLM
+        # if attachments are provided, validate them
+        if query_request.attachments:
+            validate_attachments_metadata(query_request.attachments)
+
+        agent_args = (
+            client,
+            model_id,
+            system_prompt,
             available_input_shields,
             available_output_shields,
+            query_request.conversation_id,
+            query_request.no_tools or False,
         )
-    # use system prompt from request or default one
-    system_prompt = get_system_prompt(query_request, configuration)
-    logger.debug("Using system prompt: %s", system_prompt)
-
-    # TODO(lucasagomes): redact attachments content before sending to LLM
-    # if attachments are provided, validate them
-    if query_request.attachments:
-        validate_attachments_metadata(query_request.attachments)
-
-    agent, conversation_id, session_id = await get_agent(
-        client,
-        model_id,
-        system_prompt,
-        available_input_shields,
-        available_output_shields,
-        query_request.conversation_id,
-        query_request.no_tools or False,
-    )
+        agent, conversation_id, session_id = await get_agent(*agent_args)
+        vector_dbs = [] if query_request.no_tools else await client.vector_dbs.list()
 
     logger.debug("Conversation ID: %s, session ID: %s", conversation_id, session_id)
     # bypass tools and MCP servers if no_tools is True
@@ -1049,9 +1226,7 @@ async def retrieve_response(
             ),
         }
 
-        vector_db_ids = [
-            vector_db.identifier for vector_db in await client.vector_dbs.list()
-        ]
+        vector_db_ids = [vector_db.identifier for vector_db in vector_dbs]
         toolgroups = (get_rag_toolgroups(vector_db_ids) or []) + [
             mcp_server.name for mcp_server in configuration.mcp_servers
         ]
@@ -1059,23 +1234,35 @@ async def retrieve_response(
         if not toolgroups:
             toolgroups = None
 
-    # TODO: LCORE-881 - Remove if Llama Stack starts to support these mime types
-    documents: list[Document] = [
-        (
-            {"content": doc["content"], "mime_type": "text/plain"}
-            if doc["mime_type"].lower() in ("application/json", "application/xml")
-            else doc
-        )
-        for doc in query_request.get_documents()
-    ]
+    # attachments sent earlier in the conversation are only referenced
+    attachment_index = AttachmentIndex()
+    message, documents = turn_input(
+        query_request.query,
+        query_request.attachments,
+        attachment_index.known(conversation_id),
+    )
 
-    response = await agent.create_turn(
-        messages=[UserMessage(role="user", content=query_request.query)],
-        session_id=session_id,
-        documents=documents,
-        stream=True,
-        toolgroups=toolgroups,
+    # a pooled agent is rebuilt when its conversation was deleted meanwhile
+    rebuild_agent = (
+        partial(get_agent, *agent_args) if query_request.conversation_id else None
     )
+    # the slot of the concurrency limiter is held until the stream ends
+    async with deadline_stage(STAGE_TURN_CREATION):
+        response = await LlamaStackLimiter().stream(
+            lambda: create_agent_turn(
+                agent,
+                session_id,
+                rebuild_agent,
+                messages=[UserMessage(role="user", content=message)],
+                documents=documents,
+                stream=True,
+                toolgroups=toolgroups,
+            )
+        )
     response = cast(AsyncIterator[AgentTurnResponseStreamChunk], response)
+    attachment_index.remember(
+        conversation_id, query_request.attachments, previous=conversation_id
+    )
 
-    return response, conversation_id
+    # the whole stream is read within the deadline of the request
+    return until_deadline(response), conversation_id
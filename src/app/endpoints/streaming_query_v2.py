@@ -0,0 +1,482 @@
+"""Handler for REST API call to provide streamed answer to query using Response API."""
+
+import asyncio
+import logging
+from datetime import UTC, datetime
+from typing import Annotated, Any, AsyncIterator, Iterator, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from litellm.exceptions import RateLimitError
+from llama_stack_client import APIConnectionError, AsyncLlamaStackClient  # type: ignore
+
+import metrics
+from app.endpoints.query import (
+    cancel_topic_summary,
+    evaluate_model_hints,
+    persist_query_turn,
+    resolve_topic_summary,
+    select_model_and_provider_id,
+    start_topic_summary,
+)
+from app.endpoints.query_v2 import (
+    _build_tool_call_summary,
+    _extract_text_from_response_output_item,
+    apply_history_budget,
+    extract_token_usage_from_responses_api,
+    get_topic_summary,
+    prepare_responses_request,
+    reference_sent_attachments,
+)
+from app.endpoints.streaming_query import (
+    LLM_TOOL_CALL_EVENT,
+    LLM_TOOL_RESULT_EVENT,
+    close_cancelled_turn,
+    format_stream_data,
+    generic_llm_error,
+    stream_end_event,
+    stream_event,
+    stream_start_event,
+    stream_text_delta,
+    streaming_query_responses,
+)
+from authentication import get_auth_dependency
+from authentication.interface import AuthTuple
+from authorization.middleware import authorize
+from catalog.model_catalog import ModelCatalog
+from client import AsyncLlamaStackClientHolder
+from configuration import configuration
+from constants import MEDIA_TYPE_JSON, MEDIA_TYPE_TEXT
+from models.config import Action
+from models.database.conversations import UserConversation
+from models.requests import QueryRequest
+from utils.attachments import AttachmentIndex
+from utils.coalescing import TokenCoalescing
+from utils.concurrency_limiter import LlamaStackLimiter
+from utils.deadline import (
+    STAGE_AGENT_INIT,
+    STAGE_MODEL_LISTING,
+    STAGE_TURN_CREATION,
+    client_timeout,
+    deadline_stage,
+    run_stage,
+    until_deadline,
+)
+from utils.endpoints import (
+    check_configuration_loaded,
+    validate_conversation_ownership,
+    validate_model_provider_override,
+)
+from utils.fair_scheduler import FairScheduler, user_roles
+from utils.keepalive import StreamKeepalive
+from utils.mcp_headers import mcp_headers_dependency
+from utils.prompt_size import check_prompt_size
+from utils.resumable_stream import ResumableStreams
+from utils.quota import check_tokens_available
+from utils.stage_timer import STAGE_QUOTA, stage_timer
+from utils.stream_cancellation import run_detached, stream_cancelled
+from utils.token_counter import TokenCounter
+from utils.types import TurnSummary
+
+logger = logging.getLogger("app.endpoints.handlers")
+router = APIRouter(tags=["streaming_query_v2"])
+
+# output items of tools executed by Llama Stack, their results are streamed
+TOOL_RESULT_ITEM_TYPES = ("file_search_call", "web_search_call", "mcp_call")
+
+
+def _stream_error_event(message: str, chunk_id: int, media_type: str) -> str:
+    """Build error event reported by the Responses API stream."""
+    if media_type == MEDIA_TYPE_TEXT:
+        return f"Error: {message}"
+    return format_stream_data(
+        {
+            "event": "error",
+            "data": {
+                "id": chunk_id,
+                "token": message,
+            },
+        }
+    )
+
+
+def stream_build_event_v2(
+    event: Any, chunk_id: int, summary: TurnSummary, media_type: str = MEDIA_TYPE_JSON
+) -> Iterator[str]:
+    """Translate a Responses API stream event into streaming query events.
+
+    The events use the same schema as the /v1/streaming_query endpoint:
+
+    1. response.output_text.delta -> token
+    2. response.output_item.added of a tool call -> tool_call start
+    3. response.output_item.done of a tool call -> tool_call with arguments,
+       followed by tool_result for tools executed by Llama Stack
+    4. response.failed, error -> error
+
+    Tool calls are recorded into the turn summary. Start, turn completion
+    and end of the stream are handled by the caller.
+
+    Args:
+        event: The event from the Responses API stream.
+        chunk_id: The current chunk ID counter.
+        summary: Summary of the turn updated with the tool calls.
+        media_type: Media type of the response (e.g. text or JSON).
+
+    Returns:
+        Iterator[str]: Formatted events to be sent to the client.
+    """
+    match getattr(event, "type", None):
+        case "response.output_text.delta":
+            yield stream_text_delta(chunk_id, event.delta, media_type)
+        case "response.output_item.added":
+            if _build_tool_call_summary(event.item) is not None:
+                yield stream_event(
+                    data={"id": chunk_id, "token": ""},
+                    event_type=LLM_TOOL_CALL_EVENT,
+                    media_type=media_type,
+                )
+        case "response.output_item.done":
+            tool_call = _build_tool_call_summary(event.item)
+            if tool_call is None:
+                return
+            summary.tool_calls.append(tool_call)
+            yield stream_event(
+                data={
+                    "id": chunk_id,
+                    "token": {
+                        "tool_name": tool_call.name,
+                        "arguments": tool_call.args,
+                    },
+                },
+                event_type=LLM_TOOL_CALL_EVENT,
+                media_type=media_type,
+            )
+            if event.item.type in TOOL_RESULT_ITEM_TYPES:
+                yield stream_event(
+                    data={
+                        "id": chunk_id,
+                        "token": {
+                            "tool_name": tool_call.name,
+                            "response": tool_call.response,
+                        },
+                    },
+                    event_type=LLM_TOOL_RESULT_EVENT,
+                    media_type=media_type,
+                )
+        case "response.failed":
+            error = getattr(event.response, "error", None)
+            message = getattr(error, "message", None) or "Response generation failed"
+            yield _stream_error_event(message, chunk_id, media_type)
+        case "error":
+            yield _stream_error_event(event.message, chunk_id, media_type)
+        case event_type:
+            logger.debug("Unhandled Responses API event: %s", event_type)
+
+
+async def retrieve_response(
+    client: AsyncLlamaStackClient,
+    model_id: str,
+    query_request: QueryRequest,
+    token: str,
+    mcp_headers: dict[str, dict[str, str]] | None = None,
+) -> tuple[AsyncIterator[Any], str, bool]:
+    """
+    Retrieve streamed response from LLMs and agents using Responses API.
+
+    Parameters:
+        client (AsyncLlamaStackClient): The AsyncLlamaStackClient to use for the request.
+        model_id (str): The identifier of the LLM model to use.
+        query_request (QueryRequest): The user's query and associated metadata.
+        token (str): The authentication token for authorization.
+        mcp_headers (dict[str, dict[str, str]], optional): Headers for multi-component processing.
+
+    Returns:
+        tuple: A tuple containing the stream of response events, the
+        system prompt used and a flag telling if conversation history was
+        truncated.
+    """
+    async with deadline_stage(STAGE_AGENT_INIT):
+        create_kwargs = await prepare_responses_request(
+            client, model_id, query_request, token, mcp_headers
+        )
+        truncated = await apply_history_budget(client, model_id, create_kwargs)
+        reference_sent_attachments(create_kwargs, query_request)
+    # the remaining time is propagated to the client call, the slot of the
+    # concurrency limiter is held until the stream ends
+    async with deadline_stage(STAGE_TURN_CREATION) as timeout:
+        stream = await LlamaStackLimiter().stream(
+            lambda: client.responses.create(
+                **create_kwargs, stream=True, timeout=client_timeout(timeout)
+            )
+        )
+    return until_deadline(stream), create_kwargs["instructions"], truncated
+
+
+@router.post("/streaming_query", responses=streaming_query_responses)
+@authorize(Action.STREAMING_QUERY)
+async def streaming_query_endpoint_handler_v2(  # pylint: disable=too-many-locals,too-many-statements
+    request: Request,
+    query_request: QueryRequest,
+    auth: Annotated[AuthTuple, Depends(get_auth_dependency())],
+    mcp_headers: dict[str, dict[str, str]] = Depends(mcp_headers_dependency),
+    last_event_id: Annotated[Optional[str], Header()] = None,
+) -> StreamingResponse:
+    """
+    Handle request to the /streaming_query endpoint using Responses API.
+
+    The answer is streamed by the Responses API and its events are
+    translated into the same events as sent by the /v1/streaming_query
+    endpoint: start, token, tool_call, tool_result, turn_complete and end.
+    The token usage sent in the end event is taken from the usage block of
+    the completed response.
+
+    A client that lost the connection can resume the response by sending
+    the query again with the `Last-Event-ID` header, it receives the events
+    it missed instead of a new answer.
+
+    Returns:
+        StreamingResponse: An HTTP streaming response yielding
+        SSE-formatted events for the query lifecycle.
+
+    Raises:
+        HTTPException: Returns HTTP 500 if unable to connect to the
+        Llama Stack server.
+    """
+    check_configuration_loaded(configuration)
+    started_at = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    # Enforce RBAC: optionally disallow overriding model/provider in requests
+    validate_model_provider_override(query_request, request.state.authorized_actions)
+
+    user_id, _user_name, skip_userid_check, token = auth
+
+    # a reconnected client gets the rest of the response it already started
+    resumed = ResumableStreams().resume(user_id, last_event_id)
+    if resumed is not None:
+        return StreamingResponse(
+            StreamKeepalive().apply(resumed), media_type="text/event-stream"
+        )
+
+    user_conversation: UserConversation | None = None
+    if query_request.conversation_id:
+        user_conversation = await asyncio.to_thread(
+            validate_conversation_ownership,
+            user_id=user_id,
+            conversation_id=query_request.conversation_id,
+            others_allowed=(
+                Action.QUERY_OTHERS_CONVERSATIONS in request.state.authorized_actions
+            ),
+        )
+        if user_conversation is None:
+            logger.warning(
+                "Conversation %s not found for user %s",
+                query_request.conversation_id,
+                user_id,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "response": "Conversation not found",
+                    "cause": "The requested conversation does not exist.",
+                },
+            )
+
+    with stage_timer(STAGE_QUOTA):
+        await asyncio.to_thread(
+            check_tokens_available, configuration.quota_limiters, user_id
+        )
+
+    media_type = query_request.media_type or MEDIA_TYPE_JSON
+    try:
+        # try to get Llama Stack client
+        client = AsyncLlamaStackClientHolder().get_client()
+        llama_stack_model_id, model_id, provider_id = select_model_and_provider_id(
+            await run_stage(STAGE_MODEL_LISTING, ModelCatalog().get(client)),
+            *evaluate_model_hints(
+                user_conversation=user_conversation, query_request=query_request
+            ),
+        )
+        await asyncio.to_thread(
+            check_prompt_size,
+            query_request,
+            llama_stack_model_id,
+            model_id,
+            provider_id,
+        )
+        # the permit is held until the response stream ends
+        permit = await FairScheduler().acquire(user_id, user_roles(request.state))
+        topic_summary_task = start_topic_summary(
+            get_topic_summary, query_request, client, llama_stack_model_id
+        )
+        try:
+            stream, system_prompt, truncated = await retrieve_response(
+                client, llama_stack_model_id, query_request, token, mcp_headers
+            )
+        except BaseException:
+            cancel_topic_summary(topic_summary_task)
+            permit.release()
+            raise
+
+        async def response_generator() -> AsyncIterator[str]:
+            """
+            Generate SSE formatted streaming response.
+
+            Translates the Responses API events, then stores the turn
+            once the stream is finished.
+            """
+            chunk_id = 0
+            summary = TurnSummary(llm_response="", tool_calls=[], truncated=truncated)
+            token_usage = TokenCounter()
+            conversation_id = query_request.conversation_id or ""
+            started = False
+
+            # deltas of the answer, recorded if the turn is cancelled
+            answer: list[str] = []
+
+            try:
+                async for event in stream:
+                    event_type = getattr(event, "type", None)
+                    if event_type == "response.created":
+                        # the response ID identifies the conversation
+                        conversation_id = event.response.id
+                        started = True
+                        # truncated history does not chain to the previous response
+                        AttachmentIndex().remember(
+                            conversation_id,
+                            query_request.attachments,
+                            previous=(
+                                None if truncated else query_request.conversation_id
+                            ),
+                        )
+                        yield stream_start_event(conversation_id)
+                        continue
+                    if event_type == "response.completed":
+                        response = event.response
+                        summary.llm_response = "".join(
+                            _extract_text_from_response_output_item(item)
+                            for item in response.output
+                        )
+                        model_label = (
+                            llama_stack_model_id.split("/", 1)[1]
+                            if "/" in llama_stack_model_id
+                            else llama_stack_model_id
+                        )
+                        token_usage = extract_token_usage_from_responses_api(
+                            response, model_label, provider_id, system_prompt
+                        )
+                        yield format_stream_data(
+                            {
+                                "event": "turn_complete",
+                                "data": {"token": summary.llm_response},
+                            }
+                        )
+                        continue
+                    if event_type == "response.output_text.delta":
+                        answer.append(event.delta)
+                    for stream_chunk in stream_build_event_v2(
+                        event, chunk_id, summary, media_type
+                    ):
+                        chunk_id += 1
+                        yield stream_chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # the client went away, the rest of the answer is not generated
+                cancel_topic_summary(topic_summary_task)
+                summary.llm_response = "".join(answer)
+                stream_cancelled(
+                    close_cancelled_turn(
+                        stream,
+                        user_id,
+                        conversation_id,
+                        model_id,
+                        provider_id,
+                        query_request,
+                        summary,
+                    )
+                )
+                raise
+
+            async def store_turn() -> None:
+                """Generate the topic summary and store the turn."""
+                if not conversation_id:
+                    logger.warning("Responses API stream finished without response ID")
+                    cancel_topic_summary(topic_summary_task)
+                    return
+
+                topic_summary = await resolve_topic_summary(
+                    topic_summary_task,
+                    get_topic_summary,
+                    conversation_id,
+                    query_request.query,
+                    client,
+                    llama_stack_model_id,
+                )
+                await persist_query_turn(
+                    user_id,
+                    conversation_id,
+                    model_id,
+                    provider_id,
+                    query_request,
+                    summary,
+                    [],
+                    topic_summary,
+                    started_at=started_at,
+                    skip_userid_check=skip_userid_check,
+                    consumed_tokens=token_usage,
+                )
+
+            # the turn is stored even when the client leaves right after the
+            # end of the answer
+            stored = run_detached(store_turn())
+            if not started:
+                yield stream_start_event(conversation_id)
+            # TODO(ltomasbo): referenced documents are not parsed from
+            # Responses API output yet
+            yield stream_end_event({}, summary, token_usage, media_type)
+            await asyncio.shield(stored)
+
+        # Note: The HTTP Content-Type header is always text/event-stream for SSE,
+        # but the media_type parameter controls how the content is formatted
+        # adjacent tokens are merged if the client asked for it
+        events = TokenCoalescing().apply(
+            response_generator(), query_request.coalesce_tokens
+        )
+        events = permit.hold(events)
+        if media_type == MEDIA_TYPE_JSON:
+            # the response is generated in background and can be resumed
+            events = ResumableStreams().start(user_id, events)
+            events = StreamKeepalive().apply(events)
+        return StreamingResponse(events, media_type="text/event-stream")
+    # connection to Llama Stack server
+    except APIConnectionError as e:
+        # Update metrics for the LLM call failure
+        metrics.llm_calls_failures_total.inc()
+        logger.error("Unable to connect to Llama Stack: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={
+                "response": "Unable to connect to Llama Stack",
+                "cause": str(e),
+            },
+        ) from e
+    except RateLimitError as e:
+        used_model = getattr(e, "model", "unknown")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "response": "Model quota exceeded",
+                "cause": f"The token quota for model {used_model} has been exceeded.",
+            },
+        ) from e
+    except HTTPException:
+        raise
+    except Exception as e:  # pylint: disable=broad-except
+        # errors are converted to OLS-compatible streaming responses
+        error_response = generic_llm_error(e, media_type)
+
+        async def error_generator() -> AsyncIterator[str]:
+            yield error_response
+
+        content_type = (
+            "text/event-stream" if media_type == MEDIA_TYPE_JSON else "text/plain"
+        )
+        return StreamingResponse(error_generator(), media_type=content_type)
@@ -12,11 +12,26 @@ import metrics
 import version
 from app import routers
 from app.database import create_tables, initialize_database
+from cache.response_cache import ResponseCache
+from catalog.model_catalog import ModelCatalog
+from catalog.shield_catalog import ShieldCatalog
+from catalog.vector_store_catalog import VectorStoreCatalog
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from log import get_logger
+from utils.agent_pool import AgentPool
+from utils.attachments import AttachmentIndex
+from utils.coalescing import TokenCoalescing
 from utils.common import register_mcp_servers_async
+from utils.concurrency_limiter import LlamaStackLimiter
+from utils.deadline import request_deadline
+from utils.fair_scheduler import FairScheduler
+from utils.keepalive import StreamKeepalive
+from utils.stage_timer import request_timings
 from utils.llama_stack_version import check_llama_stack_version
+from utils.query_jobs import QueryJobRunner
+from utils.resumable_stream import ResumableStreams
+from utils.write_behind import WriteBehindQueue
 
 logger = get_logger(__name__)
 
@@ -44,13 +59,41 @@ async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
     logger.info("Registering MCP servers")
     await register_mcp_servers_async(logger, configuration.configuration)
     get_logger("app.endpoints.handlers")
+
+    logger.info("Setting up Llama Stack catalogs")
+    catalogs = (ModelCatalog(), ShieldCatalog(), VectorStoreCatalog())
+    for catalog in catalogs:
+        catalog.configure(configuration.catalog_configuration)
+        catalog.start_background_refresh(client)
+    AgentPool().configure(configuration.agent_pool_configuration)
+    ResponseCache().configure(configuration.response_cache_configuration)
+    LlamaStackLimiter().configure(configuration.concurrency_limiter_configuration)
+    FairScheduler().configure(configuration.fair_scheduling_configuration)
+    AttachmentIndex().configure(configuration.attachments_configuration)
+    TokenCoalescing().configure(configuration.streaming_configuration)
+    ResumableStreams().configure(configuration.streaming_configuration)
+    StreamKeepalive().configure(configuration.streaming_configuration)
     logger.info("App startup complete")
 
     initialize_database()
     create_tables()
 
+    write_behind = WriteBehindQueue()
+    write_behind.configure(configuration.write_behind_configuration)
+    write_behind.start()
+
+    query_job_runner = QueryJobRunner()
+    query_job_runner.configure(configuration.query_jobs_configuration)
+    query_job_runner.start()
+
     yield
 
+    await query_job_runner.stop()
+    # make sure all pending writes are persisted before shutdown
+    await write_behind.stop()
+    for catalog in catalogs:
+        await catalog.stop_background_refresh()
+
 
 app = FastAPI(
     title=f"{service_name} service - OpenAPI",
@@ -97,10 +140,19 @@ async def rest_api_metrics(
 
     logger.debug("Processing API request for path: %s", path)
 
-    # measure time to handle duration + update histogram
-    with metrics.response_duration_seconds.labels(path).time():
+    # measure time to handle duration + update histogram, the request has to
+    # be processed before its deadline
+    with (
+        metrics.response_duration_seconds.labels(path).time(),
+        request_deadline(configuration.deadlines_configuration, path),
+        request_timings(path) as timings,
+    ):
         response = await call_next(request)
 
+    # streamed responses report only stages finished before streaming started
+    if configuration.service_configuration.server_timing and timings.stages:
+        response.headers["Server-Timing"] = timings.server_timing()
+
     # ignore /metrics endpoint that will be called periodically
     if not path.endswith("/metrics"):
         # just update metrics
@@ -9,6 +9,8 @@ from app.endpoints import (
     providers,
     root,
     query,
+    query_batch,
+    query_jobs,
     health,
     config,
     feedback,
@@ -20,6 +22,7 @@ from app.endpoints import (
     tools,
     # V2 endpoints for Response API support
     query_v2,
+    streaming_query_v2,
 )
 
 
@@ -37,6 +40,8 @@ def include_routers(app: FastAPI) -> None:
     app.include_router(shields.router, prefix="/v1")
     app.include_router(providers.router, prefix="/v1")
     app.include_router(query.router, prefix="/v1")
+    app.include_router(query_batch.router, prefix="/v1")
+    app.include_router(query_jobs.router, prefix="/v1")
     app.include_router(streaming_query.router, prefix="/v1")
     app.include_router(config.router, prefix="/v1")
     app.include_router(feedback.router, prefix="/v1")
@@ -45,6 +50,7 @@ def include_routers(app: FastAPI) -> None:
 
     # V2 endpoints - Response API support
     app.include_router(query_v2.router, prefix="/v2")
+    app.include_router(streaming_query_v2.router, prefix="/v2")
 
     # road-core does not version these endpoints
     app.include_router(health.router)
@@ -21,6 +21,7 @@ from constants import (
 from authentication.interface import NO_AUTH_TUPLE, AuthInterface, AuthTuple
 from authentication.utils import extract_user_token
 from models.config import JwkConfiguration
+from utils.stage_timer import STAGE_AUTH, timed_stage
 
 logger = logging.getLogger(__name__)
 
@@ -120,6 +121,7 @@ class JwkTokenAuthDependency(AuthInterface):  # pylint: disable=too-few-public-m
         self.config: JwkConfiguration = config
         self.skip_userid_check = False
 
+    @timed_stage(STAGE_AUTH)
     async def __call__(self, request: Request) -> AuthTuple:
         """Authenticate the JWT in the headers against the keys from the JWK url."""
         if not request.headers.get("Authorization"):
@@ -13,6 +13,7 @@ from kubernetes.config import ConfigException
 from configuration import configuration
 from authentication.interface import AuthInterface
 from constants import DEFAULT_VIRTUAL_PATH
+from utils.stage_timer import STAGE_AUTH, timed_stage
 
 logger = logging.getLogger(__name__)
 
@@ -228,6 +229,7 @@ class K8SAuthDependency(AuthInterface):  # pylint: disable=too-few-public-method
         self.virtual_path = virtual_path
         self.skip_userid_check = False
 
+    @timed_stage(STAGE_AUTH)
     async def __call__(self, request: Request) -> tuple[str, str, bool, str]:
         """Validate FastAPI Requests for authentication and authorization.
 
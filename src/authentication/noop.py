@@ -10,6 +10,7 @@ from constants import (
 )
 from authentication.interface import AuthInterface
 from log import get_logger
+from utils.stage_timer import STAGE_AUTH, timed_stage
 
 logger = get_logger(__name__)
 
@@ -22,6 +23,7 @@ class NoopAuthDependency(AuthInterface):  # pylint: disable=too-few-public-metho
         self.virtual_path = virtual_path
         self.skip_userid_check = True
 
+    @timed_stage(STAGE_AUTH)
     async def __call__(self, request: Request) -> tuple[str, str, bool, str]:
         """Validate FastAPI Requests for authentication and authorization.
 
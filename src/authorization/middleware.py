@@ -106,6 +106,7 @@ async def _perform_authorization_check(
                 break
     if req is not None:
         req.state.authorized_actions = authorized_actions
+        req.state.user_roles = user_roles
 
 
 def authorize(action: Action) -> Callable:
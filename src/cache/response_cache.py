@@ -0,0 +1,200 @@
+"""Exact-match cache of responses to stateless queries."""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from pydantic import BaseModel
+
+import constants
+import metrics
+from log import get_logger
+from models.config import ResponseCacheConfiguration
+from models.requests import QueryRequest
+from models.responses import ReferencedDocument
+from utils.token_counter import TokenCounter
+from utils.types import Singleton, TurnSummary
+
+logger = get_logger("cache.response_cache")
+
+# values of Cache-Control request header that disable the response cache
+CACHE_CONTROL_NO_CACHE = "no-cache"
+CACHE_CONTROL_NO_STORE = "no-store"
+
+
+class CachedResponse(BaseModel):
+    """Response of the LLM stored in the response cache.
+
+    Attributes:
+        summary: Summary of the LLM turn.
+        conversation_id: Conversation the response was generated in.
+        referenced_documents: Documents referenced in the response.
+        input_tokens: Number of tokens sent to LLM by the original request.
+        output_tokens: Number of tokens received from LLM by the original request.
+        topic_summary: Topic summary generated for the original request.
+    """
+
+    summary: TurnSummary
+    conversation_id: str
+    referenced_documents: list[ReferencedDocument] = []
+    input_tokens: int = 0
+    output_tokens: int = 0
+    topic_summary: Optional[str] = None
+
+    @property
+    def token_usage(self) -> TokenCounter:
+        """Return token usage of the original request."""
+        token_usage = TokenCounter()
+        token_usage.input_tokens = self.input_tokens
+        token_usage.output_tokens = self.output_tokens
+        return token_usage
+
+
+@dataclass
+class _Entry:
+    """Cached response with its expiration time and (approximate) size."""
+
+    response: CachedResponse
+    expires_at: float
+    size: int
+
+
+def response_cache_key(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    model_id: str,
+    provider_id: str,
+    system_prompt: str,
+    query_request: QueryRequest,
+    toolgroups: Iterable[str],
+    user_id: Optional[str] = None,
+) -> str:
+    """Compute key of the response cache for a stateless query.
+
+    The key is a hash of everything that influences the LLM response: the
+    model and provider, the resolved system prompt, the query itself, the
+    attachments, the `no_tools` flag and the set of available toolgroups.
+    When the user ID is given, the key is private to that user.
+    """
+    attachments = [a.model_dump() for a in query_request.attachments or []]
+    material = json.dumps(
+        [
+            user_id,
+            model_id,
+            provider_id,
+            system_prompt,
+            query_request.query,
+            attachments,
+            bool(query_request.no_tools),
+            sorted(set(toolgroups)),
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def cache_bypass(cache_control: Optional[str]) -> tuple[bool, bool]:
+    """Decide if the cache should be bypassed based on Cache-Control header.
+
+    Args:
+        cache_control: Value of the Cache-Control request header, if any.
+
+    Returns:
+        Pair of flags (skip_lookup, skip_store). `no-cache` forces a fresh
+        response that is still stored; `no-store` additionally prevents the
+        response from being stored.
+    """
+    if not cache_control:
+        return False, False
+    directives = {d.strip().lower() for d in cache_control.split(",")}
+    no_store = CACHE_CONTROL_NO_STORE in directives
+    no_cache = no_store or CACHE_CONTROL_NO_CACHE in directives
+    return no_cache, no_store
+
+
+class ResponseCache(metaclass=Singleton):
+    """In-memory cache of responses to stateless queries.
+
+    Entries expire after configured time-to-live. When either the number of
+    entries or their total size exceeds configured limits, the least recently
+    used entries are evicted. The cache is disabled until it is configured.
+    """
+
+    def __init__(self) -> None:
+        """Initialize disabled cache with default limits."""
+        self.enabled: bool = False
+        self.ttl: float = constants.DEFAULT_RESPONSE_CACHE_TTL
+        self.max_entries: int = constants.DEFAULT_RESPONSE_CACHE_MAX_ENTRIES
+        self.max_size: int = constants.DEFAULT_RESPONSE_CACHE_MAX_SIZE
+        self.single_flight: bool = True
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._size: int = 0
+
+    def configure(self, config: ResponseCacheConfiguration) -> None:
+        """Apply response cache configuration and drop all cached responses."""
+        self.enabled = config.enabled
+        self.ttl = config.ttl
+        self.max_entries = config.max_entries
+        self.max_size = config.max_size
+        self.single_flight = config.single_flight
+        self.clear()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return cached response for given key or None if not found or expired."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            metrics.response_cache_misses_total.inc()
+            return None
+        self._entries.move_to_end(key)
+        metrics.response_cache_hits_total.inc()
+        return entry.response
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        """Store response in the cache, evicting least recently used entries."""
+        size = len(response.model_dump_json())
+        if size > self.max_size:
+            logger.debug("Response of size %d is too large to be cached", size)
+            return
+        self._remove(key)
+        self._entries[key] = _Entry(response, time.monotonic() + self.ttl, size)
+        self._size += size
+        while len(self._entries) > self.max_entries or self._size > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+        metrics.response_cache_size_bytes.set(self._size)
+
+    def invalidate_conversation(self, conversation_id: str) -> None:
+        """Drop cached responses generated in given conversation."""
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if entry.response.conversation_id == conversation_id
+        ]
+        for key in stale:
+            self._remove(key)
+        metrics.response_cache_size_bytes.set(self._size)
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._entries.clear()
+        self._size = 0
+        metrics.response_cache_size_bytes.set(0)
+
+    def _remove(self, key: str) -> None:
+        """Remove entry with given key if it exists."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def __len__(self) -> int:
+        """Return number of cached responses."""
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Return total size of cached responses in bytes."""
+        return self._size
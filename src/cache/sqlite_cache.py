@@ -136,7 +136,10 @@ class SQLiteCache(Cache):
         self.connection = None
         config = self.sqlite_config
         try:
-            self.connection = sqlite3.connect(database=config.db_path)
+            # writes can be performed by the write-behind queue worker thread
+            self.connection = sqlite3.connect(
+                database=config.db_path, check_same_thread=False
+            )
             self.initialize_cache()
         except sqlite3.Error as e:
             if self.connection is not None:
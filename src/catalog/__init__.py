@@ -0,0 +1,7 @@
+"""Cached catalogs of Llama Stack resources.
+
+Catalogs keep a local, periodically refreshed copy of data that Llama Stack
+exposes through its list APIs (models, shields, ...). The data changes very
+rarely, so endpoint handlers can consult the catalog instead of performing an
+extra round trip to Llama Stack on every request.
+"""
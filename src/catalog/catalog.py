@@ -0,0 +1,148 @@
+"""Base class that is parent for all Llama Stack catalog implementations."""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Generic, Optional, TypeVar
+
+from llama_stack_client import AsyncLlamaStackClient  # type: ignore
+
+import constants
+from log import get_logger
+from models.config import CatalogConfiguration
+
+logger = get_logger("catalog.catalog")
+
+T = TypeVar("T")
+
+
+class Catalog(ABC, Generic[T]):  # pylint: disable=too-many-instance-attributes
+    """Base class for TTL-cached snapshots of Llama Stack resources.
+
+    The snapshot is fetched lazily on first access and then reused until
+    its time-to-live expires, until it is explicitly invalidated or until a
+    different Llama Stack client is used. Concurrent callers that find the
+    snapshot stale share a single in-flight refresh. Optionally the snapshot
+    can be refreshed periodically by a background task so request handlers
+    never have to wait for Llama Stack.
+
+    Subclasses implement the `_fetch` method that retrieves the data from
+    Llama Stack and converts it into the snapshot type.
+    """
+
+    name: str = "catalog"
+
+    def __init__(self) -> None:
+        """Initialize an empty catalog with default settings."""
+        self.ttl: float = constants.DEFAULT_CATALOG_TTL
+        self.background_refresh: bool = True
+        self._snapshot: Optional[T] = None
+        self._loaded_at: float = 0.0
+        self._client: Optional[AsyncLlamaStackClient] = None
+        # incremented by invalidation, so fetches started before are not stored
+        self._generation: int = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_task: Optional[asyncio.Task] = None
+
+    def configure(self, config: CatalogConfiguration) -> None:
+        """Apply catalog configuration and drop the current snapshot."""
+        self.ttl = config.ttl
+        self.background_refresh = config.background_refresh
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the current snapshot so the next access fetches fresh data.
+
+        A refresh already in flight is not waited for by later callers, and
+        its result, possibly stale, is not stored.
+        """
+        logger.debug("Invalidating %s", self.name)
+        self._generation += 1
+        self._refresh_task = None
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    def is_fresh(self, client: AsyncLlamaStackClient) -> bool:
+        """Check if the snapshot is present, not expired and loaded via given client."""
+        return (
+            self._snapshot is not None
+            and self._client is client
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def get(self, client: AsyncLlamaStackClient) -> T:
+        """Return the snapshot, refreshing it first when it is not fresh.
+
+        Args:
+            client: Llama Stack client used to fetch data when needed.
+
+        Returns:
+            The cached (or freshly fetched) snapshot.
+        """
+        if self.is_fresh(client):
+            return self._snapshot  # type: ignore[return-value]
+        return await self.refresh(client)
+
+    async def refresh(self, client: AsyncLlamaStackClient) -> T:
+        """Fetch the data from Llama Stack and replace the snapshot.
+
+        Concurrent calls share one in-flight fetch. Errors raised while
+        fetching are propagated to all callers and the old snapshot is kept.
+        """
+        task = self._refresh_task
+        if (
+            task is None
+            or task.done()
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            task = asyncio.create_task(self._refresh(client, self._generation))
+            self._refresh_task = task
+        return await asyncio.shield(task)
+
+    async def _refresh(self, client: AsyncLlamaStackClient, generation: int) -> T:
+        """Perform one fetch and store its result unless invalidated meanwhile."""
+        logger.debug("Refreshing %s", self.name)
+        snapshot = await self._fetch(client)
+        if generation != self._generation:
+            logger.debug("Dropping %s fetched before invalidation", self.name)
+            return snapshot
+        self._snapshot = snapshot
+        self._client = client
+        self._loaded_at = time.monotonic()
+        return snapshot
+
+    @abstractmethod
+    async def _fetch(self, client: AsyncLlamaStackClient) -> T:
+        """Retrieve data from Llama Stack and build the snapshot."""
+
+    def start_background_refresh(self, client: AsyncLlamaStackClient) -> None:
+        """Start a task that keeps the snapshot fresh, if enabled in configuration.
+
+        The snapshot is refreshed twice per TTL period so it never expires
+        while Llama Stack is reachable. Refresh failures are logged and the
+        previous snapshot stays in use.
+        """
+        if not self.background_refresh or self._background_task is not None:
+            return
+        self._background_task = asyncio.create_task(self._refresh_loop(client))
+
+    async def stop_background_refresh(self) -> None:
+        """Stop the background refresh task if it is running."""
+        task = self._background_task
+        self._background_task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _refresh_loop(self, client: AsyncLlamaStackClient) -> None:
+        """Refresh the snapshot periodically until cancelled."""
+        while True:
+            try:
+                await self.refresh(client)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.warning("Unable to refresh %s: %s", self.name, e)
+            await asyncio.sleep(self.ttl / 2)
@@ -0,0 +1,62 @@
+"""Catalog of models registered in Llama Stack."""
+
+from typing import Any, Iterable, Iterator, Optional
+
+from llama_stack_client import AsyncLlamaStackClient  # type: ignore
+
+from catalog.catalog import Catalog
+from log import get_logger
+from utils.types import SingletonABCMeta
+
+logger = get_logger("catalog.model_catalog")
+
+
+class ModelIndex:
+    """Immutable snapshot of available models indexed for fast lookup.
+
+    Models are indexed by `(provider_id, identifier)` pair and the first
+    LLM model (used as a fallback when no model is selected by request or
+    configuration) is precomputed, so model selection does not need to
+    scan the list.
+    """
+
+    def __init__(self, models: Iterable[Any]) -> None:
+        """Build the index from the list of models returned by Llama Stack."""
+        self.models: list[Any] = list(models)
+        self.llms: list[Any] = [
+            m for m in self.models if getattr(m, "model_type", None) == "llm"
+        ]
+        self.default_llm: Optional[Any] = self.llms[0] if self.llms else None
+        self._by_key: dict[tuple[str, str], Any] = {}
+        for m in self.models:
+            key = (getattr(m, "provider_id", None), getattr(m, "identifier", None))
+            # keep the first occurrence, same as the linear scan did
+            self._by_key.setdefault(key, m)  # type: ignore[arg-type]
+
+    def get(self, provider_id: str, identifier: str) -> Optional[Any]:
+        """Return model with given provider and identifier or None if not found."""
+        return self._by_key.get((provider_id, identifier))
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        """Check if the model with `(provider_id, identifier)` key exists."""
+        return key in self._by_key
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over all models in the original order."""
+        return iter(self.models)
+
+    def __len__(self) -> int:
+        """Return number of models."""
+        return len(self.models)
+
+
+class ModelCatalog(Catalog[ModelIndex], metaclass=SingletonABCMeta):
+    """TTL-cached catalog of models available in Llama Stack."""
+
+    name = "model catalog"
+
+    async def _fetch(self, client: AsyncLlamaStackClient) -> ModelIndex:
+        """Retrieve list of models from Llama Stack and index it."""
+        index = ModelIndex(await client.models.list())
+        logger.debug("Model catalog contains %d models", len(index))
+        return index
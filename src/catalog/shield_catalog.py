@@ -0,0 +1,96 @@
+"""Catalog of shields registered in Llama Stack."""
+
+from typing import Iterable, Iterator
+
+from llama_stack_client import AsyncLlamaStackClient  # type: ignore
+from llama_stack_client.types import Shield  # type: ignore
+
+from catalog.catalog import Catalog
+from log import get_logger
+from utils.types import SingletonABCMeta
+
+logger = get_logger("catalog.shield_catalog")
+
+
+def _is_inout_shield(shield: Shield) -> bool:
+    """
+    Determine if the shield identifier indicates an input/output shield.
+
+    Parameters:
+        shield (Shield): The shield to check.
+
+    Returns:
+        bool: True if the shield identifier starts with "inout_", otherwise False.
+    """
+    return shield.identifier.startswith("inout_")
+
+
+def is_output_shield(shield: Shield) -> bool:
+    """
+    Determine if the shield is for monitoring output.
+
+    Return True if the given shield is classified as an output or
+    inout shield.
+
+    A shield is considered an output shield if its identifier
+    starts with "output_" or "inout_".
+    """
+    return _is_inout_shield(shield) or shield.identifier.startswith("output_")
+
+
+def is_input_shield(shield: Shield) -> bool:
+    """
+    Determine if the shield is for monitoring input.
+
+    Return True if the shield is classified as an input or inout
+    shield.
+
+    Parameters:
+        shield (Shield): The shield identifier to classify.
+
+    Returns:
+        bool: True if the shield is for input or both input/output monitoring; False otherwise.
+    """
+    return _is_inout_shield(shield) or not is_output_shield(shield)
+
+
+class ShieldIndex:
+    """Immutable snapshot of available shields split into input and output ones.
+
+    Shields are classified once when the snapshot is built, so agent
+    creation can use the precomputed identifier lists directly.
+    """
+
+    def __init__(self, shields: Iterable[Shield]) -> None:
+        """Build the index from the list of shields returned by Llama Stack."""
+        self.shields: list[Shield] = list(shields)
+        self.input_shields: list[str] = [
+            shield.identifier for shield in self.shields if is_input_shield(shield)
+        ]
+        self.output_shields: list[str] = [
+            shield.identifier for shield in self.shields if is_output_shield(shield)
+        ]
+
+    def __iter__(self) -> Iterator[Shield]:
+        """Iterate over all shields in the original order."""
+        return iter(self.shields)
+
+    def __len__(self) -> int:
+        """Return number of shields."""
+        return len(self.shields)
+
+
+class ShieldCatalog(Catalog[ShieldIndex], metaclass=SingletonABCMeta):
+    """TTL-cached catalog of shields available in Llama Stack."""
+
+    name = "shield catalog"
+
+    async def _fetch(self, client: AsyncLlamaStackClient) -> ShieldIndex:
+        """Retrieve list of shields from Llama Stack and classify them."""
+        index = ShieldIndex(await client.shields.list())
+        logger.debug(
+            "Shield catalog contains input shields %s and output shields %s",
+            index.input_shields,
+            index.output_shields,
+        )
+        return index
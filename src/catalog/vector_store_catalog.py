@@ -0,0 +1,68 @@
+"""Catalog of vector stores registered in Llama Stack."""
+
+from typing import Any, Iterable, Iterator
+
+from llama_stack_client import AsyncLlamaStackClient  # type: ignore
+
+from catalog.catalog import Catalog
+from log import get_logger
+from utils.types import SingletonABCMeta
+
+logger = get_logger("catalog.vector_store_catalog")
+
+
+def get_rag_tools(vector_store_ids: list[str]) -> list[dict[str, Any]] | None:
+    """
+    Convert vector store IDs to tools format for Responses API.
+
+    Args:
+        vector_store_ids: List of vector store identifiers
+
+    Returns:
+        list[dict[str, Any]] | None: List containing file_search tool configuration,
+        or None if no vector stores provided
+    """
+    if not vector_store_ids:
+        return None
+
+    return [
+        {
+            "type": "file_search",
+            "vector_store_ids": vector_store_ids,
+            "max_num_results": 10,
+        }
+    ]
+
+
+class VectorStoreIndex:
+    """Immutable snapshot of available vector stores.
+
+    The RAG tool definition for Responses API depends only on the vector
+    store IDs, so it is built once when the snapshot is created.
+    """
+
+    def __init__(self, vector_stores: Iterable[Any]) -> None:
+        """Build the index from the list of vector stores returned by Llama Stack."""
+        self.vector_stores: list[Any] = list(vector_stores)
+        self.ids: list[str] = [vector_store.id for vector_store in self.vector_stores]
+        self.rag_tools: list[dict[str, Any]] | None = get_rag_tools(self.ids)
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over all vector stores in the original order."""
+        return iter(self.vector_stores)
+
+    def __len__(self) -> int:
+        """Return number of vector stores."""
+        return len(self.vector_stores)
+
+
+class VectorStoreCatalog(Catalog[VectorStoreIndex], metaclass=SingletonABCMeta):
+    """TTL-cached catalog of vector stores available in Llama Stack."""
+
+    name = "vector store catalog"
+
+    async def _fetch(self, client: AsyncLlamaStackClient) -> VectorStoreIndex:
+        """Retrieve list of vector stores from Llama Stack."""
+        index = VectorStoreIndex((await client.vector_stores.list()).data)
+        logger.debug("Vector store catalog contains vector stores %s", index.ids)
+        return index
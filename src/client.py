@@ -7,7 +7,7 @@ from typing import Optional
 from llama_stack import (
     AsyncLlamaStackAsLibraryClient,  # type: ignore
 )
-from llama_stack_client import AsyncLlamaStackClient  # type: ignore
+from llama_stack_client import NOT_GIVEN, AsyncLlamaStackClient  # type: ignore
 from models.config import LlamaStackConfiguration
 from utils.types import Singleton
 
@@ -44,6 +44,12 @@ class AsyncLlamaStackClientHolder(metaclass=Singleton):
                     if llama_stack_config.api_key is not None
                     else None
                 ),
+                # keep the client's own default timeout when not configured
+                timeout=(
+                    llama_stack_config.timeout
+                    if llama_stack_config.timeout is not None
+                    else NOT_GIVEN
+                ),
             )
 
     def get_client(self) -> AsyncLlamaStackClient:
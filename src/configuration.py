@@ -21,6 +21,19 @@ from models.config import (
     DatabaseConfiguration,
     ConversationCacheConfiguration,
     QuotaHandlersConfiguration,
+    CatalogConfiguration,
+    AgentPoolConfiguration,
+    ResponseCacheConfiguration,
+    WriteBehindConfiguration,
+    BatchQueryConfiguration,
+    QueryJobsConfiguration,
+    DeadlinesConfiguration,
+    ConcurrencyLimiterConfiguration,
+    FairSchedulingConfiguration,
+    ConversationHistoryConfiguration,
+    PromptSizeConfiguration,
+    AttachmentsConfiguration,
+    StreamingConfiguration,
 )
 
 from cache.cache import Cache
@@ -36,7 +49,8 @@ class LogicError(Exception):
     """Error in application logic."""
 
 
-class AppConfig:
+# one read-only accessor per configuration section
+class AppConfig:  # pylint: disable=too-many-public-methods
     """Singleton class to load and store the configuration."""
 
     _instance = None
@@ -158,6 +172,97 @@ class AppConfig:
             raise LogicError("logic error: configuration is not loaded")
         return self._configuration.quota_handlers
 
+    @property
+    def catalog_configuration(self) -> CatalogConfiguration:
+        """Return Llama Stack catalogs configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.catalog
+
+    @property
+    def agent_pool_configuration(self) -> AgentPoolConfiguration:
+        """Return agent pool configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.agent_pool
+
+    @property
+    def response_cache_configuration(self) -> ResponseCacheConfiguration:
+        """Return response cache configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.response_cache
+
+    @property
+    def write_behind_configuration(self) -> WriteBehindConfiguration:
+        """Return write-behind queue configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.write_behind
+
+    @property
+    def batch_query_configuration(self) -> BatchQueryConfiguration:
+        """Return batch query endpoint configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.batch_query
+
+    @property
+    def query_jobs_configuration(self) -> QueryJobsConfiguration:
+        """Return asynchronous query jobs configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.query_jobs
+
+    @property
+    def deadlines_configuration(self) -> DeadlinesConfiguration:
+        """Return request deadlines configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.deadlines
+
+    @property
+    def concurrency_limiter_configuration(self) -> ConcurrencyLimiterConfiguration:
+        """Return concurrency limiter configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.concurrency_limiter
+
+    @property
+    def fair_scheduling_configuration(self) -> FairSchedulingConfiguration:
+        """Return fair scheduling configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.fair_scheduling
+
+    @property
+    def conversation_history_configuration(self) -> ConversationHistoryConfiguration:
+        """Return conversation history configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.conversation_history
+
+    @property
+    def prompt_size_configuration(self) -> PromptSizeConfiguration:
+        """Return prompt size configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.prompt_size
+
+    @property
+    def attachments_configuration(self) -> AttachmentsConfiguration:
+        """Return attachments configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.attachments
+
+    @property
+    def streaming_configuration(self) -> StreamingConfiguration:
+        """Return streaming configuration."""
+        if self._configuration is None:
+            raise LogicError("logic error: configuration is not loaded")
+        return self._configuration.streaming
+
     @property
     def conversation_cache(self) -> Cache:
         """Return the conversation cache."""
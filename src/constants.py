@@ -115,10 +115,14 @@ DEFAULT_JWT_USER_NAME_CLAIM = "username"
 
 # default RAG tool value
 DEFAULT_RAG_TOOL = "knowledge_search"
+# Maximum number of RAG tool responses with memoized extracted metadata
+RAG_METADATA_CACHE_SIZE = 1024
 
 # Media type constants for streaming responses
 MEDIA_TYPE_JSON = "application/json"
 MEDIA_TYPE_TEXT = "text/plain"
+# Newline delimited JSON used to stream results of batch queries
+MEDIA_TYPE_NDJSON = "application/x-ndjson"
 
 # PostgreSQL connection constants
 # See: https://www.postgresql.org/docs/current/libpq-connect.html#LIBPQ-CONNECT-SSLMODE
@@ -148,3 +152,142 @@ DEFAULT_EMBEDDING_DIMENSION = 768
 # quota limiters constants
 USER_QUOTA_LIMITER = "user_limiter"
 CLUSTER_QUOTA_LIMITER = "cluster_limiter"
+
+# Llama Stack catalogs (models, shields, ...)
+# Default time-to-live of cached catalog data, in seconds
+DEFAULT_CATALOG_TTL = 300
+
+# Agent handle pool
+# Maximum number of initialized agents (one per conversation and agent
+# configuration) kept in memory for reuse by subsequent conversation turns
+DEFAULT_AGENT_POOL_SIZE = 1024
+
+# Topic summary of a new conversation is generated concurrently with the main
+# LLM call; maximum time, in seconds, to wait for it once the answer is ready
+TOPIC_SUMMARY_DEADLINE = 10.0
+
+# Request deadlines
+# Default overall time budget, in seconds, of one request
+DEFAULT_REQUEST_DEADLINE = 300.0
+# Default overall time budgets, in seconds, of endpoints that need more (or
+# less) time than other endpoints
+DEFAULT_ENDPOINT_DEADLINES = {"/v1/query/batch": 3600.0}
+# Default time budgets, in seconds, of request processing stages
+DEFAULT_MODEL_LISTING_DEADLINE = 10.0
+DEFAULT_AGENT_INIT_DEADLINE = 30.0
+DEFAULT_TURN_CREATION_DEADLINE = 240.0
+
+# Adaptive concurrency limit of inference calls to Llama Stack
+# Default initial, minimal and maximal number of concurrent calls
+DEFAULT_CONCURRENCY_INITIAL_LIMIT = 16
+DEFAULT_CONCURRENCY_MIN_LIMIT = 1
+DEFAULT_CONCURRENCY_MAX_LIMIT = 128
+# Default latency, in seconds, above which calls are considered as overload
+DEFAULT_CONCURRENCY_LATENCY_THRESHOLD = 30.0
+# Ratio of multiplicative decrease of the limit on overload
+CONCURRENCY_LIMIT_BACKOFF_RATIO = 0.9
+# Default maximum number of calls waiting for a free slot
+DEFAULT_CONCURRENCY_QUEUE_SIZE = 64
+# Default maximum time, in seconds, a call can wait for a free slot
+DEFAULT_CONCURRENCY_QUEUE_TIMEOUT = 10.0
+# Default number of consecutive connection failures opening circuit breaker
+DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+# Default time, in seconds, after which open circuit breaker lets a probe in
+DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT = 30.0
+
+# Fair scheduling of LLM turns across users
+# Default maximum number of turns in flight, for all users together
+DEFAULT_FAIR_SCHEDULING_MAX_IN_FLIGHT = 64
+# Default maximum number of turns in flight of one user
+DEFAULT_FAIR_SCHEDULING_MAX_IN_FLIGHT_PER_USER = 4
+# Default maximum number of queued turns of one user
+DEFAULT_FAIR_SCHEDULING_MAX_QUEUED_PER_USER = 16
+# Default maximum time, in seconds, a turn can wait in the queue
+DEFAULT_FAIR_SCHEDULING_QUEUE_TIMEOUT = 60.0
+# Weight of users without any role listed in role weights
+DEFAULT_FAIR_SCHEDULING_WEIGHT = 1
+
+# Conversation history management
+# Default token budget of conversation history, instructions and query
+DEFAULT_HISTORY_TOKEN_BUDGET = 16384
+# Counters of tokens of conversation history
+HISTORY_TOKEN_COUNTER_LLAMA3 = "llama3"
+HISTORY_TOKEN_COUNTER_APPROXIMATE = "approximate"
+# Number of characters per token assumed by the approximate counter
+APPROXIMATE_CHARS_PER_TOKEN = 4
+# Maximum number of most recent history items retrieved from Llama Stack
+HISTORY_ITEMS_LIMIT = 100
+
+# Query attachments
+# Default maximum size of one attachment, in bytes
+DEFAULT_MAX_ATTACHMENT_SIZE = 4 * 1024 * 1024
+# Default maximum total size of attachments of one query, in bytes
+DEFAULT_MAX_ATTACHMENTS_SIZE = 16 * 1024 * 1024
+# Default maximum number of conversations with remembered attachments
+DEFAULT_ATTACHMENT_INDEX_MAX_CONVERSATIONS = 10000
+# Content types of attachments sent to Llama Stack as plain text
+# TODO: LCORE-881 - Remove if Llama Stack starts to support these mime types  # pylint: disable=fixme
+ATTACHMENT_PLAIN_TEXT_CONTENT_TYPES = frozenset(("application/json", "application/xml"))
+
+# Streamed responses
+# Default maximum time a delta of the answer text is held back to be merged
+# with the following ones, in seconds
+DEFAULT_STREAMING_COALESCING_WINDOW = 0.03
+# Default number of buffered characters of the answer text sent right away
+DEFAULT_STREAMING_COALESCING_MAX_SIZE = 1024
+# Default number of the most recent events of a streamed response kept to be
+# replayed to a reconnected client
+DEFAULT_STREAM_REPLAY_BUFFER_SIZE = 2048
+# Default time a finished streamed response can still be resumed, in seconds
+DEFAULT_STREAM_RESUME_RETENTION = 60.0
+# Default maximum number of resumable streamed responses kept in memory
+DEFAULT_MAX_RESUMABLE_STREAMS = 1000
+# Default time a resumable response is generated after its client went away,
+# waiting for the client to reconnect, in seconds
+DEFAULT_STREAM_DISCONNECT_GRACE_PERIOD = 10.0
+# Default time of silence of a streamed response after which a keepalive
+# comment is sent, in seconds
+DEFAULT_STREAM_KEEPALIVE_INTERVAL = 15.0
+
+# Response cache for stateless queries
+# Default time-to-live of cached responses, in seconds
+DEFAULT_RESPONSE_CACHE_TTL = 3600
+# Default maximum number of cached responses
+DEFAULT_RESPONSE_CACHE_MAX_ENTRIES = 1024
+# Default maximum total size of cached responses, in bytes
+DEFAULT_RESPONSE_CACHE_MAX_SIZE = 64 * 1024 * 1024
+
+# Write-behind queue for bookkeeping performed after the LLM answer is ready
+WRITE_BEHIND_WAIT_FOR_ACK = "wait_for_ack"
+WRITE_BEHIND_FIRE_AND_FORGET = "fire_and_forget"
+# Default maximum number of pending writes
+DEFAULT_WRITE_BEHIND_QUEUE_SIZE = 1024
+# Default number of workers (and worker threads) performing the writes
+DEFAULT_WRITE_BEHIND_WORKERS = 1
+# Default maximum number of writes performed by one worker thread call
+DEFAULT_WRITE_BEHIND_BATCH_SIZE = 32
+
+# Batch query endpoint
+# Default maximum number of queries in one batch
+DEFAULT_BATCH_QUERY_MAX_QUERIES = 1000
+# Default maximum number of queries of one batch processed at the same time
+DEFAULT_BATCH_QUERY_CONCURRENCY = 8
+
+# Asynchronous query jobs
+QUERY_JOB_PENDING = "pending"
+QUERY_JOB_RUNNING = "running"
+QUERY_JOB_SUCCEEDED = "succeeded"
+QUERY_JOB_FAILED = "failed"
+# Default number of workers answering queries of submitted jobs
+DEFAULT_QUERY_JOBS_WORKERS = 4
+# Default maximum number of submitted jobs waiting for a free worker
+DEFAULT_QUERY_JOBS_QUEUE_SIZE = 100
+# Default time, in seconds, for which finished jobs are kept in the database
+DEFAULT_QUERY_JOBS_RETENTION = 24 * 60 * 60
+# Default maximum time, in seconds, a client can wait for a job to finish
+DEFAULT_QUERY_JOBS_MAX_WAIT = 60
+# Interval, in seconds, of database polling while waiting for a job that is
+# processed by another service worker
+QUERY_JOB_POLL_INTERVAL = 0.5
+# Minimum interval, in seconds, between purges of expired jobs
+QUERY_JOB_PURGE_INTERVAL = 60
@@ -51,3 +51,101 @@ llm_token_sent_total = Counter(
 llm_token_received_total = Counter(
     "ls_llm_token_received_total", "LLM tokens received", ["provider", "model"]
 )
+
+# Metrics for the cache of responses to stateless queries
+response_cache_hits_total = Counter(
+    "ls_response_cache_hits_total", "Response cache hits"
+)
+response_cache_misses_total = Counter(
+    "ls_response_cache_misses_total", "Response cache misses"
+)
+response_cache_size_bytes = Gauge(
+    "ls_response_cache_size_bytes", "Total size of cached responses"
+)
+
+# Backpressure of the write-behind queue: number of pending writes, number of
+# submissions that had to wait for free space and number of failed writes
+write_behind_queue_depth = Gauge(
+    "ls_write_behind_queue_depth", "Number of writes pending in write-behind queue"
+)
+write_behind_blocked_total = Counter(
+    "ls_write_behind_blocked_total",
+    "Write-behind submissions delayed because the queue was full",
+)
+write_behind_failures_total = Counter(
+    "ls_write_behind_failures_total", "Failed write-behind writes", ["job"]
+)
+
+# Asynchronous query jobs finished, by their final status
+query_jobs_total = Counter("ls_query_jobs_total", "Finished query jobs", ["status"])
+
+# Requests cancelled because a processing stage exceeded its deadline
+request_deadline_exceeded_total = Counter(
+    "ls_request_deadline_exceeded_total",
+    "Requests cancelled because of exceeded deadline",
+    ["stage"],
+)
+
+# Histogram to measure durations of stages of request processing (e.g.
+# authentication, model listing, turn creation, persistence) and of the
+# steps performed concurrently within a stage; step is empty for the stage
+request_stage_duration_seconds = Histogram(
+    "ls_request_stage_duration_seconds",
+    "Durations of request processing stages and their steps",
+    ["path", "stage", "step"],
+)
+
+# Adaptive concurrency limiter and circuit breaker of calls to Llama Stack;
+# circuit breaker state is 0 when closed, 1 when half-open and 2 when open
+llama_stack_concurrency_limit = Gauge(
+    "ls_llama_stack_concurrency_limit", "Limit of concurrent calls to Llama Stack"
+)
+llama_stack_calls_in_flight = Gauge(
+    "ls_llama_stack_calls_in_flight", "Number of calls to Llama Stack in flight"
+)
+llama_stack_queue_depth = Gauge(
+    "ls_llama_stack_queue_depth", "Number of calls waiting for a free slot"
+)
+llama_stack_circuit_breaker_state = Gauge(
+    "ls_llama_stack_circuit_breaker_state", "State of the Llama Stack circuit breaker"
+)
+llama_stack_rejected_total = Counter(
+    "ls_llama_stack_rejected_total",
+    "Calls to Llama Stack rejected by the concurrency limiter",
+    ["reason"],
+)
+
+# Estimated sizes of prompts, in tokens, and prompts rejected as too large
+# for the context of the model before they were sent to Llama Stack
+llm_prompt_tokens_estimated = Histogram(
+    "ls_llm_prompt_tokens_estimated",
+    "Estimated tokens of prompts",
+    ["provider", "model"],
+    buckets=(256, 1024, 4096, 8192, 16384, 32768, 65536, 131072, 262144),
+)
+llm_prompt_too_large_total = Counter(
+    "ls_llm_prompt_too_large_total",
+    "Prompts rejected as too large for the model context",
+    ["provider", "model"],
+)
+
+# Bytes of query attachments sent to Llama Stack and bytes of repeated
+# attachments referenced instead of being sent again
+attachment_bytes_total = Counter(
+    "ls_attachment_bytes_total", "Bytes of query attachments", ["disposition"]
+)
+
+# Streamed responses resumed by clients reconnecting with Last-Event-ID
+streams_resumed_total = Counter(
+    "ls_streams_resumed_total", "Streamed responses resumed by reconnected clients"
+)
+
+# Streamed responses cancelled because their client went away
+streams_cancelled_total = Counter(
+    "ls_streams_cancelled_total", "Streamed responses cancelled after client left"
+)
+
+# Histogram to measure time LLM turns wait for their turn in the fair scheduler
+turn_queue_wait_seconds = Histogram(
+    "ls_turn_queue_wait_seconds", "Time LLM turns wait in the fair scheduler queue"
+)
@@ -1,13 +1,7 @@
 """Utility functions for metrics handling."""
 
-from typing import cast
-
-from llama_stack.models.llama.datatypes import RawMessage
-from llama_stack.models.llama.llama3.chat_format import ChatFormat
-from llama_stack.models.llama.llama3.tokenizer import Tokenizer
-from llama_stack_client.types.agents.turn import Turn
-
 import metrics
+from catalog.model_catalog import ModelCatalog
 from client import AsyncLlamaStackClientHolder
 from configuration import configuration
 from log import get_logger
@@ -20,13 +14,9 @@ logger = get_logger(__name__)
 async def setup_model_metrics() -> None:
     """Perform setup of all metrics related to LLM model and provider."""
     logger.info("Setting up model metrics")
-    model_list = await AsyncLlamaStackClientHolder().get_client().models.list()
+    model_index = await ModelCatalog().get(AsyncLlamaStackClientHolder().get_client())
 
-    models = [
-        model
-        for model in model_list
-        if model.model_type == "llm"  # pyright: ignore[reportAttributeAccessIssue]
-    ]
+    models = model_index.llms
 
     default_model_label = (
         configuration.inference.default_provider,  # type: ignore[reportAttributeAccessIssue]
@@ -55,23 +45,3 @@ async def setup_model_metrics() -> None:
                 default_model_value,
             )
     logger.info("Model metrics setup complete")
-
-
-def update_llm_token_count_from_turn(
-    turn: Turn, model: str, provider: str, system_prompt: str = ""
-) -> None:
-    """Update the LLM calls metrics from a turn."""
-    tokenizer = Tokenizer.get_instance()
-    formatter = ChatFormat(tokenizer)
-
-    raw_message = cast(RawMessage, turn.output_message)
-    encoded_output = formatter.encode_dialog_prompt([raw_message])
-    token_count = len(encoded_output.tokens) if encoded_output.tokens else 0
-    metrics.llm_token_received_total.labels(provider, model).inc(token_count)
-
-    input_messages = [RawMessage(role="user", content=system_prompt)] + cast(
-        list[RawMessage], turn.input_messages
-    )
-    encoded_input = formatter.encode_dialog_prompt(input_messages)
-    token_count = len(encoded_input.tokens) if encoded_input.tokens else 0
-    metrics.llm_token_sent_total.labels(provider, model).inc(token_count)
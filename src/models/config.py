@@ -1,7 +1,7 @@
 """Model with service configuration."""
 
 from pathlib import Path
-from typing import Optional, Any, Pattern
+from typing import Iterable, Optional, Any, Pattern, TypeVar
 from enum import Enum
 from functools import cached_property
 import re
@@ -17,7 +17,9 @@ from pydantic import (
     FilePath,
     AnyHttpUrl,
     PositiveInt,
+    PositiveFloat,
     NonNegativeInt,
+    NonNegativeFloat,
     SecretStr,
 )
 
@@ -28,6 +30,8 @@ import constants
 
 from utils import checks
 
+DefaultT = TypeVar("DefaultT")
+
 
 class ConfigurationBase(BaseModel):
     """Base class for all configuration models that rejects unknown fields."""
@@ -155,6 +159,8 @@ class ServiceConfiguration(ConfigurationBase):
     workers: PositiveInt = 1
     color_log: bool = True
     access_log: bool = True
+    # report durations of request processing stages in Server-Timing header
+    server_timing: bool = False
     tls_config: TLSConfiguration = Field(default_factory=TLSConfiguration)
     cors: CORSConfiguration = Field(default_factory=CORSConfiguration)
 
@@ -181,6 +187,8 @@ class LlamaStackConfiguration(ConfigurationBase):
     api_key: Optional[SecretStr] = None
     use_as_library_client: Optional[bool] = None
     library_client_config_path: Optional[str] = None
+    # default timeout of calls to Llama Stack service, in seconds
+    timeout: Optional[PositiveFloat] = None
 
     @model_validator(mode="after")
     def check_llama_stack_model(self) -> Self:
@@ -511,6 +519,312 @@ class InferenceConfiguration(ConfigurationBase):
         return self
 
 
+class CatalogConfiguration(ConfigurationBase):
+    """Configuration of cached Llama Stack catalogs (models, shields, ...)."""
+
+    # how long cached catalog data is considered to be valid, in seconds
+    ttl: PositiveInt = constants.DEFAULT_CATALOG_TTL
+    # refresh catalogs periodically in the background
+    background_refresh: bool = True
+
+
+class AgentPoolConfiguration(ConfigurationBase):
+    """Configuration of the pool of initialized agents.
+
+    Agents bound to a conversation and its session are kept for reuse by the
+    next turn of the conversation; the least recently used ones are dropped
+    once the pool is full.
+    """
+
+    # maximum number of pooled agents (one per conversation and agent
+    # configuration)
+    max_agents: PositiveInt = constants.DEFAULT_AGENT_POOL_SIZE
+
+
+class ResponseCacheConfiguration(ConfigurationBase):
+    """Configuration of the cache of responses to stateless queries.
+
+    Only queries without conversation ID are cached. When single flight is
+    enabled, identical stateless queries that arrive while the answer is
+    being generated wait for it instead of calling the LLM again. Responses
+    are reused only for queries of the same user and are returned in the
+    conversation they were generated in. Responses that depend on live data
+    (for example results of MCP tools) may get outdated before they expire,
+    so the cache is disabled by default.
+    """
+
+    enabled: bool = False
+    # how long cached responses are considered to be valid, in seconds
+    ttl: PositiveInt = constants.DEFAULT_RESPONSE_CACHE_TTL
+    # maximum number of cached responses
+    max_entries: PositiveInt = constants.DEFAULT_RESPONSE_CACHE_MAX_ENTRIES
+    # maximum total size of cached responses, in bytes
+    max_size: PositiveInt = constants.DEFAULT_RESPONSE_CACHE_MAX_SIZE
+    # identical stateless queries processed at the same time share one LLM call
+    single_flight: bool = True
+
+
+class WriteBehindConfiguration(ConfigurationBase):
+    """Configuration of the write-behind queue.
+
+    Bookkeeping performed after the LLM answer is ready (transcripts,
+    conversation details, quota consumption and conversation cache) is
+    handed over to worker tasks that perform the writes in batches in worker
+    threads. With `wait_for_ack` durability the response is sent once the
+    writes are done, with `fire_and_forget` durability it is sent as soon as
+    the writes are queued; in that case a follow-up request may not see the
+    effects of the previous one yet (e.g. a new conversation or consumed
+    quota). Writes related to one conversation are always performed in order.
+    """
+
+    enabled: bool = True
+    durability: Literal["wait_for_ack", "fire_and_forget"] = (
+        constants.WRITE_BEHIND_WAIT_FOR_ACK
+    )
+    # maximum number of pending writes; submitters wait when the queue is full
+    queue_size: PositiveInt = constants.DEFAULT_WRITE_BEHIND_QUEUE_SIZE
+    workers: PositiveInt = constants.DEFAULT_WRITE_BEHIND_WORKERS
+    batch_size: PositiveInt = constants.DEFAULT_WRITE_BEHIND_BATCH_SIZE
+
+
+class BatchQueryConfiguration(ConfigurationBase):
+    """Configuration of the batch query endpoint."""
+
+    # maximum number of queries accepted in one batch
+    max_queries: PositiveInt = constants.DEFAULT_BATCH_QUERY_MAX_QUERIES
+    # maximum number of queries of one batch processed at the same time
+    concurrency: PositiveInt = constants.DEFAULT_BATCH_QUERY_CONCURRENCY
+
+
+class QueryJobsConfiguration(ConfigurationBase):
+    """Configuration of asynchronous query jobs.
+
+    Submitted jobs are answered by a pool of workers in the background and
+    their state is stored in the database, so any service worker can report
+    it to clients.
+    """
+
+    # number of workers answering queries of submitted jobs
+    workers: PositiveInt = constants.DEFAULT_QUERY_JOBS_WORKERS
+    # maximum number of jobs waiting for a free worker; more are rejected
+    queue_size: PositiveInt = constants.DEFAULT_QUERY_JOBS_QUEUE_SIZE
+    # how long finished jobs are kept in the database, in seconds
+    retention: PositiveInt = constants.DEFAULT_QUERY_JOBS_RETENTION
+    # maximum time a client can wait for a job to finish, in seconds
+    max_wait: PositiveInt = constants.DEFAULT_QUERY_JOBS_MAX_WAIT
+
+
+class DeadlinesConfiguration(ConfigurationBase):
+    """Configuration of request deadlines.
+
+    Every request gets an overall time budget. Calls to Llama Stack made
+    while the request is processed are grouped into stages, each stage is
+    limited by its own budget and by the time remaining to the deadline of
+    the request. Requests exceeding the budget fail with HTTP 504.
+    """
+
+    enabled: bool = True
+    # overall time budget of one request, in seconds
+    request: PositiveFloat = constants.DEFAULT_REQUEST_DEADLINE
+    # overall time budgets of specific endpoints (by path), in seconds
+    endpoints: dict[str, PositiveFloat] = Field(
+        default_factory=lambda: dict(constants.DEFAULT_ENDPOINT_DEADLINES)
+    )
+    # time budgets of request processing stages, in seconds
+    model_listing: PositiveFloat = constants.DEFAULT_MODEL_LISTING_DEADLINE
+    agent_init: PositiveFloat = constants.DEFAULT_AGENT_INIT_DEADLINE
+    turn_creation: PositiveFloat = constants.DEFAULT_TURN_CREATION_DEADLINE
+    topic_summary: PositiveFloat = constants.TOPIC_SUMMARY_DEADLINE
+
+
+class ConcurrencyLimiterConfiguration(ConfigurationBase):
+    """Configuration of the concurrency limiter of calls to Llama Stack.
+
+    The number of concurrent inference calls is limited by an adaptive
+    limit: it grows slowly while calls succeed in time and shrinks quickly
+    when they are slow or fail (AIMD). Calls over the limit wait in a
+    bounded queue. After repeated connection failures the circuit breaker
+    opens and calls fail fast until a probe call succeeds.
+
+    The limiter is disabled by default, because it rejects calls that would
+    have been served before; enable it once the limits fit the deployment.
+    """
+
+    enabled: bool = False
+    initial_limit: PositiveInt = constants.DEFAULT_CONCURRENCY_INITIAL_LIMIT
+    min_limit: PositiveInt = constants.DEFAULT_CONCURRENCY_MIN_LIMIT
+    max_limit: PositiveInt = constants.DEFAULT_CONCURRENCY_MAX_LIMIT
+    # calls slower than this, in seconds, decrease the limit
+    latency_threshold: PositiveFloat = constants.DEFAULT_CONCURRENCY_LATENCY_THRESHOLD
+    # maximum number of calls waiting for a free slot
+    queue_size: NonNegativeInt = constants.DEFAULT_CONCURRENCY_QUEUE_SIZE
+    # maximum time a call can wait for a free slot, in seconds
+    queue_timeout: PositiveFloat = constants.DEFAULT_CONCURRENCY_QUEUE_TIMEOUT
+    # number of consecutive connection failures opening the circuit breaker
+    failure_threshold: PositiveInt = constants.DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+    # time after which the open circuit breaker lets a probe call in, in seconds
+    reset_timeout: PositiveFloat = constants.DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT
+
+    @model_validator(mode="after")
+    def check_limits(self) -> Self:
+        """Check that the initial limit is between minimal and maximal limit."""
+        if not self.min_limit <= self.initial_limit <= self.max_limit:
+            raise ValueError(
+                "Concurrency limits must satisfy min_limit <= initial_limit <= max_limit"
+            )
+        return self
+
+
+class FairSchedulingConfiguration(ConfigurationBase):
+    """Configuration of fair scheduling of LLM turns across users.
+
+    The number of turns in flight is capped per user and in total. Queued
+    turns of different users are served round-robin; a user whose role is
+    listed in `role_weights` gets that many turns served per round (the
+    highest weight of all roles of the user is used).
+
+    The scheduling is disabled by default: all requests of a deployment
+    without authentication belong to one user, which the per-user cap
+    would limit to a few turns at a time.
+    """
+
+    enabled: bool = False
+    max_in_flight: PositiveInt = constants.DEFAULT_FAIR_SCHEDULING_MAX_IN_FLIGHT
+    max_in_flight_per_user: PositiveInt = (
+        constants.DEFAULT_FAIR_SCHEDULING_MAX_IN_FLIGHT_PER_USER
+    )
+    max_queued_per_user: NonNegativeInt = (
+        constants.DEFAULT_FAIR_SCHEDULING_MAX_QUEUED_PER_USER
+    )
+    # maximum time a turn can wait in the queue, in seconds
+    queue_timeout: PositiveFloat = constants.DEFAULT_FAIR_SCHEDULING_QUEUE_TIMEOUT
+    role_weights: dict[str, PositiveInt] = Field(default_factory=dict)
+
+    def weight(self, roles: Iterable[str]) -> int:
+        """Return scheduling weight of a user with the given roles."""
+        return max(
+            (self.role_weights[role] for role in roles if role in self.role_weights),
+            default=constants.DEFAULT_FAIR_SCHEDULING_WEIGHT,
+        )
+
+
+class ConversationHistoryConfiguration(ConfigurationBase):
+    """Configuration of conversation history management.
+
+    Continued conversations send their whole history to the model on every
+    turn. When enabled, the oldest turns are dropped before the turn is
+    sent, so the history, instructions and query fit into the token budget
+    of the model. Budgets are looked up by the full model ID (with provider)
+    first, then by the model name.
+    """
+
+    enabled: bool = False
+    default_budget: PositiveInt = constants.DEFAULT_HISTORY_TOKEN_BUDGET
+    model_budgets: dict[str, PositiveInt] = Field(default_factory=dict)
+    token_counter: Literal["llama3", "approximate"] = (
+        constants.HISTORY_TOKEN_COUNTER_LLAMA3
+    )
+
+    def budget(self, model_id: str) -> int:
+        """Return token budget of the given model."""
+        return _model_setting(self.model_budgets, model_id, self.default_budget)
+
+
+class PromptSizeConfiguration(ConfigurationBase):
+    """Configuration of the pre-flight check of prompt size.
+
+    Tokens of the system prompt, query and attachments are estimated before
+    the request is sent to Llama Stack; prompts larger than the context
+    size of the model are rejected with HTTP 413. Context sizes are looked
+    up by the full model ID (with provider) first, then by the model name.
+    Prompts for models without configured context size (and without a
+    default one) are only measured, never rejected. The approximate token
+    counter is fast, the llama3 one is exact for llama models.
+    """
+
+    enabled: bool = True
+    default_context_size: Optional[PositiveInt] = None
+    model_context_sizes: dict[str, PositiveInt] = Field(default_factory=dict)
+    token_counter: Literal["llama3", "approximate"] = (
+        constants.HISTORY_TOKEN_COUNTER_APPROXIMATE
+    )
+
+    def context_size(self, model_id: str) -> Optional[int]:
+        """Return context size of the given model, None if it is not known."""
+        return _model_setting(
+            self.model_context_sizes, model_id, self.default_context_size
+        )
+
+
+class AttachmentsConfiguration(ConfigurationBase):
+    """Configuration of query attachments.
+
+    Attachments larger than `max_attachment_size` bytes and queries with
+    attachments larger than `max_request_size` bytes in total are rejected
+    with HTTP 413. When deduplication is enabled, an attachment that was
+    already sent earlier in the conversation is referenced instead of being
+    sent again. Sent attachments are remembered in memory for the most
+    recent `max_conversations` conversations; attachments that are not
+    remembered (for example sent through another worker) are sent in full.
+    """
+
+    max_attachment_size: PositiveInt = constants.DEFAULT_MAX_ATTACHMENT_SIZE
+    max_request_size: PositiveInt = constants.DEFAULT_MAX_ATTACHMENTS_SIZE
+    deduplicate: bool = True
+    max_conversations: PositiveInt = (
+        constants.DEFAULT_ATTACHMENT_INDEX_MAX_CONVERSATIONS
+    )
+
+
+class StreamingConfiguration(ConfigurationBase):
+    """Configuration of streamed responses.
+
+    With token coalescing, adjacent deltas of the answer text are merged
+    into one event; the merged event is sent when the oldest delta waited
+    for `coalescing_window` seconds, when `coalescing_max_size` characters
+    are buffered or when any other event is sent. Clients choose coalescing
+    by the `coalesce_tokens` field of the query request, `coalesce_tokens`
+    is used for requests that do not set it.
+
+    Resumable responses are generated independently of the client connection
+    and every event gets an ID. The last `replay_buffer_size` events are kept
+    in memory, a client reconnecting with the `Last-Event-ID` header gets the
+    events it missed and then the rest of the response. Finished responses
+    can be resumed for `resume_retention` seconds, at most
+    `max_resumable_streams` responses are kept.
+
+    When the client goes away, the LLM turn is cancelled. Resumable
+    responses are cancelled only when no client reconnects within
+    `disconnect_grace_period` seconds.
+
+    With keepalive, an SSE comment is sent whenever the response has been
+    silent for `keepalive_interval` seconds, e.g. during a long tool call,
+    so that proxies and load balancers do not drop the idle connection.
+    """
+
+    coalesce_tokens: bool = False
+    coalescing_window: PositiveFloat = constants.DEFAULT_STREAMING_COALESCING_WINDOW
+    coalescing_max_size: PositiveInt = constants.DEFAULT_STREAMING_COALESCING_MAX_SIZE
+    resumable: bool = True
+    replay_buffer_size: PositiveInt = constants.DEFAULT_STREAM_REPLAY_BUFFER_SIZE
+    resume_retention: PositiveFloat = constants.DEFAULT_STREAM_RESUME_RETENTION
+    max_resumable_streams: PositiveInt = constants.DEFAULT_MAX_RESUMABLE_STREAMS
+    disconnect_grace_period: NonNegativeFloat = (
+        constants.DEFAULT_STREAM_DISCONNECT_GRACE_PERIOD
+    )
+    keepalive: bool = True
+    keepalive_interval: PositiveFloat = constants.DEFAULT_STREAM_KEEPALIVE_INTERVAL
+
+
+def _model_setting(
+    settings: dict[str, int], model_id: str, default: DefaultT
+) -> int | DefaultT:
+    """Look up setting of a model by its full ID, then by the model name."""
+    if model_id in settings:
+        return settings[model_id]
+    return settings.get(model_id.split("/", 1)[-1], default)
+
+
 class ConversationCacheConfiguration(ConfigurationBase):
     """Conversation cache configuration."""
 
@@ -615,6 +929,35 @@ class Configuration(ConfigurationBase):
     quota_handlers: QuotaHandlersConfiguration = Field(
         default_factory=QuotaHandlersConfiguration
     )
+    catalog: CatalogConfiguration = Field(default_factory=CatalogConfiguration)
+    agent_pool: AgentPoolConfiguration = Field(default_factory=AgentPoolConfiguration)
+    response_cache: ResponseCacheConfiguration = Field(
+        default_factory=ResponseCacheConfiguration
+    )
+    write_behind: WriteBehindConfiguration = Field(
+        default_factory=WriteBehindConfiguration
+    )
+    batch_query: BatchQueryConfiguration = Field(
+        default_factory=BatchQueryConfiguration
+    )
+    query_jobs: QueryJobsConfiguration = Field(default_factory=QueryJobsConfiguration)
+    deadlines: DeadlinesConfiguration = Field(default_factory=DeadlinesConfiguration)
+    concurrency_limiter: ConcurrencyLimiterConfiguration = Field(
+        default_factory=ConcurrencyLimiterConfiguration
+    )
+    fair_scheduling: FairSchedulingConfiguration = Field(
+        default_factory=FairSchedulingConfiguration
+    )
+    conversation_history: ConversationHistoryConfiguration = Field(
+        default_factory=ConversationHistoryConfiguration
+    )
+    prompt_size: PromptSizeConfiguration = Field(
+        default_factory=PromptSizeConfiguration
+    )
+    attachments: AttachmentsConfiguration = Field(
+        default_factory=AttachmentsConfiguration
+    )
+    streaming: StreamingConfiguration = Field(default_factory=StreamingConfiguration)
 
     def dump(self, filename: str = "configuration.json") -> None:
         """Dump actual configuration into JSON file."""
@@ -0,0 +1,43 @@
+"""Asynchronous query job models."""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, Text, func
+
+from models.database.base import Base
+
+
+class QueryJob(Base):  # pylint: disable=too-few-public-methods
+    """Model for storing state of asynchronous query jobs."""
+
+    __tablename__ = "query_job"
+
+    # The job ID
+    id: Mapped[str] = mapped_column(primary_key=True)
+
+    # The user ID of the user who submitted the job
+    user_id: Mapped[str] = mapped_column(index=True)
+
+    # One of pending, running, succeeded or failed
+    status: Mapped[str] = mapped_column()
+
+    # The submitted query request serialized to JSON
+    request: Mapped[str] = mapped_column(Text)
+
+    # HTTP status code and JSON serialized query response (or error detail)
+    # of a finished job
+    status_code: Mapped[Optional[int]] = mapped_column(default=None)
+    result: Mapped[Optional[str]] = mapped_column(Text, default=None)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),  # pylint: disable=not-callable
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+    completed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None, index=True
+    )
@@ -82,6 +82,7 @@ class QueryRequest(BaseModel):
         attachments: The optional attachments.
         no_tools: Whether to bypass all tools and MCP servers (default: False).
         media_type: The optional media type for response format (application/json or text/plain).
+        coalesce_tokens: Whether to merge adjacent tokens of streamed response.
 
     Example:
         ```python
@@ -152,6 +153,13 @@ class QueryRequest(BaseModel):
         examples=[MEDIA_TYPE_JSON, MEDIA_TYPE_TEXT],
     )
 
+    coalesce_tokens: Optional[bool] = Field(
+        None,
+        description="Whether to merge adjacent tokens of streamed response into "
+        "fewer events, the service default is used when not set",
+        examples=[True, False],
+    )
+
     # provides examples for /docs endpoint
     model_config = {
         "extra": "forbid",
@@ -225,6 +233,41 @@ class QueryRequest(BaseModel):
         return self
 
 
+class BatchQueryRequest(BaseModel):
+    """Model representing a batch of independent requests for the LLM.
+
+    Attributes:
+        queries: The queries to be answered.
+
+    Example:
+        ```python
+        batch_request = BatchQueryRequest(
+            queries=[QueryRequest(query="What is Kubernetes?")]
+        )
+        ```
+    """
+
+    queries: list[QueryRequest] = Field(
+        min_length=1,
+        description="The queries to be answered",
+    )
+
+    # provides examples for /docs endpoint
+    model_config = {
+        "extra": "forbid",
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "queries": [
+                        {"query": "What is Kubernetes?"},
+                        {"query": "What is OpenShift?", "no_tools": True},
+                    ]
+                }
+            ]
+        },
+    }
+
+
 class FeedbackCategory(str, Enum):
     """Enum representing predefined feedback categories for AI responses.
 
@@ -305,6 +305,78 @@ class QueryResponse(BaseModel):
     }
 
 
+class QueryJobResponse(BaseModel):
+    """Model representing state of an asynchronous query job.
+
+    Attributes:
+        job_id: The job ID.
+        status: One of pending, running, succeeded or failed.
+        created_at: When the job was submitted.
+        started_at: When processing of the job started.
+        completed_at: When the job finished.
+        response: Response to the query of a succeeded job.
+        error: HTTP status code and detail of the error of a failed job.
+
+    Example:
+        ```python
+        job = QueryJobResponse(
+            job_id="123e4567-e89b-12d3-a456-426614174000",
+            status="pending",
+            created_at="2024-01-01T00:00:00Z",
+        )
+        ```
+    """
+
+    job_id: str = Field(
+        ...,
+        description="Job ID (UUID)",
+        examples=["123e4567-e89b-12d3-a456-426614174000"],
+    )
+
+    status: str = Field(
+        ...,
+        description="Status of the job",
+        examples=["pending", "running", "succeeded", "failed"],
+    )
+
+    created_at: Optional[str] = Field(
+        None,
+        description="When the job was submitted",
+        examples=["2024-01-01T01:00:00Z"],
+    )
+
+    started_at: Optional[str] = Field(
+        None,
+        description="When processing of the job started",
+        examples=["2024-01-01T01:00:01Z"],
+    )
+
+    completed_at: Optional[str] = Field(
+        None,
+        description="When the job finished",
+        examples=["2024-01-01T01:02:00Z"],
+    )
+
+    response: Optional[QueryResponse] = Field(
+        None,
+        description="Response to the query of a succeeded job",
+    )
+
+    error: Optional[dict[str, Any]] = Field(
+        None,
+        description="HTTP status code and detail of the error of a failed job",
+        examples=[
+            {
+                "status_code": 500,
+                "detail": {
+                    "response": "Unable to connect to Llama Stack",
+                    "cause": "Connection error.",
+                },
+            }
+        ],
+    )
+
+
 class InfoResponse(BaseModel):
     """Model representing a response to an info request.
 
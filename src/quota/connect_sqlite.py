@@ -16,7 +16,10 @@ def connect_sqlite(config: SQLiteDatabaseConfiguration) -> Any:
     # even if SQLite is not alive
     connection = None
     try:
-        connection = sqlite3.connect(database=config.db_path)
+        # quota checks are performed from worker threads so they do not
+        # block the event loop; the SQLite module serializes access to the
+        # connection itself
+        connection = sqlite3.connect(database=config.db_path, check_same_thread=False)
         if connection is not None:
             connection.autocommit = True
         return connection
@@ -0,0 +1,106 @@
+"""Pool of initialized agent handles reused across conversation turns."""
+
+import copy
+from typing import Optional
+
+from cachetools import LRUCache
+from llama_stack_client._client import AsyncLlamaStackClient
+from llama_stack_client.lib.agents.agent import AsyncAgent
+
+import constants
+from log import get_logger
+from models.config import AgentPoolConfiguration
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+AgentKey = tuple[str, str, str, tuple[str, ...], tuple[str, ...], bool]
+
+
+def agent_key(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    conversation_id: str,
+    model_id: str,
+    system_prompt: str,
+    available_input_shields: list[str],
+    available_output_shields: list[str],
+    no_tools: bool,
+) -> AgentKey:
+    """Build the pool key from the conversation ID and the agent configuration.
+
+    The tool parser is derived from the model ID and the `no_tools` flag, so
+    both are part of the key as well.
+    """
+    return (
+        conversation_id,
+        model_id,
+        system_prompt,
+        tuple(available_input_shields),
+        tuple(available_output_shields),
+        no_tools,
+    )
+
+
+class AgentPool(metaclass=Singleton):
+    """Bounded LRU pool of initialized agents with their session IDs.
+
+    Continuing a conversation normally requires several Llama Stack calls
+    (retrieve the agent, create and initialize a new one, delete the orphan
+    agent and list the sessions). Agents stored in the pool are already bound
+    to the conversation and its session, so they can be used for the next
+    turn directly.
+
+    Each lookup returns a shallow copy of the pooled agent, so per-request
+    attributes (like `extra_headers`) set by one request do not leak into
+    another one.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty pool with the default size."""
+        self._entries: LRUCache[
+            AgentKey, tuple[AsyncLlamaStackClient, AsyncAgent, str]
+        ] = LRUCache(maxsize=constants.DEFAULT_AGENT_POOL_SIZE)
+
+    def configure(self, config: AgentPoolConfiguration) -> None:
+        """Apply agent pool configuration and drop all pooled agents."""
+        self._entries = LRUCache(maxsize=config.max_agents)
+
+    def get(
+        self, client: AsyncLlamaStackClient, key: AgentKey
+    ) -> Optional[tuple[AsyncAgent, str]]:
+        """Return copy of the pooled agent and its session ID, if available.
+
+        Entries created through a different Llama Stack client are not valid
+        anymore; they are dropped and None is returned.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        pooled_client, agent, session_id = entry
+        if pooled_client is not client:
+            logger.debug("Dropping agent for conversation %s from pool", key[0])
+            self._entries.pop(key, None)
+            return None
+        return copy.copy(agent), session_id
+
+    def put(
+        self,
+        client: AsyncLlamaStackClient,
+        key: AgentKey,
+        agent: AsyncAgent,
+        session_id: str,
+    ) -> None:
+        """Store the initialized agent and its session ID in the pool."""
+        self._entries[key] = (client, copy.copy(agent), session_id)
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Drop all agents bound to the given conversation."""
+        for key in [k for k in self._entries if k[0] == conversation_id]:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all pooled agents."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return number of pooled agents."""
+        return len(self._entries)
@@ -0,0 +1,211 @@
+"""Ingestion of query attachments.
+
+Attachments are checked against byte limits before anything else is done
+with them, then appended to the query (Responses API) or converted to
+documents of the turn (Agent API) in one pass. The model sees the whole
+conversation, so an attachment that was already sent earlier in the same
+conversation is replaced by a short reference instead of being sent again.
+Digests of attachments sent in recent conversations are remembered in
+memory; attachments that are not remembered are simply sent in full.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Collection, Iterable, Optional
+
+from fastapi import HTTPException, status
+from llama_stack_client.types.agents.turn_create_params import Document
+
+import constants
+import metrics
+from configuration import configuration
+from log import get_logger
+from models.config import AttachmentsConfiguration
+from models.requests import Attachment
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+
+def attachment_size(attachment: Attachment) -> int:
+    """Return size of the attachment content in bytes (UTF-8)."""
+    content = attachment.content
+    # ASCII content does not need to be encoded to be measured
+    return len(content) if content.isascii() else len(content.encode("utf-8"))
+
+
+def attachment_digest(attachment: Attachment) -> str:
+    """Return SHA-256 digest of the attachment content."""
+    return hashlib.sha256(attachment.content.encode("utf-8")).hexdigest()
+
+
+def _too_large(response: str, cause: str) -> HTTPException:
+    """Build the exception reported for too large attachments."""
+    logger.warning("Attachments rejected: %s", cause)
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail={"response": response, "cause": cause},
+    )
+
+
+def check_attachments_size(attachments: Optional[list[Attachment]]) -> None:
+    """Check attachments against the configured byte limits.
+
+    The check stops at the first attachment exceeding a limit, so the rest
+    of an oversized request is not even measured.
+
+    Raises:
+        HTTPException: HTTP 413 when an attachment or all attachments
+        together are larger than allowed.
+    """
+    config = configuration.attachments_configuration
+    total = 0
+    for attachment in attachments or []:
+        size = attachment_size(attachment)
+        if size > config.max_attachment_size:
+            raise _too_large(
+                "Attachment is too large",
+                f"Attachment of type {attachment.attachment_type} has {size} "
+                f"bytes, at most {config.max_attachment_size} bytes are allowed.",
+            )
+        total += size
+        if total > config.max_request_size:
+            raise _too_large(
+                "Attachments are too large",
+                "Attachments have more than "
+                f"{config.max_request_size} bytes in total.",
+            )
+
+
+def _reference(attachment: Attachment, digest: str) -> str:
+    """Return text referencing an attachment sent earlier in the conversation."""
+    return (
+        f"\n\n[Attachment: {attachment.attachment_type}, unchanged since it was "
+        f"sent earlier in this conversation (sha256 {digest[:12]})]"
+    )
+
+
+def _is_known(attachment: Attachment, known: Collection[str]) -> Optional[str]:
+    """Return digest of the attachment if it is one of the known ones."""
+    if not known:
+        return None
+    digest = attachment_digest(attachment)
+    return digest if digest in known else None
+
+
+def render_query(
+    query: str, attachments: Optional[list[Attachment]], known: Collection[str] = ()
+) -> str:
+    """Append attachments to the query text.
+
+    Args:
+        query: The query text.
+        attachments: Attachments of the query.
+        known: Digests of attachments sent earlier in the conversation,
+            these are referenced instead of being appended.
+
+    Returns:
+        The query followed by its attachments.
+    """
+    if not attachments:
+        return query
+    parts = [query]
+    for attachment in attachments:
+        digest = _is_known(attachment, known)
+        if digest is not None:
+            parts.append(_reference(attachment, digest))
+        else:
+            parts.append(f"\n\n[Attachment: {attachment.attachment_type}]\n")
+            parts.append(attachment.content)
+    return "".join(parts)
+
+
+def turn_input(
+    query: str, attachments: Optional[list[Attachment]], known: Collection[str] = ()
+) -> tuple[str, list[Document]]:
+    """Split attachments into documents of the turn and references.
+
+    Args:
+        query: The query text.
+        attachments: Attachments of the query.
+        known: Digests of attachments sent earlier in the conversation,
+            these are referenced in the message instead of being sent as
+            documents.
+
+    Returns:
+        Tuple of the user message and the documents of the turn.
+    """
+    parts = [query]
+    documents: list[Document] = []
+    for attachment in attachments or []:
+        digest = _is_known(attachment, known)
+        if digest is not None:
+            parts.append(_reference(attachment, digest))
+            continue
+        mime_type = attachment.content_type
+        if mime_type.lower() in constants.ATTACHMENT_PLAIN_TEXT_CONTENT_TYPES:
+            mime_type = "text/plain"
+        documents.append({"content": attachment.content, "mime_type": mime_type})
+    return "".join(parts), documents
+
+
+class AttachmentIndex(metaclass=Singleton):
+    """Digests of attachments sent in recent conversations.
+
+    Until configured, no attachments are remembered.
+    """
+
+    def __init__(self) -> None:
+        """Initialize disabled index."""
+        self.config = AttachmentsConfiguration(deduplicate=False)
+        self._conversations: OrderedDict[str, frozenset[str]] = OrderedDict()
+
+    def configure(self, config: AttachmentsConfiguration) -> None:
+        """Apply attachments configuration."""
+        self.config = config
+        self._conversations = OrderedDict()
+
+    def known(self, conversation_id: Optional[str]) -> frozenset[str]:
+        """Return digests of attachments sent in the conversation."""
+        if not self.config.deduplicate or not conversation_id:
+            return frozenset()
+        digests = self._conversations.get(conversation_id)
+        if digests is None:
+            return frozenset()
+        self._conversations.move_to_end(conversation_id)
+        return digests
+
+    def remember(
+        self,
+        conversation_id: str,
+        attachments: Optional[Iterable[Attachment]],
+        previous: Optional[str] = None,
+    ) -> None:
+        """Record attachments sent to the model.
+
+        Args:
+            conversation_id: Conversation the attachments were sent in.
+            attachments: Attachments of the query.
+            previous: Conversation continued by this one (for the Responses
+                API, the previous response), its attachments are inherited.
+        """
+        known = self.known(previous)
+        digests = set(known)
+        for attachment in attachments or []:
+            size = attachment_size(attachment)
+            if not known:
+                metrics.attachment_bytes_total.labels("sent").inc(size)
+                if self.config.deduplicate:
+                    digests.add(attachment_digest(attachment))
+                continue
+            digest = attachment_digest(attachment)
+            disposition = "referenced" if digest in known else "sent"
+            metrics.attachment_bytes_total.labels(disposition).inc(size)
+            digests.add(digest)
+
+        if not self.config.deduplicate or not conversation_id or not digests:
+            return
+        self._conversations[conversation_id] = frozenset(digests)
+        self._conversations.move_to_end(conversation_id)
+        while len(self._conversations) > self.config.max_conversations:
+            self._conversations.popitem(last=False)
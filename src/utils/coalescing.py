@@ -0,0 +1,159 @@
+"""Coalescing of streamed answer tokens.
+
+Every delta of the answer text is sent as one event, so long answers cause
+one write (and one TCP push through every proxy) per token. Clients that
+opt in get adjacent deltas merged into one event, which is flushed when
+the oldest buffered delta is older than the time window, when the buffered
+text reaches the size threshold, or when any other event is sent. Merged
+events keep the ID of their first delta; apart from the merged text the
+events are unchanged.
+"""
+
+import asyncio
+from typing import AsyncIterator, Generic, Optional, TypeVar
+
+from models.config import StreamingConfiguration
+from utils.sse import TokenDelta, merge_token_deltas
+from utils.types import Singleton
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class TimedStream(Generic[T]):
+    """Async iterator that can be read with a timeout.
+
+    The next item is awaited in a task which survives timeouts, so no item
+    is lost when reading times out.
+    """
+
+    def __init__(self, stream: AsyncIterator[T]) -> None:
+        """Wrap the stream."""
+        self._iterator = stream.__aiter__()
+        self._next: Optional[asyncio.Task[object]] = None
+
+    async def _read(self) -> object:
+        """Read next item of the stream, `_END` at its end."""
+        try:
+            return await anext(self._iterator)
+        except StopAsyncIteration:
+            return _END
+
+    async def next(self, timeout: Optional[float] = None) -> T:
+        """Return next item of the stream.
+
+        Raises:
+            asyncio.TimeoutError: No item arrived within the timeout.
+            StopAsyncIteration: The stream is exhausted.
+        """
+        if self._next is None:
+            self._next = asyncio.create_task(self._read())
+        done, _ = await asyncio.wait({self._next}, timeout=timeout)
+        if not done:
+            raise asyncio.TimeoutError
+        task, self._next = self._next, None
+        item = task.result()
+        if item is _END:
+            raise StopAsyncIteration
+        return item  # type: ignore[return-value]
+
+    async def aclose(self) -> None:
+        """Stop reading the stream and close it."""
+        if self._next is not None:
+            self._next.cancel()
+            await asyncio.gather(self._next, return_exceptions=True)
+            self._next = None
+        close = getattr(self._iterator, "aclose", None)
+        if close is not None:
+            await close()
+
+
+async def coalesce_tokens(
+    events: AsyncIterator[str], window: float, max_size: int
+) -> AsyncIterator[str]:
+    """Merge adjacent deltas of the answer text into fewer events.
+
+    Args:
+        events: Formatted events of the streamed response.
+        window: Maximum time a delta is held back, in seconds.
+        max_size: Number of buffered characters flushed right away.
+
+    Yields:
+        The events, with adjacent deltas merged.
+    """
+    loop = asyncio.get_running_loop()
+    stream: TimedStream[str] = TimedStream(events)
+    buffer: list[TokenDelta] = []
+    size = 0
+    flush_at = 0.0
+    try:
+        while True:
+            timeout = max(flush_at - loop.time(), 0.0) if buffer else None
+            try:
+                event = await stream.next(timeout)
+            except asyncio.TimeoutError:
+                event = None
+            except StopAsyncIteration:
+                break
+
+            if isinstance(event, TokenDelta) and (
+                not buffer or event.event_type == buffer[0].event_type
+            ):
+                if not buffer:
+                    flush_at = loop.time() + window
+                buffer.append(event)
+                size += len(event.token)
+                if size < max_size:
+                    continue
+                event = None
+
+            # time is up, buffer is full or another event has to be sent
+            if buffer:
+                yield merge_token_deltas(buffer)
+                buffer, size = [], 0
+            if isinstance(event, TokenDelta):
+                flush_at = loop.time() + window
+                buffer.append(event)
+                size = len(event.token)
+            elif event is not None:
+                yield event
+        if buffer:
+            yield merge_token_deltas(buffer)
+    finally:
+        await stream.aclose()
+
+
+class TokenCoalescing(metaclass=Singleton):
+    """Token coalescing of streamed responses chosen per request.
+
+    Until configured, only requests asking for coalescing are coalesced,
+    with the default window and size.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with the default configuration."""
+        self.config = StreamingConfiguration()
+
+    def configure(self, config: StreamingConfiguration) -> None:
+        """Apply streaming configuration."""
+        self.config = config
+
+    def apply(
+        self, events: AsyncIterator[str], requested: Optional[bool]
+    ) -> AsyncIterator[str]:
+        """Coalesce tokens of the stream if requested or enabled by default.
+
+        Args:
+            events: Formatted events of the streamed response.
+            requested: Choice of the client, None to use the default.
+
+        Returns:
+            The events, coalesced if chosen.
+        """
+        enabled = self.config.coalesce_tokens if requested is None else requested
+        if not enabled:
+            return events
+        return coalesce_tokens(
+            events, self.config.coalescing_window, self.config.coalescing_max_size
+        )
@@ -0,0 +1,58 @@
+"""Helpers to run independent request processing steps concurrently."""
+
+import asyncio
+from typing import Any, Awaitable, Mapping
+
+from utils.stage_timer import stage_timer
+
+
+async def _timed_step(stage: str, step: str, awaitable: Awaitable[Any]) -> Any:
+    """Await one step measured by the stage timer."""
+    with stage_timer(stage, step):
+        return await awaitable
+
+
+async def run_concurrently(
+    stage: str, steps: Mapping[str, Awaitable[Any]]
+) -> dict[str, Any]:
+    """Run independent steps of one stage concurrently.
+
+    The stage fails fast: as soon as any step raises an exception, all other
+    steps that are still running are cancelled and the exception is
+    propagated to the caller. Duration of each step is measured by the stage
+    timer of current request, see `utils.stage_timer`.
+
+    Blocking (synchronous) calls, like database queries, should be passed
+    wrapped by `asyncio.to_thread` so they do not block the event loop.
+
+    Args:
+        stage: Name of the stage, used as metric label.
+        steps: Mapping of step names to awaitables to run.
+
+    Returns:
+        Mapping of step names to results of the corresponding awaitables.
+    """
+    tasks = {
+        name: asyncio.ensure_future(_timed_step(stage, name, awaitable))
+        for name, awaitable in steps.items()
+    }
+    if not tasks:
+        return {}
+    try:
+        await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+        # retrieve all exceptions, but report the first failed step in order
+        errors = [
+            task.exception()
+            for task in tasks.values()
+            if task.done() and not task.cancelled()
+        ]
+        for error in errors:
+            if error is not None:
+                raise error
+    finally:
+        # cancel whatever is still running, either because one step failed
+        # or because the caller itself was cancelled
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+    return {name: task.result() for name, task in tasks.items()}
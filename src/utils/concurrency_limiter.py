@@ -0,0 +1,358 @@
+"""Adaptive concurrency limiter and circuit breaker of calls to Llama Stack.
+
+When the inference backend degrades, piling more requests onto it makes
+latency worse for everyone. Inference calls to Llama Stack are therefore
+admitted by an adaptive concurrency limit (additive increase while calls
+succeed in time, multiplicative decrease when they are slow or fail), calls
+over the limit wait in a bounded queue, and after repeated connection
+failures a circuit breaker rejects calls immediately until a probe call
+succeeds. Rejected calls fail with HTTP 503.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from llama_stack_client import APIConnectionError  # type: ignore
+
+import constants
+import metrics
+from log import get_logger
+from models.config import ConcurrencyLimiterConfiguration
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit of concurrent calls with a bounded wait queue.
+
+    The limit grows by one per `limit` calls finished faster than the
+    latency threshold and shrinks by `CONCURRENCY_LIMIT_BACKOFF_RATIO` for
+    every call that is slower or fails to connect.
+    """
+
+    def __init__(self, config: ConcurrencyLimiterConfiguration) -> None:
+        """Initialize the limiter without any calls in flight."""
+        self.config = config
+        self.limit = float(config.initial_limit)
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._update_metrics()
+
+    @property
+    def queue_depth(self) -> int:
+        """Return number of calls waiting for a free slot."""
+        return len(self._waiters)
+
+    def _has_free_slot(self) -> bool:
+        """Check if one more call fits into the current limit."""
+        return self.in_flight < max(int(self.limit), 1)
+
+    def _update_metrics(self) -> None:
+        """Export the limit, calls in flight and queue depth."""
+        metrics.llama_stack_concurrency_limit.set(int(self.limit))
+        metrics.llama_stack_calls_in_flight.set(self.in_flight)
+        metrics.llama_stack_queue_depth.set(len(self._waiters))
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting for it in the queue if needed.
+
+        Returns:
+            True when the slot was taken, False when the queue is full or
+            no slot became free within the queue timeout.
+        """
+        if self._has_free_slot() and not self._waiters:
+            self.in_flight += 1
+            self._update_metrics()
+            return True
+        if len(self._waiters) >= self.config.queue_size:
+            return False
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_metrics()
+        try:
+            await asyncio.wait_for(waiter, timeout=self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # the slot might have been handed over just before cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._update_metrics()
+        # the slot might have been handed over just before the timeout
+        return waiter.done() and not waiter.cancelled()
+
+    def release(self) -> None:
+        """Return a slot and hand free slots over to waiting calls."""
+        self.in_flight -= 1
+        while self._waiters and self._has_free_slot():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._update_metrics()
+
+    def on_success(self, latency: float) -> None:
+        """Adjust the limit after a call that reached Llama Stack."""
+        if latency > self.config.latency_threshold:
+            self.on_overload()
+            return
+        self.limit = min(self.limit + 1 / self.limit, self.config.max_limit)
+        self._update_metrics()
+
+    def on_overload(self) -> None:
+        """Decrease the limit after a slow or failed call."""
+        self.limit = max(
+            self.limit * constants.CONCURRENCY_LIMIT_BACKOFF_RATIO,
+            self.config.min_limit,
+        )
+        self._update_metrics()
+
+
+class CircuitBreaker:
+    """Circuit breaker opened by consecutive connection failures.
+
+    The open breaker rejects all calls. Once the reset timeout elapses it
+    becomes half-open and lets one probe call in: its success closes the
+    breaker, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        """Initialize closed circuit breaker."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        """Change the state and export it."""
+        if state != self.state:
+            logger.warning("Llama Stack circuit breaker is %s", state)
+        self.state = state
+        metrics.llama_stack_circuit_breaker_state.set(self._STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        """Check if a call can be made, let a probe in when half-open."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._set_state(self.HALF_OPEN)
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a call that reached Llama Stack."""
+        self.failures = 0
+        self._probing = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Count a connection failure, open the breaker if needed."""
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def record_abandoned(self) -> None:
+        """Let another probe in when the probe call ended without a result."""
+        self._probing = False
+
+
+class _Permit:
+    """Slot of one admitted call, returned when the call finishes."""
+
+    def __init__(
+        self, limiter: AdaptiveConcurrencyLimiter, breaker: CircuitBreaker
+    ) -> None:
+        """Start measuring latency of the call."""
+        self._limiter = limiter
+        self._breaker = breaker
+        self._started = time.monotonic()
+        self.latency: Optional[float] = None
+        self.released = False
+
+    def observe_latency(self) -> None:
+        """Record latency of the call, only the first observation counts."""
+        if self.latency is None:
+            self.latency = time.monotonic() - self._started
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        """Return the slot once, learn from the outcome of the call."""
+        if self.released:
+            return
+        self.released = True
+        self.observe_latency()
+        self._limiter.release()
+        if error is None:
+            self._breaker.record_success()
+            self._limiter.on_success(self.latency or 0.0)
+        elif isinstance(error, APIConnectionError):
+            self._breaker.record_failure()
+            self._limiter.on_overload()
+        else:
+            # e.g. the client went away, the outcome is unknown
+            self._breaker.record_abandoned()
+
+
+class _GuardedStream:
+    """Stream holding a slot of the limiter until it is exhausted or closed."""
+
+    def __init__(self, stream: Any, permit: _Permit) -> None:
+        """Wrap the stream."""
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._permit = permit
+
+    def __aiter__(self) -> "_GuardedStream":
+        """Return the stream itself as iterator."""
+        return self
+
+    async def __anext__(self) -> Any:
+        """Return next item of the stream, release the slot at its end."""
+        try:
+            item = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._permit.release()
+            raise
+        except BaseException as e:
+            self._permit.release(e)
+            raise
+        # latency of streams is the time to the first item
+        self._permit.observe_latency()
+        return item
+
+    async def aclose(self) -> None:
+        """Close the stream and release the slot."""
+        self._permit.release(asyncio.CancelledError())
+        close = getattr(self._stream, "aclose", None) or getattr(
+            self._stream, "close", None
+        )
+        if close is not None:
+            await close()
+
+    def __del__(self) -> None:
+        """Release the slot of a stream that was never consumed."""
+        if not self._permit.released:
+            self._permit.release(asyncio.CancelledError())
+
+
+class LlamaStackLimiter(metaclass=Singleton):
+    """Admission control of inference calls to Llama Stack.
+
+    Until configured, all calls are admitted without any limit.
+    """
+
+    def __init__(self) -> None:
+        """Initialize disabled limiter."""
+        self.enabled = False
+        self.limiter = AdaptiveConcurrencyLimiter(ConcurrencyLimiterConfiguration())
+        self.breaker = CircuitBreaker(
+            constants.DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            constants.DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT,
+        )
+
+    def configure(self, config: ConcurrencyLimiterConfiguration) -> None:
+        """Apply concurrency limiter configuration."""
+        self.enabled = config.enabled
+        self.limiter = AdaptiveConcurrencyLimiter(config)
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_timeout)
+
+    def _reject(self, reason: str, response: str, cause: str) -> HTTPException:
+        """Build the exception reported for rejected call."""
+        metrics.llama_stack_rejected_total.labels(reason).inc()
+        logger.warning("Call to Llama Stack rejected: %s", cause)
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"response": response, "cause": cause},
+        )
+
+    async def acquire(self) -> Optional[_Permit]:
+        """Admit one call.
+
+        Returns:
+            Permit to be released when the call finishes, or None when the
+            limiter is disabled.
+
+        Raises:
+            HTTPException: HTTP 503 when the circuit breaker is open or no
+            slot is available in time.
+        """
+        if not self.enabled:
+            return None
+        if not self.breaker.allow():
+            raise self._reject(
+                "circuit_open",
+                "Llama Stack is unavailable",
+                "Calls are suspended after repeated connection failures",
+            )
+        if not await self.limiter.acquire():
+            self.breaker.record_abandoned()
+            raise self._reject(
+                "overloaded",
+                "Llama Stack is overloaded",
+                f"No free slot for the call within {self.limiter.config.queue_timeout}"
+                " seconds",
+            )
+        return _Permit(self.limiter, self.breaker)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Run the code within the context manager as one admitted call."""
+        permit = await self.acquire()
+        if permit is None:
+            yield
+            return
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            permit.release(error)
+
+    async def stream(self, open_stream: Callable[[], Awaitable[T]]) -> T:
+        """Open a stream as one admitted call.
+
+        The slot is held until the returned stream is exhausted or closed.
+
+        Args:
+            open_stream: Function opening the stream (async iterator).
+
+        Returns:
+            The stream, wrapped to release the slot at its end.
+        """
+        permit = await self.acquire()
+        if permit is None:
+            return await open_stream()
+        try:
+            stream = await open_stream()
+        except BaseException as e:
+            permit.release(e)
+            raise
+        return _GuardedStream(stream, permit)  # type: ignore[return-value]
@@ -0,0 +1,224 @@
+"""Deadlines of requests processed with help of Llama Stack.
+
+Every request gets an overall time budget when it is received. Its
+deadline is kept in a context variable, so it is visible to all code
+handling the request without passing it around. Calls to Llama Stack are
+grouped into stages (model listing, agent initialization, turn creation
+and topic summary); each stage is limited by its own budget and by the
+time remaining to the deadline of the request. A stage that does not
+finish in time is cancelled and the request fails with HTTP 504 naming
+the stage.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Iterator,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+
+from fastapi import HTTPException, status
+from llama_stack_client import NOT_GIVEN, APITimeoutError, NotGiven  # type: ignore
+
+import metrics
+from log import get_logger
+from models.config import DeadlinesConfiguration
+from utils.stream_cancellation import aclose_quietly
+from utils.stage_timer import (
+    STAGE_AGENT_INIT,
+    STAGE_MODEL_LISTING,
+    STAGE_TOPIC_SUMMARY,
+    STAGE_TURN_CREATION,
+    stage_timer,
+)
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# stages with time budgets
+STAGES = (
+    STAGE_MODEL_LISTING,
+    STAGE_AGENT_INIT,
+    STAGE_TURN_CREATION,
+    STAGE_TOPIC_SUMMARY,
+)
+
+
+class Deadline:
+    """Point in time by which a request has to be processed."""
+
+    def __init__(self, budget: float, stage_budgets: Mapping[str, float]) -> None:
+        """Start the deadline with overall budget and budgets of stages, in seconds."""
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        self.stage_budgets = dict(stage_budgets)
+
+    def remaining(self) -> float:
+        """Return time remaining to the deadline, in seconds."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def stage_timeout(self, stage: str) -> float:
+        """Return time the given stage may take, in seconds.
+
+        The timeout is the budget of the stage, shortened to the time
+        remaining to the deadline.
+        """
+        remaining = self.remaining()
+        return min(self.stage_budgets.get(stage, remaining), remaining)
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+@contextmanager
+def request_deadline(
+    config: DeadlinesConfiguration, path: str
+) -> Iterator[Optional[Deadline]]:
+    """Start deadline of the request to the given path.
+
+    The deadline is visible to all code (including tasks started) within
+    the context manager. Nothing is started when deadlines are disabled.
+
+    Args:
+        config: Deadlines configuration.
+        path: Path of the request, used to select its overall budget.
+
+    Yields:
+        The started deadline, or None if deadlines are disabled.
+    """
+    if not config.enabled:
+        yield None
+        return
+    deadline = Deadline(
+        config.endpoints.get(path, config.request),
+        {stage: getattr(config, stage) for stage in STAGES},
+    )
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return deadline of the request being processed, if any."""
+    return _current_deadline.get()
+
+
+def stage_timeout(stage: str) -> Optional[float]:
+    """Return time the given stage of current request may take, in seconds.
+
+    Returns:
+        The timeout, or None if the request has no deadline.
+    """
+    deadline = _current_deadline.get()
+    return None if deadline is None else deadline.stage_timeout(stage)
+
+
+def client_timeout(timeout: Optional[float]) -> float | NotGiven:
+    """Return the `timeout` argument propagating a timeout to a Llama Stack client call.
+
+    The client treats explicit `timeout=None` as no timeout at all, so the
+    client default is kept when there is no timeout to propagate.
+    """
+    return NOT_GIVEN if timeout is None else timeout
+
+
+def deadline_exceeded(stage: str, timeout: float) -> HTTPException:
+    """Build the exception reported when a stage exceeds its deadline."""
+    metrics.request_deadline_exceeded_total.labels(stage).inc()
+    logger.warning("Stage %s did not finish in %.1f seconds", stage, timeout)
+    return HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail={
+            "response": "Request deadline exceeded",
+            "cause": f"Stage {stage} did not finish in {timeout:.1f} seconds",
+        },
+    )
+
+
+@asynccontextmanager
+async def deadline_stage(stage: str) -> AsyncIterator[Optional[float]]:
+    """Limit the duration of one stage of current request.
+
+    The code within the context manager is cancelled when the stage
+    timeout expires; timeouts of Llama Stack client calls are treated the
+    same way. Without request deadline the code is not limited. Duration
+    of the stage is measured by the stage timer.
+
+    Args:
+        stage: Name of the stage, reported to the client on timeout.
+
+    Yields:
+        The stage timeout in seconds, to be propagated to the client calls,
+        or None if the request has no deadline.
+
+    Raises:
+        HTTPException: HTTP 504 when the stage does not finish in time.
+    """
+    timeout = stage_timeout(stage)
+    with stage_timer(stage):
+        if timeout is None:
+            yield None
+            return
+        try:
+            async with asyncio.timeout(timeout):
+                yield timeout
+        except (TimeoutError, APITimeoutError) as e:
+            raise deadline_exceeded(stage, timeout) from e
+
+
+async def run_stage(stage: str, awaitable: Awaitable[Any]) -> Any:
+    """Await the awaitable as one stage of current request.
+
+    See `deadline_stage` for details.
+    """
+    async with deadline_stage(stage):
+        return await awaitable
+
+
+def until_deadline(stream: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Limit reading of a streamed response by the deadline of current request.
+
+    Timeouts of the client calls limit only the start of the stream and
+    the wait for each of its chunks, so the whole stream is read within
+    the time remaining to the deadline. When the deadline expires, the
+    stream is closed and the reading fails with HTTP 504.
+
+    Args:
+        stream: The streamed response of Llama Stack.
+
+    Returns:
+        The stream limited by the deadline, or the stream itself if the
+        request has no deadline.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return stream
+    return _read_until(stream, deadline)
+
+
+async def _read_until(stream: AsyncIterator[T], deadline: Deadline) -> AsyncIterator[T]:
+    """Yield items of the stream until the deadline expires."""
+    try:
+        while True:
+            try:
+                async with asyncio.timeout(deadline.remaining()):
+                    item = await anext(stream)
+            except StopAsyncIteration:
+                return
+            except (TimeoutError, APITimeoutError) as e:
+                raise deadline_exceeded(STAGE_TURN_CREATION, deadline.budget) from e
+            yield item
+    finally:
+        await aclose_quietly(stream)
@@ -1,10 +1,15 @@
 """Utility functions for endpoint handlers."""
 
 from contextlib import suppress
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, cast
 from fastapi import HTTPException, status
+from llama_stack_client import NotFoundError
 from llama_stack_client._client import AsyncLlamaStackClient
 from llama_stack_client.lib.agents.agent import AsyncAgent
+from llama_stack_client.types.agents.agent_turn_response_stream_chunk import (
+    AgentTurnResponseStreamChunk,
+)
+from llama_stack_client.types.agents.turn import Turn
 from pydantic import AnyUrl, ValidationError
 
 import constants
@@ -15,6 +20,8 @@ from models.database.conversations import UserConversation
 from models.config import Action
 from app.database import get_session
 from configuration import AppConfig
+from utils.agent_pool import AgentPool, agent_key
+from utils.stream_cancellation import aclose_quietly
 from utils.suid import get_suid
 from utils.types import TurnSummary
 from utils.types import GraniteToolParser
@@ -252,7 +259,7 @@ def store_conversation_into_cache(
 
 
 # # pylint: disable=R0913,R0917
-async def get_agent(
+async def get_agent(  # pylint: disable=too-many-locals
     client: AsyncLlamaStackClient,
     model_id: str,
     system_prompt: str,
@@ -266,7 +273,11 @@ async def get_agent(
 
     Return the agent, conversation and session IDs.
 
-    If a conversation_id is provided, the function attempts to retrieve the
+    Agents are kept in the agent pool, so when the same conversation is
+    continued with the same agent configuration the pooled agent and its
+    session are returned without contacting Llama Stack at all.
+
+    Otherwise, if a conversation_id is provided, the function attempts to retrieve the
     existing agent and, on success, rebinds a newly created agent instance to
     that conversation (deleting the temporary/orphan agent) and returns the
     first existing session_id for the conversation. If no conversation_id is
@@ -301,6 +312,24 @@ async def get_agent(
           existing conversation_id.
         - Initializes the agent and may create a new session.
     """
+    pool = AgentPool()
+    if conversation_id:
+        pooled = pool.get(
+            client,
+            agent_key(
+                conversation_id,
+                model_id,
+                system_prompt,
+                available_input_shields,
+                available_output_shields,
+                no_tools,
+            ),
+        )
+        if pooled is not None:
+            agent, session_id = pooled
+            logger.debug("Reusing pooled agent for conversation %s", conversation_id)
+            return agent, conversation_id, session_id
+
     existing_agent_id = None
     if conversation_id:
         with suppress(ValueError):
@@ -344,9 +373,125 @@ async def get_agent(
         session_id = await agent.create_session(get_suid())
         logger.debug("New session ID: %s", session_id)
 
+    pool.put(
+        client,
+        agent_key(
+            conversation_id,
+            model_id,
+            system_prompt,
+            available_input_shields,
+            available_output_shields,
+            no_tools,
+        ),
+        agent,
+        session_id,
+    )
     return agent, conversation_id, session_id
 
 
+async def create_agent_turn(
+    agent: AsyncAgent,
+    session_id: str,
+    rebuild_agent: Optional[Callable[[], Awaitable[tuple[AsyncAgent, str, str]]]],
+    **turn_args: Any,
+) -> AsyncIterator[AgentTurnResponseStreamChunk] | Turn:
+    """
+    Create a turn, rebuilding the agent once when its session is gone.
+
+    Pooled agents are used without checking that their conversation and
+    session still exist in Llama Stack, so a conversation deleted through
+    another worker is only noticed when the turn fails with "not found". The
+    pooled agent is then dropped and the turn is created once more by an
+    agent rebuilt from Llama Stack, which reports deleted conversations as
+    usual.
+
+    Parameters:
+        agent (AsyncAgent): Agent returned by `get_agent`.
+        session_id (str): Session of the conversation.
+        rebuild_agent: Function calling `get_agent` again for the same
+        conversation; None for a new conversation, whose agent was just
+        created.
+        turn_args: Arguments of `AsyncAgent.create_turn`.
+
+    Returns:
+        The turn, or the stream of its chunks when `stream` is set.
+    """
+    if rebuild_agent is None:
+        return await agent.create_turn(session_id=session_id, **turn_args)
+    if turn_args.get("stream"):
+        # the turn is created by the first read of the stream
+        return _stream_rebuilding_agent(agent, session_id, rebuild_agent, turn_args)
+    try:
+        return await agent.create_turn(session_id=session_id, **turn_args)
+    except NotFoundError:
+        agent, session_id = await _rebuild_agent(agent, rebuild_agent)
+        return await agent.create_turn(session_id=session_id, **turn_args)
+
+
+async def _stream_rebuilding_agent(
+    agent: AsyncAgent,
+    session_id: str,
+    rebuild_agent: Callable[[], Awaitable[tuple[AsyncAgent, str, str]]],
+    turn_args: dict[str, Any],
+) -> AsyncIterator[AgentTurnResponseStreamChunk]:
+    """Stream the turn, rebuild the agent if the turn was not found."""
+    stream = cast(
+        AsyncIterator[AgentTurnResponseStreamChunk],
+        await agent.create_turn(session_id=session_id, **turn_args),
+    )
+    try:
+        try:
+            first = await anext(stream, None)
+        except NotFoundError:
+            await aclose_quietly(stream)
+            agent, session_id = await _rebuild_agent(agent, rebuild_agent)
+            stream = cast(
+                AsyncIterator[AgentTurnResponseStreamChunk],
+                await agent.create_turn(session_id=session_id, **turn_args),
+            )
+            first = await anext(stream, None)
+        if first is None:
+            return
+        yield first
+        async for chunk in stream:
+            yield chunk
+    finally:
+        await aclose_quietly(stream)
+
+
+async def _rebuild_agent(
+    agent: AsyncAgent,
+    rebuild_agent: Callable[[], Awaitable[tuple[AsyncAgent, str, str]]],
+) -> tuple[AsyncAgent, str]:
+    """Drop the pooled agent and return a rebuilt one with its session ID.
+
+    Raises:
+        HTTPException: 404 when the conversation no longer exists; the turn
+        is not continued in a new conversation unknown to the caller.
+    """
+    conversation_id = agent.agent_id
+    logger.info(
+        "Session of conversation %s not found, rebuilding agent", conversation_id
+    )
+    AgentPool().invalidate(conversation_id)
+    rebuilt, rebuilt_conversation_id, session_id = await rebuild_agent()
+    if rebuilt_conversation_id != conversation_id:
+        logger.error("Conversation %s was deleted", conversation_id)
+        # the agent of the new conversation is not needed
+        AgentPool().invalidate(rebuilt_conversation_id)
+        client = cast(AsyncLlamaStackClient, rebuilt.client)
+        await client.agents.delete(agent_id=rebuilt_conversation_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "response": "Conversation not found",
+                "cause": f"Conversation {conversation_id} could not be retrieved.",
+            },
+        )
+    rebuilt.extra_headers = agent.extra_headers
+    return rebuilt, session_id
+
+
 async def get_temp_agent(
     client: AsyncLlamaStackClient,
     model_id: str,
@@ -0,0 +1,237 @@
+"""Fair scheduling of LLM turns across users.
+
+Token quotas limit how much a user can consume in total, but not how fast:
+a single user running scripts can still occupy the LLM backend and slow
+everyone else down. Before a turn is created, it has to be admitted by the
+fair scheduler. The scheduler caps the number of turns in flight per user
+and in total, and serves queued turns of different users round-robin, with
+users of higher-weighted roles getting more turns served per round.
+Turns waiting in the queue for too long are rejected with HTTP 429.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+import metrics
+from log import get_logger
+from models.config import FairSchedulingConfiguration
+from utils.stream_cancellation import aclose_quietly
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class _UserQueue:  # pylint: disable=too-few-public-methods
+    """Turns of one user, queued and in flight."""
+
+    def __init__(self, weight: int) -> None:
+        """Initialize empty queue of a user with the given weight."""
+        self.weight = weight
+        # turns that can still be served in the current round
+        self.credit = weight
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future[None]] = deque()
+
+
+class TurnPermit:
+    """Permit of one admitted turn, released when the turn finishes."""
+
+    def __init__(self, scheduler: "FairScheduler", user_id: str) -> None:
+        """Initialize permit of the given user."""
+        self._scheduler = scheduler
+        self._user_id = user_id
+        # permits issued before the scheduler was reconfigured are ignored
+        self._config = scheduler.config
+        self.released = False
+
+    def release(self) -> None:
+        """Release the permit, letting the next queued turn in; idempotent."""
+        if self.released:
+            return
+        self.released = True
+        if self._scheduler.config is self._config:
+            self._scheduler.release(self._user_id)
+
+    async def hold(self, stream: AsyncIterator[T]) -> AsyncIterator[T]:
+        """Yield items of the stream, release the permit when it ends.
+
+        The stream is closed when the client goes away before its end.
+        """
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            self.release()
+            await aclose_quietly(stream)
+
+    def __del__(self) -> None:
+        """Release the permit of an abandoned turn, e.g. of an unread stream."""
+        self.release()
+
+
+class FairScheduler(metaclass=Singleton):
+    """Weighted round-robin scheduler of LLM turns across users.
+
+    Until configured, all turns are admitted immediately.
+    """
+
+    def __init__(self) -> None:
+        """Initialize disabled scheduler."""
+        self.config = FairSchedulingConfiguration(enabled=False)
+        self.in_flight = 0
+        self._users: dict[str, _UserQueue] = {}
+        # users with queued turns, in the order they are served
+        self._ring: deque[str] = deque()
+
+    def configure(self, config: FairSchedulingConfiguration) -> None:
+        """Apply fair scheduling configuration."""
+        self.config = config
+        self.in_flight = 0
+        self._users = {}
+        self._ring = deque()
+
+    def _reject(self, cause: str) -> HTTPException:
+        """Build the exception reported for rejected turn."""
+        logger.warning("Turn rejected by fair scheduler: %s", cause)
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"response": "Too many concurrent requests", "cause": cause},
+        )
+
+    async def acquire(self, user_id: str, roles: Iterable[str]) -> TurnPermit:
+        """Admit one turn of the user, waiting in the queue if needed.
+
+        Args:
+            user_id: Identifier of the user creating the turn.
+            roles: Roles of the user, used to select the scheduling weight.
+
+        Returns:
+            Permit to be released when the turn finishes.
+
+        Raises:
+            HTTPException: HTTP 429 when the queue of the user is full or the
+            turn waited in the queue for too long.
+        """
+        if not self.config.enabled:
+            return TurnPermit(self, user_id)
+
+        weight = self.config.weight(roles)
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserQueue(weight)
+        user.weight = weight
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        user.waiters.append(waiter)
+        if user_id not in self._ring:
+            self._ring.append(user_id)
+        self._dispatch()
+        if not waiter.done() and len(user.waiters) > self.config.max_queued_per_user:
+            self._remove_waiter(user_id, waiter)
+            raise self._reject(
+                f"User has {self.config.max_queued_per_user} requests waiting already"
+            )
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter), timeout=self.config.queue_timeout
+            )
+        except BaseException as e:
+            # the turn might have been admitted just before giving up
+            if waiter.done() and not waiter.cancelled():
+                self.release(user_id)
+            else:
+                waiter.cancel()
+                self._remove_waiter(user_id, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(
+                    "Request waited in the queue for more than "
+                    f"{self.config.queue_timeout} seconds"
+                ) from e
+            raise
+        finally:
+            metrics.turn_queue_wait_seconds.observe(time.monotonic() - started)
+        return TurnPermit(self, user_id)
+
+    def release(self, user_id: str) -> None:
+        """Finish one turn of the user and admit queued turns."""
+        if not self.config.enabled:
+            return
+        self.in_flight -= 1
+        user = self._users.get(user_id)
+        if user is not None:
+            user.in_flight -= 1
+            self._forget_idle(user_id)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def turn(self, user_id: str, roles: Iterable[str]) -> AsyncIterator[None]:
+        """Run the code within the context manager as one admitted turn."""
+        permit = await self.acquire(user_id, roles)
+        try:
+            yield
+        finally:
+            permit.release()
+
+    def _dispatch(self) -> None:
+        """Admit queued turns while there are free slots.
+
+        The user at the head of the ring is served until its credit for the
+        current round is used up, then it is moved to the tail. Users that
+        reached their own limit are skipped.
+        """
+        while self.in_flight < self.config.max_in_flight:
+            user_id = self._next_user()
+            if user_id is None:
+                return
+            user = self._users[user_id]
+            waiter = user.waiters.popleft()
+            self.in_flight += 1
+            user.in_flight += 1
+            waiter.set_result(None)
+            user.credit -= 1
+            if not user.waiters:
+                self._ring.popleft()
+                user.credit = user.weight
+            elif user.credit <= 0:
+                user.credit = user.weight
+                self._ring.rotate(-1)
+
+    def _next_user(self) -> Optional[str]:
+        """Move the first user able to run one more turn to the head of the ring."""
+        for _ in range(len(self._ring)):
+            user = self._users[self._ring[0]]
+            if user.in_flight < self.config.max_in_flight_per_user:
+                return self._ring[0]
+            self._ring.rotate(-1)
+        return None
+
+    def _remove_waiter(self, user_id: str, waiter: asyncio.Future[None]) -> None:
+        """Remove a turn that gave up waiting from the queue."""
+        user = self._users.get(user_id)
+        if user is None:
+            return
+        if waiter in user.waiters:
+            user.waiters.remove(waiter)
+        if not user.waiters and user_id in self._ring:
+            self._ring.remove(user_id)
+            user.credit = user.weight
+        self._forget_idle(user_id)
+
+    def _forget_idle(self, user_id: str) -> None:
+        """Drop the state of a user without any queued turns or turns in flight."""
+        user = self._users.get(user_id)
+        if user is not None and not user.waiters and not user.in_flight:
+            del self._users[user_id]
+
+
+def user_roles(state: object) -> set[str]:
+    """Return roles of the user resolved by authorization, if any."""
+    return getattr(state, "user_roles", set())
@@ -0,0 +1,96 @@
+"""Token budget of conversation history.
+
+Conversation history is split into turns, each starting with a user
+message. When the history does not fit into the token budget of the model
+together with the instructions and the new query, the oldest turns are
+dropped. Tokens are counted by a pluggable counter: the llama3 tokenizer
+(also used for token metrics) or a cheap estimate based on text length.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+from llama_stack.models.llama.llama3.tokenizer import Tokenizer
+
+import constants
+
+TokenCountFunction = Callable[[str], int]
+
+
+def llama3_token_count(text: str) -> int:
+    """Count tokens of the text with the llama3 tokenizer."""
+    return len(Tokenizer.get_instance().encode(text, bos=False, eos=False))
+
+
+def approximate_token_count(text: str) -> int:
+    """Estimate number of tokens of the text from its length."""
+    return -(-len(text) // constants.APPROXIMATE_CHARS_PER_TOKEN)
+
+
+TOKEN_COUNTERS: dict[str, TokenCountFunction] = {
+    constants.HISTORY_TOKEN_COUNTER_LLAMA3: llama3_token_count,
+    constants.HISTORY_TOKEN_COUNTER_APPROXIMATE: approximate_token_count,
+}
+
+
+@dataclass
+class HistoryMessage:
+    """One message of conversation history.
+
+    Attributes:
+        role: role of the author of the message, user or assistant
+        content: text of the message
+    """
+
+    role: str
+    content: str
+
+
+@dataclass
+class HistoryTurn:
+    """Messages of one conversation turn, starting with the user message."""
+
+    messages: list[HistoryMessage] = field(default_factory=list)
+
+    def token_count(self, count: TokenCountFunction) -> int:
+        """Count tokens of all messages of the turn."""
+        return sum(count(message.content) for message in self.messages)
+
+
+def group_turns(messages: list[HistoryMessage]) -> list[HistoryTurn]:
+    """Split conversation history into turns, each started by a user message."""
+    turns: list[HistoryTurn] = []
+    for message in messages:
+        if message.role == "user" or not turns:
+            turns.append(HistoryTurn())
+        turns[-1].messages.append(message)
+    return turns
+
+
+def fit_history(
+    turns: list[HistoryTurn],
+    budget: int,
+    reserved: int,
+    count: TokenCountFunction,
+) -> tuple[list[HistoryTurn], bool]:
+    """Keep the most recent turns fitting into the token budget.
+
+    Args:
+        turns: Conversation history, oldest turn first.
+        budget: Token budget of the whole model input.
+        reserved: Tokens reserved for the instructions and the new query.
+        count: Function counting tokens of a text.
+
+    Returns:
+        Tuple of the kept turns and a flag telling if any turn was dropped.
+    """
+    available = budget - reserved
+    kept: list[HistoryTurn] = []
+    for turn in reversed(turns):
+        tokens = turn.token_count(count)
+        if tokens > available:
+            break
+        available -= tokens
+        kept.append(turn)
+    kept.reverse()
+    return kept, len(kept) < len(turns)
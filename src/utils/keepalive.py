@@ -0,0 +1,110 @@
+"""Keepalive of streamed responses.
+
+While a tool runs, the Llama Stack stream can stay silent for a long time
+and proxies or load balancers drop connections idle for longer than their
+timeout. The events of the response are read by a background task and
+handed over through a queue; whenever no event was sent for the keepalive
+interval, an SSE comment is sent instead. SSE clients ignore comments.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+from models.config import StreamingConfiguration
+from utils.stream_cancellation import aclose_quietly
+from utils.types import Singleton
+
+KEEPALIVE_COMMENT = ": keepalive\n\n"
+
+_END = object()
+
+
+async def keepalive(
+    events: AsyncIterator[str], interval: float, comment: str = KEEPALIVE_COMMENT
+) -> AsyncIterator[str]:
+    """Send the comment whenever the events are silent for the interval.
+
+    Args:
+        events: Formatted events of the streamed response.
+        interval: Time of silence after which the comment is sent, in seconds.
+        comment: The keepalive comment.
+
+    Yields:
+        The events, interleaved with keepalive comments.
+    """
+    loop = asyncio.get_running_loop()
+    # one pending event keeps the upstream from running ahead of the client
+    queue: asyncio.Queue[object] = asyncio.Queue(maxsize=1)
+    # time the last item was sent or queued
+    last = loop.time()
+    timer: asyncio.TimerHandle | None = None
+
+    async def pump() -> None:
+        """Queue the events, then their error or end."""
+        try:
+            async for event in events:
+                await queue.put(event)
+        except asyncio.CancelledError:
+            await aclose_quietly(events)
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            await queue.put(e)
+            return
+        await queue.put(_END)
+
+    def beat() -> None:
+        """Queue the comment when nothing was sent for the interval."""
+        nonlocal last, timer
+        now = loop.time()
+        if now - last >= interval:
+            # an event waiting in the queue is as good as the comment
+            if queue.empty():
+                queue.put_nowait(comment)
+            last = now
+        timer = loop.call_at(last + interval, beat)
+
+    task = asyncio.create_task(pump())
+    timer = loop.call_at(last + interval, beat)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            last = loop.time()
+            yield item  # type: ignore[misc]
+    finally:
+        if timer is not None:
+            timer.cancel()
+        # cancels the response when the client went away
+        task.cancel()
+
+
+class StreamKeepalive(metaclass=Singleton):
+    """Keepalive of streamed responses.
+
+    Until configured, keepalive comments are sent with the default interval.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with the default configuration."""
+        self.config = StreamingConfiguration()
+
+    def configure(self, config: StreamingConfiguration) -> None:
+        """Apply streaming configuration."""
+        self.config = config
+
+    def apply(self, events: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Send keepalive comments during silence of the stream if enabled.
+
+        Args:
+            events: SSE formatted events of the streamed response; plain
+                text responses can not carry comments.
+
+        Returns:
+            The events, with keepalive comments if enabled.
+        """
+        if not self.config.keepalive:
+            return events
+        return keepalive(events, self.config.keepalive_interval)
@@ -0,0 +1,84 @@
+"""Pre-flight check of prompt size.
+
+Oversized prompts (huge attachments, long system prompts) would otherwise
+be sent to Llama Stack only to be refused by the provider. The size of
+the system prompt, query and attachments is estimated before any agent is
+created and prompts that do not fit into the context of the model are
+rejected right away with HTTP 413.
+"""
+
+from fastapi import HTTPException, status
+
+import metrics
+from configuration import configuration
+from log import get_logger
+from models.requests import QueryRequest
+from utils.attachments import check_attachments_size
+from utils.endpoints import get_system_prompt
+from utils.history import TOKEN_COUNTERS, TokenCountFunction
+
+logger = get_logger(__name__)
+
+
+def estimate_prompt_tokens(
+    system_prompt: str, query_request: QueryRequest, count: TokenCountFunction
+) -> int:
+    """Estimate tokens of the system prompt, query and attachments."""
+    tokens = count(system_prompt) + count(query_request.query)
+    for attachment in query_request.attachments or []:
+        tokens += count(attachment.content)
+    return tokens
+
+
+def check_prompt_size(
+    query_request: QueryRequest,
+    llama_stack_model_id: str,
+    model_id: str,
+    provider_id: str,
+) -> None:
+    """Reject prompts that do not fit into the context of the model.
+
+    Attachments are checked against their byte limits first, so the tokens
+    of oversized attachments are never counted.
+
+    Args:
+        query_request: The query, including attachments.
+        llama_stack_model_id: Full model ID, used to look up the context size.
+        model_id: Model ID, used as metric label.
+        provider_id: Provider ID, used as metric label.
+
+    Raises:
+        HTTPException: HTTP 413 when attachments are larger than allowed or
+        the prompt is larger than the context.
+    """
+    check_attachments_size(query_request.attachments)
+    config = configuration.prompt_size_configuration
+    if not config.enabled:
+        return
+    tokens = estimate_prompt_tokens(
+        get_system_prompt(query_request, configuration),
+        query_request,
+        TOKEN_COUNTERS[config.token_counter],
+    )
+    metrics.llm_prompt_tokens_estimated.labels(provider_id, model_id).observe(tokens)
+
+    context_size = config.context_size(llama_stack_model_id)
+    if context_size is None or tokens <= context_size:
+        return
+    metrics.llm_prompt_too_large_total.labels(provider_id, model_id).inc()
+    logger.warning(
+        "Prompt of about %d tokens exceeds context size %d of model %s",
+        tokens,
+        context_size,
+        llama_stack_model_id,
+    )
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail={
+            "response": "Prompt is too long",
+            "cause": (
+                f"The prompt has about {tokens} tokens, the context size of "
+                f"model {llama_stack_model_id} is {context_size} tokens."
+            ),
+        },
+    )
@@ -0,0 +1,281 @@
+"""Pool of workers answering asynchronous query jobs."""
+
+import asyncio
+import json
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+import constants
+import metrics
+from app.database import get_session
+from log import get_logger
+from models.config import QueryJobsConfiguration
+from models.database.query_jobs import QueryJob
+from utils.suid import get_suid
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+FINISHED_JOB_STATUSES = (constants.QUERY_JOB_SUCCEEDED, constants.QUERY_JOB_FAILED)
+
+
+def _insert_job(job_id: str, user_id: str, request: str) -> None:
+    """Store a new pending job in the database."""
+    with get_session() as session:
+        session.add(
+            QueryJob(
+                id=job_id,
+                user_id=user_id,
+                status=constants.QUERY_JOB_PENDING,
+                request=request,
+            )
+        )
+        session.commit()
+
+
+def _update_job(job_id: str, **values: Any) -> None:
+    """Update stored state of the job."""
+    with get_session() as session:
+        columns = {getattr(QueryJob, name): value for name, value in values.items()}
+        session.query(QueryJob).filter_by(id=job_id).update(columns)
+        session.commit()
+
+
+def load_job(job_id: str) -> Optional[QueryJob]:
+    """Load the job from the database, return None if it does not exist."""
+    with get_session() as session:
+        job = session.query(QueryJob).filter_by(id=job_id).first()
+        if job is not None:
+            session.expunge(job)
+        return job
+
+
+def _purge_jobs(finished_before: datetime) -> int:
+    """Delete jobs finished before given time, return number of deleted jobs."""
+    with get_session() as session:
+        deleted = (
+            session.query(QueryJob)
+            .filter(QueryJob.completed_at < finished_before)
+            .delete()
+        )
+        session.commit()
+        return deleted
+
+
+class QueryJobRunner(metaclass=Singleton):
+    """Bounded pool of workers answering submitted query jobs.
+
+    Submitted jobs are stored in the database and queued for the workers of
+    this service worker. State changes and results are written back to the
+    database, so status of the job can be served by any service worker.
+    Waiting for a job processed locally is notified directly, jobs processed
+    by other service workers are polled from the database.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the runner with default settings."""
+        self.config = QueryJobsConfiguration()
+        self._queue: Optional[
+            asyncio.Queue[tuple[str, Callable[[], Awaitable[BaseModel]]]]
+        ] = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._finished: dict[str, asyncio.Event] = {}
+        # queue slots reserved by jobs being stored in the database
+        self._reserved = 0
+        self._last_purge: float = 0.0
+
+    def configure(self, config: QueryJobsConfiguration) -> None:
+        """Apply query jobs configuration."""
+        self.config = config
+
+    @property
+    def running(self) -> bool:
+        """Check if the workers are running."""
+        return bool(self._worker_tasks)
+
+    def start(self) -> None:
+        """Start the workers."""
+        if self.running:
+            return
+        logger.info("Starting %d query job workers", self.config.workers)
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._worker_tasks = [
+            asyncio.create_task(self._work(self._queue))
+            for _ in range(self.config.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers, jobs not finished yet are marked as failed."""
+        if not self.running:
+            return
+        logger.info("Stopping query job workers")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            job_id, _ = queue.get_nowait()
+            await self._finish(job_id, *self._shutdown_error())
+
+    async def submit(
+        self, user_id: str, request: BaseModel, run: Callable[[], Awaitable[BaseModel]]
+    ) -> str:
+        """Store the job in the database and queue it for the workers.
+
+        Args:
+            user_id: ID of the user submitting the job.
+            request: The submitted request, stored with the job.
+            run: Function answering the request.
+
+        Returns:
+            ID of the submitted job.
+
+        Raises:
+            HTTPException: When the job queue is full or the workers are not running.
+        """
+        queue = self._queue
+        # the slot is reserved before storing the job, so concurrent
+        # submissions can not overfill the queue
+        if queue is None or queue.qsize() + self._reserved >= queue.maxsize:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "response": "Unable to accept query job",
+                    "cause": "Too many query jobs are waiting to be processed.",
+                },
+            )
+        self._reserved += 1
+        try:
+            await self._purge_expired()
+            job_id = get_suid()
+            await asyncio.to_thread(
+                _insert_job, job_id, user_id, request.model_dump_json()
+            )
+        finally:
+            self._reserved -= 1
+        if self._queue is not queue:
+            # the workers were stopped while the job was being stored
+            await self._finish(job_id, *self._shutdown_error())
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={
+                    "response": "Unable to accept query job",
+                    "cause": "The service is shutting down.",
+                },
+            )
+        self._finished[job_id] = asyncio.Event()
+        queue.put_nowait((job_id, run))
+        logger.debug("Query job %s submitted by user %s", job_id, user_id)
+        return job_id
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[QueryJob]:
+        """Wait at most `timeout` seconds for the job to finish.
+
+        Returns:
+            The job in its current state, or None if it does not exist.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(load_job, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.status in FINISHED_JOB_STATUSES or remaining <= 0:
+                return job
+            finished = self._finished.get(job_id)
+            try:
+                if finished is not None:
+                    await asyncio.wait_for(finished.wait(), timeout=remaining)
+                else:
+                    # the job is processed by another service worker
+                    await asyncio.sleep(
+                        min(constants.QUERY_JOB_POLL_INTERVAL, remaining)
+                    )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(
+        self, queue: asyncio.Queue[tuple[str, Callable[[], Awaitable[BaseModel]]]]
+    ) -> None:
+        """Answer queued jobs until cancelled."""
+        while True:
+            job_id, run = await queue.get()
+            try:
+                await self._run(job_id, run)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # the worker must survive database failures
+                logger.exception("Unable to store state of query job %s", job_id)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job_id: str, run: Callable[[], Awaitable[BaseModel]]) -> None:
+        """Answer one job and store its result."""
+        logger.debug("Running query job %s", job_id)
+        await asyncio.to_thread(
+            _update_job,
+            job_id,
+            status=constants.QUERY_JOB_RUNNING,
+            started_at=datetime.now(UTC),
+        )
+        try:
+            response = await run()
+        except HTTPException as e:
+            await self._finish(job_id, e.status_code, e.detail)
+        except asyncio.CancelledError:
+            await self._finish(job_id, *self._shutdown_error())
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.exception("Query job %s failed", job_id)
+            await self._finish(
+                job_id,
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"response": "Unable to process query", "cause": str(e)},
+            )
+        else:
+            await self._finish(
+                job_id, status.HTTP_200_OK, response.model_dump(mode="json")
+            )
+
+    async def _finish(self, job_id: str, status_code: int, result: Any) -> None:
+        """Store the result of the job and notify clients waiting for it."""
+        job_status = (
+            constants.QUERY_JOB_SUCCEEDED
+            if status_code == status.HTTP_200_OK
+            else constants.QUERY_JOB_FAILED
+        )
+        try:
+            await asyncio.to_thread(
+                _update_job,
+                job_id,
+                status=job_status,
+                status_code=status_code,
+                result=json.dumps(result, default=str),
+                completed_at=datetime.now(UTC),
+            )
+        finally:
+            metrics.query_jobs_total.labels(job_status).inc()
+            finished = self._finished.pop(job_id, None)
+            if finished is not None:
+                finished.set()
+
+    @staticmethod
+    def _shutdown_error() -> tuple[int, dict[str, str]]:
+        """Return status code and detail of jobs interrupted by service shutdown."""
+        return status.HTTP_503_SERVICE_UNAVAILABLE, {
+            "response": "Query job interrupted",
+            "cause": "The service was shut down before the job was finished.",
+        }
+
+    async def _purge_expired(self) -> None:
+        """Delete expired finished jobs, at most once per purge interval."""
+        now = time.monotonic()
+        if now - self._last_purge < constants.QUERY_JOB_PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        finished_before = datetime.now(UTC) - timedelta(seconds=self.config.retention)
+        deleted = await asyncio.to_thread(_purge_jobs, finished_before)
+        if deleted:
+            logger.info("Purged %d expired query jobs", deleted)
@@ -0,0 +1,169 @@
+"""Fast extraction of document metadata from RAG tool responses.
+
+The knowledge_search tool returns retrieved chunks as text, each chunk
+followed by a `Metadata: {...}` line holding a Python dict literal. The
+metadata is needed by several endpoints, so the extraction is done by
+one compiled pattern in one pass over the text, flat dict literals are
+parsed without `ast.literal_eval` and results are memoized by the hash
+of the text content.
+"""
+
+import ast
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+import constants
+from log import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# One metadata block, the dict literal is terminated by end of line or text
+METADATA_PATTERN = re.compile(r"Metadata:\s*(\{.*?\})(?=\n|$)", re.DOTALL)
+
+# Flat dict literal with string keys and string, number, bool or None values
+# as printed by Python for the metadata of chunks. Strings with escapes or
+# nested containers are left to the generic parsers.
+_STRING = r"'[^'\\\n]*'|\"[^\"\\\n]*\""
+_SCALAR = rf"{_STRING}|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|True|False|None"
+_ENTRY = rf"\s*(?:{_STRING})\s*:\s*(?:{_SCALAR})\s*"
+_FLAT_DICT_PATTERN = re.compile(rf"\{{(?:{_ENTRY}(?:,{_ENTRY})*,?)?\s*\}}")
+_ENTRY_PATTERN = re.compile(rf"({_STRING})\s*:\s*({_SCALAR})")
+
+_CONSTANTS: dict[str, Any] = {"True": True, "False": False, "None": None}
+
+
+class _ContentCache(Generic[T]):
+    """Thread-safe LRU cache of results keyed by hash of the text content.
+
+    Only the hash and length of the text are kept, not the text itself, so
+    memory used by the cache does not depend on size of tool responses.
+    The hash of a string is computed once and cached by the interpreter.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        """Initialize empty cache holding at most `maxsize` results."""
+        self._maxsize = maxsize
+        self._entries: OrderedDict[tuple[int, int], T] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str, compute: Callable[[str], T]) -> T:
+        """Return memoized result for the text, compute it on cache miss."""
+        key = (hash(text), len(text))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        result = compute(text)
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """Remove all memoized results."""
+        with self._lock:
+            self._entries.clear()
+
+
+_metadata_cache: _ContentCache[tuple[dict[str, Any], ...]] = _ContentCache(
+    constants.RAG_METADATA_CACHE_SIZE
+)
+_json_cache: _ContentCache[Any] = _ContentCache(constants.RAG_METADATA_CACHE_SIZE)
+
+
+def _parse_scalar(token: str) -> Any:
+    """Convert scalar token matched by the flat dict pattern to its value."""
+    if token[0] in "'\"":
+        return token[1:-1]
+    if token in _CONSTANTS:
+        return _CONSTANTS[token]
+    if any(c in token for c in ".eE"):
+        return float(token)
+    return int(token)
+
+
+def parse_metadata(block: str) -> Optional[dict[str, Any]]:
+    """Parse one metadata dict literal.
+
+    Flat dicts are parsed by the precompiled pattern, JSON objects by the
+    JSON parser, and `ast.literal_eval` is used only for anything else.
+
+    Returns:
+        Parsed metadata, or None if the block is not a valid dict literal.
+    """
+    if _FLAT_DICT_PATTERN.fullmatch(block):
+        return {
+            key[1:-1]: _parse_scalar(value)
+            for key, value in _ENTRY_PATTERN.findall(block)
+        }
+    data: Any = None
+    try:
+        data = json.loads(block)
+    except ValueError:
+        try:
+            data = ast.literal_eval(block)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError) as e:
+            logger.debug("Failed to parse metadata block: %s | Error: %s", block, e)
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def _extract_metadata(text: str) -> tuple[dict[str, Any], ...]:
+    """Extract metadata of all chunks found in the text."""
+    metadata = []
+    for block in METADATA_PATTERN.findall(text):
+        data = parse_metadata(block)
+        if data is not None:
+            metadata.append(data)
+    return tuple(metadata)
+
+
+def extract_metadata(text: str) -> tuple[dict[str, Any], ...]:
+    """Extract metadata of all chunks from knowledge_search tool response.
+
+    Results are memoized and shared between callers, so the returned
+    dicts must not be modified.
+
+    Args:
+        text: The tool response text.
+
+    Returns:
+        Metadata of the chunks in order of their appearance in the text.
+    """
+    return _metadata_cache.get(text, _extract_metadata)
+
+
+def _parse_json(text: str) -> Any:
+    """Parse JSON text, return None if it is not a JSON object or array."""
+    stripped = text.lstrip()
+    # knowledge_search responses are plain text, don't pay for the exception
+    if not stripped or stripped[0] not in "{[":
+        return None
+    try:
+        return json.loads(stripped)
+    except ValueError:
+        return None
+
+
+def parse_json_response(text: str) -> Any:
+    """Parse tool response holding JSON object or array.
+
+    Results are memoized and shared between callers, so the returned
+    value must not be modified.
+
+    Returns:
+        Parsed JSON object or array, or None if the text is not one.
+    """
+    return _json_cache.get(text, _parse_json)
+
+
+def clear_cache() -> None:
+    """Remove all memoized extraction results."""
+    _metadata_cache.clear()
+    _json_cache.clear()
@@ -0,0 +1,255 @@
+"""Resumable streamed responses.
+
+When a client or a proxy drops the connection in the middle of a streamed
+answer, the client would have to send the query again and a whole new LLM
+turn would be created. Instead, a resumable response is generated by a
+background task independent of the client connection. Every event gets
+the SSE field `id: <stream ID>:<event number>` and the most recent events
+are kept in a bounded ring buffer. A client reconnecting with the
+`Last-Event-ID` header receives the events it missed, followed by the rest
+of the response if it is still being generated.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, status
+
+import metrics
+from log import get_logger
+from models.config import StreamingConfiguration
+from utils.stream_cancellation import aclose_quietly
+from utils.suid import get_suid
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+
+class ResumableStream:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """Events of one streamed response, generated in background.
+
+    Readers get the events from the ring buffer, the oldest events are
+    dropped as new ones arrive. A reader falling behind by more than the
+    size of the buffer (a stalled connection) is disconnected, the client
+    can not resume such a stream and has to send the query again. When the
+    last reader leaves and no client reconnects within the grace period,
+    generation of the response is cancelled.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        stream_id: str,
+        user_id: str,
+        events: AsyncIterator[str],
+        size: int,
+        grace_period: float,
+    ) -> None:
+        """Start generating the events in background.
+
+        Args:
+            stream_id: Identifier of the stream, the prefix of event IDs.
+            user_id: Identifier of the user the response belongs to.
+            events: Formatted events of the response.
+            size: Number of the most recent events kept.
+            grace_period: Time to wait for a reader to reconnect before the
+                generation is cancelled, in seconds.
+        """
+        self.stream_id = stream_id
+        self.user_id = user_id
+        self._events: deque[str] = deque(maxlen=size)
+        # number of the next event, i.e. of all events generated so far
+        self._next = 0
+        self._error: Optional[BaseException] = None
+        self._readers = 0
+        self._grace_period = grace_period
+        self._abandon: Optional[asyncio.TimerHandle] = None
+        self._changed = asyncio.Condition()
+        self.finished: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._pump(events))
+
+    @property
+    def _first(self) -> int:
+        """Return number of the oldest event in the buffer."""
+        return self._next - len(self._events)
+
+    async def _pump(self, events: AsyncIterator[str]) -> None:
+        """Append the numbered events to the buffer and wake up readers."""
+        try:
+            async for event in events:
+                if not event:
+                    continue
+                async with self._changed:
+                    self._events.append(f"id: {self.stream_id}:{self._next}\n{event}")
+                    self._next += 1
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            await aclose_quietly(events)
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.exception("Resumable stream %s failed", self.stream_id)
+            self._error = e
+        finally:
+            async with self._changed:
+                self.finished.set_result(None)
+                self._changed.notify_all()
+
+    def subscribe(self, after: Optional[int] = None) -> AsyncIterator[str]:
+        """Read the events following the given event.
+
+        Args:
+            after: Number of the last event received by the client, None to
+                read from the beginning of the response.
+
+        Returns:
+            The events the client has not received yet.
+
+        Raises:
+            HTTPException: HTTP 410 when some of the events are not kept any
+            longer.
+        """
+        start = 0 if after is None else after + 1
+        if start < self._first:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail={
+                    "response": "Stream can not be resumed",
+                    "cause": "Events following the last received event are "
+                    "not available any longer, send the query again.",
+                },
+            )
+        return self._read(start)
+
+    async def _read(self, position: int) -> AsyncIterator[str]:
+        """Yield events from the given one until the response ends."""
+        self._readers += 1
+        if self._abandon is not None:
+            self._abandon.cancel()
+            self._abandon = None
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(
+                        lambda: position < self._next or self.finished.done()
+                    )
+                    if position < self._first:
+                        logger.warning(
+                            "Reader of stream %s fell behind, disconnecting",
+                            self.stream_id,
+                        )
+                        return
+                    items = list(islice(self._events, position - self._first, None))
+                    position = self._next
+                for item in items:
+                    yield item
+                if not items and self.finished.done():
+                    if self._error is not None:
+                        raise self._error
+                    return
+        finally:
+            self._readers -= 1
+            if not self._readers and not self.finished.done():
+                # nobody reads the response, unless the client reconnects
+                self._abandon = self._task.get_loop().call_later(
+                    self._grace_period, self._task.cancel
+                )
+
+
+def _parse_event_id(last_event_id: str) -> Optional[tuple[str, int]]:
+    """Split an event ID into the stream ID and the event number."""
+    stream_id, _, number = last_event_id.strip().rpartition(":")
+    if not stream_id or not number.isdigit():
+        return None
+    return stream_id, int(number)
+
+
+class ResumableStreams(metaclass=Singleton):
+    """Recent resumable streamed responses.
+
+    Until configured, responses are not resumable.
+    """
+
+    def __init__(self) -> None:
+        """Initialize disabled registry."""
+        self.config = StreamingConfiguration(resumable=False)
+        self._streams: OrderedDict[str, ResumableStream] = OrderedDict()
+
+    def configure(self, config: StreamingConfiguration) -> None:
+        """Apply streaming configuration."""
+        self.config = config
+        self._streams = OrderedDict()
+
+    def start(self, user_id: str, events: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Generate the response in background so that it can be resumed.
+
+        Args:
+            user_id: Identifier of the user the response belongs to.
+            events: Formatted events of the response.
+
+        Returns:
+            The events with their IDs, the events unchanged when responses
+            are not resumable.
+        """
+        if not self.config.resumable:
+            return events
+        stream = ResumableStream(
+            get_suid(),
+            user_id,
+            events,
+            self.config.replay_buffer_size,
+            self.config.disconnect_grace_period,
+        )
+        self._streams[stream.stream_id] = stream
+        while len(self._streams) > self.config.max_resumable_streams:
+            # an evicted stream is still delivered to its readers
+            self._streams.popitem(last=False)
+        loop = asyncio.get_running_loop()
+        stream.finished.add_done_callback(
+            lambda _: loop.call_later(
+                self.config.resume_retention, self._forget, stream
+            )
+        )
+        return stream.subscribe()
+
+    def _forget(self, stream: ResumableStream) -> None:
+        """Stop keeping a finished stream."""
+        if self._streams.get(stream.stream_id) is stream:
+            del self._streams[stream.stream_id]
+
+    def resume(
+        self, user_id: str, last_event_id: Optional[str]
+    ) -> Optional[AsyncIterator[str]]:
+        """Resume the response following the last event received by the client.
+
+        Args:
+            user_id: Identifier of the user resuming the response.
+            last_event_id: Value of the `Last-Event-ID` header.
+
+        Returns:
+            The events the client has not received yet, None when there is
+            nothing to resume and the query should be answered as usual.
+
+        Raises:
+            HTTPException: HTTP 404 when the stream is not known (any longer),
+            HTTP 410 when the missed events are not kept any longer.
+        """
+        if not self.config.resumable or not last_event_id:
+            return None
+        parsed = _parse_event_id(last_event_id)
+        stream = self._streams.get(parsed[0]) if parsed is not None else None
+        # streams of other users are not disclosed
+        if parsed is None or stream is None or stream.user_id != user_id:
+            logger.info("Stream of event %s can not be resumed", last_event_id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "response": "Stream not found",
+                    "cause": "The stream to be resumed has expired or does not "
+                    "exist, send the query again without Last-Event-ID.",
+                },
+            )
+        events = stream.subscribe(parsed[1])
+        metrics.streams_resumed_total.inc()
+        logger.info("Resuming stream %s after event %d", *parsed)
+        return events
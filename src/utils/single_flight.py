@@ -0,0 +1,130 @@
+"""Coalescing of identical concurrent operations."""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Optional, TypeVar
+
+from log import get_logger
+from utils.stream_cancellation import aclose_quietly
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Share one execution of an operation among concurrent callers.
+
+    The first caller with given key (the leader) starts the operation;
+    callers with the same key that arrive while the operation is in flight
+    wait for its result instead of starting their own. The operation is
+    shielded from cancellation of individual callers, so a disconnected
+    leader does not break the followers.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize empty set of in-flight operations."""
+        self.name = name
+        self._flights: dict[str, asyncio.Future[T]] = {}
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[T]],
+        linger: Optional[Callable[[T], Awaitable[Any]]] = None,
+    ) -> tuple[T, bool]:
+        """Run the operation or join the one that is already in flight.
+
+        Args:
+            key: Key identifying identical operations.
+            func: Function starting the operation.
+            linger: Optional function returning an awaitable that keeps the
+                operation joinable after its result is available (e.g. until
+                a stream produced by the operation is fully consumed).
+
+        Returns:
+            Pair of the operation result and a flag that is True when the
+            result was produced by another caller.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            logger.debug("Joining in-flight %s operation", self.name)
+            return await asyncio.shield(flight), True
+
+        flight = asyncio.ensure_future(func())
+        self._flights[key] = flight
+
+        def release(_: Any = None) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        def finished(done: asyncio.Future[T]) -> None:
+            if linger is None or done.cancelled() or done.exception() is not None:
+                release()
+            else:
+                asyncio.ensure_future(linger(done.result())).add_done_callback(release)
+
+        flight.add_done_callback(finished)
+        return await asyncio.shield(flight), False
+
+    def __len__(self) -> int:
+        """Return number of operations in flight."""
+        return len(self._flights)
+
+
+class StreamFanOut(Generic[T]):  # pylint: disable=too-few-public-methods
+    """Deliver items of one upstream async iterator to many subscribers.
+
+    The upstream is consumed by a background task once; every subscriber
+    receives all items from the beginning of the stream, including those
+    produced before it subscribed, followed by the upstream error (if any).
+    When all subscribers leave before the stream ends, the upstream is
+    closed, nobody would read the rest of it.
+    """
+
+    def __init__(self, upstream: AsyncIterator[T]) -> None:
+        """Start consuming the upstream iterator."""
+        self._items: list[T] = []
+        self._error: Optional[BaseException] = None
+        self._subscribers = 0
+        self._changed = asyncio.Condition()
+        self.finished: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._pump_task = asyncio.create_task(self._pump(upstream))
+
+    async def _pump(self, upstream: AsyncIterator[T]) -> None:
+        """Read upstream items and wake up all subscribers."""
+        try:
+            async for item in upstream:
+                async with self._changed:
+                    self._items.append(item)
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            await aclose_quietly(upstream)
+            raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._error = e
+        finally:
+            async with self._changed:
+                self.finished.set_result(None)
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        """Iterate over all items of the upstream iterator."""
+        index = 0
+        self._subscribers += 1
+        try:
+            while True:
+                async with self._changed:
+                    while index >= len(self._items) and not self.finished.done():
+                        await self._changed.wait()
+                    items = self._items[index:]
+                for item in items:
+                    yield item
+                index += len(items)
+                if not items and self.finished.done():
+                    if self._error is not None:
+                        raise self._error
+                    return
+        finally:
+            self._subscribers -= 1
+            if not self._subscribers and not self.finished.done():
+                self._pump_task.cancel()
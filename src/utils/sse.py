@@ -0,0 +1,98 @@
+"""Encoder of Server-Sent Events of streaming responses.
+
+Every token of a streamed answer is sent as one event. Serializing the
+whole event with `json.dumps` for every token is measurable at hundreds of
+tokens per answer and thousands of concurrent streams, so events with a
+token payload are assembled from precomputed frames and only the token
+itself is escaped. The output is identical to serializing the event with
+`json.dumps`.
+"""
+
+import json
+from json.encoder import encode_basestring_ascii  # type: ignore[attr-defined]
+from typing import Any, Optional
+
+_FRAME_SUFFIX = "}}\n\n"
+# the frames are built lazily for every event type
+_token_frame_prefixes: dict[str, str] = {}
+
+
+def _token_frame_prefix(event_type: str) -> str:
+    """Return the start of a token event frame, up to the event ID."""
+    prefix = _token_frame_prefixes.get(event_type)
+    if prefix is None:
+        prefix = f'data: {{"event": {json.dumps(event_type)}, "data": {{"id": '
+        _token_frame_prefixes[event_type] = prefix
+    return prefix
+
+
+def encode_data(data: Any) -> str:
+    """Format data as a Server-Sent Events data string."""
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def encode_token_event(event_type: str, chunk_id: int, token: str) -> str:
+    """Format an event with the given ID and text token."""
+    return "".join(
+        (
+            _token_frame_prefix(event_type),
+            str(chunk_id),
+            ', "token": ',
+            encode_basestring_ascii(token),
+            _FRAME_SUFFIX,
+        )
+    )
+
+
+class TokenDelta(str):
+    """Event with a delta of the answer text.
+
+    The event is a string like any other event, it just remembers its text
+    so that adjacent deltas can be merged into one event, see
+    utils.coalescing. Deltas of plain text responses have no event type.
+    """
+
+    event_type: Optional[str]
+    chunk_id: int
+    token: str
+
+
+def token_delta(event_type: Optional[str], chunk_id: int, token: str) -> TokenDelta:
+    """Format a delta of the answer text, plain text when no event type is given."""
+    delta = TokenDelta(
+        token if event_type is None else encode_token_event(event_type, chunk_id, token)
+    )
+    delta.event_type = event_type
+    delta.chunk_id = chunk_id
+    delta.token = token
+    return delta
+
+
+def merge_token_deltas(deltas: list[TokenDelta]) -> str:
+    """Merge adjacent deltas of the same type into one event with the first ID."""
+    if len(deltas) == 1:
+        return deltas[0]
+    first = deltas[0]
+    token = "".join(delta.token for delta in deltas)
+    if first.event_type is None:
+        return token
+    return encode_token_event(first.event_type, first.chunk_id, token)
+
+
+def encode_event(event_type: str, data: dict[str, Any]) -> str:
+    """Format an event of the given type.
+
+    Events with just an integer ID and a text token take the fast path,
+    other events are serialized as a whole.
+    """
+    if len(data) == 2:
+        chunk_id = data.get("id")
+        token = data.get("token")
+        # bool is a subclass of int but is serialized differently
+        if (
+            type(chunk_id) is int  # pylint: disable=unidiomatic-typecheck
+            and isinstance(token, str)
+            and next(iter(data)) == "id"
+        ):
+            return encode_token_event(event_type, chunk_id, token)
+    return encode_data({"event": event_type, "data": data})
@@ -0,0 +1,127 @@
+"""Per-stage latency breakdown of requests.
+
+Handlers enter the `stage_timer` context manager around each stage of
+request processing (authentication, quota check, model listing, agent
+initialization, turn creation, topic summary and persistence). Steps of
+a stage run concurrently (see `utils.concurrency`) are measured as well.
+Duration of every stage and step is exported in the
+`ls_request_stage_duration_seconds` histogram labelled by request path,
+stage and step, and it is collected so it can be reported to the client
+in the `Server-Timing` response header.
+
+Timings of the request being processed are kept in a context variable
+set by the REST API middleware; stages entered outside of any request
+(for example by background jobs) are not measured.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar, cast
+
+import metrics
+
+T = TypeVar("T")
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+STAGE_AUTH = "auth"
+STAGE_QUOTA = "quota"
+STAGE_MODEL_LISTING = "model_listing"
+STAGE_AGENT_INIT = "agent_init"
+STAGE_TURN_CREATION = "turn_creation"
+STAGE_TOPIC_SUMMARY = "topic_summary"
+STAGE_PERSISTENCE = "persistence"
+
+
+class RequestTimings:
+    """Durations of stages of one request."""
+
+    def __init__(self, path: str) -> None:
+        """Start collecting timings of the request to the given path."""
+        self.path = path
+        self.stages: dict[str, float] = {}
+
+    def record(self, stage: str, duration: float, step: str = "") -> None:
+        """Record duration of one stage or of its step, in seconds."""
+        metrics.request_stage_duration_seconds.labels(self.path, stage, step).observe(
+            duration
+        )
+        name = f"{stage}.{step}" if step else stage
+        # a stage entered repeatedly (e.g. by batch items) is reported once
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+
+    def server_timing(self) -> str:
+        """Format the recorded timings as value of the Server-Timing header."""
+        return ", ".join(
+            f"{stage};dur={duration * 1000:.1f}"
+            for stage, duration in self.stages.items()
+        )
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def request_timings(path: str) -> Iterator[RequestTimings]:
+    """Collect timings of stages of the request to the given path.
+
+    Args:
+        path: Path of the request, used as metric label.
+
+    Yields:
+        Timings of the request, filled in as its stages finish.
+    """
+    timings = RequestTimings(path)
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def stage_timer(stage: str, step: str = "") -> Iterator[None]:
+    """Measure duration of one stage of current request, or of its step.
+
+    The duration is recorded even when the stage fails.
+
+    Args:
+        stage: Name of the stage, used as metric label.
+        step: Name of the step within the stage, used as metric label.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.record(stage, time.perf_counter() - start, step)
+
+
+async def timed(stage: str, awaitable: Awaitable[T]) -> T:
+    """Await the awaitable as one measured stage of current request."""
+    with stage_timer(stage):
+        return await awaitable
+
+
+def timed_stage(stage: str) -> Callable[[F], F]:
+    """Measure every call of the decorated coroutine function as one stage.
+
+    The decorated function keeps its signature, so decorated methods still
+    override the methods of their base class.
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage_timer(stage):
+                return await func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
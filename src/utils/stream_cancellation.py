@@ -0,0 +1,62 @@
+"""Cancellation of streamed responses nobody reads any longer.
+
+When the client of a streamed response goes away, the Llama Stack stream
+is closed right away instead of being consumed to its end, which stops
+generation of the answer. Post-processing, like generation of the topic
+summary, is skipped and only the partial response is recorded, marked as
+cancelled. The generator of the response is being cancelled or closed at
+that point and must not await anything, so the cleanup is finished by a
+background task.
+"""
+
+import asyncio
+from typing import Any, Awaitable, TypeVar
+
+import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# background tasks are referenced until they finish
+_detached: set[asyncio.Future[Any]] = set()
+
+
+def run_detached(awaitable: Awaitable[T]) -> asyncio.Future[T]:
+    """Run the awaitable in background, independently of the caller."""
+    task = asyncio.ensure_future(awaitable)
+    _detached.add(task)
+    task.add_done_callback(_detached.discard)
+    return task
+
+
+async def aclose_quietly(stream: Any) -> None:
+    """Close an async iterator, errors of a broken stream are just logged."""
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is None:
+        return
+    try:
+        await close()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.debug("Closing of cancelled stream failed", exc_info=True)
+
+
+async def _cleanup(awaitable: Awaitable[None]) -> None:
+    """Finish cleanup of a cancelled stream, log its errors."""
+    try:
+        await awaitable
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Cleanup of cancelled stream failed")
+
+
+def stream_cancelled(cleanup: Awaitable[None]) -> None:
+    """Count a stream cancelled because its client went away.
+
+    Args:
+        cleanup: Closes the upstream and records the partial response, it
+            is run in background.
+    """
+    metrics.streams_cancelled_total.inc()
+    logger.info("Client of streamed response went away, cancelling the turn")
+    run_detached(_cleanup(cleanup))
@@ -1,8 +1,10 @@
 """Helper classes to count tokens sent and received by the LLM."""
 
+import asyncio
 import logging
 from dataclasses import dataclass
-from typing import cast
+from functools import cache
+from typing import Optional, cast
 
 from llama_stack.models.llama.datatypes import RawMessage
 from llama_stack.models.llama.llama3.chat_format import ChatFormat
@@ -61,7 +63,7 @@ def extract_token_usage_from_turn(turn: Turn, system_prompt: str = "") -> TokenC
         tokenizer = Tokenizer.get_instance()
         formatter = ChatFormat(tokenizer)
 
-        # Count output tokens (same logic as metrics.utils.update_llm_token_count_from_turn)
+        # Count output tokens (same dialog encoding as StreamTokenUsage)
         if hasattr(turn, "output_message") and turn.output_message:
             raw_message = cast(RawMessage, turn.output_message)
             encoded_output = formatter.encode_dialog_prompt([raw_message])
@@ -69,7 +71,7 @@ def extract_token_usage_from_turn(turn: Turn, system_prompt: str = "") -> TokenC
                 len(encoded_output.tokens) if encoded_output.tokens else 0
             )
 
-        # Count input tokens (same logic as metrics.utils.update_llm_token_count_from_turn)
+        # Count input tokens (same dialog encoding as StreamTokenUsage)
         if hasattr(turn, "input_messages") and turn.input_messages:
             input_messages = cast(list[RawMessage], turn.input_messages)
             if system_prompt:
@@ -128,3 +130,115 @@ def extract_and_update_token_metrics(
         logger.warning("Failed to update token metrics: %s", e)
 
     return token_counter
+
+
+def _count_dialog_tokens(messages: list[RawMessage]) -> int:
+    """Count tokens of the messages encoded as a llama3 dialog."""
+    formatter = ChatFormat(Tokenizer.get_instance())
+    encoded = formatter.encode_dialog_prompt(messages)
+    return len(encoded.tokens) if encoded.tokens else 0
+
+
+@cache
+def _message_overhead() -> int:
+    """Count tokens the dialog format adds to a single message."""
+    return _count_dialog_tokens([RawMessage(role="assistant", content="")])
+
+
+def _count_turn_tokens(
+    turn: Turn, system_prompt: str, output_counted: bool
+) -> tuple[int, Optional[int]]:
+    """Count input tokens of the turn, and output tokens unless already counted."""
+    input_messages = cast(list[RawMessage], turn.input_messages or [])
+    if system_prompt:
+        input_messages = [RawMessage(role="system", content=system_prompt)] + (
+            input_messages
+        )
+    input_tokens = _count_dialog_tokens(input_messages) if input_messages else 0
+    if output_counted or not turn.output_message:
+        return input_tokens, None
+    return input_tokens, _count_dialog_tokens([cast(RawMessage, turn.output_message)])
+
+
+class StreamTokenUsage:
+    """Token usage of one streamed turn.
+
+    Output tokens are counted incrementally from the deltas of the answer
+    as they arrive, so the whole output is never encoded again. The input
+    dialog is encoded once, in a worker thread, when the turn completes.
+    The same counts are exported to Prometheus and sent to the client.
+    """
+
+    def __init__(self, model: str, provider: str, system_prompt: str = "") -> None:
+        """Initialize usage of a turn of the given model.
+
+        Args:
+            model: The model identifier for metrics labeling
+            provider: The provider identifier for metrics labeling
+            system_prompt: The system prompt used for the turn
+        """
+        self.model = model
+        self.provider = provider
+        self.system_prompt = system_prompt
+        self.output_tokens = 0
+        self._counting: Optional[asyncio.Future[tuple[int, Optional[int]]]] = None
+
+    def add_output(self, text: str) -> None:
+        """Count tokens of a delta of the answer text."""
+        if not text:
+            return
+        if not self.output_tokens:
+            self.output_tokens = _message_overhead()
+        self.output_tokens += len(
+            Tokenizer.get_instance().encode(text, bos=False, eos=False)
+        )
+
+    def complete(self, turn: Turn) -> None:
+        """Start counting input tokens of the completed turn in a worker thread."""
+        if self._counting is None:
+            self._counting = asyncio.ensure_future(
+                asyncio.to_thread(
+                    _count_turn_tokens,
+                    turn,
+                    self.system_prompt,
+                    bool(self.output_tokens),
+                )
+            )
+
+    async def finish(self, record_metrics: bool = True) -> TokenCounter:
+        """Wait for the counting to finish and update Prometheus metrics.
+
+        Args:
+            record_metrics: Whether to update Prometheus metrics; disabled
+                when the same turn is counted for more than one client
+
+        Returns:
+            TokenCounter: Token usage information, without input tokens
+            when the turn did not complete
+        """
+        token_counter = TokenCounter(output_tokens=self.output_tokens)
+        if self._counting is not None:
+            try:
+                input_tokens, output_tokens = await self._counting
+                token_counter.input_tokens = input_tokens
+                token_counter.input_tokens_counted = input_tokens
+                if output_tokens is not None:
+                    token_counter.output_tokens = output_tokens
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning("Failed to count input tokens of turn: %s", e)
+                # Fallback to default estimate if token counting fails
+                token_counter.input_tokens = 100
+            token_counter.llm_calls = 1
+
+        if not record_metrics:
+            return token_counter
+        try:
+            metrics.llm_token_sent_total.labels(self.provider, self.model).inc(
+                token_counter.input_tokens
+            )
+            metrics.llm_token_received_total.labels(self.provider, self.model).inc(
+                token_counter.output_tokens
+            )
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning("Failed to update token metrics: %s", e)
+        return token_counter
@@ -83,6 +83,7 @@ def store_transcript(  # pylint: disable=too-many-arguments,too-many-positional-
         "llm_response": summary.llm_response,
         "rag_chunks": rag_chunks,
         "truncated": truncated,
+        "cancelled": summary.cancelled,
         "attachments": [attachment.model_dump() for attachment in attachments],
         "tool_calls": [tc.model_dump() for tc in summary.tool_calls],
     }
@@ -1,7 +1,7 @@
 """Common types for the project."""
 
+from abc import ABCMeta
 from typing import Any, Optional
-import json
 from llama_stack_client.lib.agents.event_logger import interleaved_content_as_str
 from llama_stack_client.lib.agents.tool_parser import ToolParser
 from llama_stack_client.types.shared.completion_message import CompletionMessage
@@ -10,6 +10,7 @@ from llama_stack_client.types.tool_execution_step import ToolExecutionStep
 from pydantic import BaseModel
 from models.responses import RAGChunk
 from constants import DEFAULT_RAG_TOOL
+from utils.rag_metadata import parse_json_response
 
 
 class Singleton(type):
@@ -29,6 +30,10 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class SingletonABCMeta(Singleton, ABCMeta):
+    """Metaclass for Singleton support of abstract base class implementations."""
+
+
 # See https://github.com/meta-llama/llama-stack-client-python/issues/206
 class GraniteToolParser(ToolParser):
     """Workaround for 'tool_calls' with granite models."""
@@ -92,6 +97,10 @@ class TurnSummary(BaseModel):
     llm_response: str
     tool_calls: list[ToolCallSummary]
     rag_chunks: list[RAGChunk] = []
+    # whether the oldest turns of conversation history were dropped
+    truncated: bool = False
+    # whether the turn was cancelled because the client went away
+    cancelled: bool = False
 
     def append_tool_calls_from_llama(self, tec: ToolExecutionStep) -> None:
         """Append the tool calls from a llama tool execution step."""
@@ -121,8 +130,8 @@ class TurnSummary(BaseModel):
         try:
             # Parse the response to get chunks
             # Try JSON first
-            try:
-                data = json.loads(response_content)
+            data = parse_json_response(response_content)
+            if data is not None:
                 if isinstance(data, dict) and "chunks" in data:
                     for chunk in data["chunks"]:
                         self.rag_chunks.append(
@@ -143,16 +152,15 @@ class TurnSummary(BaseModel):
                                     score=chunk.get("score"),
                                 )
                             )
-            except json.JSONDecodeError:
+            elif response_content.strip():
                 # If not JSON, treat the entire response as a single chunk
-                if response_content.strip():
-                    self.rag_chunks.append(
-                        RAGChunk(
-                            content=response_content,
-                            source=DEFAULT_RAG_TOOL,
-                            score=None,
-                        )
+                self.rag_chunks.append(
+                    RAGChunk(
+                        content=response_content,
+                        source=DEFAULT_RAG_TOOL,
+                        score=None,
                     )
+                )
         except (KeyError, AttributeError, TypeError, ValueError):
             # Treat response as single chunk on data access/structure errors
             if response_content.strip():
@@ -0,0 +1,151 @@
+"""Write-behind queue for bookkeeping performed after the response is ready."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional
+
+import constants
+import metrics
+from log import get_logger
+from models.config import WriteBehindConfiguration
+from utils.types import Singleton
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _Job:
+    """One queued write."""
+
+    name: str
+    call: Callable[[], Any]
+    # completed by the worker when the submitter waits for acknowledgement
+    ack: Optional[asyncio.Future[None]] = None
+
+
+def _run_batch(jobs: list[_Job]) -> list[Optional[Exception]]:
+    """Perform the writes one by one, collecting their errors."""
+    errors: list[Optional[Exception]] = []
+    for job in jobs:
+        try:
+            job.call()
+            errors.append(None)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            metrics.write_behind_failures_total.labels(job.name).inc()
+            if job.ack is None:
+                logger.exception("Write-behind job %s failed", job.name)
+            errors.append(e)
+    return errors
+
+
+class WriteBehindQueue(metaclass=Singleton):
+    """Bounded queue of writes performed by background workers.
+
+    Every worker owns its own queue and performs the writes in batches in a
+    worker thread, so blocking database and filesystem calls do not block
+    the event loop. Writes are assigned to workers by key (conversation ID),
+    therefore writes related to one conversation are performed in order.
+    Until the queue is started (and after it is stopped) the writes are
+    performed inline by the submitter.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the queue with default settings."""
+        self.config = WriteBehindConfiguration()
+        self._queues: list[asyncio.Queue[_Job]] = []
+        self._worker_tasks: list[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, config: WriteBehindConfiguration) -> None:
+        """Apply write-behind queue configuration."""
+        self.config = config
+
+    @property
+    def running(self) -> bool:
+        """Check if the workers are running."""
+        return bool(self._worker_tasks)
+
+    def start(self) -> None:
+        """Start the workers, if enabled in configuration."""
+        if not self.config.enabled or self.running:
+            return
+        logger.info("Starting %d write-behind workers", self.config.workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.workers, thread_name_prefix="write-behind"
+        )
+        self._queues = [
+            asyncio.Queue(maxsize=self.config.queue_size)
+            for _ in range(self.config.workers)
+        ]
+        self._worker_tasks = [
+            asyncio.create_task(self._work(queue)) for queue in self._queues
+        ]
+
+    async def stop(self) -> None:
+        """Flush all pending writes and stop the workers."""
+        if not self.running:
+            return
+        logger.info("Flushing write-behind queue")
+        for queue in self._queues:
+            await queue.join()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queues = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def submit(
+        self, key: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> None:
+        """Queue the write `func(*args, **kwargs)`.
+
+        Waits while the queue is full. With `wait_for_ack` durability it
+        also waits until the write is performed and raises its error.
+
+        Args:
+            key: Key of writes that must be performed in order.
+            func: Function performing the write.
+            args: Positional arguments of the function.
+            kwargs: Keyword arguments of the function.
+        """
+        call = partial(func, *args, **kwargs)
+        if not self.running:
+            call()
+            return
+        ack = None
+        if self.config.durability == constants.WRITE_BEHIND_WAIT_FOR_ACK:
+            ack = asyncio.get_running_loop().create_future()
+        queue = self._queues[hash(key) % len(self._queues)]
+        if queue.full():
+            metrics.write_behind_blocked_total.inc()
+        await queue.put(_Job(getattr(func, "__name__", "write"), call, ack))
+        metrics.write_behind_queue_depth.inc()
+        if ack is not None:
+            # the write is performed even when the submitter is cancelled
+            await asyncio.shield(ack)
+
+    async def _work(self, queue: asyncio.Queue[_Job]) -> None:
+        """Perform queued writes in batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await queue.get()]
+            while len(jobs) < self.config.batch_size and not queue.empty():
+                jobs.append(queue.get_nowait())
+            metrics.write_behind_queue_depth.dec(len(jobs))
+            try:
+                errors = await loop.run_in_executor(self._executor, _run_batch, jobs)
+            finally:
+                for _ in jobs:
+                    queue.task_done()
+            for job, error in zip(jobs, errors):
+                if job.ack is None or job.ack.done():
+                    continue
+                if error is None:
+                    job.ack.set_result(None)
+                else:
+                    job.ack.set_exception(error)
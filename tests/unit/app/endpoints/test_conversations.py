@@ -854,6 +854,7 @@ class TestDeleteConversationEndpoint:
             "app.endpoints.conversations.AsyncLlamaStackClientHolder"
         )
         mock_client_holder.return_value.get_client.return_value = mock_client
+        mock_response_cache = mocker.patch("app.endpoints.conversations.ResponseCache")
 
         response = await delete_conversation_endpoint_handler(
             request=dummy_request, conversation_id=VALID_CONVERSATION_ID, auth=MOCK_AUTH
@@ -866,6 +867,9 @@ class TestDeleteConversationEndpoint:
         mock_client.agents.session.delete.assert_called_once_with(
             agent_id=VALID_CONVERSATION_ID, session_id=VALID_CONVERSATION_ID
         )
+        mock_response_cache.return_value.invalidate_conversation.assert_called_once_with(
+            VALID_CONVERSATION_ID
+        )
 
 
 # Generated entirely by AI, no human review, so read with that in mind.
@@ -4,11 +4,12 @@
 # pylint: disable=too-many-lines
 # pylint: disable=ungrouped-imports
 
+import asyncio
 import json
 
 from typing import Any
 import pytest
-from pytest_mock import MockerFixture
+from pytest_mock import MockerFixture, MockType
 from fastapi import HTTPException, Request, status
 from litellm.exceptions import RateLimitError
 
@@ -23,6 +24,8 @@ from pydantic import AnyUrl
 from tests.unit.conftest import AgentFixtures
 
 from app.endpoints.query import (
+    answer_query,
+    cancel_topic_summary,
     evaluate_model_hints,
     get_topic_summary,
     get_rag_toolgroups,
@@ -30,14 +33,23 @@ from app.endpoints.query import (
     parse_metadata_from_text_item,
     parse_referenced_documents,
     query_endpoint_handler,
+    query_flights,
+    request_cache_control,
+    resolve_topic_summary,
     retrieve_response,
     select_model_and_provider_id,
+    start_topic_summary,
     validate_attachments_metadata,
 )
 from authorization.resolvers import NoopRolesResolver
 from configuration import AppConfig
+from cache.response_cache import ResponseCache
 from models.cache_entry import CacheEntry
-from models.config import Action, ModelContextProtocolServer
+from models.config import (
+    Action,
+    ModelContextProtocolServer,
+    ResponseCacheConfiguration,
+)
 from models.database.conversations import UserConversation
 from models.requests import Attachment, QueryRequest
 from models.responses import ReferencedDocument
@@ -56,6 +68,12 @@ MOCK_AUTH = (
 )
 
 
+@pytest.fixture(autouse=True, name="check_prompt_size")
+def check_prompt_size_fixture(mocker: MockerFixture) -> MockType:
+    """Skip the pre-flight check of prompt size, tested in utils."""
+    return mocker.patch("app.endpoints.query.check_prompt_size")
+
+
 @pytest.fixture
 def dummy_request() -> Request:
     """Dummy request fixture for testing."""
@@ -869,6 +887,8 @@ async def test_retrieve_response_four_available_shields(
         None,  # conversation_id
         False,  # no_tools
     )
+    # shields are listed only once for both input and output classification
+    mock_client.shields.list.assert_called_once()
 
     mock_agent.create_turn.assert_called_once_with(
         messages=[UserMessage(content="What is OpenStack?", role="user")],
@@ -2140,7 +2160,13 @@ async def test_query_endpoint_handler_conversation_not_found(
 ) -> None:
     """Test that a 404 is raised for a non-existant conversation_id."""
     mock_config = mocker.Mock()
+    mock_config.quota_limiters = []
     mocker.patch("app.endpoints.query.configuration", mock_config)
+    mock_client = mocker.AsyncMock()
+    mock_client.models.list.return_value = []
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
+    )
 
     mocker.patch(
         "app.endpoints.query.validate_conversation_ownership", return_value=None
@@ -2305,3 +2331,477 @@ async def test_query_endpoint_quota_exceeded(
     assert isinstance(detail, dict)
     assert detail["response"] == "Model quota exceeded"  # type: ignore
     assert "gpt-4-turbo" in detail["cause"]  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_query_endpoint_prompt_too_long(
+    mocker: MockerFixture, dummy_request: Request, check_prompt_size: MockType
+) -> None:
+    """Test that too long prompt is rejected before the turn is created."""
+    check_prompt_size.side_effect = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail={"response": "Prompt is too long", "cause": "Too many tokens"},
+    )
+    mocker.patch(
+        "app.endpoints.query.select_model_and_provider_id",
+        return_value=("openai/gpt-4-turbo", "gpt-4-turbo", "openai"),
+    )
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client",
+        return_value=mocker.AsyncMock(),
+    )
+    mock_retrieve_response = mocker.patch("app.endpoints.query.retrieve_response")
+    query_request = QueryRequest(query="What is OpenStack?")  # type: ignore
+
+    with pytest.raises(HTTPException) as exc_info:
+        await query_endpoint_handler(
+            dummy_request, query_request=query_request, auth=MOCK_AUTH
+        )
+    assert exc_info.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    check_prompt_size.assert_called_once_with(
+        query_request, "openai/gpt-4-turbo", "gpt-4-turbo", "openai"
+    )
+    mock_retrieve_response.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_start_topic_summary_new_conversation(mocker: MockerFixture) -> None:
+    """Test that topic summary is started speculatively for new conversation."""
+    mock_get_topic_summary = mocker.AsyncMock(return_value="Topic")
+    mock_client = mocker.AsyncMock()
+
+    task = start_topic_summary(
+        mock_get_topic_summary,
+        QueryRequest(query="What is OpenStack?"),
+        mock_client,
+        "m",
+    )
+    assert task is not None
+
+    topic_summary = await resolve_topic_summary(
+        task,
+        mock_get_topic_summary,
+        "conversation",
+        "What is OpenStack?",
+        mock_client,
+        "m",
+    )
+    assert topic_summary == "Topic"
+    mock_get_topic_summary.assert_called_once_with(
+        "What is OpenStack?", mock_client, "m"
+    )
+
+
+@pytest.mark.asyncio
+async def test_start_topic_summary_existing_conversation(
+    mocker: MockerFixture,
+) -> None:
+    """Test that topic summary is not started when conversation continues."""
+    mock_get_topic_summary = mocker.AsyncMock(return_value="Topic")
+    query_request = QueryRequest(
+        query="What is OpenStack?",
+        conversation_id="00000000-0000-0000-0000-000000000001",
+    )
+
+    task = start_topic_summary(
+        mock_get_topic_summary, query_request, mocker.AsyncMock(), "m"
+    )
+    assert task is None
+    mock_get_topic_summary.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_topic_summary_deadline(mocker: MockerFixture) -> None:
+    """Test that slow topic summary is dropped after the deadline."""
+    mocker.patch("app.endpoints.query.constants.TOPIC_SUMMARY_DEADLINE", 0.01)
+
+    async def slow_topic_summary(*_: Any) -> str:
+        await asyncio.sleep(10)
+        return "Topic"
+
+    task = asyncio.create_task(slow_topic_summary())
+    topic_summary = await resolve_topic_summary(
+        task, slow_topic_summary, "conversation", "question", mocker.AsyncMock(), "m"
+    )
+    assert topic_summary is None
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_resolve_topic_summary_failure(mocker: MockerFixture) -> None:
+    """Test that failure to generate topic summary is not propagated."""
+    mock_get_topic_summary = mocker.AsyncMock(side_effect=Exception("LLM failed"))
+    task = start_topic_summary(
+        mock_get_topic_summary, QueryRequest(query="question"), mocker.AsyncMock(), "m"
+    )
+
+    topic_summary = await resolve_topic_summary(
+        task,
+        mock_get_topic_summary,
+        "conversation",
+        "question",
+        mocker.AsyncMock(),
+        "m",
+    )
+    assert topic_summary is None
+
+
+@pytest.mark.asyncio
+async def test_resolve_topic_summary_without_task(mocker: MockerFixture) -> None:
+    """Test that summary is generated only for conversations unknown to database."""
+    mock_get_topic_summary = mocker.AsyncMock(return_value="Topic")
+    mock_session = mocker.Mock()
+    mock_session.__enter__ = mocker.Mock(return_value=mock_session)
+    mock_session.__exit__ = mocker.Mock(return_value=None)
+    mocker.patch("app.endpoints.query.get_session", return_value=mock_session)
+    mock_first = mock_session.query.return_value.filter_by.return_value.first
+
+    mock_first.return_value = mocker.Mock()
+    topic_summary = await resolve_topic_summary(
+        None,
+        mock_get_topic_summary,
+        "conversation",
+        "question",
+        mocker.AsyncMock(),
+        "m",
+    )
+    assert topic_summary is None
+    mock_get_topic_summary.assert_not_called()
+
+    mock_first.return_value = None
+    topic_summary = await resolve_topic_summary(
+        None,
+        mock_get_topic_summary,
+        "conversation",
+        "question",
+        mocker.AsyncMock(),
+        "m",
+    )
+    assert topic_summary == "Topic"
+
+
+@pytest.mark.asyncio
+async def test_query_endpoint_cancels_topic_summary_on_failure(
+    dummy_request: Request, mocker: MockerFixture
+) -> None:
+    """Test that speculative topic summary is cancelled when the LLM call fails."""
+    mock_config = mocker.Mock()
+    mock_config.quota_limiters = []
+    mocker.patch("app.endpoints.query.configuration", mock_config)
+    mock_client = mocker.AsyncMock()
+    mock_client.models.list.return_value = []
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
+    )
+    mocker.patch(
+        "app.endpoints.query.select_model_and_provider_id",
+        return_value=("provider1/model1", "model1", "provider1"),
+    )
+    mocker.patch(
+        "app.endpoints.query.retrieve_response",
+        side_effect=APIConnectionError(request=None),  # type: ignore
+    )
+
+    async def slow_topic_summary(*_: Any) -> str:
+        await asyncio.sleep(10)
+        return "Topic"
+
+    topic_summary_task = asyncio.create_task(slow_topic_summary())
+    mock_start_topic_summary = mocker.patch(
+        "app.endpoints.query.start_topic_summary", return_value=topic_summary_task
+    )
+
+    with pytest.raises(HTTPException) as e:
+        await query_endpoint_handler(
+            request=dummy_request,
+            query_request=QueryRequest(query="What is OpenStack?"),
+            auth=MOCK_AUTH,
+        )
+    assert e.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    mock_start_topic_summary.assert_called_once()
+    with pytest.raises(asyncio.CancelledError):
+        await topic_summary_task
+
+
+@pytest.mark.asyncio
+async def test_cancel_topic_summary(mocker: MockerFixture) -> None:
+    """Test cancelling the speculative topic summary."""
+    # nothing to cancel
+    cancel_topic_summary(None)
+
+    task = start_topic_summary(
+        mocker.AsyncMock(return_value="Topic"),
+        QueryRequest(query="question"),
+        mocker.AsyncMock(),
+        "m",
+    )
+    assert task is not None
+    cancel_topic_summary(task)
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # finished task is kept intact
+    cancel_topic_summary(task)
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_query_endpoint_handler_response_cache(
+    mocker: MockerFixture,
+) -> None:
+    """Test that repeated stateless query is answered from the response cache."""
+    mock_client = mocker.AsyncMock()
+    mock_client.models.list.return_value = []
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
+    )
+    mock_config = mocker.Mock()
+    mock_config.quota_limiters = []
+    mock_config.mcp_servers = []
+    mock_config.configuration.byok_rag = []
+    mock_config.customization = None
+    mocker.patch("app.endpoints.query.configuration", mock_config)
+    mocker.patch(
+        "app.endpoints.query.select_model_and_provider_id",
+        return_value=("provider1/model1", "model1", "provider1"),
+    )
+    mocker.patch("app.endpoints.query.is_transcripts_enabled", return_value=False)
+    mocker.patch("app.endpoints.query.store_conversation_into_cache")
+    mock_consume_tokens = mocker.patch("app.endpoints.query.consume_tokens")
+    mock_database_operations(mocker)
+    mocker.patch(
+        "app.endpoints.query.get_topic_summary", return_value="Test topic summary"
+    )
+    token_usage = TokenCounter()
+    token_usage.input_tokens = 10
+    token_usage.output_tokens = 20
+    mock_retrieve_response = mocker.patch(
+        "app.endpoints.query.retrieve_response",
+        return_value=(
+            TurnSummary(llm_response="LLM answer", tool_calls=[]),
+            "00000000-0000-0000-0000-000000000000",
+            [],
+            token_usage,
+        ),
+    )
+
+    mocker.patch(
+        "app.endpoints.query.validate_conversation_ownership",
+        return_value=mocker.Mock(
+            last_used_model="model1", last_used_provider="provider1"
+        ),
+    )
+
+    request = Request(scope={"type": "http", "headers": []})
+    request.state.authorized_actions = set(Action)
+
+    response_cache = ResponseCache()
+    response_cache.configure(ResponseCacheConfiguration(enabled=True))
+    try:
+        first = await query_endpoint_handler(
+            request=request,
+            query_request=QueryRequest(query="What is OpenStack?"),
+            auth=MOCK_AUTH,
+        )
+        second = await query_endpoint_handler(
+            request=request,
+            query_request=QueryRequest(query="What is OpenStack?"),
+            auth=MOCK_AUTH,
+        )
+        # the cached answer is in the original conversation, which is continued
+        await query_endpoint_handler(
+            request=request,
+            query_request=QueryRequest(
+                query="How do I install it?", conversation_id=second.conversation_id
+            ),
+            auth=MOCK_AUTH,
+        )
+
+        # bypass the cache using Cache-Control request header
+        no_cache_request = Request(
+            scope={"type": "http", "headers": [(b"cache-control", b"no-cache")]}
+        )
+        no_cache_request.state.authorized_actions = set(Action)
+        await query_endpoint_handler(
+            request=no_cache_request,
+            query_request=QueryRequest(query="What is OpenStack?"),
+            auth=MOCK_AUTH,
+        )
+    finally:
+        response_cache.configure(ResponseCacheConfiguration())
+
+    assert mock_retrieve_response.call_count == 3
+    assert second.response == first.response == "LLM answer"
+    # cached answer reports the original conversation and usage
+    assert second.conversation_id == first.conversation_id
+    assert second.input_tokens == 10
+    assert second.output_tokens == 20
+    follow_up = mock_retrieve_response.call_args_list[1].args[2]
+    assert follow_up.conversation_id == second.conversation_id
+    # tokens are consumed only by real LLM calls
+    assert mock_consume_tokens.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_answer_query_cached_answer_in_original_conversation(
+    mocker: MockerFixture,
+) -> None:
+    """Test that the answer is reused only by the same user."""
+    mock_config = mocker.Mock()
+    mock_config.mcp_servers = []
+    mock_config.configuration.byok_rag = []
+    mock_config.customization = None
+    mocker.patch("app.endpoints.query.configuration", mock_config)
+    retrieve_response_func = mocker.AsyncMock(
+        return_value=(
+            TurnSummary(llm_response="LLM answer", tool_calls=[]),
+            "response-1",
+            [],
+            TokenCounter(),
+        )
+    )
+    get_topic_summary_func = mocker.AsyncMock(return_value="Topic")
+
+    async def answer(user_id: str) -> Any:
+        return await answer_query(
+            retrieve_response_func,
+            get_topic_summary_func,
+            mocker.AsyncMock(),
+            "provider1/model1",
+            "provider1",
+            QueryRequest(query="What is OpenStack?"),
+            "token",
+            {},
+            user_id=user_id,
+        )
+
+    response_cache = ResponseCache()
+    response_cache.configure(ResponseCacheConfiguration(enabled=True))
+    try:
+        first = await answer("user1")
+        second = await answer("user1")
+        other_user = await answer("user2")
+    finally:
+        response_cache.configure(ResponseCacheConfiguration())
+
+    # the user owns the original conversation, so it is continued
+    assert not first[5]
+    assert second[1] == "response-1"
+    assert second[5]
+    # answers of other users are not reused
+    assert not other_user[5]
+    assert retrieve_response_func.call_count == 2
+
+
+def test_request_cache_control() -> None:
+    """Test that Cache-Control header is read only when responses are cached."""
+    # requests without any headers are fine while the cache is disabled
+    assert request_cache_control(Request(scope={"type": "http"})) is None
+
+    request = Request(
+        scope={"type": "http", "headers": [(b"cache-control", b"no-store")]}
+    )
+    response_cache = ResponseCache()
+    response_cache.configure(ResponseCacheConfiguration(enabled=True))
+    try:
+        assert request_cache_control(request) == "no-store"
+    finally:
+        response_cache.configure(ResponseCacheConfiguration())
+
+
+@pytest.mark.asyncio
+async def test_query_endpoint_handler_single_flight(
+    mocker: MockerFixture,
+) -> None:
+    """Test that identical concurrent stateless queries share one LLM call."""
+    mock_client = mocker.AsyncMock()
+    mock_client.models.list.return_value = []
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
+    )
+    mock_config = mocker.Mock()
+    mock_config.quota_limiters = []
+    mock_config.mcp_servers = []
+    mock_config.configuration.byok_rag = []
+    mock_config.customization = None
+    mocker.patch("app.endpoints.query.configuration", mock_config)
+    mocker.patch(
+        "app.endpoints.query.select_model_and_provider_id",
+        return_value=("provider1/model1", "model1", "provider1"),
+    )
+    mocker.patch("app.endpoints.query.is_transcripts_enabled", return_value=False)
+    mocker.patch("app.endpoints.query.store_conversation_into_cache")
+    mock_consume_tokens = mocker.patch("app.endpoints.query.consume_tokens")
+    mock_database_operations(mocker)
+    mocker.patch(
+        "app.endpoints.query.get_topic_summary", return_value="Test topic summary"
+    )
+    release = asyncio.Event()
+
+    async def retrieve_response(*_args: Any, **_kwargs: Any) -> Any:
+        await release.wait()
+        return (
+            TurnSummary(llm_response="LLM answer", tool_calls=[]),
+            "00000000-0000-0000-0000-000000000000",
+            [],
+            TokenCounter(),
+        )
+
+    mock_retrieve_response = mocker.patch(
+        "app.endpoints.query.retrieve_response", side_effect=retrieve_response
+    )
+    mocker.patch(
+        "app.endpoints.query.validate_conversation_ownership",
+        return_value=mocker.Mock(
+            last_used_model="model1", last_used_provider="provider1"
+        ),
+    )
+
+    request = Request(scope={"type": "http", "headers": []})
+    request.state.authorized_actions = set(Action)
+    flights = mocker.spy(query_flights, "do")
+
+    response_cache = ResponseCache()
+    # single flight works also when the answers are not stored in the cache
+    response_cache.configure(ResponseCacheConfiguration(enabled=True))
+    try:
+        no_store_request = Request(
+            scope={"type": "http", "headers": [(b"cache-control", b"no-store")]}
+        )
+        no_store_request.state.authorized_actions = set(Action)
+        tasks = [
+            asyncio.create_task(
+                query_endpoint_handler(
+                    request=r,
+                    query_request=QueryRequest(query="What is OpenStack?"),
+                    auth=MOCK_AUTH,
+                )
+            )
+            for r in (no_store_request, request)
+        ]
+        # the LLM answers once the second request joined the first one
+        while flights.call_count < 2:
+            await asyncio.sleep(0)
+        release.set()
+        first, second = await asyncio.gather(*tasks)
+
+        # the follower gets the conversation of the leader, which is continued
+        await query_endpoint_handler(
+            request=request,
+            query_request=QueryRequest(
+                query="How do I install it?", conversation_id=second.conversation_id
+            ),
+            auth=MOCK_AUTH,
+        )
+    finally:
+        response_cache.configure(ResponseCacheConfiguration())
+
+    assert mock_retrieve_response.call_count == 2
+    assert second.response == first.response == "LLM answer"
+    assert first.conversation_id == "00000000-0000-0000-0000-000000000000"
+    assert second.conversation_id == first.conversation_id
+    follow_up = mock_retrieve_response.call_args.args[2]
+    assert follow_up.conversation_id == second.conversation_id
+    # tokens are consumed only by the requests that called the LLM
+    assert mock_consume_tokens.call_count == 2
@@ -0,0 +1,401 @@
+"""Unit tests for the /query/batch REST API endpoint."""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import json
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture, MockType
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from llama_stack_client import APIConnectionError
+
+from app.endpoints.query_batch import (
+    batch_item_error,
+    batch_query_endpoint_handler,
+    stream_batch_results,
+)
+from configuration import AppConfig
+from models.config import Action
+from models.requests import BatchQueryRequest, QueryRequest
+from models.responses import QueryResponse
+from utils.token_counter import TokenCounter
+
+# User ID must be proper UUID
+MOCK_AUTH = (
+    "00000001-0001-0001-0001-000000000001",
+    "mock_username",
+    False,
+    "mock_token",
+)
+
+
+@pytest.fixture(autouse=True, name="check_prompt_size")
+def check_prompt_size_fixture(mocker: MockerFixture) -> MockType:
+    """Skip the pre-flight check of prompt size, tested in utils."""
+    return mocker.patch("app.endpoints.query_batch.check_prompt_size")
+
+
+@pytest.fixture
+def dummy_request() -> Request:
+    """Dummy request fixture for testing."""
+    req = Request(scope={"type": "http", "headers": []})
+    req.state.authorized_actions = set(Action)
+    return req
+
+
+@pytest.fixture(name="setup_configuration")
+def setup_configuration_fixture() -> AppConfig:
+    """Set up configuration for tests."""
+    config_dict: dict[Any, Any] = {
+        "name": "test",
+        "service": {
+            "host": "localhost",
+            "port": 8080,
+            "auth_enabled": False,
+            "workers": 1,
+            "color_log": True,
+            "access_log": True,
+        },
+        "llama_stack": {
+            "api_key": "test-key",
+            "url": "http://test.com:1234",
+            "use_as_library_client": False,
+        },
+        "user_data_collection": {
+            "transcripts_enabled": False,
+        },
+        "mcp_servers": [],
+        "customization": None,
+        "conversation_cache": {
+            "type": "noop",
+        },
+        "batch_query": {
+            "max_queries": 3,
+            "concurrency": 2,
+        },
+    }
+    cfg = AppConfig()
+    cfg.init_from_dict(config_dict)
+    return cfg
+
+
+def _token_counter(input_tokens: int, output_tokens: int) -> TokenCounter:
+    """Prepare token counter with given usage."""
+    counter = TokenCounter()
+    counter.input_tokens = input_tokens
+    counter.output_tokens = output_tokens
+    return counter
+
+
+def _batch(*queries: str) -> BatchQueryRequest:
+    """Prepare batch request with given queries."""
+    return BatchQueryRequest(queries=[QueryRequest(query=q) for q in queries])
+
+
+async def _collect(stream: Any) -> list[dict[str, Any]]:
+    """Collect all NDJSON lines produced by the stream."""
+    return [json.loads(line) async for line in stream]
+
+
+def test_batch_query_request_is_not_empty() -> None:
+    """Test that batch without any query is rejected."""
+    with pytest.raises(ValueError):
+        BatchQueryRequest(queries=[])
+
+
+def test_batch_item_error_http_exception() -> None:
+    """Test that HTTP exceptions keep their status code and detail."""
+    error = batch_item_error(
+        HTTPException(status_code=404, detail={"response": "Conversation not found"})
+    )
+    assert error == {
+        "status_code": 404,
+        "detail": {"response": "Conversation not found"},
+    }
+
+
+def test_batch_item_error_connection_error(mocker: MockerFixture) -> None:
+    """Test that connection errors are reported as HTTP 500."""
+    mock_failures = mocker.patch("metrics.llm_calls_failures_total")
+    error = batch_item_error(APIConnectionError(request=mocker.Mock()))
+    assert error["status_code"] == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert error["detail"]["response"] == "Unable to connect to Llama Stack"
+    mock_failures.inc.assert_called_once()
+
+
+def test_batch_item_error_unexpected_error() -> None:
+    """Test that unexpected errors are reported as HTTP 500."""
+    error = batch_item_error(ValueError("boom"))
+    assert error == {
+        "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+        "detail": {"response": "Unable to process query", "cause": "boom"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_batch_results(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that results are streamed in completion order with aggregated tokens."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mock_consume = mocker.patch("app.endpoints.query_batch.consume_tokens")
+    mocker.patch(
+        "app.endpoints.query_batch.get_available_quotas", return_value={"daily": 10}
+    )
+
+    async def answer(_request: Request, query_request: QueryRequest, *_: Any) -> Any:
+        if query_request.query == "slow":
+            await asyncio.sleep(0.01)
+        if query_request.query == "bad":
+            raise HTTPException(status_code=403, detail={"response": "Forbidden"})
+        response = QueryResponse(conversation_id="c", response=query_request.query)
+        tokens = None if query_request.query == "reused" else _token_counter(10, 2)
+        return response, tokens
+
+    mocker.patch("app.endpoints.query_batch.answer_batch_item", side_effect=answer)
+
+    lines = await _collect(
+        stream_batch_results(
+            dummy_request,
+            _batch("slow", "bad", "fast", "reused"),
+            MOCK_AUTH,
+            {},
+            mocker.AsyncMock(),
+            mocker.Mock(),
+            concurrency=4,
+        )
+    )
+
+    assert [line.get("index") for line in lines[:-1]] == [1, 2, 3, 0]
+    assert lines[0]["error"] == {
+        "status_code": 403,
+        "detail": {"response": "Forbidden"},
+    }
+    assert lines[1]["response"]["response"] == "fast"
+    assert lines[3]["response"]["response"] == "slow"
+    assert lines[-1] == {
+        "summary": {
+            "succeeded": 3,
+            "failed": 1,
+            "input_tokens": 20,
+            "output_tokens": 4,
+            "available_quotas": {"daily": 10},
+        }
+    }
+    # tokens of all queries are charged at once
+    mock_consume.assert_called_once_with(
+        setup_configuration.quota_limiters,
+        MOCK_AUTH[0],
+        input_tokens=20,
+        output_tokens=4,
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_batch_results_bounded_concurrency(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that at most the configured number of queries run at the same time."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mocker.patch("app.endpoints.query_batch.consume_tokens")
+    mocker.patch("app.endpoints.query_batch.get_available_quotas", return_value={})
+    running = 0
+    max_running = 0
+
+    async def answer(*_: Any) -> Any:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return QueryResponse(response="answer"), _token_counter(1, 1)
+
+    mocker.patch("app.endpoints.query_batch.answer_batch_item", side_effect=answer)
+
+    lines = await _collect(
+        stream_batch_results(
+            dummy_request,
+            _batch("q1", "q2", "q3", "q4", "q5"),
+            MOCK_AUTH,
+            {},
+            mocker.AsyncMock(),
+            mocker.Mock(),
+            concurrency=2,
+        )
+    )
+
+    assert len(lines) == 6
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_batch_results_client_disconnect(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that tokens consumed so far are charged when the stream is closed early."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mock_consume = mocker.patch("app.endpoints.query_batch.consume_tokens")
+    mock_detached = mocker.patch("app.endpoints.query_batch.run_detached")
+
+    async def answer(_request: Request, query_request: QueryRequest, *_: Any) -> Any:
+        if query_request.query == "slow":
+            await asyncio.sleep(10)
+        return QueryResponse(response="answer"), _token_counter(5, 1)
+
+    mocker.patch("app.endpoints.query_batch.answer_batch_item", side_effect=answer)
+
+    stream = stream_batch_results(
+        dummy_request,
+        _batch("fast", "slow"),
+        MOCK_AUTH,
+        {},
+        mocker.AsyncMock(),
+        mocker.Mock(),
+        concurrency=2,
+    )
+    line = json.loads(await anext(stream))
+    assert line["index"] == 0
+    await stream.aclose()
+
+    # the tokens are charged in background
+    mock_detached.assert_called_once()
+    await mock_detached.call_args.args[0]
+    mock_consume.assert_called_once_with(
+        setup_configuration.quota_limiters,
+        MOCK_AUTH[0],
+        input_tokens=5,
+        output_tokens=1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_query_endpoint_handler_too_many_queries(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that batch larger than the configured limit is rejected."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mocker.patch("authorization.middleware.configuration", setup_configuration)
+
+    with pytest.raises(HTTPException) as e:
+        await batch_query_endpoint_handler(
+            request=dummy_request,
+            batch_request=_batch("q1", "q2", "q3", "q4"),
+            auth=MOCK_AUTH,
+            mcp_headers={},
+        )
+    assert e.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert e.value.detail["response"] == "Too many queries in batch"  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_batch_query_endpoint_handler(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that quota and models are resolved once for the whole batch."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mocker.patch("authorization.middleware.configuration", setup_configuration)
+    mock_client = mocker.AsyncMock()
+    mocker.patch(
+        "app.endpoints.query_batch.AsyncLlamaStackClientHolder"
+    ).return_value.get_client.return_value = mock_client
+    mock_check = mocker.patch("app.endpoints.query_batch.check_tokens_available")
+    mock_models = mocker.Mock()
+    mock_catalog = mocker.patch("app.endpoints.query_batch.ModelCatalog")
+    mock_catalog.return_value.get = mocker.AsyncMock(return_value=mock_models)
+
+    response = await batch_query_endpoint_handler(
+        request=dummy_request,
+        batch_request=_batch("q1", "q2"),
+        auth=MOCK_AUTH,
+        mcp_headers={},
+    )
+
+    assert isinstance(response, StreamingResponse)
+    assert response.media_type == "application/x-ndjson"
+    mock_check.assert_called_once_with(setup_configuration.quota_limiters, MOCK_AUTH[0])
+    mock_catalog.return_value.get.assert_awaited_once_with(mock_client)
+
+
+@pytest.mark.asyncio
+async def test_batch_query_endpoint_handler_connection_error(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that connection error while preparing the batch is reported as HTTP 500."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mocker.patch("authorization.middleware.configuration", setup_configuration)
+    mocker.patch("metrics.llm_calls_failures_total")
+    mocker.patch("app.endpoints.query_batch.check_tokens_available")
+    mocker.patch(
+        "app.endpoints.query_batch.AsyncLlamaStackClientHolder"
+    ).return_value.get_client.side_effect = APIConnectionError(request=mocker.Mock())
+
+    with pytest.raises(HTTPException) as e:
+        await batch_query_endpoint_handler(
+            request=dummy_request,
+            batch_request=_batch("q1"),
+            auth=MOCK_AUTH,
+            mcp_headers={},
+        )
+    assert e.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@pytest.mark.asyncio
+async def test_stream_batch_results_disconnect_while_charging(
+    mocker: MockerFixture,
+    dummy_request: Request,
+    setup_configuration: AppConfig,
+) -> None:
+    """Test that tokens queued for charging are not charged again on disconnect."""
+    mocker.patch("app.endpoints.query_batch.configuration", setup_configuration)
+    mock_consume = mocker.patch("app.endpoints.query_batch.consume_tokens")
+    mock_detached = mocker.patch("app.endpoints.query_batch.run_detached")
+    queued = asyncio.Event()
+
+    async def submit(*_args: Any, **_kwargs: Any) -> None:
+        """Queue the write and wait for it forever."""
+        queued.set()
+        await asyncio.Event().wait()
+
+    mocker.patch("app.endpoints.query_batch.WriteBehindQueue").return_value.submit = (
+        submit
+    )
+    mocker.patch(
+        "app.endpoints.query_batch.answer_batch_item",
+        return_value=(QueryResponse(response="answer"), _token_counter(5, 1)),
+    )
+
+    consumer = asyncio.create_task(
+        _collect(
+            stream_batch_results(
+                dummy_request,
+                _batch("q1"),
+                MOCK_AUTH,
+                {},
+                mocker.AsyncMock(),
+                mocker.Mock(),
+                concurrency=1,
+            )
+        )
+    )
+    await queued.wait()
+    consumer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consumer
+
+    mock_detached.assert_not_called()
+    mock_consume.assert_not_called()
@@ -0,0 +1,264 @@
+"""Unit tests for the /query/jobs REST API endpoints."""
+
+# pylint: disable=redefined-outer-name
+
+import json
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from pytest_mock import MockerFixture
+from fastapi import HTTPException, Request, status
+
+import constants
+from authorization.resolvers import NoopRolesResolver
+from app.endpoints.query_jobs import (
+    get_query_job_endpoint_handler,
+    get_query_job_result_endpoint_handler,
+    submit_query_job_endpoint_handler,
+)
+from configuration import AppConfig
+from models.config import Action
+from models.database.query_jobs import QueryJob
+from models.requests import QueryRequest
+
+# User ID must be proper UUID
+MOCK_AUTH = (
+    "00000001-0001-0001-0001-000000000001",
+    "mock_username",
+    False,
+    "mock_token",
+)
+JOB_ID = "123e4567-e89b-12d3-a456-426614174000"
+
+
+@pytest.fixture
+def dummy_request() -> Request:
+    """Dummy request fixture for testing."""
+    req = Request(scope={"type": "http"})
+    req.state.authorized_actions = set(Action)
+    return req
+
+
+@pytest.fixture(name="setup_configuration")
+def setup_configuration_fixture(mocker: MockerFixture) -> AppConfig:
+    """Set up configuration for tests."""
+    config_dict: dict[Any, Any] = {
+        "name": "test",
+        "service": {
+            "host": "localhost",
+            "port": 8080,
+            "auth_enabled": False,
+            "workers": 1,
+            "color_log": True,
+            "access_log": True,
+        },
+        "llama_stack": {
+            "api_key": "test-key",
+            "url": "http://test.com:1234",
+            "use_as_library_client": False,
+        },
+        "user_data_collection": {
+            "transcripts_enabled": False,
+        },
+        "mcp_servers": [],
+        "customization": None,
+        "conversation_cache": {
+            "type": "noop",
+        },
+        "query_jobs": {
+            "max_wait": 5,
+        },
+    }
+    cfg = AppConfig()
+    cfg.init_from_dict(config_dict)
+    mocker.patch("app.endpoints.query_jobs.configuration", cfg)
+    mocker.patch("authorization.middleware.configuration", cfg)
+    return cfg
+
+
+def _job(
+    job_status: str,
+    status_code: int | None = None,
+    result: Any = None,
+    user_id: str = MOCK_AUTH[0],
+) -> QueryJob:
+    """Prepare stored query job."""
+    return QueryJob(
+        id=JOB_ID,
+        user_id=user_id,
+        status=job_status,
+        request="{}",
+        status_code=status_code,
+        result=json.dumps(result) if result is not None else None,
+        created_at=datetime(2024, 1, 1, tzinfo=UTC),
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_submit_query_job(mocker: MockerFixture, dummy_request: Request) -> None:
+    """Test that the job is submitted to the runner and its ID returned."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+    mock_runner.return_value.submit = mocker.AsyncMock(return_value=JOB_ID)
+    query_request = QueryRequest(query="What is OpenStack?")
+
+    response = await submit_query_job_endpoint_handler(
+        request=dummy_request,
+        query_request=query_request,
+        auth=MOCK_AUTH,
+        mcp_headers={},
+    )
+
+    assert response.job_id == JOB_ID
+    assert response.status == constants.QUERY_JOB_PENDING
+    user_id, submitted_request, run = mock_runner.return_value.submit.call_args.args
+    assert user_id == MOCK_AUTH[0]
+    assert submitted_request is query_request
+    assert run.keywords["query_request"] is query_request
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_submit_query_job_model_override_forbidden(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that model override is validated before the job is submitted."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+
+    # Patch authorization to exclude MODEL_OVERRIDE from authorized actions
+    access_resolver = mocker.Mock()
+    access_resolver.check_access.return_value = True
+    access_resolver.get_actions.return_value = set(Action) - {Action.MODEL_OVERRIDE}
+    mocker.patch(
+        "authorization.middleware.get_authorization_resolvers",
+        return_value=(NoopRolesResolver(), access_resolver),
+    )
+
+    with pytest.raises(HTTPException) as e:
+        await submit_query_job_endpoint_handler(
+            request=dummy_request,
+            query_request=QueryRequest(query="q", model="m", provider="p"),
+            auth=MOCK_AUTH,
+            mcp_headers={},
+        )
+    assert e.value.status_code == status.HTTP_403_FORBIDDEN
+    mock_runner.return_value.submit.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_get_query_job_succeeded(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test retrieving status and response of a succeeded job."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+    mock_runner.return_value.wait = mocker.AsyncMock(
+        return_value=_job(
+            constants.QUERY_JOB_SUCCEEDED,
+            200,
+            {"conversation_id": "c", "response": "answer"},
+        )
+    )
+
+    response = await get_query_job_endpoint_handler(
+        request=dummy_request, job_id=JOB_ID, auth=MOCK_AUTH, wait=30
+    )
+
+    assert response.status == constants.QUERY_JOB_SUCCEEDED
+    assert response.created_at == "2024-01-01T00:00:00+00:00"
+    assert response.response is not None
+    assert response.response.response == "answer"
+    assert response.error is None
+    # waiting time is limited by configuration
+    mock_runner.return_value.wait.assert_awaited_once_with(JOB_ID, 5)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_get_query_job_of_other_user(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that jobs of other users are not found."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+    mock_runner.return_value.wait = mocker.AsyncMock(
+        return_value=_job(constants.QUERY_JOB_PENDING, user_id="someone-else")
+    )
+
+    with pytest.raises(HTTPException) as e:
+        await get_query_job_endpoint_handler(
+            request=dummy_request, job_id=JOB_ID, auth=MOCK_AUTH, wait=0
+        )
+    assert e.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_get_query_job_invalid_id(dummy_request: Request) -> None:
+    """Test that invalid job ID is rejected."""
+    with pytest.raises(HTTPException) as e:
+        await get_query_job_endpoint_handler(
+            request=dummy_request, job_id="invalid", auth=MOCK_AUTH, wait=0
+        )
+    assert e.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_get_query_job_result_not_finished(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that result of unfinished job is not available."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+    mock_runner.return_value.wait = mocker.AsyncMock(
+        return_value=_job(constants.QUERY_JOB_RUNNING)
+    )
+
+    with pytest.raises(HTTPException) as e:
+        await get_query_job_result_endpoint_handler(
+            request=dummy_request, job_id=JOB_ID, auth=MOCK_AUTH
+        )
+    assert e.value.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_get_query_job_result_failed(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that error of failed job is returned with its status code."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+    mock_runner.return_value.wait = mocker.AsyncMock(
+        return_value=_job(
+            constants.QUERY_JOB_FAILED, 429, {"response": "Model quota exceeded"}
+        )
+    )
+
+    with pytest.raises(HTTPException) as e:
+        await get_query_job_result_endpoint_handler(
+            request=dummy_request, job_id=JOB_ID, auth=MOCK_AUTH
+        )
+    assert e.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert e.value.detail == {"response": "Model quota exceeded"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("setup_configuration")
+async def test_get_query_job_result_succeeded(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test retrieving response of a succeeded job."""
+    mock_runner = mocker.patch("app.endpoints.query_jobs.QueryJobRunner")
+    mock_runner.return_value.wait = mocker.AsyncMock(
+        return_value=_job(
+            constants.QUERY_JOB_SUCCEEDED,
+            200,
+            {"conversation_id": "c", "response": "answer"},
+        )
+    )
+
+    response = await get_query_job_result_endpoint_handler(
+        request=dummy_request, job_id=JOB_ID, auth=MOCK_AUTH
+    )
+    assert response.conversation_id == "c"
+    assert response.response == "answer"
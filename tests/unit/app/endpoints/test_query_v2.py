@@ -4,19 +4,26 @@
 from typing import Any
 from litellm.exceptions import RateLimitError
 import pytest
-from pytest_mock import MockerFixture
+from pytest_mock import MockerFixture, MockType
 from fastapi import HTTPException, status, Request
 
 from llama_stack_client import APIConnectionError
 
 from models.requests import QueryRequest, Attachment
-from models.config import ModelContextProtocolServer
+from models.config import (
+    AttachmentsConfiguration,
+    ConversationHistoryConfiguration,
+    ModelContextProtocolServer,
+)
+from utils.attachments import AttachmentIndex
 
+from app.endpoints import query as query_module
 from app.endpoints.query_v2 import (
-    get_rag_tools,
+    apply_history_budget,
     get_mcp_tools,
     retrieve_response,
     query_endpoint_handler_v2,
+    reference_sent_attachments,
 )
 
 # User ID must be proper UUID
@@ -28,6 +35,12 @@ MOCK_AUTH = (
 )
 
 
+@pytest.fixture(autouse=True, name="check_prompt_size")
+def check_prompt_size_fixture(mocker: MockerFixture) -> MockType:
+    """Skip the pre-flight check of prompt size, tested in utils."""
+    return mocker.patch("app.endpoints.query.check_prompt_size")
+
+
 @pytest.fixture
 def dummy_request() -> Request:
     """Create a dummy FastAPI Request object for testing."""
@@ -35,17 +48,6 @@ def dummy_request() -> Request:
     return req
 
 
-def test_get_rag_tools() -> None:
-    """Test get_rag_tools returns None for empty list and correct tool format for vector stores."""
-    assert get_rag_tools([]) is None
-
-    tools = get_rag_tools(["db1", "db2"])
-    assert isinstance(tools, list)
-    assert tools[0]["type"] == "file_search"
-    assert tools[0]["vector_store_ids"] == ["db1", "db2"]
-    assert tools[0]["max_num_results"] == 10
-
-
 def test_get_mcp_tools_with_and_without_token() -> None:
     """Test get_mcp_tools generates correct tool definitions with and without auth tokens."""
     servers = [
@@ -68,6 +70,24 @@ def test_get_mcp_tools_with_and_without_token() -> None:
     assert tools_with_token[1]["headers"] == {"Authorization": "Bearer abc"}
 
 
+def test_get_mcp_tools_with_mcp_headers() -> None:
+    """Test that per-server MCP headers take precedence over the auth token."""
+    servers = [
+        ModelContextProtocolServer(name="fs", url="http://localhost:3000"),
+        ModelContextProtocolServer(name="git", url="https://git.example.com/mcp"),
+    ]
+    mcp_headers = {"http://localhost:3000": {"X-Token": "xyz"}}
+
+    tools = get_mcp_tools(servers, token="abc", mcp_headers=mcp_headers)
+    assert tools[0]["headers"] == {"X-Token": "xyz"}
+    assert tools[1]["headers"] == {"Authorization": "Bearer abc"}
+
+    # headers of one request do not leak into the precompiled template
+    tools = get_mcp_tools(servers, token=None)
+    assert "headers" not in tools[0]
+    assert "headers" not in tools[1]
+
+
 @pytest.mark.asyncio
 async def test_retrieve_response_no_tools_bypasses_tools(mocker: MockerFixture) -> None:
     """Test that no_tools=True bypasses tool configuration and passes None to responses API."""
@@ -148,6 +168,10 @@ async def test_retrieve_response_builds_rag_and_mcp_tools(
     assert mcp_tool["server_label"] == "fs"
     assert mcp_tool["headers"] == {"Authorization": "Bearer mytoken"}
 
+    # vector stores are served from the catalog on subsequent requests
+    await retrieve_response(mock_client, "model-y", qr, token="mytoken")
+    mock_client.vector_stores.list.assert_called_once()
+
 
 @pytest.mark.asyncio
 async def test_retrieve_response_parses_output_and_tool_calls(
@@ -359,6 +383,30 @@ async def test_retrieve_response_validates_attachments(mocker: MockerFixture) ->
     assert "x" in kwargs["input"]
 
 
+def test_reference_sent_attachments() -> None:
+    """Test that attachments sent earlier in the conversation are referenced."""
+    attachments = [
+        Attachment(attachment_type="log", content_type="text/plain", content="LOG"),
+    ]
+    qr = QueryRequest(query="hello", attachments=attachments)
+    index = AttachmentIndex()
+    index.configure(AttachmentsConfiguration())
+    try:
+        index.remember("resp-1", attachments)
+
+        create_kwargs = {"input": "hello\n\n[Attachment: log]\nLOG"}
+        reference_sent_attachments(create_kwargs, qr)
+        # the conversation was not chained, e.g. the history was truncated
+        assert create_kwargs["input"] == "hello\n\n[Attachment: log]\nLOG"
+
+        create_kwargs["previous_response_id"] = "resp-1"
+        reference_sent_attachments(create_kwargs, qr)
+        assert "LOG" not in create_kwargs["input"]
+        assert create_kwargs["input"].startswith("hello\n\n[Attachment: log, unchanged")
+    finally:
+        index.configure(AttachmentsConfiguration(deduplicate=False))
+
+
 @pytest.mark.asyncio
 async def test_query_endpoint_handler_v2_success(
     mocker: MockerFixture, dummy_request: Request
@@ -375,13 +423,18 @@ async def test_query_endpoint_handler_v2_success(
     mocker.patch(
         "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
     )
+    mocker.patch("app.endpoints.query.VectorStoreCatalog").return_value.get = (
+        mocker.AsyncMock()
+    )
     mocker.patch("app.endpoints.query.evaluate_model_hints", return_value=(None, None))
     mocker.patch(
         "app.endpoints.query.select_model_and_provider_id",
         return_value=("llama/m", "m", "p"),
     )
 
-    summary = mocker.Mock(llm_response="ANSWER", tool_calls=[], rag_chunks=[])
+    summary = mocker.Mock(
+        llm_response="ANSWER", tool_calls=[], rag_chunks=[], truncated=False
+    )
     token_usage = mocker.Mock(input_tokens=10, output_tokens=20)
     mocker.patch(
         "app.endpoints.query_v2.retrieve_response",
@@ -390,7 +443,7 @@ async def test_query_endpoint_handler_v2_success(
     mocker.patch("app.endpoints.query_v2.get_topic_summary", return_value="Topic")
     mocker.patch("app.endpoints.query.is_transcripts_enabled", return_value=False)
     mocker.patch("app.endpoints.query.persist_user_conversation_details")
-    mocker.patch("utils.endpoints.store_conversation_into_cache")
+    mocker.patch("app.endpoints.query.store_conversation_into_cache")
     mocker.patch("app.endpoints.query.get_session")
 
     # Add missing mocks for quota functions
@@ -412,6 +465,50 @@ async def test_query_endpoint_handler_v2_success(
     assert res.response == "ANSWER"
 
 
+@pytest.mark.asyncio
+async def test_query_endpoint_handler_v2_prefetches_vector_stores(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that vector stores are loaded in the concurrent pre-inference stage."""
+    mock_config = mocker.Mock()
+    mock_config.llama_stack_configuration = mocker.Mock()
+    mock_config.quota_limiters = []
+    mocker.patch("app.endpoints.query_v2.configuration", mock_config)
+
+    mock_client = mocker.Mock()
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
+    )
+    mocker.patch("app.endpoints.query.ModelCatalog").return_value.get = (
+        mocker.AsyncMock(return_value=[])
+    )
+    mock_vector_stores = mocker.patch("app.endpoints.query.VectorStoreCatalog")
+    mock_vector_stores.return_value.get = mocker.AsyncMock()
+    mocker.patch(
+        "app.endpoints.query.select_model_and_provider_id",
+        return_value=("llama/m", "m", "p"),
+    )
+    # the LLM call fails, the pre-inference stage is what matters
+    mocker.patch(
+        "app.endpoints.query_v2.retrieve_response",
+        side_effect=APIConnectionError(request=Request(scope={"type": "http"})),  # type: ignore
+    )
+    mocker.patch("utils.quota.check_tokens_available")
+    pre_inference = mocker.spy(query_module, "run_concurrently")
+    dummy_request.state.authorized_actions = []
+
+    with pytest.raises(HTTPException):
+        await query_endpoint_handler_v2(
+            request=dummy_request,
+            query_request=QueryRequest(query="hi"),
+            auth=("user123", "", False, "token-abc"),
+            mcp_headers={},
+        )
+
+    assert set(pre_inference.call_args.args[1]) == {"quota", "models", "vector_stores"}
+    mock_vector_stores.return_value.get.assert_awaited_once_with(mock_client)
+
+
 @pytest.mark.asyncio
 async def test_query_endpoint_handler_v2_api_connection_error(
     mocker: MockerFixture, dummy_request: Request
@@ -477,3 +574,80 @@ async def test_query_endpoint_quota_exceeded(
     assert isinstance(detail, dict)
     assert detail["response"] == "Model quota exceeded"  # type: ignore
     assert "gpt-4-turbo" in detail["cause"]  # type: ignore
+
+
+def _history_item(mocker: MockerFixture, role: str, content: str) -> Any:
+    """Create a Responses API message item."""
+    return mocker.Mock(type="message", role=role, content=content)
+
+
+def _mock_history(mocker: MockerFixture, usage: Any) -> Any:
+    """Mock client with a conversation of three turns, ten tokens each."""
+    mock_client = mocker.Mock()
+    previous = mocker.Mock()
+    previous.usage = usage
+    previous.output = [_history_item(mocker, "assistant", "a" * 20)]
+    mock_client.responses.retrieve = mocker.AsyncMock(return_value=previous)
+    # the most recent items are listed first
+    items = mocker.Mock()
+    items.data = [
+        _history_item(mocker, "user", "q" * 20),
+        _history_item(mocker, "assistant", "a" * 20),
+        _history_item(mocker, "user", "q" * 20),
+        mocker.Mock(type="function_call", role=None),
+        _history_item(mocker, "assistant", "a" * 20),
+        _history_item(mocker, "user", "q" * 20),
+    ]
+    mock_client.responses.input_items.list = mocker.AsyncMock(return_value=items)
+    mock_config = mocker.Mock()
+    mock_config.conversation_history_configuration = ConversationHistoryConfiguration(
+        enabled=True, default_budget=20, token_counter="approximate"
+    )
+    mocker.patch("app.endpoints.query_v2.configuration", mock_config)
+    return mock_client
+
+
+@pytest.mark.asyncio
+async def test_apply_history_budget_drops_oldest_turns(mocker: MockerFixture) -> None:
+    """Test that the oldest turns are dropped when the history exceeds the budget."""
+    mock_client = _mock_history(mocker, usage=None)
+    create_kwargs = {
+        "input": "n" * 20,
+        "instructions": "",
+        "previous_response_id": "resp-3",
+    }
+
+    assert await apply_history_budget(mock_client, "provider/model", create_kwargs)
+
+    assert "previous_response_id" not in create_kwargs
+    assert create_kwargs["input"] == [
+        {"role": "user", "content": "q" * 20},
+        {"role": "assistant", "content": "a" * 20},
+        {"role": "user", "content": "n" * 20},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_apply_history_budget_fitting_history(mocker: MockerFixture) -> None:
+    """Test that history fitting into the budget by reported usage is not retrieved."""
+    mock_client = _mock_history(mocker, usage={"input_tokens": 10, "output_tokens": 5})
+    create_kwargs = {
+        "input": "n" * 20,
+        "instructions": "",
+        "previous_response_id": "resp-3",
+    }
+
+    assert not await apply_history_budget(mock_client, "provider/model", create_kwargs)
+
+    assert create_kwargs["previous_response_id"] == "resp-3"
+    mock_client.responses.input_items.list.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_apply_history_budget_new_conversation(mocker: MockerFixture) -> None:
+    """Test that new conversations have no history to truncate."""
+    mock_client = mocker.Mock()
+    create_kwargs = {"input": "hello", "instructions": ""}
+
+    assert not await apply_history_budget(mock_client, "provider/model", create_kwargs)
+    assert create_kwargs == {"input": "hello", "instructions": ""}
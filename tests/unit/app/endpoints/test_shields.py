@@ -6,6 +6,7 @@ from pytest_mock import MockerFixture
 from fastapi import HTTPException, Request, status
 
 from llama_stack_client import APIConnectionError
+from llama_stack_client.types import Shield
 
 from authentication.interface import AuthTuple
 
@@ -297,20 +298,20 @@ async def test_shields_endpoint_handler_success_with_shields_data(
 
     # Mock the LlamaStack client with sample shields data
     mock_shields_data = [
-        {
-            "identifier": "lightspeed_question_validity-shield",
-            "provider_resource_id": "lightspeed_question_validity-shield",
-            "provider_id": "lightspeed_question_validity",
-            "type": "shield",
-            "params": {},
-        },
-        {
-            "identifier": "content_filter-shield",
-            "provider_resource_id": "content_filter-shield",
-            "provider_id": "content_filter",
-            "type": "shield",
-            "params": {"threshold": 0.8},
-        },
+        Shield(
+            identifier="lightspeed_question_validity-shield",
+            provider_resource_id="lightspeed_question_validity-shield",
+            provider_id="lightspeed_question_validity",
+            type="shield",
+            params={},
+        ),
+        Shield(
+            identifier="content_filter-shield",
+            provider_resource_id="content_filter-shield",
+            provider_id="content_filter",
+            type="shield",
+            params={"threshold": 0.8},
+        ),
     ]
 
     mock_client = mocker.AsyncMock()
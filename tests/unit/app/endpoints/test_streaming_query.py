@@ -4,11 +4,13 @@ from datetime import datetime
 
 # pylint: disable=too-many-lines
 
+import asyncio
 import json
+from typing import Any, AsyncIterator
 
 from litellm.exceptions import RateLimitError
 import pytest
-from pytest_mock import MockerFixture
+from pytest_mock import MockerFixture, MockType
 
 from fastapi import HTTPException, Request, status
 from fastapi.responses import StreamingResponse
@@ -52,9 +54,14 @@ from app.endpoints.streaming_query import (
 )
 
 from authorization.resolvers import NoopRolesResolver
+from cache.response_cache import ResponseCache
 from constants import MEDIA_TYPE_JSON, MEDIA_TYPE_TEXT
 from models.cache_entry import CacheEntry
-from models.config import ModelContextProtocolServer, Action
+from models.config import (
+    Action,
+    ModelContextProtocolServer,
+    ResponseCacheConfiguration,
+)
 from models.requests import QueryRequest, Attachment
 from models.responses import RAGChunk
 from utils.token_counter import TokenCounter
@@ -83,7 +90,7 @@ def mock_database_operations(mocker: MockerFixture) -> None:
     mock_session.query.return_value.filter_by.return_value.first.return_value = None
     mock_session.__enter__ = mocker.Mock(return_value=mock_session)
     mock_session.__exit__ = mocker.Mock(return_value=None)
-    mocker.patch("app.endpoints.streaming_query.get_session", return_value=mock_session)
+    mocker.patch("app.endpoints.query.get_session", return_value=mock_session)
 
 
 def mock_metrics(mocker: MockerFixture) -> None:
@@ -123,6 +130,12 @@ Use them as supporting information only in answering this query.
 ]
 
 
+@pytest.fixture(autouse=True, name="check_prompt_size")
+def check_prompt_size_fixture(mocker: MockerFixture) -> MockType:
+    """Skip the pre-flight check of prompt size, tested in utils."""
+    return mocker.patch("app.endpoints.streaming_query.check_prompt_size")
+
+
 @pytest.fixture(autouse=True, name="setup_configuration")
 def setup_configuration_fixture() -> AppConfig:
     """Set up configuration for tests."""
@@ -197,7 +210,7 @@ async def test_streaming_query_endpoint_on_connection_error(
 
     # simulate situation when it is not possible to connect to Llama Stack
     mock_client = mocker.AsyncMock()
-    mock_client.models.side_effect = APIConnectionError(request=query_request)
+    mock_client.models.list.side_effect = APIConnectionError(request=query_request)
     mock_lsc = mocker.patch("client.AsyncLlamaStackClientHolder.get_client")
     mock_lsc.return_value = mock_client
     mock_async_lsc = mocker.patch("client.AsyncLlamaStackClientHolder.get_client")
@@ -208,13 +221,12 @@ async def test_streaming_query_endpoint_on_connection_error(
             "type": "http",
         }
     )
-    # await the async function - should return a streaming response with error
-    response = await streaming_query_endpoint_handler(
-        request, query_request, auth=MOCK_AUTH
-    )
-
-    assert isinstance(response, StreamingResponse)
-    assert response.media_type == "text/event-stream"
+    # errors before the stream starts are reported with their HTTP status
+    with pytest.raises(HTTPException) as e:
+        await streaming_query_endpoint_handler(request, query_request, auth=MOCK_AUTH)
+    assert e.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert isinstance(e.value.detail, dict)
+    assert e.value.detail["response"] == "Unable to connect to Llama Stack"
 
 
 # pylint: disable=too-many-locals
@@ -453,6 +465,98 @@ async def test_streaming_query_endpoint_handler_store_transcript(
     await _test_streaming_query_endpoint_handler(mocker, store_transcript=True)
 
 
+@pytest.mark.asyncio
+async def test_streaming_query_endpoint_handler_single_flight(
+    mocker: MockerFixture,
+) -> None:
+    """Test that identical concurrent stateless queries share one LLM stream."""
+    mock_client = mocker.AsyncMock()
+    mocker.patch(
+        "client.AsyncLlamaStackClientHolder.get_client", return_value=mock_client
+    )
+    mock_client.models.list.return_value = []
+    mocker.patch(
+        "app.endpoints.streaming_query.select_model_and_provider_id",
+        return_value=("fake_model_id", "fake_model_id", "fake_provider_id"),
+    )
+    mocker.patch(
+        "app.endpoints.streaming_query.is_transcripts_enabled", return_value=False
+    )
+    mocker.patch("app.endpoints.streaming_query.store_conversation_into_cache")
+    mocker.patch(
+        "app.endpoints.streaming_query.get_topic_summary",
+        return_value="Test topic summary",
+    )
+    mock_database_operations(mocker)
+    sent = mocker.patch("metrics.llm_token_sent_total")
+    received = mocker.patch("metrics.llm_token_received_total")
+    calls = mocker.patch("metrics.llm_calls_total")
+    release = asyncio.Event()
+
+    async def llm_stream() -> AsyncIterator[AgentTurnResponseStreamChunk]:
+        await release.wait()
+        yield AgentTurnResponseStreamChunk(
+            event=TurnResponseEvent(
+                payload=AgentTurnResponseTurnCompletePayload(
+                    event_type="turn_complete",
+                    turn=Turn(
+                        turn_id="t1",
+                        input_messages=[],
+                        output_message=CompletionMessage(
+                            role="assistant",
+                            content=[TextContentItem(text="LLM answer", type="text")],
+                            stop_reason="end_of_turn",
+                            tool_calls=[],
+                        ),
+                        session_id="test_session_id",
+                        started_at=datetime.now(),
+                        steps=[],
+                        completed_at=datetime.now(),
+                        output_attachments=[],
+                    ),
+                )
+            )
+        )
+
+    mock_retrieve_response = mocker.patch(
+        "app.endpoints.streaming_query.retrieve_response",
+        return_value=(llm_stream(), "00000000-0000-0000-0000-000000000000"),
+    )
+
+    async def collect(response: StreamingResponse) -> list[dict[str, Any]]:
+        return [json.loads(str(chunk)[5:]) async for chunk in response.body_iterator]
+
+    response_cache = ResponseCache()
+    response_cache.configure(ResponseCacheConfiguration(enabled=True))
+    try:
+        # the second request joins the stream that is still in progress
+        responses = [
+            await streaming_query_endpoint_handler(
+                Request(scope={"type": "http"}),
+                QueryRequest(query="What is OpenStack?"),
+                auth=MOCK_AUTH,
+            )
+            for _ in range(2)
+        ]
+        release.set()
+        first, second = await asyncio.gather(*(collect(r) for r in responses))
+    finally:
+        response_cache.configure(ResponseCacheConfiguration())
+
+    mock_retrieve_response.assert_called_once()
+    # both requests get the answer in the conversation it was generated in
+    assert first == second
+    assert first[0]["data"]["conversation_id"] == (
+        "00000000-0000-0000-0000-000000000000"
+    )
+    assert first[-1]["event"] == "end"
+    assert first[-1]["data"]["output_tokens"] > 0
+    # the LLM call is recorded in metrics only once
+    calls.labels.return_value.inc.assert_called_once()
+    sent.labels.return_value.inc.assert_called_once()
+    received.labels.return_value.inc.assert_called_once()
+
+
 async def test_retrieve_response_vector_db_available(
     prepare_agent_mocks: AgentFixtures, mocker: MockerFixture
 ) -> None:
@@ -1166,8 +1270,8 @@ def test_stream_build_event_error() -> None:
     assert '"token": "Something went wrong"' in result
 
 
-def test_stream_build_event_returns_heartbeat() -> None:
-    """Test stream_build_event function returns a 'heartbeat' when chunk is unrecognised."""
+def test_stream_build_event_ignores_unknown_chunk() -> None:
+    """Test stream_build_event function returns nothing when chunk is unrecognised."""
     # Create a mock chunk without an expected payload structure
     chunk = AgentTurnResponseStreamChunk(
         event=TurnResponseEvent(
@@ -1180,12 +1284,7 @@ def test_stream_build_event_returns_heartbeat() -> None:
         )
     )
 
-    result = next(stream_build_event(chunk, 0, {}))
-
-    assert result is not None
-    assert '"id": 0' in result
-    assert '"event": "token"' in result
-    assert '"token": "heartbeat"' in result
+    assert not list(stream_build_event(chunk, 0, {}))
 
 
 async def test_retrieve_response_with_mcp_servers(
@@ -2125,3 +2224,13 @@ class TestOLSCompatibilityIntegration:
         assert "input_tokens" in parsed["data"]
         assert "output_tokens" in parsed["data"]
         assert "available_quotas" in parsed  # At root level, not inside data
+
+    def test_end_event_reports_truncation(self) -> None:
+        """Test that truncation of conversation history is reported in end event."""
+        summary = TurnSummary(
+            llm_response="Test response", tool_calls=[], truncated=True
+        )
+        end_event = stream_end_event({}, summary, TokenCounter(), MEDIA_TYPE_JSON)
+        parsed = json.loads(end_event.replace("data: ", "").strip())
+
+        assert parsed["data"]["truncated"] is True
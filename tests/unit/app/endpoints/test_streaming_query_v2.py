@@ -0,0 +1,377 @@
+# pylint: disable=redefined-outer-name, import-error
+"""Unit tests for the /streaming_query (v2) REST API endpoint using Responses API."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+import pytest
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from llama_stack_client import APIConnectionError
+from pytest_mock import MockerFixture, MockType
+
+from app.endpoints.streaming_query_v2 import (
+    retrieve_response,
+    stream_build_event_v2,
+    streaming_query_endpoint_handler_v2,
+)
+from constants import MEDIA_TYPE_TEXT
+from models.config import DeadlinesConfiguration, StreamingConfiguration
+from models.requests import QueryRequest
+from utils.deadline import request_deadline
+from utils.resumable_stream import ResumableStreams
+from utils.types import TurnSummary
+
+MOCK_AUTH = ("user123", "", False, "token-abc")
+
+
+@pytest.fixture(autouse=True, name="check_prompt_size")
+def check_prompt_size_fixture(mocker: MockerFixture) -> MockType:
+    """Skip the pre-flight check of prompt size, tested in utils."""
+    return mocker.patch("app.endpoints.streaming_query_v2.check_prompt_size")
+
+
+@pytest.fixture
+def dummy_request() -> Request:
+    """Create a dummy FastAPI Request object for testing."""
+    req = Request(scope={"type": "http"})
+    req.state.authorized_actions = []
+    return req
+
+
+def _parse_events(chunks: list[str]) -> list[dict[str, Any]]:
+    """Parse SSE formatted events."""
+    return [json.loads(chunk.removeprefix("data: ")) for chunk in chunks]
+
+
+def _mcp_call_item() -> SimpleNamespace:
+    """Prepare output item of MCP tool call executed by Llama Stack."""
+    return SimpleNamespace(
+        type="mcp_call",
+        id="mcp-1",
+        name="list_pods",
+        arguments='{"namespace": "default"}',
+        server_label="k8s",
+        error=None,
+        output="pod-1",
+    )
+
+
+def test_stream_build_event_v2_text_delta() -> None:
+    """Test that text deltas are translated into token events."""
+    summary = TurnSummary(llm_response="", tool_calls=[])
+    event = SimpleNamespace(type="response.output_text.delta", delta="Hello")
+
+    events = _parse_events(list(stream_build_event_v2(event, 3, summary)))
+
+    assert events == [{"event": "token", "data": {"id": 3, "token": "Hello"}}]
+
+
+def test_stream_build_event_v2_text_delta_plain_text() -> None:
+    """Test that text deltas are streamed as they are for plain text media type."""
+    summary = TurnSummary(llm_response="", tool_calls=[])
+    event = SimpleNamespace(type="response.output_text.delta", delta="Hello")
+
+    assert list(stream_build_event_v2(event, 0, summary, MEDIA_TYPE_TEXT)) == ["Hello"]
+
+
+def test_stream_build_event_v2_tool_call() -> None:
+    """Test that executed tool calls are translated into tool_call and tool_result."""
+    summary = TurnSummary(llm_response="", tool_calls=[])
+
+    added = SimpleNamespace(type="response.output_item.added", item=_mcp_call_item())
+    done = SimpleNamespace(type="response.output_item.done", item=_mcp_call_item())
+    events = _parse_events(
+        list(stream_build_event_v2(added, 1, summary))
+        + list(stream_build_event_v2(done, 2, summary))
+    )
+
+    assert [e["event"] for e in events] == ["tool_call", "tool_call", "tool_result"]
+    assert events[0]["data"] == {"id": 1, "token": ""}
+    assert events[1]["data"]["token"] == {
+        "tool_name": "list_pods",
+        "arguments": {
+            "arguments": '{"namespace": "default"}',
+            "server_label": "k8s",
+        },
+    }
+    assert events[2]["data"]["token"] == {"tool_name": "list_pods", "response": "pod-1"}
+    assert len(summary.tool_calls) == 1
+    assert summary.tool_calls[0].id == "mcp-1"
+
+
+def test_stream_build_event_v2_function_call_without_result() -> None:
+    """Test that function calls to be executed by the client have no tool result."""
+    summary = TurnSummary(llm_response="", tool_calls=[])
+    item = SimpleNamespace(
+        type="function_call", id="fc-1", name="get_time", arguments="{}", status=None
+    )
+    done = SimpleNamespace(type="response.output_item.done", item=item)
+
+    events = _parse_events(list(stream_build_event_v2(done, 0, summary)))
+
+    assert [e["event"] for e in events] == ["tool_call"]
+
+
+def test_stream_build_event_v2_message_item() -> None:
+    """Test that message output items produce no events."""
+    summary = TurnSummary(llm_response="", tool_calls=[])
+    item = SimpleNamespace(type="message", role="assistant", content="Hello")
+    done = SimpleNamespace(type="response.output_item.done", item=item)
+
+    assert not list(stream_build_event_v2(done, 0, summary))
+    assert not summary.tool_calls
+
+
+def test_stream_build_event_v2_failed() -> None:
+    """Test that failed response is translated into error event."""
+    summary = TurnSummary(llm_response="", tool_calls=[])
+    event = SimpleNamespace(
+        type="response.failed",
+        response=SimpleNamespace(error=SimpleNamespace(message="model crashed")),
+    )
+
+    events = _parse_events(list(stream_build_event_v2(event, 5, summary)))
+
+    assert events == [{"event": "error", "data": {"id": 5, "token": "model crashed"}}]
+
+
+@pytest.mark.asyncio
+async def test_retrieve_response_streams(mocker: MockerFixture) -> None:
+    """Test that the Responses API is called in streaming mode."""
+    mock_client = mocker.Mock()
+    stream = mocker.Mock()
+    mock_client.responses.create = mocker.AsyncMock(return_value=stream)
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.prepare_responses_request",
+        return_value={"input": "hello", "model": "model-x", "instructions": "PROMPT"},
+    )
+
+    result, system_prompt, truncated = await retrieve_response(
+        mock_client, "model-x", QueryRequest(query="hello"), token="tkn"
+    )
+
+    assert result is stream
+    assert system_prompt == "PROMPT"
+    assert truncated is False
+    kwargs = mock_client.responses.create.call_args.kwargs
+    assert kwargs["stream"] is True
+    assert kwargs["model"] == "model-x"
+
+
+@pytest.mark.asyncio
+async def test_retrieve_response_propagates_deadline(mocker: MockerFixture) -> None:
+    """Test that the time remaining to the deadline is passed to the client call."""
+    mock_client = mocker.Mock()
+    mock_client.responses.create = mocker.AsyncMock(return_value=mocker.Mock())
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.prepare_responses_request",
+        return_value={"input": "hello", "model": "model-x", "instructions": "PROMPT"},
+    )
+
+    with request_deadline(DeadlinesConfiguration(turn_creation=5), "/v2/query"):
+        await retrieve_response(
+            mock_client, "model-x", QueryRequest(query="hello"), token="tkn"
+        )
+
+    assert mock_client.responses.create.call_args.kwargs["timeout"] == 5
+
+
+async def _response_stream() -> AsyncIterator[SimpleNamespace]:
+    """Simulate stream of Responses API events."""
+    message = SimpleNamespace(type="message", role="assistant", content="Hello!")
+    yield SimpleNamespace(
+        type="response.created", response=SimpleNamespace(id="resp-1")
+    )
+    yield SimpleNamespace(type="response.output_text.delta", delta="Hello")
+    yield SimpleNamespace(type="response.output_text.delta", delta="!")
+    yield SimpleNamespace(type="response.output_item.done", item=message)
+    yield SimpleNamespace(
+        type="response.completed",
+        response=SimpleNamespace(
+            id="resp-1",
+            output=[message],
+            usage={"input_tokens": 10, "output_tokens": 2},
+        ),
+    )
+
+
+def _mock_handler_dependencies(mocker: MockerFixture) -> Any:
+    """Mock dependencies of the handler, return mocked persistence of the turn."""
+    mock_config = mocker.Mock()
+    mock_config.quota_limiters = []
+    mocker.patch("app.endpoints.streaming_query_v2.configuration", mock_config)
+    mocker.patch("app.endpoints.streaming_query_v2.check_tokens_available")
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.AsyncLlamaStackClientHolder.get_client",
+        return_value=mocker.Mock(),
+    )
+    mock_catalog = mocker.patch("app.endpoints.streaming_query_v2.ModelCatalog")
+    mock_catalog.return_value.get = mocker.AsyncMock()
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.select_model_and_provider_id",
+        return_value=("llama/m", "m", "p"),
+    )
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.get_topic_summary", return_value="Topic"
+    )
+    return mocker.patch("app.endpoints.streaming_query_v2.persist_query_turn")
+
+
+@pytest.mark.asyncio
+async def test_streaming_query_endpoint_handler_v2(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that the Responses API stream is translated and the turn stored."""
+    persist = _mock_handler_dependencies(mocker)
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.retrieve_response",
+        return_value=(_response_stream(), "PROMPT", False),
+    )
+
+    response = await streaming_query_endpoint_handler_v2(
+        request=dummy_request,
+        query_request=QueryRequest(query="hi"),
+        auth=MOCK_AUTH,
+        mcp_headers={},
+    )
+    assert isinstance(response, StreamingResponse)
+    events = _parse_events([str(chunk) async for chunk in response.body_iterator])
+
+    assert [e["event"] for e in events] == [
+        "start",
+        "token",
+        "token",
+        "turn_complete",
+        "end",
+    ]
+    assert events[0]["data"]["conversation_id"] == "resp-1"
+    assert events[3]["data"]["token"] == "Hello!"
+    assert events[4]["data"]["input_tokens"] == 10
+    assert events[4]["data"]["output_tokens"] == 2
+
+    args = persist.call_args
+    assert args.args[1] == "resp-1"
+    assert args.args[5].llm_response == "Hello!"
+    assert args.args[7] == "Topic"
+    assert args.kwargs["consumed_tokens"].input_tokens == 10
+
+
+@pytest.mark.asyncio
+async def test_streaming_query_endpoint_handler_v2_resume(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that a reconnected client gets the rest of the same response."""
+    _mock_handler_dependencies(mocker)
+    retrieve = mocker.patch(
+        "app.endpoints.streaming_query_v2.retrieve_response",
+        return_value=(_response_stream(), "PROMPT", False),
+    )
+    mocker.patch("utils.resumable_stream.get_suid", return_value="stream")
+    ResumableStreams().configure(StreamingConfiguration())
+    try:
+        response = await streaming_query_endpoint_handler_v2(
+            request=dummy_request,
+            query_request=QueryRequest(query="hi"),
+            auth=MOCK_AUTH,
+            mcp_headers={},
+        )
+        first = await anext(response.body_iterator)
+        assert first.startswith("id: stream:0\ndata: ")
+        await response.body_iterator.aclose()  # type: ignore[attr-defined]
+
+        resumed = await streaming_query_endpoint_handler_v2(
+            request=dummy_request,
+            query_request=QueryRequest(query="hi"),
+            auth=MOCK_AUTH,
+            mcp_headers={},
+            last_event_id="stream:0",
+        )
+        chunks = [chunk async for chunk in resumed.body_iterator]
+    finally:
+        ResumableStreams().configure(StreamingConfiguration(resumable=False))
+
+    assert [chunk.split("\n", 1)[0] for chunk in chunks] == [
+        f"id: stream:{i}" for i in range(1, 5)
+    ]
+    events = _parse_events([chunk.split("\n", 1)[1] for chunk in chunks])
+    assert [e["event"] for e in events] == ["token", "token", "turn_complete", "end"]
+    retrieve.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_streaming_query_endpoint_handler_v2_client_disconnect(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that the turn is cancelled when the client goes away."""
+    persist = _mock_handler_dependencies(mocker)
+    record = mocker.patch("app.endpoints.streaming_query.record_cancelled_turn")
+    cancelled = mocker.patch("metrics.streams_cancelled_total")
+    closed = asyncio.Event()
+
+    async def endless_stream() -> AsyncIterator[SimpleNamespace]:
+        try:
+            yield SimpleNamespace(
+                type="response.created", response=SimpleNamespace(id="resp-1")
+            )
+            while True:
+                yield SimpleNamespace(type="response.output_text.delta", delta="la")
+        finally:
+            closed.set()
+
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.retrieve_response",
+        return_value=(endless_stream(), "PROMPT", False),
+    )
+
+    response = await streaming_query_endpoint_handler_v2(
+        request=dummy_request,
+        query_request=QueryRequest(query="hi"),
+        auth=MOCK_AUTH,
+        mcp_headers={},
+    )
+    events = _parse_events(
+        [await anext(response.body_iterator) for _ in range(3)]  # type: ignore
+    )
+    assert [e["event"] for e in events] == ["start", "token", "token"]
+    await response.body_iterator.aclose()  # type: ignore[attr-defined]
+
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    for _ in range(3):
+        await asyncio.sleep(0)
+    cancelled.inc.assert_called_once()
+    record.assert_awaited_once()
+    args = record.call_args.args
+    assert args[1] == "resp-1"
+    # the response is read ahead of the client by the keepalive
+    assert args[5].llm_response.startswith("lala")
+    persist.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_streaming_query_endpoint_handler_v2_api_connection_error(
+    mocker: MockerFixture, dummy_request: Request
+) -> None:
+    """Test that connection errors are reported before streaming starts."""
+    _mock_handler_dependencies(mocker)
+
+    def _raise(*_args: Any, **_kwargs: Any) -> Exception:
+        raise APIConnectionError(request=Request(scope={"type": "http"}))  # type: ignore
+
+    mocker.patch(
+        "app.endpoints.streaming_query_v2.retrieve_response", side_effect=_raise
+    )
+    fail_metric = mocker.patch("metrics.llm_calls_failures_total")
+
+    with pytest.raises(HTTPException) as exc:
+        await streaming_query_endpoint_handler_v2(
+            request=dummy_request,
+            query_request=QueryRequest(query="hi"),
+            auth=MOCK_AUTH,
+            mcp_headers={},
+        )
+
+    assert exc.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    fail_metric.inc.assert_called_once()
@@ -15,7 +15,10 @@ from app.endpoints import (
     shields,
     providers,
     query,
+    query_batch,
+    query_jobs,
     query_v2,
+    streaming_query_v2,
     health,
     config,
     feedback,
@@ -65,7 +68,7 @@ def test_include_routers() -> None:
     include_routers(app)
 
     # are all routers added?
-    assert len(app.routers) == 16
+    assert len(app.routers) == 19
     assert root.router in app.get_routers()
     assert info.router in app.get_routers()
     assert models.router in app.get_routers()
@@ -73,7 +76,10 @@ def test_include_routers() -> None:
     assert shields.router in app.get_routers()
     assert providers.router in app.get_routers()
     assert query.router in app.get_routers()
+    assert query_batch.router in app.get_routers()
+    assert query_jobs.router in app.get_routers()
     assert query_v2.router in app.get_routers()
+    assert streaming_query_v2.router in app.get_routers()
     assert streaming_query.router in app.get_routers()
     assert config.router in app.get_routers()
     assert feedback.router in app.get_routers()
@@ -90,7 +96,7 @@ def test_check_prefixes() -> None:
     include_routers(app)
 
     # are all routers added?
-    assert len(app.routers) == 16
+    assert len(app.routers) == 19
     assert app.get_router_prefix(root.router) == ""
     assert app.get_router_prefix(info.router) == "/v1"
     assert app.get_router_prefix(models.router) == "/v1"
@@ -98,8 +104,11 @@ def test_check_prefixes() -> None:
     assert app.get_router_prefix(shields.router) == "/v1"
     assert app.get_router_prefix(providers.router) == "/v1"
     assert app.get_router_prefix(query.router) == "/v1"
+    assert app.get_router_prefix(query_batch.router) == "/v1"
+    assert app.get_router_prefix(query_jobs.router) == "/v1"
     assert app.get_router_prefix(streaming_query.router) == "/v1"
     assert app.get_router_prefix(query_v2.router) == "/v2"
+    assert app.get_router_prefix(streaming_query_v2.router) == "/v2"
     assert app.get_router_prefix(config.router) == "/v1"
     assert app.get_router_prefix(feedback.router) == "/v1"
     assert app.get_router_prefix(health.router) == ""
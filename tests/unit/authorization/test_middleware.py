@@ -220,7 +220,7 @@ class TestPerformAuthorizationCheck:
         mock_resolvers: tuple[MockType, MockType],
         request_location: str,
     ) -> None:
-        """Test that authorized_actions are set on request state when present."""
+        """Test that authorized actions and roles are set on request state when present."""
         mocker.patch(
             "authorization.middleware.get_authorization_resolvers",
             return_value=mock_resolvers,
@@ -243,6 +243,7 @@ class TestPerformAuthorizationCheck:
 
         if request_location != "none":
             assert mock_request.state.authorized_actions == {Action.QUERY}
+            assert mock_request.state.user_roles == {"employee", "*"}
 
     async def test_everyone_role_added(
         self,
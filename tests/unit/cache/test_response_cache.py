@@ -0,0 +1,202 @@
+"""Unit tests for the response cache."""
+
+import pytest
+from pytest_mock import MockerFixture
+
+from cache.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    cache_bypass,
+    response_cache_key,
+)
+from models.config import ResponseCacheConfiguration
+from models.requests import Attachment, QueryRequest
+from utils.types import TurnSummary
+
+
+@pytest.fixture(name="response_cache")
+def response_cache_fixture() -> ResponseCache:
+    """Enabled response cache with small limits."""
+    cache = ResponseCache()
+    cache.configure(
+        ResponseCacheConfiguration(enabled=True, ttl=60, max_entries=2, max_size=4096)
+    )
+    yield cache
+    cache.configure(ResponseCacheConfiguration())
+
+
+def _response(
+    text: str = "answer", conversation_id: str = "conversation"
+) -> CachedResponse:
+    """Prepare response to be cached."""
+    return CachedResponse(
+        summary=TurnSummary(llm_response=text, tool_calls=[]),
+        conversation_id=conversation_id,
+        input_tokens=10,
+        output_tokens=20,
+        topic_summary="topic",
+    )
+
+
+def test_response_cache_key() -> None:
+    """Test that everything influencing the response is part of the key."""
+    query_request = QueryRequest(query="question")
+    key = response_cache_key("m", "p", "prompt", query_request, ["b", "a"])
+
+    assert key == response_cache_key("m", "p", "prompt", query_request, ["a", "b"])
+    assert key != response_cache_key("m2", "p", "prompt", query_request, ["a", "b"])
+    assert key != response_cache_key("m", "p2", "prompt", query_request, ["a", "b"])
+    assert key != response_cache_key("m", "p", "other", query_request, ["a", "b"])
+    assert key != response_cache_key("m", "p", "prompt", query_request, ["a"])
+    assert key != response_cache_key(
+        "m", "p", "prompt", QueryRequest(query="other question"), ["a", "b"]
+    )
+    assert key != response_cache_key(
+        "m", "p", "prompt", QueryRequest(query="question", no_tools=True), ["a", "b"]
+    )
+    with_attachment = QueryRequest(
+        query="question",
+        attachments=[
+            Attachment(attachment_type="log", content_type="text/plain", content="log")
+        ],
+    )
+    assert key != response_cache_key("m", "p", "prompt", with_attachment, ["a", "b"])
+    assert key != response_cache_key(
+        "m", "p", "prompt", query_request, ["a", "b"], user_id="user"
+    )
+
+
+@pytest.mark.parametrize(
+    "cache_control,expected",
+    [
+        (None, (False, False)),
+        ("", (False, False)),
+        ("max-age=0", (False, False)),
+        ("no-cache", (True, False)),
+        ("No-Cache", (True, False)),
+        ("no-store", (True, True)),
+        ("max-age=0, no-store", (True, True)),
+    ],
+)
+def test_cache_bypass(cache_control: str | None, expected: tuple[bool, bool]) -> None:
+    """Test interpretation of the Cache-Control header."""
+    assert cache_bypass(cache_control) == expected
+
+
+def test_cached_response_token_usage() -> None:
+    """Test token usage of the original response."""
+    token_usage = _response().token_usage
+    assert token_usage.input_tokens == 10
+    assert token_usage.output_tokens == 20
+
+
+def test_response_cache_is_singleton() -> None:
+    """Test that the response cache is a singleton."""
+    assert ResponseCache() is ResponseCache()
+
+
+def test_response_cache_disabled_by_default() -> None:
+    """Test that the cache is disabled by default configuration."""
+    cache = ResponseCache()
+    cache.configure(ResponseCacheConfiguration())
+    assert not cache.enabled
+
+
+def test_response_cache_get_put(response_cache: ResponseCache) -> None:
+    """Test storing and retrieving cached responses."""
+    assert response_cache.get("key") is None
+
+    response_cache.put("key", _response())
+    cached = response_cache.get("key")
+    assert cached is not None
+    assert cached.summary.llm_response == "answer"
+    assert len(response_cache) == 1
+    assert response_cache.size > 0
+
+
+def test_response_cache_expiration(
+    response_cache: ResponseCache, mocker: MockerFixture
+) -> None:
+    """Test that expired responses are not returned."""
+    mock_time = mocker.patch("cache.response_cache.time.monotonic", return_value=100)
+    response_cache.put("key", _response())
+
+    mock_time.return_value = 159
+    assert response_cache.get("key") is not None
+
+    mock_time.return_value = 160
+    assert response_cache.get("key") is None
+    assert len(response_cache) == 0
+    assert response_cache.size == 0
+
+
+def test_response_cache_max_entries(response_cache: ResponseCache) -> None:
+    """Test that least recently used responses are evicted."""
+    response_cache.put("key1", _response())
+    response_cache.put("key2", _response())
+    # touch key1 so key2 becomes the least recently used entry
+    assert response_cache.get("key1") is not None
+    response_cache.put("key3", _response())
+
+    assert len(response_cache) == 2
+    assert response_cache.get("key1") is not None
+    assert response_cache.get("key2") is None
+    assert response_cache.get("key3") is not None
+
+
+def test_response_cache_max_size(response_cache: ResponseCache) -> None:
+    """Test that the total size of cached responses is limited."""
+    # larger than the whole cache
+    response_cache.put("huge", _response("x" * 5000))
+    assert response_cache.get("huge") is None
+
+    response_cache.put("key1", _response("x" * 2500))
+    response_cache.put("key2", _response("y" * 2500))
+    assert response_cache.size <= 4096
+    assert response_cache.get("key1") is None
+    assert response_cache.get("key2") is not None
+
+
+def test_response_cache_replace(response_cache: ResponseCache) -> None:
+    """Test that storing the same key replaces the response."""
+    response_cache.put("key", _response("first"))
+    size = response_cache.size
+    response_cache.put("key", _response("again"))
+
+    assert len(response_cache) == 1
+    assert response_cache.size == size
+    cached = response_cache.get("key")
+    assert cached is not None
+    assert cached.summary.llm_response == "again"
+
+
+def test_response_cache_invalidate_conversation(
+    response_cache: ResponseCache,
+) -> None:
+    """Test that responses of a deleted conversation are dropped."""
+    response_cache.put("key1", _response(conversation_id="deleted"))
+    response_cache.put("key2", _response(conversation_id="other"))
+
+    response_cache.invalidate_conversation("deleted")
+
+    assert len(response_cache) == 1
+    assert response_cache.get("key1") is None
+    assert response_cache.get("key2") is not None
+    assert response_cache.size == len(
+        _response(conversation_id="other").model_dump_json()
+    )
+
+
+def test_response_cache_metrics(
+    response_cache: ResponseCache, mocker: MockerFixture
+) -> None:
+    """Test that hits and misses are counted."""
+    hits = mocker.patch("metrics.response_cache_hits_total")
+    misses = mocker.patch("metrics.response_cache_misses_total")
+
+    response_cache.get("key")
+    response_cache.put("key", _response())
+    response_cache.get("key")
+
+    hits.inc.assert_called_once()
+    misses.inc.assert_called_once()
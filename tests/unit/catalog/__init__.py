@@ -0,0 +1 @@
+"""Test cases for cached Llama Stack catalogs."""
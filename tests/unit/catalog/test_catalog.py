@@ -0,0 +1,168 @@
+"""Unit tests for the Catalog base class."""
+
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from catalog.catalog import Catalog
+from models.config import CatalogConfiguration
+
+
+class CountingCatalog(Catalog[list[str]]):
+    """Catalog that records how many times data were fetched."""
+
+    def __init__(self) -> None:
+        """Initialize the catalog with zero fetches."""
+        super().__init__()
+        self.fetches = 0
+
+    async def _fetch(self, client: object) -> list[str]:
+        """Return a new snapshot on each fetch."""
+        self.fetches += 1
+        await asyncio.sleep(0)
+        return [f"item-{self.fetches}"]
+
+
+@pytest.mark.asyncio
+async def test_get_fetches_once_within_ttl(mocker: MockerFixture) -> None:
+    """Test that snapshot is fetched only once while it is fresh."""
+    catalog = CountingCatalog()
+    client = mocker.Mock()
+
+    assert await catalog.get(client) == ["item-1"]
+    assert await catalog.get(client) == ["item-1"]
+    assert catalog.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_get_refetches_after_ttl_expires(mocker: MockerFixture) -> None:
+    """Test that an expired snapshot is fetched again."""
+    catalog = CountingCatalog()
+    client = mocker.Mock()
+    monotonic = mocker.patch("catalog.catalog.time.monotonic", return_value=1000.0)
+
+    await catalog.get(client)
+    monotonic.return_value = 1000.0 + catalog.ttl + 1
+    assert await catalog.get(client) == ["item-2"]
+    assert catalog.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate(mocker: MockerFixture) -> None:
+    """Test that invalidation forces a new fetch."""
+    catalog = CountingCatalog()
+    client = mocker.Mock()
+
+    await catalog.get(client)
+    catalog.invalidate()
+    assert not catalog.is_fresh(client)
+    assert await catalog.get(client) == ["item-2"]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_refresh(mocker: MockerFixture) -> None:
+    """Test that a refresh started before invalidation is not stored."""
+    catalog = CountingCatalog()
+    client = mocker.Mock()
+
+    in_flight = asyncio.create_task(catalog.get(client))
+    await asyncio.sleep(0)
+    catalog.invalidate()
+
+    # the caller of the stale refresh still gets its result
+    assert await in_flight == ["item-1"]
+    assert not catalog.is_fresh(client)
+    assert await catalog.get(client) == ["item-2"]
+    assert catalog.is_fresh(client)
+
+
+@pytest.mark.asyncio
+async def test_get_refetches_for_different_client(mocker: MockerFixture) -> None:
+    """Test that snapshot loaded by one client is not reused for another one."""
+    catalog = CountingCatalog()
+
+    await catalog.get(mocker.Mock())
+    await catalog.get(mocker.Mock())
+    assert catalog.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_shares_one_fetch(mocker: MockerFixture) -> None:
+    """Test that concurrent callers share one in-flight refresh."""
+    catalog = CountingCatalog()
+    client = mocker.Mock()
+
+    results = await asyncio.gather(*(catalog.get(client) for _ in range(5)))
+    assert results == [["item-1"]] * 5
+    assert catalog.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_keeps_old_snapshot(mocker: MockerFixture) -> None:
+    """Test that fetch errors are propagated and the old snapshot is kept."""
+    catalog = CountingCatalog()
+    client = mocker.Mock()
+    await catalog.get(client)
+
+    mocker.patch.object(catalog, "_fetch", side_effect=ConnectionError("boom"))
+    with pytest.raises(ConnectionError, match="boom"):
+        await catalog.refresh(client)
+    assert catalog.is_fresh(client)
+    assert await catalog.get(client) == ["item-1"]
+
+
+def test_configure() -> None:
+    """Test that configuration is applied and the snapshot dropped."""
+    catalog = CountingCatalog()
+    catalog.configure(CatalogConfiguration(ttl=42, background_refresh=False))
+    assert catalog.ttl == 42
+    assert catalog.background_refresh is False
+
+
+@pytest.mark.asyncio
+async def test_background_refresh(mocker: MockerFixture) -> None:
+    """Test that background task refreshes the snapshot."""
+    catalog = CountingCatalog()
+    catalog.ttl = 0.01
+    client = mocker.Mock()
+
+    catalog.start_background_refresh(client)
+    await asyncio.sleep(0.05)
+    await catalog.stop_background_refresh()
+
+    assert catalog.fetches >= 2
+    assert catalog.is_fresh(client) or catalog.fetches >= 2
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_survives_errors(mocker: MockerFixture) -> None:
+    """Test that errors in background refresh do not stop the task."""
+    catalog = CountingCatalog()
+    catalog.ttl = 0.01
+    fetch = mocker.patch.object(
+        catalog, "_fetch", side_effect=ConnectionError("unreachable")
+    )
+
+    catalog.start_background_refresh(mocker.Mock())
+    await asyncio.sleep(0.05)
+    await catalog.stop_background_refresh()
+
+    assert fetch.call_count >= 2
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_disabled(mocker: MockerFixture) -> None:
+    """Test that no task is started when background refresh is disabled."""
+    catalog = CountingCatalog()
+    catalog.background_refresh = False
+
+    catalog.start_background_refresh(mocker.Mock())
+    assert catalog._background_task is None  # pylint: disable=protected-access
+    await catalog.stop_background_refresh()
+
+
+def test_catalog_without_fetch_can_not_be_created() -> None:
+    """Test that catalogs must implement the `_fetch` method."""
+    with pytest.raises(TypeError, match="_fetch"):
+        Catalog()  # type: ignore[abstract]  # pylint: disable=abstract-class-instantiated
@@ -0,0 +1,73 @@
+"""Unit tests for the model catalog."""
+
+import pytest
+from pytest_mock import MockerFixture
+
+from catalog.model_catalog import ModelCatalog, ModelIndex
+
+
+def _models(mocker: MockerFixture) -> list:
+    """Prepare list of mocked models as returned by Llama Stack."""
+    return [
+        mocker.Mock(
+            identifier="all-MiniLM-L6-v2", model_type="embedding", provider_id="p0"
+        ),
+        mocker.Mock(identifier="p1/model1", model_type="llm", provider_id="p1"),
+        mocker.Mock(identifier="p2/model2", model_type="llm", provider_id="p2"),
+    ]
+
+
+def test_model_index_lookup(mocker: MockerFixture) -> None:
+    """Test lookup of models by provider and identifier."""
+    models = _models(mocker)
+    index = ModelIndex(models)
+
+    assert len(index) == 3
+    assert list(index) == models
+    assert index.get("p1", "p1/model1") is models[1]
+    assert index.get("p2", "p1/model1") is None
+    assert ("p2", "p2/model2") in index
+    assert ("p2", "model2") not in index
+
+
+def test_model_index_default_llm(mocker: MockerFixture) -> None:
+    """Test that the first LLM model is precomputed."""
+    models = _models(mocker)
+    index = ModelIndex(models)
+
+    assert index.default_llm is models[1]
+    assert index.llms == models[1:]
+
+
+def test_model_index_no_llm(mocker: MockerFixture) -> None:
+    """Test index without any LLM model."""
+    index = ModelIndex(_models(mocker)[:1])
+    assert index.default_llm is None
+    assert not index.llms
+
+    index = ModelIndex([])
+    assert index.default_llm is None
+    assert len(index) == 0
+
+
+def test_model_catalog_is_singleton() -> None:
+    """Test that the model catalog is a singleton."""
+    assert ModelCatalog() is ModelCatalog()
+
+
+@pytest.mark.asyncio
+async def test_model_catalog_get(mocker: MockerFixture) -> None:
+    """Test that models are retrieved once and then served from the catalog."""
+    mock_client = mocker.AsyncMock()
+    mock_client.models.list.return_value = _models(mocker)
+
+    catalog = ModelCatalog()
+    catalog.invalidate()
+
+    index = await catalog.get(mock_client)
+    assert index.default_llm is not None
+    assert index.default_llm.identifier == "p1/model1"
+
+    index = await catalog.get(mock_client)
+    assert len(index) == 3
+    mock_client.models.list.assert_called_once()
@@ -0,0 +1,70 @@
+"""Unit tests for the shield catalog."""
+
+import pytest
+from pytest_mock import MockerFixture
+
+from catalog.shield_catalog import (
+    ShieldCatalog,
+    ShieldIndex,
+    is_input_shield,
+    is_output_shield,
+)
+
+
+def _shields(mocker: MockerFixture) -> list:
+    """Prepare list of mocked shields as returned by Llama Stack."""
+    return [
+        mocker.Mock(identifier="input_shield"),
+        mocker.Mock(identifier="output_shield"),
+        mocker.Mock(identifier="inout_shield"),
+        mocker.Mock(identifier="shield"),
+    ]
+
+
+def test_shield_classification(mocker: MockerFixture) -> None:
+    """Test classification of shields into input and output ones."""
+    shields = _shields(mocker)
+
+    assert [is_input_shield(s) for s in shields] == [True, False, True, True]
+    assert [is_output_shield(s) for s in shields] == [False, True, True, False]
+
+
+def test_shield_index(mocker: MockerFixture) -> None:
+    """Test that input and output shields are precomputed."""
+    shields = _shields(mocker)
+    index = ShieldIndex(shields)
+
+    assert len(index) == 4
+    assert list(index) == shields
+    assert index.input_shields == ["input_shield", "inout_shield", "shield"]
+    assert index.output_shields == ["output_shield", "inout_shield"]
+
+
+def test_shield_index_empty() -> None:
+    """Test index without any shield."""
+    index = ShieldIndex([])
+    assert len(index) == 0
+    assert not index.input_shields
+    assert not index.output_shields
+
+
+def test_shield_catalog_is_singleton() -> None:
+    """Test that the shield catalog is a singleton."""
+    assert ShieldCatalog() is ShieldCatalog()
+
+
+@pytest.mark.asyncio
+async def test_shield_catalog_get(mocker: MockerFixture) -> None:
+    """Test that shields are retrieved once and then served from the catalog."""
+    mock_client = mocker.AsyncMock()
+    mock_client.shields.list.return_value = _shields(mocker)
+
+    catalog = ShieldCatalog()
+    catalog.invalidate()
+
+    index = await catalog.get(mock_client)
+    assert index.output_shields == ["output_shield", "inout_shield"]
+
+    index = await catalog.get(mock_client)
+    assert len(index) == 4
+    mock_client.shields.list.assert_called_once()
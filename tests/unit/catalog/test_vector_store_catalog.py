@@ -0,0 +1,67 @@
+"""Unit tests for the vector store catalog."""
+
+import pytest
+from pytest_mock import MockerFixture
+
+from catalog.vector_store_catalog import (
+    VectorStoreCatalog,
+    VectorStoreIndex,
+    get_rag_tools,
+)
+
+
+def test_get_rag_tools() -> None:
+    """Test get_rag_tools returns None for empty list and correct tool format for vector stores."""
+    assert get_rag_tools([]) is None
+
+    tools = get_rag_tools(["db1", "db2"])
+    assert isinstance(tools, list)
+    assert tools[0]["type"] == "file_search"
+    assert tools[0]["vector_store_ids"] == ["db1", "db2"]
+    assert tools[0]["max_num_results"] == 10
+
+
+def test_vector_store_index(mocker: MockerFixture) -> None:
+    """Test that vector store IDs and RAG tools are precomputed."""
+    vector_stores = [mocker.Mock(id="db1"), mocker.Mock(id="db2")]
+    index = VectorStoreIndex(vector_stores)
+
+    assert len(index) == 2
+    assert list(index) == vector_stores
+    assert index.ids == ["db1", "db2"]
+    assert index.rag_tools == get_rag_tools(["db1", "db2"])
+
+
+def test_vector_store_index_empty() -> None:
+    """Test index without any vector store."""
+    index = VectorStoreIndex([])
+    assert len(index) == 0
+    assert not index.ids
+    assert index.rag_tools is None
+
+
+def test_vector_store_catalog_is_singleton() -> None:
+    """Test that the vector store catalog is a singleton."""
+    assert VectorStoreCatalog() is VectorStoreCatalog()
+
+
+@pytest.mark.asyncio
+async def test_vector_store_catalog_get(mocker: MockerFixture) -> None:
+    """Test that vector stores are retrieved once until the catalog is invalidated."""
+    mock_client = mocker.AsyncMock()
+    mock_client.vector_stores.list.return_value = mocker.Mock(
+        data=[mocker.Mock(id="db1")]
+    )
+
+    catalog = VectorStoreCatalog()
+    catalog.invalidate()
+
+    index = await catalog.get(mock_client)
+    assert index.ids == ["db1"]
+    index = await catalog.get(mock_client)
+    assert index.ids == ["db1"]
+    mock_client.vector_stores.list.assert_called_once()
+
+    catalog.invalidate()
+    await catalog.get(mock_client)
+    assert mock_client.vector_stores.list.call_count == 2
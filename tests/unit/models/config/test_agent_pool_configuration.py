@@ -0,0 +1,26 @@
+"""Unit tests for AgentPoolConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import AgentPoolConfiguration
+
+
+def test_agent_pool_configuration_defaults() -> None:
+    """Test the default values of agent pool configuration."""
+    c = AgentPoolConfiguration()
+    assert c.max_agents == constants.DEFAULT_AGENT_POOL_SIZE
+
+
+def test_agent_pool_configuration_custom_values() -> None:
+    """Test the agent pool configuration with explicit values."""
+    c = AgentPoolConfiguration(max_agents=10)
+    assert c.max_agents == 10
+
+
+def test_agent_pool_configuration_improper_max_agents() -> None:
+    """Test that maximum number of agents must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = AgentPoolConfiguration(max_agents=0)
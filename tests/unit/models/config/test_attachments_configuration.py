@@ -0,0 +1,27 @@
+"""Unit tests for AttachmentsConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import AttachmentsConfiguration
+
+
+def test_attachments_configuration_defaults() -> None:
+    """Test the default values of attachments configuration."""
+    c = AttachmentsConfiguration()
+    assert c.max_attachment_size == constants.DEFAULT_MAX_ATTACHMENT_SIZE
+    assert c.max_request_size == constants.DEFAULT_MAX_ATTACHMENTS_SIZE
+    assert c.deduplicate is True
+    assert c.max_conversations == constants.DEFAULT_ATTACHMENT_INDEX_MAX_CONVERSATIONS
+
+
+def test_attachments_configuration_improper_values() -> None:
+    """Test that limits must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = AttachmentsConfiguration(max_attachment_size=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = AttachmentsConfiguration(max_request_size=-1)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = AttachmentsConfiguration(max_conversations=0)
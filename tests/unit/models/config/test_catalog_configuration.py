@@ -0,0 +1,28 @@
+"""Unit tests for CatalogConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import CatalogConfiguration
+
+
+def test_catalog_configuration_defaults() -> None:
+    """Test the default values of catalog configuration."""
+    c = CatalogConfiguration()
+    assert c.ttl == constants.DEFAULT_CATALOG_TTL
+    assert c.background_refresh is True
+
+
+def test_catalog_configuration_custom_values() -> None:
+    """Test the catalog configuration with explicit values."""
+    c = CatalogConfiguration(ttl=60, background_refresh=False)
+    assert c.ttl == 60
+    assert c.background_refresh is False
+
+
+def test_catalog_configuration_improper_ttl() -> None:
+    """Test that TTL must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = CatalogConfiguration(ttl=0)
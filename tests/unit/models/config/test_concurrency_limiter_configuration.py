@@ -0,0 +1,43 @@
+"""Unit tests for ConcurrencyLimiterConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import ConcurrencyLimiterConfiguration
+
+
+def test_concurrency_limiter_configuration_defaults() -> None:
+    """Test the default values of concurrency limiter configuration."""
+    c = ConcurrencyLimiterConfiguration()
+    assert c.enabled is False
+    assert c.initial_limit == constants.DEFAULT_CONCURRENCY_INITIAL_LIMIT
+    assert c.min_limit == constants.DEFAULT_CONCURRENCY_MIN_LIMIT
+    assert c.max_limit == constants.DEFAULT_CONCURRENCY_MAX_LIMIT
+    assert c.latency_threshold == constants.DEFAULT_CONCURRENCY_LATENCY_THRESHOLD
+    assert c.queue_size == constants.DEFAULT_CONCURRENCY_QUEUE_SIZE
+    assert c.queue_timeout == constants.DEFAULT_CONCURRENCY_QUEUE_TIMEOUT
+    assert c.failure_threshold == constants.DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD
+    assert c.reset_timeout == constants.DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT
+
+
+def test_concurrency_limiter_configuration_custom_values() -> None:
+    """Test the concurrency limiter configuration with explicit values."""
+    c = ConcurrencyLimiterConfiguration(
+        initial_limit=4, min_limit=2, max_limit=8, queue_size=0
+    )
+    assert c.initial_limit == 4
+    assert c.min_limit == 2
+    assert c.max_limit == 8
+    assert c.queue_size == 0
+
+
+def test_concurrency_limiter_configuration_improper_limits() -> None:
+    """Test that the initial limit must be between minimal and maximal limit."""
+    with pytest.raises(ValidationError, match="min_limit <= initial_limit"):
+        _ = ConcurrencyLimiterConfiguration(initial_limit=200)
+    with pytest.raises(ValidationError, match="min_limit <= initial_limit"):
+        _ = ConcurrencyLimiterConfiguration(initial_limit=2, min_limit=4)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = ConcurrencyLimiterConfiguration(initial_limit=0)
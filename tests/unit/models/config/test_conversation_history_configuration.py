@@ -0,0 +1,37 @@
+"""Unit tests for ConversationHistoryConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import ConversationHistoryConfiguration
+
+
+def test_conversation_history_configuration_defaults() -> None:
+    """Test the default values of conversation history configuration."""
+    c = ConversationHistoryConfiguration()
+    assert c.enabled is False
+    assert c.default_budget == constants.DEFAULT_HISTORY_TOKEN_BUDGET
+    assert not c.model_budgets
+    assert c.token_counter == constants.HISTORY_TOKEN_COUNTER_LLAMA3
+
+
+def test_conversation_history_configuration_budget() -> None:
+    """Test lookup of token budgets of models."""
+    c = ConversationHistoryConfiguration(
+        default_budget=1000,
+        model_budgets={"openai/gpt-4o": 4000, "llama3.2:3b": 2000},
+    )
+    assert c.budget("openai/gpt-4o") == 4000
+    assert c.budget("ollama/llama3.2:3b") == 2000
+    assert c.budget("llama3.2:3b") == 2000
+    assert c.budget("openai/gpt-4o-mini") == 1000
+
+
+def test_conversation_history_configuration_improper_values() -> None:
+    """Test that budgets must be positive and token counter known."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = ConversationHistoryConfiguration(default_budget=0)
+    with pytest.raises(ValidationError, match="Input should be 'llama3'"):
+        _ = ConversationHistoryConfiguration(token_counter="tiktoken")
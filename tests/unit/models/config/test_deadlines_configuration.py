@@ -0,0 +1,38 @@
+"""Unit tests for DeadlinesConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import DeadlinesConfiguration
+
+
+def test_deadlines_configuration_defaults() -> None:
+    """Test the default values of deadlines configuration."""
+    c = DeadlinesConfiguration()
+    assert c.enabled is True
+    assert c.request == constants.DEFAULT_REQUEST_DEADLINE
+    assert c.endpoints == constants.DEFAULT_ENDPOINT_DEADLINES
+    assert c.model_listing == constants.DEFAULT_MODEL_LISTING_DEADLINE
+    assert c.agent_init == constants.DEFAULT_AGENT_INIT_DEADLINE
+    assert c.turn_creation == constants.DEFAULT_TURN_CREATION_DEADLINE
+    assert c.topic_summary == constants.TOPIC_SUMMARY_DEADLINE
+
+
+def test_deadlines_configuration_custom_values() -> None:
+    """Test the deadlines configuration with explicit values."""
+    c = DeadlinesConfiguration(
+        request=60, endpoints={"/v1/streaming_query": 120}, turn_creation=50
+    )
+    assert c.request == 60
+    assert c.endpoints == {"/v1/streaming_query": 120}
+    assert c.turn_creation == 50
+
+
+def test_deadlines_configuration_improper_budget() -> None:
+    """Test that budgets must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = DeadlinesConfiguration(request=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = DeadlinesConfiguration(endpoints={"/v1/query": -1})
@@ -94,6 +94,19 @@ def test_dump_configuration(tmp_path: Path) -> None:
         assert "database" in content
         assert "byok_rag" in content
         assert "quota_handlers" in content
+        assert "catalog" in content
+        assert "agent_pool" in content
+        assert "response_cache" in content
+        assert "write_behind" in content
+        assert "batch_query" in content
+        assert "query_jobs" in content
+        assert "deadlines" in content
+        assert "concurrency_limiter" in content
+        assert "fair_scheduling" in content
+        assert "conversation_history" in content
+        assert "prompt_size" in content
+        assert "attachments" in content
+        assert "streaming" in content
 
         # check the whole deserialized JSON file content
         assert content == {
@@ -105,6 +118,7 @@ def test_dump_configuration(tmp_path: Path) -> None:
                 "workers": 1,
                 "color_log": True,
                 "access_log": True,
+                "server_timing": False,
                 "tls_config": {
                     "tls_certificate_path": "tests/configuration/server.crt",
                     "tls_key_password": "tests/configuration/password",
@@ -134,6 +148,7 @@ def test_dump_configuration(tmp_path: Path) -> None:
                 "use_as_library_client": True,
                 "api_key": "**********",
                 "library_client_config_path": "tests/configuration/run.yaml",
+                "timeout": None,
             },
             "user_data_collection": {
                 "feedback_enabled": False,
@@ -183,6 +198,95 @@ def test_dump_configuration(tmp_path: Path) -> None:
                 "scheduler": {"period": 1},
                 "enable_token_history": False,
             },
+            "catalog": {
+                "ttl": 300,
+                "background_refresh": True,
+            },
+            "agent_pool": {
+                "max_agents": 1024,
+            },
+            "response_cache": {
+                "enabled": False,
+                "ttl": 3600,
+                "max_entries": 1024,
+                "max_size": 67108864,
+                "single_flight": True,
+            },
+            "write_behind": {
+                "enabled": True,
+                "durability": "wait_for_ack",
+                "queue_size": 1024,
+                "workers": 1,
+                "batch_size": 32,
+            },
+            "batch_query": {
+                "max_queries": 1000,
+                "concurrency": 8,
+            },
+            "query_jobs": {
+                "workers": 4,
+                "queue_size": 100,
+                "retention": 86400,
+                "max_wait": 60,
+            },
+            "deadlines": {
+                "enabled": True,
+                "request": 300.0,
+                "endpoints": {"/v1/query/batch": 3600.0},
+                "model_listing": 10.0,
+                "agent_init": 30.0,
+                "turn_creation": 240.0,
+                "topic_summary": 10.0,
+            },
+            "concurrency_limiter": {
+                "enabled": False,
+                "initial_limit": 16,
+                "min_limit": 1,
+                "max_limit": 128,
+                "latency_threshold": 30.0,
+                "queue_size": 64,
+                "queue_timeout": 10.0,
+                "failure_threshold": 5,
+                "reset_timeout": 30.0,
+            },
+            "fair_scheduling": {
+                "enabled": False,
+                "max_in_flight": 64,
+                "max_in_flight_per_user": 4,
+                "max_queued_per_user": 16,
+                "queue_timeout": 60.0,
+                "role_weights": {},
+            },
+            "conversation_history": {
+                "enabled": False,
+                "default_budget": 16384,
+                "model_budgets": {},
+                "token_counter": "llama3",
+            },
+            "prompt_size": {
+                "enabled": True,
+                "default_context_size": None,
+                "model_context_sizes": {},
+                "token_counter": "approximate",
+            },
+            "attachments": {
+                "max_attachment_size": 4194304,
+                "max_request_size": 16777216,
+                "deduplicate": True,
+                "max_conversations": 10000,
+            },
+            "streaming": {
+                "coalesce_tokens": False,
+                "coalescing_window": 0.03,
+                "coalescing_max_size": 1024,
+                "resumable": True,
+                "replay_buffer_size": 2048,
+                "resume_retention": 60.0,
+                "max_resumable_streams": 1000,
+                "disconnect_grace_period": 10.0,
+                "keepalive": True,
+                "keepalive_interval": 15.0,
+            },
         }
 
 
@@ -403,6 +507,7 @@ def test_dump_configuration_with_quota_limiters(tmp_path: Path) -> None:
                 "workers": 1,
                 "color_log": True,
                 "access_log": True,
+                "server_timing": False,
                 "tls_config": {
                     "tls_certificate_path": "tests/configuration/server.crt",
                     "tls_key_password": "tests/configuration/password",
@@ -432,6 +537,7 @@ def test_dump_configuration_with_quota_limiters(tmp_path: Path) -> None:
                 "use_as_library_client": True,
                 "api_key": "**********",
                 "library_client_config_path": "tests/configuration/run.yaml",
+                "timeout": None,
             },
             "user_data_collection": {
                 "feedback_enabled": False,
@@ -496,4 +602,93 @@ def test_dump_configuration_with_quota_limiters(tmp_path: Path) -> None:
                 "scheduler": {"period": 10},
                 "enable_token_history": True,
             },
+            "catalog": {
+                "ttl": 300,
+                "background_refresh": True,
+            },
+            "agent_pool": {
+                "max_agents": 1024,
+            },
+            "response_cache": {
+                "enabled": False,
+                "ttl": 3600,
+                "max_entries": 1024,
+                "max_size": 67108864,
+                "single_flight": True,
+            },
+            "write_behind": {
+                "enabled": True,
+                "durability": "wait_for_ack",
+                "queue_size": 1024,
+                "workers": 1,
+                "batch_size": 32,
+            },
+            "batch_query": {
+                "max_queries": 1000,
+                "concurrency": 8,
+            },
+            "query_jobs": {
+                "workers": 4,
+                "queue_size": 100,
+                "retention": 86400,
+                "max_wait": 60,
+            },
+            "deadlines": {
+                "enabled": True,
+                "request": 300.0,
+                "endpoints": {"/v1/query/batch": 3600.0},
+                "model_listing": 10.0,
+                "agent_init": 30.0,
+                "turn_creation": 240.0,
+                "topic_summary": 10.0,
+            },
+            "concurrency_limiter": {
+                "enabled": False,
+                "initial_limit": 16,
+                "min_limit": 1,
+                "max_limit": 128,
+                "latency_threshold": 30.0,
+                "queue_size": 64,
+                "queue_timeout": 10.0,
+                "failure_threshold": 5,
+                "reset_timeout": 30.0,
+            },
+            "fair_scheduling": {
+                "enabled": False,
+                "max_in_flight": 64,
+                "max_in_flight_per_user": 4,
+                "max_queued_per_user": 16,
+                "queue_timeout": 60.0,
+                "role_weights": {},
+            },
+            "conversation_history": {
+                "enabled": False,
+                "default_budget": 16384,
+                "model_budgets": {},
+                "token_counter": "llama3",
+            },
+            "prompt_size": {
+                "enabled": True,
+                "default_context_size": None,
+                "model_context_sizes": {},
+                "token_counter": "approximate",
+            },
+            "attachments": {
+                "max_attachment_size": 4194304,
+                "max_request_size": 16777216,
+                "deduplicate": True,
+                "max_conversations": 10000,
+            },
+            "streaming": {
+                "coalesce_tokens": False,
+                "coalescing_window": 0.03,
+                "coalescing_max_size": 1024,
+                "resumable": True,
+                "replay_buffer_size": 2048,
+                "resume_retention": 60.0,
+                "max_resumable_streams": 1000,
+                "disconnect_grace_period": 10.0,
+                "keepalive": True,
+                "keepalive_interval": 15.0,
+            },
         }
@@ -0,0 +1,39 @@
+"""Unit tests for FairSchedulingConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import FairSchedulingConfiguration
+
+
+def test_fair_scheduling_configuration_defaults() -> None:
+    """Test the default values of fair scheduling configuration."""
+    c = FairSchedulingConfiguration()
+    assert c.enabled is False
+    assert c.max_in_flight == constants.DEFAULT_FAIR_SCHEDULING_MAX_IN_FLIGHT
+    assert (
+        c.max_in_flight_per_user
+        == constants.DEFAULT_FAIR_SCHEDULING_MAX_IN_FLIGHT_PER_USER
+    )
+    assert (
+        c.max_queued_per_user == constants.DEFAULT_FAIR_SCHEDULING_MAX_QUEUED_PER_USER
+    )
+    assert c.queue_timeout == constants.DEFAULT_FAIR_SCHEDULING_QUEUE_TIMEOUT
+    assert not c.role_weights
+
+
+def test_fair_scheduling_configuration_weight() -> None:
+    """Test that users get the highest weight of their roles."""
+    c = FairSchedulingConfiguration(role_weights={"admin": 4, "premium": 2})
+    assert c.weight({"*", "premium", "admin"}) == 4
+    assert c.weight({"*", "premium"}) == 2
+    assert c.weight({"*"}) == constants.DEFAULT_FAIR_SCHEDULING_WEIGHT
+    assert c.weight(set()) == constants.DEFAULT_FAIR_SCHEDULING_WEIGHT
+
+
+def test_fair_scheduling_configuration_improper_weight() -> None:
+    """Test that role weights must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = FairSchedulingConfiguration(role_weights={"admin": 0})
@@ -0,0 +1,45 @@
+"""Unit tests for PromptSizeConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import PromptSizeConfiguration
+
+
+def test_prompt_size_configuration_defaults() -> None:
+    """Test the default values of prompt size configuration."""
+    c = PromptSizeConfiguration()
+    assert c.enabled is True
+    assert c.default_context_size is None
+    assert not c.model_context_sizes
+    assert c.token_counter == constants.HISTORY_TOKEN_COUNTER_APPROXIMATE
+
+
+def test_prompt_size_configuration_context_size() -> None:
+    """Test lookup of context sizes of models."""
+    c = PromptSizeConfiguration(
+        default_context_size=8192,
+        model_context_sizes={"openai/gpt-4o": 128000, "llama3.2:3b": 32768},
+    )
+    assert c.context_size("openai/gpt-4o") == 128000
+    assert c.context_size("ollama/llama3.2:3b") == 32768
+    assert c.context_size("openai/gpt-4o-mini") == 8192
+
+
+def test_prompt_size_configuration_unknown_context_size() -> None:
+    """Test that context size of models not configured is not known."""
+    c = PromptSizeConfiguration(model_context_sizes={"openai/gpt-4o": 128000})
+    assert c.context_size("openai/gpt-4o") == 128000
+    assert c.context_size("openai/gpt-4o-mini") is None
+
+
+def test_prompt_size_configuration_improper_values() -> None:
+    """Test that context sizes must be positive and token counter known."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = PromptSizeConfiguration(default_context_size=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = PromptSizeConfiguration(model_context_sizes={"m": -1})
+    with pytest.raises(ValidationError, match="Input should be 'llama3'"):
+        _ = PromptSizeConfiguration(token_counter="tiktoken")
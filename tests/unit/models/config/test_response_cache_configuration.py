@@ -0,0 +1,28 @@
+"""Unit tests for ResponseCacheConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import ResponseCacheConfiguration
+
+
+def test_response_cache_configuration_defaults() -> None:
+    """Test the default values of response cache configuration."""
+    c = ResponseCacheConfiguration()
+    assert c.enabled is False
+    assert c.ttl == constants.DEFAULT_RESPONSE_CACHE_TTL
+    assert c.max_entries == constants.DEFAULT_RESPONSE_CACHE_MAX_ENTRIES
+    assert c.max_size == constants.DEFAULT_RESPONSE_CACHE_MAX_SIZE
+    assert c.single_flight is True
+
+
+def test_response_cache_configuration_improper_values() -> None:
+    """Test that limits must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = ResponseCacheConfiguration(ttl=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = ResponseCacheConfiguration(max_entries=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = ResponseCacheConfiguration(max_size=-1)
@@ -21,6 +21,7 @@ def test_service_configuration_constructor() -> None:
     assert s.workers == 1
     assert s.color_log is True
     assert s.access_log is True
+    assert s.server_timing is False
     assert s.tls_config == TLSConfiguration()
 
 
@@ -0,0 +1,50 @@
+"""Unit tests for StreamingConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import StreamingConfiguration
+
+
+def test_streaming_configuration_defaults() -> None:
+    """Test the default values of streaming configuration."""
+    c = StreamingConfiguration()
+    assert c.coalesce_tokens is False
+    assert c.coalescing_window == constants.DEFAULT_STREAMING_COALESCING_WINDOW
+    assert c.coalescing_max_size == constants.DEFAULT_STREAMING_COALESCING_MAX_SIZE
+    assert c.resumable is True
+    assert c.replay_buffer_size == constants.DEFAULT_STREAM_REPLAY_BUFFER_SIZE
+    assert c.resume_retention == constants.DEFAULT_STREAM_RESUME_RETENTION
+    assert c.max_resumable_streams == constants.DEFAULT_MAX_RESUMABLE_STREAMS
+    assert c.disconnect_grace_period == constants.DEFAULT_STREAM_DISCONNECT_GRACE_PERIOD
+    assert c.keepalive is True
+    assert c.keepalive_interval == constants.DEFAULT_STREAM_KEEPALIVE_INTERVAL
+
+
+def test_streaming_configuration_improper_values() -> None:
+    """Test that the windows and sizes must be positive."""
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = StreamingConfiguration(coalescing_window=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = StreamingConfiguration(coalescing_max_size=-1)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = StreamingConfiguration(replay_buffer_size=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = StreamingConfiguration(resume_retention=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = StreamingConfiguration(max_resumable_streams=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = StreamingConfiguration(keepalive_interval=0)
+
+
+def test_streaming_configuration_grace_period() -> None:
+    """Test that the grace period can be zero, but not negative."""
+    assert (
+        StreamingConfiguration(disconnect_grace_period=0).disconnect_grace_period == 0
+    )
+    with pytest.raises(
+        ValidationError, match="Input should be greater than or equal to 0"
+    ):
+        _ = StreamingConfiguration(disconnect_grace_period=-1)
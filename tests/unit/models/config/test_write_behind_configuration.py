@@ -0,0 +1,36 @@
+"""Unit tests for WriteBehindConfiguration model."""
+
+import pytest
+
+from pydantic import ValidationError
+
+import constants
+from models.config import WriteBehindConfiguration
+
+
+def test_write_behind_configuration_defaults() -> None:
+    """Test the default values of write-behind queue configuration."""
+    c = WriteBehindConfiguration()
+    assert c.enabled is True
+    assert c.durability == constants.WRITE_BEHIND_WAIT_FOR_ACK
+    assert c.queue_size == constants.DEFAULT_WRITE_BEHIND_QUEUE_SIZE
+    assert c.workers == constants.DEFAULT_WRITE_BEHIND_WORKERS
+    assert c.batch_size == constants.DEFAULT_WRITE_BEHIND_BATCH_SIZE
+
+
+def test_write_behind_configuration_fire_and_forget() -> None:
+    """Test the fire-and-forget durability."""
+    c = WriteBehindConfiguration(durability="fire_and_forget")
+    assert c.durability == constants.WRITE_BEHIND_FIRE_AND_FORGET
+
+
+def test_write_behind_configuration_improper_values() -> None:
+    """Test that improper values are rejected."""
+    with pytest.raises(ValidationError, match="Input should be 'wait_for_ack'"):
+        _ = WriteBehindConfiguration(durability="eventually")
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = WriteBehindConfiguration(queue_size=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = WriteBehindConfiguration(workers=0)
+    with pytest.raises(ValidationError, match="Input should be greater than 0"):
+        _ = WriteBehindConfiguration(batch_size=0)
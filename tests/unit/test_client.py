@@ -71,3 +71,17 @@ async def test_get_async_llama_stack_wrong_configuration() -> None:
     ):
         client = AsyncLlamaStackClientHolder()
         await client.load(cfg)
+
+
+async def test_get_async_llama_stack_remote_client_timeout() -> None:
+    """Test that the configured timeout is used by the client in server mode."""
+    cfg = LlamaStackConfiguration(
+        url="http://localhost:8321",
+        api_key=None,
+        use_as_library_client=False,
+        timeout=12.5,
+    )
+    client = AsyncLlamaStackClientHolder()
+    await client.load(cfg)
+
+    assert client.get_client().timeout == 12.5
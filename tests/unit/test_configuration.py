@@ -431,6 +431,97 @@ def test_authentication_configuration_not_loaded() -> None:
         cfg.authentication_configuration  # pylint: disable=pointless-statement
 
 
+def test_catalog_configuration_not_loaded() -> None:
+    """Test that accessing catalog_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.catalog_configuration  # pylint: disable=pointless-statement
+
+
+def test_agent_pool_configuration_not_loaded() -> None:
+    """Test that accessing agent_pool_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.agent_pool_configuration  # pylint: disable=pointless-statement
+
+
+def test_response_cache_configuration_not_loaded() -> None:
+    """Test that accessing response_cache_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.response_cache_configuration  # pylint: disable=pointless-statement
+
+
+def test_write_behind_configuration_not_loaded() -> None:
+    """Test that accessing write_behind_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.write_behind_configuration  # pylint: disable=pointless-statement
+
+
+def test_batch_query_configuration_not_loaded() -> None:
+    """Test that accessing batch_query_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.batch_query_configuration  # pylint: disable=pointless-statement
+
+
+def test_query_jobs_configuration_not_loaded() -> None:
+    """Test that accessing query_jobs_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.query_jobs_configuration  # pylint: disable=pointless-statement
+
+
+def test_deadlines_configuration_not_loaded() -> None:
+    """Test that accessing deadlines_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.deadlines_configuration  # pylint: disable=pointless-statement
+
+
+def test_concurrency_limiter_configuration_not_loaded() -> None:
+    """Test that accessing concurrency_limiter_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.concurrency_limiter_configuration  # pylint: disable=pointless-statement
+
+
+def test_fair_scheduling_configuration_not_loaded() -> None:
+    """Test that accessing fair_scheduling_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.fair_scheduling_configuration  # pylint: disable=pointless-statement
+
+
+def test_conversation_history_configuration_not_loaded() -> None:
+    """Test that accessing conversation_history_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.conversation_history_configuration  # pylint: disable=pointless-statement
+
+
+def test_prompt_size_configuration_not_loaded() -> None:
+    """Test that accessing prompt_size_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.prompt_size_configuration  # pylint: disable=pointless-statement
+
+
+def test_attachments_configuration_not_loaded() -> None:
+    """Test that accessing attachments_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.attachments_configuration  # pylint: disable=pointless-statement
+
+
+def test_streaming_configuration_not_loaded() -> None:
+    """Test that accessing streaming_configuration before loading raises an error."""
+    cfg = AppConfig()
+    with pytest.raises(LogicError, match="logic error: configuration is not loaded"):
+        cfg.streaming_configuration  # pylint: disable=pointless-statement
+
+
 def test_customization_not_loaded() -> None:
     """Test that accessing customization before loading raises an error."""
     cfg = AppConfig()
@@ -0,0 +1,95 @@
+"""Unit tests for the agent handle pool."""
+
+from pytest_mock import MockerFixture
+
+from models.config import AgentPoolConfiguration
+from utils.agent_pool import AgentPool, agent_key
+
+
+def _key(conversation_id: str, system_prompt: str = "prompt") -> tuple:
+    """Build pool key for given conversation."""
+    return agent_key(conversation_id, "model", system_prompt, ["in"], ["out"], False)
+
+
+def test_agent_key() -> None:
+    """Test that all agent configuration options are part of the key."""
+    assert _key("c1") == _key("c1")
+    assert _key("c1") != _key("c2")
+    assert _key("c1") != _key("c1", "other prompt")
+    assert agent_key("c1", "m", "p", [], [], False) != agent_key(
+        "c1", "m", "p", [], [], True
+    )
+
+
+def test_agent_pool_is_singleton() -> None:
+    """Test that the agent pool is a singleton."""
+    assert AgentPool() is AgentPool()
+
+
+def test_agent_pool_get_put(mocker: MockerFixture) -> None:
+    """Test storing and retrieving pooled agents."""
+    pool = AgentPool()
+    pool.clear()
+    client = mocker.Mock()
+    agent = mocker.Mock()
+
+    assert pool.get(client, _key("c1")) is None
+
+    pool.put(client, _key("c1"), agent, "s1")
+    pooled = pool.get(client, _key("c1"))
+    assert pooled is not None
+    pooled_agent, session_id = pooled
+    assert session_id == "s1"
+    # copy is returned so per-request attributes do not leak
+    assert pooled_agent is not agent
+    pooled_agent.extra_headers = {"X-Test": "1"}
+    pooled = pool.get(client, _key("c1"))
+    assert pooled is not None
+    assert pooled[0].extra_headers != {"X-Test": "1"}
+
+
+def test_agent_pool_different_client(mocker: MockerFixture) -> None:
+    """Test that agents created via a different client are dropped."""
+    pool = AgentPool()
+    pool.clear()
+    pool.put(mocker.Mock(), _key("c1"), mocker.Mock(), "s1")
+
+    assert pool.get(mocker.Mock(), _key("c1")) is None
+    assert len(pool) == 0
+
+
+def test_agent_pool_eviction(mocker: MockerFixture) -> None:
+    """Test that least recently used agents are evicted."""
+    pool = AgentPool()
+    pool.configure(AgentPoolConfiguration(max_agents=2))
+    client = mocker.Mock()
+    pool.put(client, _key("c1"), mocker.Mock(), "s1")
+    pool.put(client, _key("c2"), mocker.Mock(), "s2")
+    # touch c1 so c2 becomes the least recently used entry
+    assert pool.get(client, _key("c1")) is not None
+    pool.put(client, _key("c3"), mocker.Mock(), "s3")
+
+    assert len(pool) == 2
+    assert pool.get(client, _key("c1")) is not None
+    assert pool.get(client, _key("c2")) is None
+    assert pool.get(client, _key("c3")) is not None
+
+    pool.configure(AgentPoolConfiguration())
+    assert len(pool) == 0
+
+
+def test_agent_pool_invalidate(mocker: MockerFixture) -> None:
+    """Test dropping all agents bound to a conversation."""
+    pool = AgentPool()
+    pool.clear()
+    client = mocker.Mock()
+    pool.put(client, _key("c1"), mocker.Mock(), "s1")
+    pool.put(client, _key("c1", "other prompt"), mocker.Mock(), "s1")
+    pool.put(client, _key("c2"), mocker.Mock(), "s2")
+
+    pool.invalidate("c1")
+    assert len(pool) == 1
+    assert pool.get(client, _key("c2")) is not None
+
+    pool.clear()
+    assert len(pool) == 0
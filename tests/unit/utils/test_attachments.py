@@ -0,0 +1,136 @@
+"""Unit tests for functions defined in utils/attachments.py."""
+
+from typing import Iterator
+
+import pytest
+from fastapi import HTTPException, status
+from pytest_mock import MockerFixture
+
+from models.config import AttachmentsConfiguration
+from models.requests import Attachment
+from utils.attachments import (
+    AttachmentIndex,
+    attachment_digest,
+    attachment_size,
+    check_attachments_size,
+    render_query,
+    turn_input,
+)
+
+
+def _attachment(content: str, content_type: str = "text/plain") -> Attachment:
+    """Return log attachment with the given content."""
+    return Attachment(attachment_type="log", content_type=content_type, content=content)
+
+
+@pytest.fixture(name="attachment_index")
+def attachment_index_fixture() -> Iterator[AttachmentIndex]:
+    """Return the index remembering two conversations, disabled afterwards."""
+    index = AttachmentIndex()
+    index.configure(AttachmentsConfiguration(max_conversations=2))
+    yield index
+    index.configure(AttachmentsConfiguration(deduplicate=False))
+
+
+def test_attachment_size() -> None:
+    """Test that the size is measured in bytes of UTF-8 encoded content."""
+    assert attachment_size(_attachment("abcd")) == 4
+    assert attachment_size(_attachment("kůň")) == 5
+
+
+def test_check_attachments_size(mocker: MockerFixture) -> None:
+    """Test limits of one attachment and of all attachments of the query."""
+    mock_config = mocker.Mock()
+    mock_config.attachments_configuration = AttachmentsConfiguration(
+        max_attachment_size=10, max_request_size=15
+    )
+    mocker.patch("utils.attachments.configuration", mock_config)
+
+    check_attachments_size(None)
+    check_attachments_size([_attachment("x" * 10), _attachment("x" * 5)])
+
+    with pytest.raises(HTTPException) as e:
+        check_attachments_size([_attachment("x" * 11)])
+    assert e.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert e.value.detail["response"] == "Attachment is too large"  # type: ignore
+
+    with pytest.raises(HTTPException) as e:
+        check_attachments_size([_attachment("x" * 10), _attachment("x" * 6)])
+    assert e.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert e.value.detail["response"] == "Attachments are too large"  # type: ignore
+
+
+def test_render_query() -> None:
+    """Test that attachments are appended to the query."""
+    attachments = [_attachment("first"), _attachment("second")]
+    assert render_query("query", None) == "query"
+    assert render_query("query", attachments) == (
+        "query\n\n[Attachment: log]\nfirst\n\n[Attachment: log]\nsecond"
+    )
+
+
+def test_render_query_known_attachment() -> None:
+    """Test that attachments sent earlier are only referenced."""
+    attachments = [_attachment("first"), _attachment("second")]
+    digest = attachment_digest(attachments[0])
+
+    rendered = render_query("query", attachments, {digest})
+
+    assert "first" not in rendered
+    assert digest[:12] in rendered
+    assert rendered.endswith("\n\n[Attachment: log]\nsecond")
+
+
+def test_turn_input() -> None:
+    """Test conversion of attachments to documents of the turn."""
+    attachments = [
+        _attachment("sent earlier"),
+        _attachment('{"a": 1}', "application/json"),
+        _attachment("kind: Pod", "application/yaml"),
+    ]
+    known = {attachment_digest(attachments[0])}
+
+    message, documents = turn_input("query", attachments, known)
+
+    assert message.startswith("query\n\n[Attachment: log, unchanged")
+    assert documents == [
+        {"content": '{"a": 1}', "mime_type": "text/plain"},
+        {"content": "kind: Pod", "mime_type": "application/yaml"},
+    ]
+    assert turn_input("query", None) == ("query", [])
+
+
+def test_attachment_index_disabled() -> None:
+    """Test that nothing is remembered until the index is configured."""
+    index = AttachmentIndex()
+    index.configure(AttachmentsConfiguration(deduplicate=False))
+
+    index.remember("conversation", [_attachment("content")])
+
+    assert not index.known("conversation")
+
+
+def test_attachment_index(
+    mocker: MockerFixture, attachment_index: AttachmentIndex
+) -> None:
+    """Test that attachments are inherited from the previous response."""
+    mock_metric = mocker.patch("utils.attachments.metrics.attachment_bytes_total")
+    first, second = _attachment("first"), _attachment("second")
+
+    attachment_index.remember("response-1", [first])
+    attachment_index.remember("response-2", [first, second], previous="response-1")
+
+    assert attachment_index.known("response-2") == {
+        attachment_digest(first),
+        attachment_digest(second),
+    }
+    assert attachment_index.known(None) == frozenset()
+    assert [c.args for c in mock_metric.labels.call_args_list] == [
+        ("sent",),
+        ("referenced",),
+        ("sent",),
+    ]
+
+    # the least recently used conversation is forgotten
+    attachment_index.remember("response-3", [second])
+    assert not attachment_index.known("response-1")
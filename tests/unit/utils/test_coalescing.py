@@ -0,0 +1,130 @@
+"""Unit tests for coalescing of streamed answer tokens."""
+
+import asyncio
+from typing import AsyncIterator, Iterator
+
+import pytest
+
+from models.config import StreamingConfiguration
+from utils.coalescing import TimedStream, TokenCoalescing, coalesce_tokens
+from utils.sse import encode_token_event, token_delta
+
+
+async def _events(*items: object) -> AsyncIterator[str]:
+    """Yield the events, sleep for the given number of seconds on floats."""
+    for item in items:
+        if isinstance(item, float):
+            await asyncio.sleep(item)
+        else:
+            yield item  # type: ignore[misc]
+
+
+async def _collect(events: AsyncIterator[str]) -> list[str]:
+    """Return all events of the stream."""
+    return [event async for event in events]
+
+
+@pytest.fixture(name="coalescing")
+def coalescing_fixture() -> Iterator[TokenCoalescing]:
+    """Return token coalescing with the default configuration restored afterwards."""
+    coalescing = TokenCoalescing()
+    yield coalescing
+    coalescing.configure(StreamingConfiguration())
+
+
+async def test_coalesce_adjacent_tokens() -> None:
+    """Test that adjacent deltas are merged until another event is sent."""
+    events = _events(
+        token_delta("token", 0, "Hello"),
+        token_delta("token", 1, ", "),
+        token_delta("token", 2, "world"),
+        "data: end\n\n",
+    )
+    assert await _collect(coalesce_tokens(events, 10.0, 1024)) == [
+        encode_token_event("token", 0, "Hello, world"),
+        "data: end\n\n",
+    ]
+
+
+async def test_coalesce_tokens_window() -> None:
+    """Test that buffered deltas are flushed when the window elapses."""
+    events = _events(
+        token_delta("token", 0, "a"),
+        token_delta("token", 1, "b"),
+        0.1,
+        token_delta("token", 2, "c"),
+    )
+    assert await _collect(coalesce_tokens(events, 0.01, 1024)) == [
+        encode_token_event("token", 0, "ab"),
+        encode_token_event("token", 2, "c"),
+    ]
+
+
+async def test_coalesce_tokens_max_size() -> None:
+    """Test that buffered deltas are flushed when the threshold is reached."""
+    events = _events(*(token_delta("token", i, "ab") for i in range(5)))
+    assert await _collect(coalesce_tokens(events, 10.0, 4)) == [
+        encode_token_event("token", 0, "abab"),
+        encode_token_event("token", 2, "abab"),
+        encode_token_event("token", 4, "ab"),
+    ]
+
+
+async def test_coalesce_tokens_event_type_change() -> None:
+    """Test that deltas of different event types are not merged."""
+    events = _events(
+        token_delta("token", 0, "a"),
+        token_delta("other", 1, "b"),
+        token_delta("other", 2, "c"),
+    )
+    assert await _collect(coalesce_tokens(events, 10.0, 1024)) == [
+        encode_token_event("token", 0, "a"),
+        encode_token_event("other", 1, "bc"),
+    ]
+
+
+async def test_coalesce_tokens_plain_text() -> None:
+    """Test that deltas of plain text responses are merged into plain text."""
+    events = _events(token_delta(None, 0, "a"), token_delta(None, 1, "b"))
+    assert await _collect(coalesce_tokens(events, 10.0, 1024)) == ["ab"]
+
+
+async def test_coalesce_tokens_closes_stream() -> None:
+    """Test that the wrapped stream is closed when the client goes away."""
+    closed = asyncio.Event()
+
+    async def endless() -> AsyncIterator[str]:
+        try:
+            while True:
+                yield "data: event\n\n"
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    events = coalesce_tokens(endless(), 10.0, 1024)
+    assert await anext(events) == "data: event\n\n"
+    await events.aclose()  # type: ignore[attr-defined]
+    assert closed.is_set()
+
+
+async def test_timed_stream_keeps_item_after_timeout() -> None:
+    """Test that no item is lost when reading times out."""
+    stream: TimedStream[str] = TimedStream(_events(0.05, "late"))
+    with pytest.raises(asyncio.TimeoutError):
+        await stream.next(0.001)
+    assert await stream.next() == "late"
+    with pytest.raises(StopAsyncIteration):
+        await stream.next()
+    await stream.aclose()
+
+
+async def test_token_coalescing_apply(coalescing: TokenCoalescing) -> None:
+    """Test that coalescing follows the request, then the configuration."""
+    events = _events()
+    assert coalescing.apply(events, None) is events
+    assert coalescing.apply(events, False) is events
+    assert coalescing.apply(events, True) is not events
+
+    coalescing.configure(StreamingConfiguration(coalesce_tokens=True))
+    assert coalescing.apply(events, None) is not events
+    assert coalescing.apply(events, False) is events
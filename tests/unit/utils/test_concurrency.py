@@ -0,0 +1,87 @@
+"""Unit tests for functions defined in utils/concurrency.py."""
+
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from utils.concurrency import run_concurrently
+from utils.stage_timer import request_timings
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_results() -> None:
+    """Test that results of all steps are returned by step name."""
+
+    async def step(value: int) -> int:
+        await asyncio.sleep(0)
+        return value
+
+    results = await run_concurrently(
+        "test", {"a": step(1), "b": step(2), "c": asyncio.to_thread(lambda: 3)}
+    )
+    assert results == {"a": 1, "b": 2, "c": 3}
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_no_steps() -> None:
+    """Test stage without any step."""
+    assert not await run_concurrently("test", {})
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_runs_in_parallel() -> None:
+    """Test that steps are really running concurrently."""
+    barrier = asyncio.Event()
+
+    async def waiter() -> str:
+        await barrier.wait()
+        return "waited"
+
+    async def setter() -> str:
+        barrier.set()
+        return "set"
+
+    results = await asyncio.wait_for(
+        run_concurrently("test", {"waiter": waiter(), "setter": setter()}), 1
+    )
+    assert results == {"waiter": "waited", "setter": "set"}
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_fail_fast() -> None:
+    """Test that the first failure cancels remaining steps."""
+    cancelled = asyncio.Event()
+
+    async def slow() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing() -> None:
+        raise ValueError("step failed")
+
+    with pytest.raises(ValueError, match="step failed"):
+        await asyncio.wait_for(
+            run_concurrently("test", {"slow": slow(), "failing": failing()}), 1
+        )
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_run_concurrently_metrics(mocker: MockerFixture) -> None:
+    """Test that duration of each step is observed."""
+    histogram = mocker.patch("metrics.request_stage_duration_seconds")
+
+    async def step() -> None:
+        return None
+
+    with request_timings("/v1/query") as timings:
+        await run_concurrently("stage", {"one": step(), "two": step()})
+
+    histogram.labels.assert_any_call("/v1/query", "stage", "one")
+    histogram.labels.assert_any_call("/v1/query", "stage", "two")
+    assert histogram.labels.return_value.observe.call_count == 2
+    assert set(timings.stages) == {"stage.one", "stage.two"}
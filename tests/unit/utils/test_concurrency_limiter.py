@@ -0,0 +1,209 @@
+"""Unit tests for the adaptive concurrency limiter and circuit breaker."""
+
+import asyncio
+from typing import AsyncIterator, Iterator
+
+import pytest
+from fastapi import HTTPException, status
+from llama_stack_client import APIConnectionError
+from pytest_mock import MockerFixture
+
+from models.config import ConcurrencyLimiterConfiguration
+from utils.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    LlamaStackLimiter,
+)
+
+
+@pytest.fixture(name="llama_stack_limiter")
+def llama_stack_limiter_fixture() -> Iterator[LlamaStackLimiter]:
+    """Return the limiter configured with a small limit, disabled afterwards."""
+    limiter = LlamaStackLimiter()
+    limiter.configure(
+        ConcurrencyLimiterConfiguration(
+            enabled=True,
+            initial_limit=1,
+            queue_size=1,
+            queue_timeout=0.05,
+            failure_threshold=2,
+        )
+    )
+    yield limiter
+    limiter.configure(ConcurrencyLimiterConfiguration(enabled=False))
+
+
+def test_limiter_increases_limit_on_fast_calls() -> None:
+    """Test additive increase of the limit after calls finished in time."""
+    limiter = AdaptiveConcurrencyLimiter(
+        ConcurrencyLimiterConfiguration(initial_limit=2, max_limit=3)
+    )
+    limiter.on_success(0.1)
+    limiter.on_success(0.1)
+    # 2 + 1/2 + 1/2.5
+    assert limiter.limit == pytest.approx(2.9)
+
+    for _ in range(10):
+        limiter.on_success(0.1)
+    assert limiter.limit == 3
+
+
+def test_limiter_decreases_limit_on_slow_calls() -> None:
+    """Test multiplicative decrease of the limit after slow calls."""
+    limiter = AdaptiveConcurrencyLimiter(
+        ConcurrencyLimiterConfiguration(
+            initial_limit=10, min_limit=5, latency_threshold=1.0
+        )
+    )
+    limiter.on_success(2.0)
+    assert limiter.limit == 9
+
+    for _ in range(20):
+        limiter.on_overload()
+    assert limiter.limit == 5
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue() -> None:
+    """Test that calls over the limit wait for a free slot."""
+    limiter = AdaptiveConcurrencyLimiter(
+        ConcurrencyLimiterConfiguration(initial_limit=1, queue_size=1)
+    )
+    assert await limiter.acquire()
+
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+    # the queue is full
+    assert not await limiter.acquire()
+
+    limiter.release()
+    assert await waiting
+    assert limiter.in_flight == 1
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_timeout() -> None:
+    """Test that calls waiting too long for a slot are rejected."""
+    limiter = AdaptiveConcurrencyLimiter(
+        ConcurrencyLimiterConfiguration(initial_limit=1, queue_timeout=0.01)
+    )
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert limiter.in_flight == 1
+    assert limiter.queue_depth == 0
+
+
+def test_circuit_breaker(mocker: MockerFixture) -> None:
+    """Test opening, half-opening and closing of the circuit breaker."""
+    monotonic = mocker.patch("utils.concurrency_limiter.time.monotonic")
+    monotonic.return_value = 100.0
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    # one probe is let in after the reset timeout
+    monotonic.return_value = 131.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    # failed probe opens the breaker again
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    monotonic.return_value = 162.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_llama_stack_limiter_disabled() -> None:
+    """Test that calls are not limited until the limiter is configured."""
+    limiter = LlamaStackLimiter()
+    limiter.configure(ConcurrencyLimiterConfiguration(enabled=False))
+
+    assert await limiter.acquire() is None
+    async with limiter.slot():
+        pass
+
+
+@pytest.mark.asyncio
+async def test_llama_stack_limiter_overloaded(
+    llama_stack_limiter: LlamaStackLimiter,
+) -> None:
+    """Test that calls without a free slot fail with HTTP 503."""
+    async with llama_stack_limiter.slot():
+        with pytest.raises(HTTPException) as e:
+            async with llama_stack_limiter.slot():
+                pass
+
+    assert e.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert e.value.detail["response"] == "Llama Stack is overloaded"  # type: ignore
+    assert llama_stack_limiter.limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_llama_stack_limiter_circuit_open(
+    mocker: MockerFixture, llama_stack_limiter: LlamaStackLimiter
+) -> None:
+    """Test that calls fail fast after repeated connection failures."""
+    for _ in range(2):
+        with pytest.raises(APIConnectionError):
+            async with llama_stack_limiter.slot():
+                raise APIConnectionError(request=mocker.Mock())
+
+    with pytest.raises(HTTPException) as e:
+        async with llama_stack_limiter.slot():
+            pass
+
+    assert e.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert e.value.detail["response"] == "Llama Stack is unavailable"  # type: ignore
+    assert llama_stack_limiter.limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_llama_stack_limiter_stream(
+    llama_stack_limiter: LlamaStackLimiter,
+) -> None:
+    """Test that the slot is held until the stream is exhausted."""
+
+    async def chunks() -> AsyncIterator[str]:
+        yield "a"
+        yield "b"
+
+    async def open_stream() -> AsyncIterator[str]:
+        return chunks()
+
+    stream = await llama_stack_limiter.stream(open_stream)
+    assert llama_stack_limiter.limiter.in_flight == 1
+
+    assert [chunk async for chunk in stream] == ["a", "b"]
+    assert llama_stack_limiter.limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_llama_stack_limiter_stream_closed(
+    llama_stack_limiter: LlamaStackLimiter,
+) -> None:
+    """Test that the slot of a stream closed early is released."""
+
+    async def chunks() -> AsyncIterator[str]:
+        yield "a"
+        yield "b"
+
+    async def open_stream() -> AsyncIterator[str]:
+        return chunks()
+
+    stream = await llama_stack_limiter.stream(open_stream)
+    assert await anext(stream) == "a"
+    await stream.aclose()  # type: ignore[attr-defined]
+
+    assert llama_stack_limiter.limiter.in_flight == 0
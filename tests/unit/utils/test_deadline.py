@@ -0,0 +1,193 @@
+"""Unit tests for functions defined in utils/deadline.py."""
+
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+from fastapi import HTTPException, status
+from llama_stack_client import NOT_GIVEN, APITimeoutError
+from pytest_mock import MockerFixture
+
+from models.config import DeadlinesConfiguration
+from utils.deadline import (
+    STAGE_AGENT_INIT,
+    STAGE_TURN_CREATION,
+    Deadline,
+    client_timeout,
+    current_deadline,
+    deadline_stage,
+    request_deadline,
+    run_stage,
+    stage_timeout,
+    until_deadline,
+)
+
+
+def test_deadline_stage_timeout() -> None:
+    """Test that stage timeout is limited by the stage budget and remaining time."""
+    deadline = Deadline(5.0, {STAGE_AGENT_INIT: 1.0, STAGE_TURN_CREATION: 60.0})
+
+    assert deadline.stage_timeout(STAGE_AGENT_INIT) == 1.0
+    assert 4.0 < deadline.stage_timeout(STAGE_TURN_CREATION) <= 5.0
+    assert 4.0 < deadline.stage_timeout("unknown") <= 5.0
+
+
+def test_deadline_expired() -> None:
+    """Test that expired deadline leaves no time to any stage."""
+    deadline = Deadline(5.0, {STAGE_AGENT_INIT: 1.0})
+    deadline.expires_at -= 10
+
+    assert deadline.remaining() == 0.0
+    assert deadline.stage_timeout(STAGE_AGENT_INIT) == 0.0
+
+
+def test_request_deadline_endpoint_budget() -> None:
+    """Test that the overall budget is selected by the request path."""
+    config = DeadlinesConfiguration(request=30, endpoints={"/v1/query": 10})
+
+    with request_deadline(config, "/v1/query") as deadline:
+        assert deadline is not None
+        assert current_deadline() is deadline
+        assert deadline.budget == 10
+    with request_deadline(config, "/v1/streaming_query") as deadline:
+        assert deadline is not None
+        assert deadline.budget == 30
+    assert current_deadline() is None
+
+
+def test_request_deadline_disabled() -> None:
+    """Test that no deadline is started when deadlines are disabled."""
+    config = DeadlinesConfiguration(enabled=False)
+
+    with request_deadline(config, "/v1/query") as deadline:
+        assert deadline is None
+        assert stage_timeout(STAGE_AGENT_INIT) is None
+
+
+def test_client_timeout() -> None:
+    """Test the timeout argument propagating the timeout to client calls."""
+    assert client_timeout(None) is NOT_GIVEN
+    assert client_timeout(2.5) == 2.5
+
+
+@pytest.mark.asyncio
+async def test_deadline_stage_without_deadline() -> None:
+    """Test that stages of requests without deadline are not limited."""
+    async with deadline_stage(STAGE_AGENT_INIT) as timeout:
+        assert timeout is None
+    assert await run_stage(STAGE_AGENT_INIT, asyncio.sleep(0, "done")) == "done"
+
+
+@pytest.mark.asyncio
+async def test_deadline_stage_in_time() -> None:
+    """Test stage that finishes before its deadline."""
+    config = DeadlinesConfiguration(agent_init=1.0)
+
+    with request_deadline(config, "/v1/query"):
+        async with deadline_stage(STAGE_AGENT_INIT) as timeout:
+            assert timeout == 1.0
+        result = await run_stage(STAGE_AGENT_INIT, asyncio.sleep(0, "done"))
+
+    assert result == "done"
+
+
+@pytest.mark.asyncio
+async def test_deadline_stage_exceeded(mocker: MockerFixture) -> None:
+    """Test that stage exceeding its budget is cancelled with HTTP 504."""
+    metric = mocker.patch("metrics.request_deadline_exceeded_total")
+    config = DeadlinesConfiguration(agent_init=0.01)
+    cancelled = asyncio.Event()
+
+    async def stuck() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with request_deadline(config, "/v1/query"):
+        with pytest.raises(HTTPException) as e:
+            await run_stage(STAGE_AGENT_INIT, stuck())
+
+    assert cancelled.is_set()
+    assert e.value.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert e.value.detail["response"] == "Request deadline exceeded"  # type: ignore
+    assert STAGE_AGENT_INIT in e.value.detail["cause"]  # type: ignore
+    metric.labels.assert_called_once_with(STAGE_AGENT_INIT)
+
+
+@pytest.mark.asyncio
+async def test_deadline_stage_limited_by_request_budget() -> None:
+    """Test that stage is limited by the time remaining to the request deadline."""
+    config = DeadlinesConfiguration(request=0.01, turn_creation=60)
+
+    with request_deadline(config, "/v1/query"):
+        with pytest.raises(HTTPException) as e:
+            await run_stage(STAGE_TURN_CREATION, asyncio.sleep(10))
+
+    assert STAGE_TURN_CREATION in e.value.detail["cause"]  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_deadline_stage_client_timeout(mocker: MockerFixture) -> None:
+    """Test that timeout of a client call is reported as exceeded deadline."""
+    config = DeadlinesConfiguration()
+
+    async def timed_out() -> None:
+        raise APITimeoutError(request=mocker.Mock())
+
+    with request_deadline(config, "/v2/query"):
+        with pytest.raises(HTTPException) as e:
+            await run_stage(STAGE_TURN_CREATION, timed_out())
+
+    assert e.value.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+
+
+def test_until_deadline_without_deadline() -> None:
+    """Test that the stream is not limited when the request has no deadline."""
+
+    async def stream() -> AsyncIterator[int]:
+        yield 1
+
+    events = stream()
+    assert until_deadline(events) is events
+
+
+@pytest.mark.asyncio
+async def test_until_deadline_stream_read_in_time() -> None:
+    """Test that the stream read within the deadline is passed through."""
+
+    async def stream() -> AsyncIterator[int]:
+        for i in range(3):
+            yield i
+
+    with request_deadline(DeadlinesConfiguration(), "/v1/streaming_query"):
+        events = until_deadline(stream())
+
+    assert [event async for event in events] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_until_deadline_stream_exceeds_deadline() -> None:
+    """Test that the stream is closed when its reading exceeds the deadline."""
+    closed = asyncio.Event()
+
+    async def stream() -> AsyncIterator[int]:
+        try:
+            yield 1
+            await asyncio.sleep(10)
+            yield 2
+        finally:
+            closed.set()
+
+    config = DeadlinesConfiguration(request=0.05)
+    with request_deadline(config, "/v1/streaming_query"):
+        events = until_deadline(stream())
+
+    # the deadline applies even when the stream is read outside the request
+    assert await anext(events) == 1
+    with pytest.raises(HTTPException) as e:
+        await anext(events)
+
+    assert e.value.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert closed.is_set()
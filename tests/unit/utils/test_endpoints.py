@@ -4,9 +4,11 @@
 
 from pathlib import Path
 import os
+from typing import AsyncIterator
 import pytest
-from pytest_mock import MockerFixture
+from pytest_mock import MockerFixture, MockType
 from fastapi import HTTPException
+from llama_stack_client import NotFoundError
 from pydantic import AnyUrl
 
 import constants
@@ -16,7 +18,8 @@ from models.responses import ReferencedDocument
 from models.requests import QueryRequest
 from models.config import Action
 from utils import endpoints
-from utils.endpoints import get_agent, get_temp_agent
+from utils.agent_pool import AgentPool, agent_key
+from utils.endpoints import create_agent_turn, get_agent, get_temp_agent
 
 from tests.unit import config_dict
 from tests.unit.conftest import AgentFixtures
@@ -294,6 +297,62 @@ async def test_get_agent_with_conversation_id(
     assert result_session_id == "test_session_id"
 
 
+@pytest.mark.asyncio
+async def test_get_agent_reuses_pooled_agent(
+    prepare_agent_mocks: AgentFixtures, mocker: MockerFixture
+) -> None:
+    """Test that continuing a conversation reuses the pooled agent."""
+    mock_client, mock_agent = prepare_agent_mocks
+    mock_agent.agent_id = "pooled_conversation_id"
+    mock_agent.create_session.return_value = "pooled_session_id"
+    mock_agent_class = mocker.patch(
+        "utils.endpoints.AsyncAgent", return_value=mock_agent
+    )
+    mocker.patch("utils.endpoints.get_suid", return_value="pooled_session_id")
+
+    # first turn creates new conversation
+    _, conversation_id, session_id = await get_agent(
+        client=mock_client,
+        model_id="test_model",
+        system_prompt="test_prompt",
+        available_input_shields=["shield1"],
+        available_output_shields=["output_shield2"],
+        conversation_id=None,
+    )
+    assert conversation_id == "pooled_conversation_id"
+    mock_agent_class.assert_called_once()
+
+    # second turn is served from the pool without contacting Llama Stack
+    result_agent, result_conversation_id, result_session_id = await get_agent(
+        client=mock_client,
+        model_id="test_model",
+        system_prompt="test_prompt",
+        available_input_shields=["shield1"],
+        available_output_shields=["output_shield2"],
+        conversation_id=conversation_id,
+    )
+    assert result_agent is not mock_agent
+    assert result_conversation_id == conversation_id
+    assert result_session_id == session_id
+    mock_agent_class.assert_called_once()
+    mock_client.agents.retrieve.assert_not_called()
+    mock_client.agents.session.list.assert_not_called()
+
+    # different agent configuration is not served from the pool
+    mock_client.agents.session.list.return_value = mocker.Mock(
+        data=[{"session_id": "pooled_session_id"}]
+    )
+    await get_agent(
+        client=mock_client,
+        model_id="test_model",
+        system_prompt="other_prompt",
+        available_input_shields=["shield1"],
+        available_output_shields=["output_shield2"],
+        conversation_id=conversation_id,
+    )
+    mock_client.agents.retrieve.assert_called_once()
+
+
 @pytest.mark.asyncio
 async def test_get_agent_with_conversation_id_and_no_agent_in_llama_stack(
     setup_configuration: AppConfig,
@@ -694,6 +753,123 @@ async def test_get_agent_no_tools_false_preserves_parser(
     )
 
 
+def _pooled_agent(mocker: MockerFixture) -> tuple[MockType, MockType, MockType]:
+    """Pool an agent of a conversation and prepare its rebuilt replacement."""
+    client = mocker.Mock()
+    pooled = mocker.AsyncMock(agent_id="conversation_id", extra_headers={"h": "v"})
+    pooled.create_turn.side_effect = NotFoundError(
+        message="Session not found", response=mocker.Mock(request=None), body=None
+    )
+    AgentPool().clear()
+    AgentPool().put(
+        client,
+        agent_key("conversation_id", "model", "prompt", [], [], False),
+        pooled,
+        "session_id",
+    )
+    rebuilt = mocker.AsyncMock()
+    rebuild_agent = mocker.AsyncMock(
+        return_value=(rebuilt, "conversation_id", "rebuilt_session_id")
+    )
+    return pooled, rebuilt, rebuild_agent
+
+
+@pytest.mark.asyncio
+async def test_create_agent_turn_rebuilds_agent_on_not_found(
+    mocker: MockerFixture,
+) -> None:
+    """Test that the turn is created by a rebuilt agent when the session is gone."""
+    pooled, rebuilt, rebuild_agent = _pooled_agent(mocker)
+    rebuilt.create_turn.return_value = "turn"
+
+    turn = await create_agent_turn(
+        pooled, "session_id", rebuild_agent, messages=[], stream=False
+    )
+
+    assert turn == "turn"
+    assert len(AgentPool()) == 0
+    rebuild_agent.assert_awaited_once_with()
+    rebuilt.create_turn.assert_awaited_once_with(
+        session_id="rebuilt_session_id", messages=[], stream=False
+    )
+    assert rebuilt.extra_headers == {"h": "v"}
+
+
+@pytest.mark.asyncio
+async def test_create_agent_turn_stream_rebuilds_agent_on_not_found(
+    mocker: MockerFixture,
+) -> None:
+    """Test that the turn is streamed by a rebuilt agent when the session is gone."""
+    pooled, rebuilt, rebuild_agent = _pooled_agent(mocker)
+
+    async def not_found() -> AsyncIterator[str]:
+        """Fail like a turn created in a deleted session."""
+        raise NotFoundError(
+            message="Session not found", response=mocker.Mock(request=None), body=None
+        )
+        yield "never"  # pylint: disable=unreachable
+
+    async def chunks() -> AsyncIterator[str]:
+        """Stream chunks of the turn."""
+        yield "chunk1"
+        yield "chunk2"
+
+    pooled.create_turn.side_effect = None
+    pooled.create_turn.return_value = not_found()
+    rebuilt.create_turn.return_value = chunks()
+
+    stream = await create_agent_turn(
+        pooled, "session_id", rebuild_agent, messages=[], stream=True
+    )
+
+    assert [chunk async for chunk in stream] == ["chunk1", "chunk2"]
+    assert len(AgentPool()) == 0
+    rebuilt.create_turn.assert_awaited_once_with(
+        session_id="rebuilt_session_id", messages=[], stream=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_agent_turn_deleted_conversation(
+    mocker: MockerFixture,
+) -> None:
+    """Test that a deleted conversation is reported instead of replaced."""
+    pooled, rebuilt, rebuild_agent = _pooled_agent(mocker)
+    rebuilt.client.agents.delete = mocker.AsyncMock()
+    # the conversation is gone, so a new one was created for the rebuilt agent
+    rebuild_agent.return_value = (rebuilt, "new_conversation_id", "new_session_id")
+    AgentPool().put(
+        mocker.Mock(),
+        agent_key("new_conversation_id", "model", "prompt", [], [], False),
+        rebuilt,
+        "new_session_id",
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await create_agent_turn(
+            pooled, "session_id", rebuild_agent, messages=[], stream=False
+        )
+
+    assert exc_info.value.status_code == 404
+    assert len(AgentPool()) == 0
+    rebuilt.client.agents.delete.assert_awaited_once_with(
+        agent_id="new_conversation_id"
+    )
+    rebuilt.create_turn.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_create_agent_turn_new_conversation_not_rebuilt(
+    mocker: MockerFixture,
+) -> None:
+    """Test that errors of turns in new conversations are not retried."""
+    pooled, _, _ = _pooled_agent(mocker)
+
+    with pytest.raises(NotFoundError):
+        await create_agent_turn(pooled, "session_id", None, messages=[], stream=False)
+    pooled.create_turn.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 async def test_get_temp_agent_basic_functionality(
     prepare_agent_mocks: AgentFixtures, mocker: MockerFixture
@@ -0,0 +1,188 @@
+"""Unit tests for fair scheduling of LLM turns across users."""
+
+import asyncio
+from typing import AsyncIterator, Iterator
+
+import pytest
+from fastapi import HTTPException, status
+from pytest_mock import MockerFixture
+
+from models.config import FairSchedulingConfiguration
+from utils.fair_scheduler import FairScheduler, user_roles
+
+
+@pytest.fixture(name="scheduler")
+def scheduler_fixture() -> Iterator[FairScheduler]:
+    """Return the scheduler with one turn in flight, disabled afterwards."""
+    scheduler = FairScheduler()
+    scheduler.configure(
+        FairSchedulingConfiguration(
+            enabled=True,
+            max_in_flight=1,
+            max_in_flight_per_user=1,
+            max_queued_per_user=2,
+            queue_timeout=1.0,
+            role_weights={"premium": 2},
+        )
+    )
+    yield scheduler
+    scheduler.configure(FairSchedulingConfiguration(enabled=False))
+
+
+async def _queue_turn(
+    scheduler: FairScheduler, user_id: str, roles: set[str], served: list[str]
+) -> None:
+    """Wait for a turn, record the order in which users are served."""
+    permit = await scheduler.acquire(user_id, roles)
+    served.append(user_id)
+    await asyncio.sleep(0)
+    permit.release()
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_disabled() -> None:
+    """Test that turns are admitted immediately until the scheduler is configured."""
+    scheduler = FairScheduler()
+    scheduler.configure(FairSchedulingConfiguration(enabled=False))
+
+    async with scheduler.turn("user", {"*"}):
+        async with scheduler.turn("user", {"*"}):
+            assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_round_robin(scheduler: FairScheduler) -> None:
+    """Test that queued turns of different users are served in turns."""
+    served: list[str] = []
+    first = await scheduler.acquire("heavy", {"*"})
+
+    tasks = [
+        asyncio.create_task(_queue_turn(scheduler, user_id, {"*"}, served))
+        for user_id in ("heavy", "heavy", "light")
+    ]
+    await asyncio.sleep(0)
+    first.release()
+    await asyncio.gather(*tasks)
+
+    assert served == ["heavy", "light", "heavy"]
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_role_weights(scheduler: FairScheduler) -> None:
+    """Test that users of weighted roles get more turns served per round."""
+    scheduler.config.max_queued_per_user = 3
+    served: list[str] = []
+    first = await scheduler.acquire("other", {"*"})
+
+    tasks = [
+        asyncio.create_task(_queue_turn(scheduler, user_id, roles, served))
+        for user_id, roles in (
+            ("premium", {"*", "premium"}),
+            ("premium", {"*", "premium"}),
+            ("premium", {"*", "premium"}),
+            ("basic", {"*"}),
+            ("basic", {"*"}),
+        )
+    ]
+    await asyncio.sleep(0)
+    first.release()
+    await asyncio.gather(*tasks)
+
+    assert served == ["premium", "premium", "basic", "premium", "basic"]
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_per_user_limit(scheduler: FairScheduler) -> None:
+    """Test that a user at their limit does not block other users."""
+    scheduler.config.max_in_flight = 2
+    heavy = await scheduler.acquire("heavy", {"*"})
+
+    waiting = asyncio.create_task(scheduler.acquire("heavy", {"*"}))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    light = await asyncio.wait_for(scheduler.acquire("light", {"*"}), timeout=1)
+    light.release()
+    heavy.release()
+    (await waiting).release()
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_queue_full(scheduler: FairScheduler) -> None:
+    """Test that turns over the queue size of the user are rejected."""
+    first = await scheduler.acquire("heavy", {"*"})
+    tasks = [asyncio.create_task(scheduler.acquire("heavy", {"*"})) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as e:
+        await scheduler.acquire("heavy", {"*"})
+
+    assert e.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    first.release()
+    for task in tasks:
+        (await task).release()
+
+
+@pytest.mark.asyncio
+async def test_fair_scheduler_queue_timeout(
+    mocker: MockerFixture, scheduler: FairScheduler
+) -> None:
+    """Test that turns waiting too long are rejected and the wait is measured."""
+    metric = mocker.patch("metrics.turn_queue_wait_seconds")
+    scheduler.config.queue_timeout = 0.01
+    first = await scheduler.acquire("heavy", {"*"})
+
+    with pytest.raises(HTTPException) as e:
+        await scheduler.acquire("light", {"*"})
+
+    assert e.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "waited in the queue" in e.value.detail["cause"]  # type: ignore
+    assert metric.observe.call_count == 2
+    first.release()
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_turn_permit_hold(scheduler: FairScheduler) -> None:
+    """Test that the permit is held until the stream ends."""
+
+    async def chunks() -> AsyncIterator[str]:
+        yield "a"
+        yield "b"
+
+    permit = await scheduler.acquire("user", {"*"})
+    stream = permit.hold(chunks())
+    assert scheduler.in_flight == 1
+
+    assert [chunk async for chunk in stream] == ["a", "b"]
+    assert permit.released
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_turn_permit_hold_closes_stream(scheduler: FairScheduler) -> None:
+    """Test that the stream is closed when the client goes away."""
+    closed = asyncio.Event()
+
+    async def chunks() -> AsyncIterator[str]:
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.set()
+
+    permit = await scheduler.acquire("user", {"*"})
+    stream = permit.hold(chunks())
+    assert await anext(stream) == "a"
+    await stream.aclose()  # type: ignore[attr-defined]
+    assert closed.is_set()
+    assert permit.released
+
+
+def test_user_roles(mocker: MockerFixture) -> None:
+    """Test reading roles resolved by authorization from the request state."""
+    state = mocker.Mock(spec=["user_roles"], user_roles={"*", "admin"})
+    assert user_roles(state) == {"*", "admin"}
+    assert user_roles(object()) == set()
@@ -0,0 +1,67 @@
+"""Unit tests for functions defined in utils/history.py."""
+
+from utils.history import (
+    TOKEN_COUNTERS,
+    HistoryMessage,
+    approximate_token_count,
+    fit_history,
+    group_turns,
+)
+
+
+def _conversation() -> list[HistoryMessage]:
+    """Conversation of three turns, ten tokens each by approximate count."""
+    return [
+        HistoryMessage(role=role, content=f"{index}" * 20)
+        for index in range(3)
+        for role in ("user", "assistant")
+    ]
+
+
+def test_approximate_token_count() -> None:
+    """Test estimation of tokens from text length."""
+    assert approximate_token_count("") == 0
+    assert approximate_token_count("abcd") == 1
+    assert approximate_token_count("abcde") == 2
+    assert TOKEN_COUNTERS["approximate"] is approximate_token_count
+
+
+def test_group_turns() -> None:
+    """Test that every user message starts a new turn."""
+    messages = [HistoryMessage(role="assistant", content="greeting")]
+    messages += _conversation()
+
+    turns = group_turns(messages)
+
+    assert [len(turn.messages) for turn in turns] == [1, 2, 2, 2]
+    assert turns[1].messages[0].role == "user"
+
+
+def test_fit_history_keeps_everything() -> None:
+    """Test history fitting into the budget."""
+    turns = group_turns(_conversation())
+
+    kept, truncated = fit_history(turns, 40, 10, approximate_token_count)
+
+    assert kept == turns
+    assert not truncated
+
+
+def test_fit_history_drops_oldest_turns() -> None:
+    """Test that the oldest turns are dropped first."""
+    turns = group_turns(_conversation())
+
+    kept, truncated = fit_history(turns, 30, 5, approximate_token_count)
+
+    assert kept == turns[1:]
+    assert truncated
+
+
+def test_fit_history_no_room() -> None:
+    """Test that all turns are dropped when the query takes the whole budget."""
+    turns = group_turns(_conversation())
+
+    kept, truncated = fit_history(turns, 10, 10, approximate_token_count)
+
+    assert not kept
+    assert truncated
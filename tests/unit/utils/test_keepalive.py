@@ -0,0 +1,87 @@
+"""Unit tests for keepalive of streamed responses."""
+
+import asyncio
+from typing import AsyncIterator, Iterator
+
+import pytest
+
+from models.config import StreamingConfiguration
+from utils.keepalive import KEEPALIVE_COMMENT, StreamKeepalive, keepalive
+
+
+async def _events(*items: object) -> AsyncIterator[str]:
+    """Yield the events, sleep for the given number of seconds on floats."""
+    for item in items:
+        if isinstance(item, float):
+            await asyncio.sleep(item)
+        else:
+            yield item  # type: ignore[misc]
+
+
+async def _collect(events: AsyncIterator[str]) -> list[str]:
+    """Return all events of the stream."""
+    return [event async for event in events]
+
+
+@pytest.fixture(name="stream_keepalive")
+def stream_keepalive_fixture() -> Iterator[StreamKeepalive]:
+    """Return stream keepalive with the default configuration restored afterwards."""
+    stream_keepalive = StreamKeepalive()
+    yield stream_keepalive
+    stream_keepalive.configure(StreamingConfiguration())
+
+
+async def test_keepalive_passes_events() -> None:
+    """Test that events are not changed when the stream is not silent."""
+    events = _events("data: 0\n\n", "data: 1\n\n")
+    assert await _collect(keepalive(events, 10.0)) == ["data: 0\n\n", "data: 1\n\n"]
+
+
+async def test_keepalive_during_silence() -> None:
+    """Test that comments are sent while the stream is silent."""
+    events = _events("data: 0\n\n", 0.1, "data: 1\n\n")
+    received = await _collect(keepalive(events, 0.02))
+    assert received[0] == "data: 0\n\n"
+    assert received[-1] == "data: 1\n\n"
+    assert len(received) > 3
+    assert set(received[1:-1]) == {KEEPALIVE_COMMENT}
+
+
+async def test_keepalive_error_delivered() -> None:
+    """Test that the error of the stream is raised to the reader."""
+
+    async def failing() -> AsyncIterator[str]:
+        yield "data: 0\n\n"
+        raise ValueError("failed")
+
+    events = keepalive(failing(), 10.0)
+    assert await anext(events) == "data: 0\n\n"
+    with pytest.raises(ValueError, match="failed"):
+        await anext(events)
+
+
+async def test_keepalive_closes_stream() -> None:
+    """Test that the wrapped stream is closed when the client goes away."""
+    closed = asyncio.Event()
+
+    async def endless() -> AsyncIterator[str]:
+        try:
+            while True:
+                yield "data: event\n\n"
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    events = keepalive(endless(), 10.0)
+    assert await anext(events) == "data: event\n\n"
+    await events.aclose()  # type: ignore[attr-defined]
+    await asyncio.wait_for(closed.wait(), timeout=1)
+
+
+async def test_stream_keepalive_apply(stream_keepalive: StreamKeepalive) -> None:
+    """Test that keepalive is applied only when enabled."""
+    events = _events()
+    assert stream_keepalive.apply(events) is not events
+
+    stream_keepalive.configure(StreamingConfiguration(keepalive=False))
+    assert stream_keepalive.apply(events) is events
@@ -0,0 +1,88 @@
+"""Unit tests for functions defined in utils/prompt_size.py."""
+
+import pytest
+from fastapi import HTTPException, status
+from pytest_mock import MockerFixture
+
+from models.config import PromptSizeConfiguration
+from models.requests import Attachment, QueryRequest
+from utils.history import approximate_token_count
+from utils.prompt_size import check_prompt_size, estimate_prompt_tokens
+
+
+def _query_request() -> QueryRequest:
+    """Query of 2 tokens with one attachment of 3 tokens."""
+    return QueryRequest(
+        query="12345678",
+        attachments=[
+            Attachment(
+                attachment_type="log",
+                content_type="text/plain",
+                content="x" * 12,
+            )
+        ],
+    )  # type: ignore
+
+
+def _mock_configuration(mocker: MockerFixture, config: PromptSizeConfiguration) -> None:
+    """Use the given configuration, system prompt of 1 token, skip size limits."""
+    mock_config = mocker.Mock()
+    mock_config.prompt_size_configuration = config
+    mocker.patch("utils.prompt_size.configuration", mock_config)
+    mocker.patch("utils.prompt_size.get_system_prompt", return_value="You")
+    mocker.patch("utils.prompt_size.check_attachments_size")
+
+
+def test_estimate_prompt_tokens() -> None:
+    """Test that system prompt, query and attachments are counted."""
+    tokens = estimate_prompt_tokens("abcd", _query_request(), approximate_token_count)
+    assert tokens == 6
+
+
+def test_check_prompt_size_fits(mocker: MockerFixture) -> None:
+    """Test that prompt fitting into the context is accepted and measured."""
+    _mock_configuration(mocker, PromptSizeConfiguration(default_context_size=6))
+    mock_metric = mocker.patch("utils.prompt_size.metrics.llm_prompt_tokens_estimated")
+
+    check_prompt_size(_query_request(), "provider/model", "model", "provider")
+
+    mock_metric.labels.assert_called_once_with("provider", "model")
+    mock_metric.labels.return_value.observe.assert_called_once_with(6)
+
+
+def test_check_prompt_size_too_long(mocker: MockerFixture) -> None:
+    """Test that prompt larger than the context is rejected with HTTP 413."""
+    _mock_configuration(
+        mocker,
+        PromptSizeConfiguration(model_context_sizes={"provider/model": 5}),
+    )
+    mock_counter = mocker.patch("utils.prompt_size.metrics.llm_prompt_too_large_total")
+
+    with pytest.raises(HTTPException) as e:
+        check_prompt_size(_query_request(), "provider/model", "model", "provider")
+
+    assert e.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert e.value.detail["response"] == "Prompt is too long"  # type: ignore
+    assert "about 6 tokens" in e.value.detail["cause"]  # type: ignore
+    mock_counter.labels.return_value.inc.assert_called_once()
+
+
+def test_check_prompt_size_unknown_context_size(mocker: MockerFixture) -> None:
+    """Test that prompt for model without known context size is only measured."""
+    _mock_configuration(
+        mocker,
+        PromptSizeConfiguration(model_context_sizes={"provider/other": 5}),
+    )
+    mock_metric = mocker.patch("utils.prompt_size.metrics.llm_prompt_tokens_estimated")
+
+    check_prompt_size(_query_request(), "provider/model", "model", "provider")
+
+    mock_metric.labels.return_value.observe.assert_called_once_with(6)
+
+
+def test_check_prompt_size_disabled(mocker: MockerFixture) -> None:
+    """Test that nothing is checked when the check is disabled."""
+    _mock_configuration(
+        mocker, PromptSizeConfiguration(enabled=False, default_context_size=1)
+    )
+    check_prompt_size(_query_request(), "provider/model", "model", "provider")
@@ -0,0 +1,237 @@
+"""Unit tests for the asynchronous query job runner."""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import json
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import constants
+from models.config import QueryJobsConfiguration
+from models.database.base import Base
+from models.database.query_jobs import QueryJob
+from models.responses import QueryResponse
+from utils.query_jobs import QueryJobRunner, load_job
+
+
+@pytest.fixture
+def database(mocker: MockerFixture, tmp_path: Path) -> sessionmaker:
+    """Provide database used by the runner.
+
+    The jobs are stored in worker threads, so every thread needs its own
+    connection and the database can not be an in-memory one.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'query_jobs.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    session_local = sessionmaker(bind=engine)
+    mocker.patch("utils.query_jobs.get_session", side_effect=session_local)
+    return session_local
+
+
+@pytest.fixture
+async def runner(database: sessionmaker) -> AsyncIterator[QueryJobRunner]:
+    """Provide started query job runner, stopped after the test."""
+    _ = database
+    job_runner = QueryJobRunner()
+    job_runner.configure(QueryJobsConfiguration(workers=1, queue_size=2))
+    job_runner.start()
+    yield job_runner
+    await job_runner.stop()
+    job_runner.configure(QueryJobsConfiguration())
+
+
+@pytest.mark.asyncio
+async def test_query_job_succeeded(runner: QueryJobRunner) -> None:
+    """Test that result of the job is stored in the database."""
+
+    async def run() -> QueryResponse:
+        return QueryResponse(conversation_id="c", response="answer")
+
+    job_id = await runner.submit("user", QueryResponse(response="request"), run)
+    job = await runner.wait(job_id, 1)
+
+    assert job is not None
+    assert job.user_id == "user"
+    assert job.status == constants.QUERY_JOB_SUCCEEDED
+    assert job.status_code == 200
+    assert json.loads(job.result)["response"] == "answer"  # type: ignore[arg-type]
+    assert json.loads(job.request)["response"] == "request"
+    assert job.started_at is not None
+    assert job.completed_at is not None
+
+
+@pytest.mark.asyncio
+async def test_query_job_failed(runner: QueryJobRunner) -> None:
+    """Test that HTTP error of the job is stored with its status code."""
+
+    async def run() -> QueryResponse:
+        raise HTTPException(status_code=429, detail={"response": "Quota exceeded"})
+
+    job_id = await runner.submit("user", QueryResponse(response="request"), run)
+    job = await runner.wait(job_id, 1)
+
+    assert job is not None
+    assert job.status == constants.QUERY_JOB_FAILED
+    assert job.status_code == 429
+    assert json.loads(job.result) == {"response": "Quota exceeded"}  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_query_job_wait_timeout(runner: QueryJobRunner) -> None:
+    """Test that waiting for unfinished job returns its current state."""
+    release = asyncio.Event()
+
+    async def run() -> QueryResponse:
+        await release.wait()
+        return QueryResponse(response="answer")
+
+    job_id = await runner.submit("user", QueryResponse(response="request"), run)
+    job = await runner.wait(job_id, 0.01)
+    assert job is not None
+    assert job.status in (constants.QUERY_JOB_PENDING, constants.QUERY_JOB_RUNNING)
+
+    release.set()
+    job = await runner.wait(job_id, 1)
+    assert job is not None
+    assert job.status == constants.QUERY_JOB_SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_query_job_not_found(runner: QueryJobRunner) -> None:
+    """Test waiting for job that does not exist."""
+    assert await runner.wait("unknown", 0) is None
+
+
+@pytest.mark.asyncio
+async def test_query_job_queue_full(runner: QueryJobRunner) -> None:
+    """Test that jobs are rejected when too many are waiting for a worker."""
+    release = asyncio.Event()
+
+    async def run() -> QueryResponse:
+        await release.wait()
+        return QueryResponse(response="answer")
+
+    request = QueryResponse(response="request")
+    first = await runner.submit("user", request, run)
+    # wait until the only worker takes the first job
+    while (job := load_job(first)) is not None and job.status != "running":
+        await asyncio.sleep(0.001)
+    await runner.submit("user", request, run)
+    await runner.submit("user", request, run)
+    with pytest.raises(HTTPException) as e:
+        await runner.submit("user", request, run)
+    assert e.value.status_code == 503
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_query_job_queue_full_concurrent_submissions(
+    database: sessionmaker,
+) -> None:
+    """Test that concurrent submissions can not overfill the queue."""
+    _ = database
+    runner = QueryJobRunner()
+    runner.configure(QueryJobsConfiguration(workers=1, queue_size=1))
+    runner.start()
+    release = asyncio.Event()
+
+    async def run() -> QueryResponse:
+        await release.wait()
+        return QueryResponse(response="answer")
+
+    request = QueryResponse(response="request")
+    try:
+        first = await runner.submit("user", request, run)
+        # wait until the only worker takes the first job
+        while (job := load_job(first)) is not None and job.status != "running":
+            await asyncio.sleep(0.001)
+        results = await asyncio.gather(
+            *(runner.submit("user", request, run) for _ in range(3)),
+            return_exceptions=True,
+        )
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        accepted = [r for r in results if isinstance(r, str)]
+        assert len(accepted) == 1
+        assert len(rejected) == 2
+        assert all(e.status_code == 503 for e in rejected)
+
+        release.set()
+        for job_id in (first, *accepted):
+            finished = await runner.wait(job_id, 5)
+            assert finished is not None
+            assert finished.status == constants.QUERY_JOB_SUCCEEDED
+    finally:
+        await runner.stop()
+        runner.configure(QueryJobsConfiguration())
+
+
+@pytest.mark.asyncio
+async def test_query_job_interrupted_by_shutdown(runner: QueryJobRunner) -> None:
+    """Test that unfinished jobs are marked as failed when the runner stops."""
+    release = asyncio.Event()
+
+    async def run() -> QueryResponse:
+        await release.wait()
+        return QueryResponse(response="answer")
+
+    request = QueryResponse(response="request")
+    running = await runner.submit("user", request, run)
+    while (job := load_job(running)) is not None and job.status != "running":
+        await asyncio.sleep(0.001)
+    queued = await runner.submit("user", request, run)
+    await runner.stop()
+
+    for job_id in (running, queued):
+        job = load_job(job_id)
+        assert job is not None
+        assert job.status == constants.QUERY_JOB_FAILED
+        assert job.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_query_job_submit_not_running(database: sessionmaker) -> None:
+    """Test that jobs are rejected when the workers are not running."""
+    _ = database
+
+    async def run() -> QueryResponse:
+        return QueryResponse(response="answer")
+
+    with pytest.raises(HTTPException) as e:
+        await QueryJobRunner().submit("user", QueryResponse(response="r"), run)
+    assert e.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_query_job_purge_expired(
+    runner: QueryJobRunner, database: sessionmaker
+) -> None:
+    """Test that expired finished jobs are deleted on submission."""
+    with database() as session:
+        session.add(
+            QueryJob(
+                id="expired",
+                user_id="user",
+                status=constants.QUERY_JOB_SUCCEEDED,
+                request="{}",
+                completed_at=datetime.now(UTC) - timedelta(days=2),
+            )
+        )
+        session.commit()
+
+    async def run() -> QueryResponse:
+        return QueryResponse(response="answer")
+
+    runner._last_purge = 0.0  # pylint: disable=protected-access
+    await runner.submit("user", QueryResponse(response="request"), run)
+    assert load_job("expired") is None
@@ -0,0 +1,133 @@
+"""Unit tests for extraction of document metadata from RAG tool responses."""
+
+import ast
+
+import pytest
+from pytest_mock import MockerFixture
+
+from utils import rag_metadata
+from utils.rag_metadata import (
+    clear_cache,
+    extract_metadata,
+    parse_json_response,
+    parse_metadata,
+)
+
+KNOWLEDGE_SEARCH_RESULTS = (
+    "knowledge_search tool found 3 chunks:\nBEGIN of knowledge_search tool results.\n"
+    "Result 1\nContent: ABC\nMetadata: {'docs_url': 'https://example.com/doc1', "
+    "'title': 'Doc1', 'document_id': 'doc-1', 'source': None}\n"
+    "Result 2\nContent: DEF\nMetadata: {'docs_url': 'https://example.com/doc2', "
+    "'title': \"Doc's 2\", 'document_id': 'doc-2', 'score': 0.75, 'rank': -2}\n"
+    "Result 3\nContent: GHI\nMetadata: {'docs_url': 'https://example.com/doc3', "
+    "'tags': ['a', 'b'], 'document_id': 'doc-3'}\n"
+    "END of knowledge_search tool results.\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache() -> None:
+    """Start every test with empty cache of extracted metadata."""
+    clear_cache()
+
+
+@pytest.mark.parametrize(
+    "block",
+    [
+        "{}",
+        "{'title': 'Doc1', 'source': None, 'enabled': True, 'disabled': False}",
+        "{'score': 0.5, 'rank': -3, 'exp': 1e-3, 'title': \"Doc's\",}",
+        "{'docs_url': 'https://example.com/a,b:c', 'title': 'x, \"y\": z'}",
+        "{'tags': ['a', 'b'], 'nested': {'a': 1}}",
+        "{'title': 'escaped \\' quote'}",
+    ],
+)
+def test_parse_metadata_same_as_literal_eval(block: str) -> None:
+    """Test that the fast parser gives the same results as ast.literal_eval."""
+    assert parse_metadata(block) == ast.literal_eval(block)
+
+
+def test_parse_metadata_json() -> None:
+    """Test parsing metadata serialized to JSON."""
+    block = '{"docs_url": "https://example.com", "source": null, "chunk": 1}'
+    assert parse_metadata(block) == {
+        "docs_url": "https://example.com",
+        "source": None,
+        "chunk": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "block", ["{'title': }", "{'title': 'x'", "{'title': os.system('ls')}", "[1, 2]"]
+)
+def test_parse_metadata_invalid(block: str) -> None:
+    """Test that invalid metadata blocks are not parsed."""
+    assert parse_metadata(block) is None
+
+
+def test_extract_metadata() -> None:
+    """Test extraction of metadata of all chunks."""
+    metadata = extract_metadata(KNOWLEDGE_SEARCH_RESULTS)
+
+    assert [m["document_id"] for m in metadata] == ["doc-1", "doc-2", "doc-3"]
+    assert metadata[0]["source"] is None
+    assert metadata[1]["title"] == "Doc's 2"
+    assert metadata[1]["score"] == 0.75
+    assert metadata[1]["rank"] == -2
+    assert metadata[2]["tags"] == ["a", "b"]
+
+
+def test_extract_metadata_at_end_of_text() -> None:
+    """Test extraction of metadata not followed by new line."""
+    text = 'Some text...\nMetadata: {"docs_url": "https://redhat.com", "title": "T"}'
+    assert extract_metadata(text) == ({"docs_url": "https://redhat.com", "title": "T"},)
+
+
+def test_extract_metadata_skips_invalid_blocks() -> None:
+    """Test that invalid metadata blocks are skipped."""
+    text = "Metadata: {'title': }\nMetadata: {'title': 'valid'}\n"
+    assert extract_metadata(text) == ({"title": "valid"},)
+
+
+def test_extract_metadata_no_metadata() -> None:
+    """Test text without any metadata."""
+    assert not extract_metadata("No results found.")
+
+
+def test_extract_metadata_memoized(mocker: MockerFixture) -> None:
+    """Test that metadata of the same text is extracted only once."""
+    spy = mocker.spy(rag_metadata, "parse_metadata")
+
+    first = extract_metadata(KNOWLEDGE_SEARCH_RESULTS)
+    second = extract_metadata(KNOWLEDGE_SEARCH_RESULTS)
+
+    assert first is second
+    assert spy.call_count == 3
+
+
+def test_extract_metadata_cache_size(mocker: MockerFixture) -> None:
+    """Test that least recently used results are evicted from the cache."""
+    cache = rag_metadata._ContentCache(1)  # pylint: disable=protected-access
+    mocker.patch.object(rag_metadata, "_metadata_cache", cache)
+    spy = mocker.spy(rag_metadata, "parse_metadata")
+
+    extract_metadata("Metadata: {'a': 1}")
+    extract_metadata("Metadata: {'b': 2}")
+    extract_metadata("Metadata: {'a': 1}")
+
+    assert spy.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"chunks": [{"content": "A"}]}', {"chunks": [{"content": "A"}]}),
+        ('  [{"content": "A"}]', [{"content": "A"}]),
+        (KNOWLEDGE_SEARCH_RESULTS, None),
+        ("{not json", None),
+        ("", None),
+    ],
+)
+def test_parse_json_response(text: str, expected: object) -> None:
+    """Test parsing of tool responses holding JSON."""
+    assert parse_json_response(text) == expected
@@ -0,0 +1,182 @@
+"""Unit tests for resumable streamed responses."""
+
+import asyncio
+from typing import AsyncIterator, Iterator
+
+import pytest
+from fastapi import HTTPException, status
+from pytest_mock import MockerFixture
+
+from models.config import StreamingConfiguration
+from utils.resumable_stream import ResumableStreams
+
+
+@pytest.fixture(name="streams")
+def streams_fixture(mocker: MockerFixture) -> Iterator[ResumableStreams]:
+    """Return resumable streams with a small buffer, disabled afterwards."""
+    mocker.patch("utils.resumable_stream.get_suid", return_value="stream")
+    streams = ResumableStreams()
+    streams.configure(
+        StreamingConfiguration(
+            replay_buffer_size=4,
+            resume_retention=0.05,
+            max_resumable_streams=2,
+            disconnect_grace_period=0.05,
+        )
+    )
+    yield streams
+    streams.configure(StreamingConfiguration(resumable=False))
+
+
+async def _events(count: int) -> AsyncIterator[str]:
+    """Yield the given number of events."""
+    for i in range(count):
+        yield f"data: {i}\n\n"
+        await asyncio.sleep(0.001)
+
+
+def _event(number: int) -> str:
+    """Return the event with the given number as sent to the client."""
+    return f"id: stream:{number}\ndata: {number}\n\n"
+
+
+async def _collect(events: AsyncIterator[str]) -> list[str]:
+    """Return all events of the stream."""
+    return [event async for event in events]
+
+
+async def test_start_numbers_events(streams: ResumableStreams) -> None:
+    """Test that every event of the stream gets its ID."""
+    assert await _collect(streams.start("user", _events(3))) == [
+        _event(0),
+        _event(1),
+        _event(2),
+    ]
+
+
+async def test_start_not_resumable() -> None:
+    """Test that events are not changed when streams are not resumable."""
+    events = _events(1)
+    assert ResumableStreams().start("user", events) is events
+    assert ResumableStreams().resume("user", "stream:0") is None
+
+
+async def test_resume_after_disconnect(streams: ResumableStreams) -> None:
+    """Test that a reconnected client gets the events it missed."""
+    events = streams.start("user", _events(6))
+    assert await anext(events) == _event(0)
+    assert await anext(events) == _event(1)
+    await events.aclose()  # type: ignore[attr-defined]
+
+    resumed = streams.resume("user", "stream:1")
+    assert resumed is not None
+    assert await _collect(resumed) == [_event(i) for i in range(2, 6)]
+
+
+async def test_resume_live_stream(streams: ResumableStreams) -> None:
+    """Test that a reconnected client is attached to the live stream."""
+    events = streams.start("user", _events(3))
+    assert await anext(events) == _event(0)
+
+    resumed = streams.resume("user", "stream:0")
+    assert resumed is not None
+    assert await _collect(resumed) == [_event(1), _event(2)]
+    assert await _collect(events) == [_event(1), _event(2)]
+
+
+async def test_resume_missed_events_dropped(streams: ResumableStreams) -> None:
+    """Test that events dropped from the buffer can not be replayed."""
+    await _collect(streams.start("user", _events(6)))
+    with pytest.raises(HTTPException) as e:
+        streams.resume("user", "stream:0")
+    assert e.value.status_code == status.HTTP_410_GONE
+
+
+@pytest.mark.parametrize(
+    "user_id, last_event_id",
+    [
+        ("user", "unknown:1"),
+        ("user", "stream"),
+        ("user", "stream:x"),
+        ("other user", "stream:1"),
+    ],
+)
+async def test_resume_unknown_stream(
+    streams: ResumableStreams, user_id: str, last_event_id: str
+) -> None:
+    """Test that unknown streams and streams of other users are not resumed."""
+    await _collect(streams.start("user", _events(2)))
+    with pytest.raises(HTTPException) as e:
+        streams.resume(user_id, last_event_id)
+    assert e.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_resume_expired_stream(streams: ResumableStreams) -> None:
+    """Test that finished streams are resumable only for the retention time."""
+    await _collect(streams.start("user", _events(2)))
+    assert streams.resume("user", "stream:0") is not None
+    await asyncio.sleep(0.1)
+    with pytest.raises(HTTPException) as e:
+        streams.resume("user", "stream:0")
+    assert e.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_slow_reader_disconnected(streams: ResumableStreams) -> None:
+    """Test that a reader falling behind the buffer is disconnected."""
+    events = streams.start("user", _events(20))
+    received = []
+    async for event in events:
+        received.append(event)
+        await asyncio.sleep(0.01)
+    assert len(received) < 20
+    assert received[0] == _event(0)
+
+
+async def test_stream_error_delivered(streams: ResumableStreams) -> None:
+    """Test that the error of the response is raised to its readers."""
+
+    async def failing() -> AsyncIterator[str]:
+        yield "data: 0\n\n"
+        raise ValueError("failed")
+
+    events = streams.start("user", failing())
+    assert await anext(events) == _event(0)
+    with pytest.raises(ValueError, match="failed"):
+        await anext(events)
+
+
+async def _endless(closed: asyncio.Event) -> AsyncIterator[str]:
+    """Yield events until closed."""
+    try:
+        while True:
+            yield "data: event\n\n"
+            await asyncio.sleep(0.001)
+    finally:
+        closed.set()
+
+
+async def test_abandoned_stream_cancelled(streams: ResumableStreams) -> None:
+    """Test that generation is cancelled when no client reconnects in time."""
+    closed = asyncio.Event()
+    events = streams.start("user", _endless(closed))
+    await anext(events)
+    await events.aclose()  # type: ignore[attr-defined]
+    await asyncio.sleep(0.02)
+    assert not closed.is_set()
+    await asyncio.wait_for(closed.wait(), timeout=1)
+
+
+async def test_reconnected_stream_not_cancelled(streams: ResumableStreams) -> None:
+    """Test that generation goes on when the client reconnects in time."""
+    closed = asyncio.Event()
+    events = streams.start("user", _endless(closed))
+    await anext(events)
+    await events.aclose()  # type: ignore[attr-defined]
+
+    resumed = streams.resume("user", "stream:0")
+    assert resumed is not None
+    await anext(resumed)
+    await asyncio.sleep(0.1)
+    assert not closed.is_set()
+    await resumed.aclose()  # type: ignore[attr-defined]
+    await asyncio.wait_for(closed.wait(), timeout=1)
@@ -0,0 +1,175 @@
+"""Unit tests for coalescing of identical concurrent operations."""
+
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+
+from utils.single_flight import SingleFlight, StreamFanOut
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result() -> None:
+    """Test that concurrent callers with the same key share one execution."""
+    flights: SingleFlight[int] = SingleFlight("test")
+    calls = 0
+    release = asyncio.Event()
+
+    async def operation() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 42
+
+    leader = asyncio.create_task(flights.do("key", operation))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("key", operation))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == (42, False)
+    assert await follower == (42, True)
+    assert calls == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_different_keys() -> None:
+    """Test that operations with different keys are not coalesced."""
+    flights: SingleFlight[str] = SingleFlight("test")
+
+    async def operation(value: str) -> str:
+        await asyncio.sleep(0)
+        return value
+
+    results = await asyncio.gather(
+        flights.do("a", lambda: operation("a")),
+        flights.do("b", lambda: operation("b")),
+    )
+    assert results == [("a", False), ("b", False)]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_error() -> None:
+    """Test that an error is propagated to all callers and the key is released."""
+    flights: SingleFlight[int] = SingleFlight("test")
+
+    async def operation() -> int:
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flights.do("key", operation),
+        flights.do("key", operation),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_leader_cancellation() -> None:
+    """Test that cancelled leader does not break the followers."""
+    flights: SingleFlight[int] = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def operation() -> int:
+        await release.wait()
+        return 1
+
+    leader = asyncio.create_task(flights.do("key", operation))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("key", operation))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == (1, True)
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_single_flight_linger() -> None:
+    """Test that the flight stays joinable until the linger awaitable completes."""
+    flights: SingleFlight[int] = SingleFlight("test")
+    lingering = asyncio.Event()
+
+    async def operation() -> int:
+        return 7
+
+    async def linger(_: int) -> None:
+        await lingering.wait()
+
+    assert await flights.do("key", operation, linger=linger) == (7, False)
+    assert await flights.do("key", operation, linger=linger) == (7, True)
+    lingering.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert len(flights) == 0
+
+
+async def _stream(items: list[int], error: Exception | None = None):  # type: ignore
+    """Yield the items one by one, then optionally raise the error."""
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+    if error is not None:
+        raise error
+
+
+async def _collect(fanout: StreamFanOut[int]) -> list[int]:
+    """Collect all items delivered to one subscriber."""
+    return [item async for item in fanout.subscribe()]
+
+
+@pytest.mark.asyncio
+async def test_stream_fanout_delivers_all_items() -> None:
+    """Test that all subscribers receive the whole stream."""
+    fanout = StreamFanOut(_stream([1, 2, 3]))
+    first = asyncio.create_task(_collect(fanout))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(_collect(fanout))
+
+    assert await first == [1, 2, 3]
+    assert await second == [1, 2, 3]
+    assert fanout.finished.done()
+    # late subscriber gets the stream replayed
+    assert await _collect(fanout) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_stream_fanout_propagates_error() -> None:
+    """Test that upstream error is raised to subscribers after all items."""
+    fanout = StreamFanOut(_stream([1], ValueError("boom")))
+    received = []
+    with pytest.raises(ValueError, match="boom"):
+        async for item in fanout.subscribe():
+            received.append(item)
+    assert received == [1]
+
+
+@pytest.mark.asyncio
+async def test_stream_fanout_closes_abandoned_upstream() -> None:
+    """Test that the upstream is closed when all subscribers leave."""
+    closed = asyncio.Event()
+
+    async def endless() -> AsyncIterator[int]:
+        try:
+            while True:
+                yield 1
+                await asyncio.sleep(0)
+        finally:
+            closed.set()
+
+    fanout = StreamFanOut(endless())
+    first = fanout.subscribe()
+    second = fanout.subscribe()
+    assert await anext(first) == 1
+    assert await anext(second) == 1
+    await first.aclose()  # type: ignore[attr-defined]
+    await asyncio.sleep(0.01)
+    assert not closed.is_set()
+
+    await second.aclose()  # type: ignore[attr-defined]
+    await asyncio.wait_for(fanout.finished, timeout=1)
+    assert closed.is_set()
@@ -0,0 +1,76 @@
+"""Unit tests for the Server-Sent Events encoder defined in utils/sse.py."""
+
+import json
+from typing import Any
+
+import pytest
+
+from utils.sse import (
+    encode_data,
+    encode_event,
+    encode_token_event,
+    merge_token_deltas,
+    token_delta,
+)
+
+GOLDEN_TOKENS = [
+    "",
+    "hello",
+    ' "quoted" and \\ backslash',
+    "line\nbreak\tand\rreturn",
+    "žluťoučký kůň",
+    "emoji 😀 outside of BMP",
+    "\x00\x1f\x7f control characters",
+    "</script>",
+]
+
+
+def _golden(event_type: str, data: dict[str, Any]) -> str:
+    """Return the event serialized as a whole, the reference format."""
+    return f"data: {json.dumps({'event': event_type, 'data': data})}\n\n"
+
+
+@pytest.mark.parametrize("token", GOLDEN_TOKENS)
+@pytest.mark.parametrize("event_type", ["token", "tool_call", "tool_result"])
+def test_encode_token_event_golden(event_type: str, token: str) -> None:
+    """Test that token events are identical to the whole event serialized."""
+    expected = _golden(event_type, {"id": 42, "token": token})
+    assert encode_token_event(event_type, 42, token) == expected
+    assert encode_event(event_type, {"id": 42, "token": token}) == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"id": True, "token": "bool is not an integer ID"},
+        {"token": "other key order", "id": 1},
+        {"id": 1, "token": {"tool_name": "t", "arguments": "{}"}},
+        {"id": 1, "token": "extra key", "role": "assistant"},
+        {"id": 1},
+    ],
+)
+def test_encode_event_other_data(data: dict[str, Any]) -> None:
+    """Test that other events are serialized as a whole."""
+    assert encode_event("token", data) == _golden("token", data)
+
+
+def test_encode_data() -> None:
+    """Test formatting of arbitrary data."""
+    assert encode_data({"event": "start"}) == 'data: {"event": "start"}\n\n'
+
+
+def test_token_delta() -> None:
+    """Test that deltas of the answer text are formatted like token events."""
+    delta = token_delta("token", 1, "hello")
+    assert delta == encode_token_event("token", 1, "hello")
+    assert (delta.event_type, delta.chunk_id, delta.token) == ("token", 1, "hello")
+    assert token_delta(None, 1, "hello") == "hello"
+
+
+def test_merge_token_deltas() -> None:
+    """Test that merged deltas keep the ID of the first one."""
+    deltas = [token_delta("token", i, token) for i, token in enumerate("abc", 3)]
+    assert merge_token_deltas(deltas) == _golden("token", {"id": 3, "token": "abc"})
+    assert merge_token_deltas(deltas[:1]) is deltas[0]
+    plain = [token_delta(None, i, token) for i, token in enumerate("abc")]
+    assert merge_token_deltas(plain) == "abc"
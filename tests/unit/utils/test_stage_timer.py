@@ -0,0 +1,102 @@
+"""Unit tests for functions defined in utils/stage_timer.py."""
+
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from utils.deadline import run_stage
+from utils.stage_timer import (
+    STAGE_AUTH,
+    STAGE_MODEL_LISTING,
+    STAGE_QUOTA,
+    RequestTimings,
+    request_timings,
+    stage_timer,
+    timed,
+    timed_stage,
+)
+
+
+def test_stage_timer_records_stage(mocker: MockerFixture) -> None:
+    """Test that stage duration is recorded into the histogram and timings."""
+    metric = mocker.patch("metrics.request_stage_duration_seconds")
+
+    with request_timings("/v1/query") as timings:
+        with stage_timer(STAGE_QUOTA):
+            pass
+
+    assert list(timings.stages) == [STAGE_QUOTA]
+    metric.labels.assert_called_once_with("/v1/query", STAGE_QUOTA, "")
+    metric.labels.return_value.observe.assert_called_once()
+
+
+def test_stage_timer_records_failed_stage() -> None:
+    """Test that duration of a failed stage is recorded too."""
+    with request_timings("/v1/query") as timings:
+        with pytest.raises(ValueError):
+            with stage_timer(STAGE_QUOTA):
+                raise ValueError("quota database is down")
+
+    assert STAGE_QUOTA in timings.stages
+
+
+def test_stage_timer_outside_of_request(mocker: MockerFixture) -> None:
+    """Test that stages entered outside of any request are not measured."""
+    metric = mocker.patch("metrics.request_stage_duration_seconds")
+
+    with stage_timer(STAGE_QUOTA):
+        pass
+
+    metric.labels.assert_not_called()
+
+
+def test_request_timings_server_timing() -> None:
+    """Test formatting of the Server-Timing header value."""
+    timings = RequestTimings("/v1/query")
+    timings.record(STAGE_AUTH, 0.0123)
+    timings.record(STAGE_MODEL_LISTING, 0.001)
+    timings.record(STAGE_MODEL_LISTING, 0.002)
+
+    timings.record("pre_inference", 0.004, "models")
+
+    assert timings.server_timing() == (
+        "auth;dur=12.3, model_listing;dur=3.0, pre_inference.models;dur=4.0"
+    )
+
+
+@pytest.mark.asyncio
+async def test_timed() -> None:
+    """Test measuring an awaitable as one stage."""
+    with request_timings("/v1/query") as timings:
+        result = await timed(STAGE_QUOTA, asyncio.sleep(0, "done"))
+
+    assert result == "done"
+    assert STAGE_QUOTA in timings.stages
+
+
+@pytest.mark.asyncio
+async def test_timed_stage() -> None:
+    """Test measuring every call of a decorated coroutine function."""
+
+    class Dependency:  # pylint: disable=too-few-public-methods
+        """Dependency with measured calls."""
+
+        @timed_stage(STAGE_AUTH)
+        async def __call__(self, value: str) -> str:
+            """Return the value."""
+            return value
+
+    with request_timings("/v1/query") as timings:
+        assert await Dependency()("user") == "user"
+
+    assert STAGE_AUTH in timings.stages
+
+
+@pytest.mark.asyncio
+async def test_deadline_stage_is_measured() -> None:
+    """Test that stages limited by the request deadline are measured."""
+    with request_timings("/v1/query") as timings:
+        await run_stage(STAGE_MODEL_LISTING, asyncio.sleep(0))
+
+    assert STAGE_MODEL_LISTING in timings.stages
@@ -0,0 +1,107 @@
+"""Unit tests for cancellation of streamed responses."""
+
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+from pytest_mock import MockerFixture
+
+from utils.stream_cancellation import aclose_quietly, run_detached, stream_cancelled
+
+
+async def test_run_detached() -> None:
+    """Test that the detached task runs to its end."""
+    done = asyncio.Event()
+
+    async def work() -> int:
+        await asyncio.sleep(0)
+        done.set()
+        return 1
+
+    assert await run_detached(work()) == 1
+    assert done.is_set()
+
+
+async def test_aclose_quietly() -> None:
+    """Test that streams are closed and errors of broken streams ignored."""
+    closed = asyncio.Event()
+
+    async def stream() -> AsyncIterator[int]:
+        try:
+            yield 1
+        finally:
+            closed.set()
+
+    events = stream()
+    await anext(events)
+    await aclose_quietly(events)
+    assert closed.is_set()
+
+    class Broken:  # pylint: disable=too-few-public-methods
+        """Stream failing to close."""
+
+        async def close(self) -> None:
+            """Fail to close the stream."""
+            raise ConnectionError("connection reset")
+
+    await aclose_quietly(Broken())
+    await aclose_quietly(object())
+
+
+async def test_stream_cancelled(mocker: MockerFixture) -> None:
+    """Test that cancelled streams are counted and cleaned up in background."""
+    counter = mocker.patch("utils.stream_cancellation.metrics.streams_cancelled_total")
+    cleaned = asyncio.Event()
+
+    async def cleanup() -> None:
+        cleaned.set()
+
+    stream_cancelled(cleanup())
+    counter.inc.assert_called_once()
+    await asyncio.wait_for(cleaned.wait(), timeout=1)
+
+
+async def test_stream_cancelled_cleanup_error(mocker: MockerFixture) -> None:
+    """Test that errors of the cleanup are logged."""
+    mocker.patch("utils.stream_cancellation.metrics.streams_cancelled_total")
+    logger = mocker.patch("utils.stream_cancellation.logger")
+
+    async def cleanup() -> None:
+        raise ValueError("failed")
+
+    stream_cancelled(cleanup())
+    for _ in range(3):
+        await asyncio.sleep(0)
+    logger.exception.assert_called_once()
+
+
+@pytest.mark.parametrize("error", [asyncio.CancelledError, GeneratorExit])
+async def test_stream_cancelled_from_generator(
+    mocker: MockerFixture, error: type[BaseException]
+) -> None:
+    """Test the pattern used by response generators."""
+    mocker.patch("utils.stream_cancellation.metrics.streams_cancelled_total")
+    cleaned = asyncio.Event()
+
+    async def cleanup() -> None:
+        cleaned.set()
+
+    async def generator() -> AsyncIterator[int]:
+        try:
+            yield 1
+            await asyncio.sleep(10)
+        except (asyncio.CancelledError, GeneratorExit):
+            stream_cancelled(cleanup())
+            raise
+
+    events = generator()
+    await anext(events)
+    if error is GeneratorExit:
+        await events.aclose()  # type: ignore[attr-defined]
+    else:
+        task = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    await asyncio.wait_for(cleaned.wait(), timeout=1)
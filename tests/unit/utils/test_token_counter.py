@@ -0,0 +1,128 @@
+"""Unit tests for token usage of streamed turns defined in utils/token_counter.py."""
+
+from typing import Any, Iterator
+
+import pytest
+from pytest_mock import MockerFixture, MockType
+
+from utils import token_counter
+from utils.token_counter import StreamTokenUsage
+
+# tokens the fake dialog format adds to every message
+OVERHEAD = 5
+
+
+def _encode_dialog_prompt(messages: list[Any]) -> Any:
+    """Encode the dialog with one token per word of every message."""
+    tokens = []
+    for message in messages:
+        content = message["content"] if isinstance(message, dict) else message.content
+        tokens += ["header"] * OVERHEAD + content.split()
+    return type("Encoded", (), {"tokens": tokens})
+
+
+@pytest.fixture(name="sent_metric")
+def fake_tokenizer_fixture(mocker: MockerFixture) -> Iterator[MockType]:
+    """Count tokens by words, return the mocked metric of input tokens."""
+    token_counter._message_overhead.cache_clear()  # pylint: disable=protected-access
+    tokenizer = mocker.patch("utils.token_counter.Tokenizer.get_instance")
+    tokenizer.return_value.encode.side_effect = lambda text, **_: text.split()
+    formatter = mocker.patch("utils.token_counter.ChatFormat")
+    formatter.return_value.encode_dialog_prompt.side_effect = _encode_dialog_prompt
+    yield mocker.patch("utils.token_counter.metrics.llm_token_sent_total")
+    token_counter._message_overhead.cache_clear()  # pylint: disable=protected-access
+
+
+def _turn(mocker: MockerFixture, output: str) -> Any:
+    """Create a completed turn with one input message."""
+    turn = mocker.Mock()
+    turn.input_messages = [{"role": "user", "content": "what is kubernetes"}]
+    turn.output_message = {"role": "assistant", "content": output}
+    return turn
+
+
+async def test_stream_token_usage(mocker: MockerFixture, sent_metric: MockType) -> None:
+    """Test that output is counted from deltas and input once when the turn completes."""
+    received = mocker.patch("utils.token_counter.metrics.llm_token_received_total")
+    usage = StreamTokenUsage("model", "provider", "be brief")
+    usage.add_output("Kubernetes is ")
+    usage.add_output("")
+    usage.add_output("an orchestrator")
+    usage.complete(_turn(mocker, "ignored, already counted"))
+
+    counter = await usage.finish()
+
+    assert counter.output_tokens == OVERHEAD + 4
+    # system prompt and user message
+    assert counter.input_tokens == 2 * OVERHEAD + 5
+    assert counter.input_tokens_counted == counter.input_tokens
+    assert counter.llm_calls == 1
+    sent_metric.labels.assert_called_once_with("provider", "model")
+    sent_metric.labels().inc.assert_called_once_with(2 * OVERHEAD + 5)
+    received.labels().inc.assert_called_once_with(OVERHEAD + 4)
+
+
+async def test_stream_token_usage_output_from_turn(
+    mocker: MockerFixture, sent_metric: MockType
+) -> None:
+    """Test that output is counted from the turn when no deltas arrived."""
+    mocker.patch("utils.token_counter.metrics.llm_token_received_total")
+    usage = StreamTokenUsage("model", "provider")
+    usage.complete(_turn(mocker, "whole answer"))
+
+    counter = await usage.finish()
+
+    assert counter.output_tokens == OVERHEAD + 2
+    assert counter.input_tokens == OVERHEAD + 3
+    sent_metric.labels().inc.assert_called_once_with(OVERHEAD + 3)
+
+
+async def test_stream_token_usage_incomplete_turn(
+    mocker: MockerFixture, sent_metric: MockType
+) -> None:
+    """Test that only output is counted when the turn did not complete."""
+    mocker.patch("utils.token_counter.metrics.llm_token_received_total")
+    usage = StreamTokenUsage("model", "provider")
+    usage.add_output("partial answer")
+
+    counter = await usage.finish()
+
+    assert counter.output_tokens == OVERHEAD + 2
+    assert counter.input_tokens == 0
+    assert counter.llm_calls == 0
+    sent_metric.labels().inc.assert_called_once_with(0)
+
+
+async def test_stream_token_usage_counting_failure(
+    mocker: MockerFixture, sent_metric: MockType
+) -> None:
+    """Test that the input is estimated when it can not be counted."""
+    mocker.patch("utils.token_counter.metrics.llm_token_received_total")
+    usage = StreamTokenUsage("model", "provider")
+    turn = _turn(mocker, "answer")
+    turn.input_messages = [{"role": "user", "content": None}]
+    usage.add_output("answer")
+    usage.complete(turn)
+
+    counter = await usage.finish()
+
+    assert counter.input_tokens == 100
+    assert counter.output_tokens == OVERHEAD + 1
+    sent_metric.labels().inc.assert_called_once_with(100)
+
+
+async def test_stream_token_usage_without_metrics(
+    mocker: MockerFixture, sent_metric: MockType
+) -> None:
+    """Test that usage of a shared turn is returned without updating metrics."""
+    received = mocker.patch("utils.token_counter.metrics.llm_token_received_total")
+    usage = StreamTokenUsage("model", "provider")
+    usage.add_output("answer")
+    usage.complete(_turn(mocker, "answer"))
+
+    counter = await usage.finish(record_metrics=False)
+
+    assert counter.input_tokens == OVERHEAD + 3
+    assert counter.output_tokens == OVERHEAD + 1
+    sent_metric.labels.assert_not_called()
+    received.labels.assert_not_called()
@@ -119,6 +119,7 @@ def test_store_transcript(mocker: MockerFixture) -> None:
             "llm_response": summary.llm_response,
             "rag_chunks": rag_chunks,
             "truncated": truncated,
+            "cancelled": False,
             "attachments": attachments,
             "tool_calls": [
                 {
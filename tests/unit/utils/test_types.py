@@ -2,7 +2,9 @@
 
 from pytest_mock import MockerFixture
 
-from utils.types import GraniteToolParser
+from constants import DEFAULT_RAG_TOOL
+from models.responses import RAGChunk
+from utils.types import GraniteToolParser, TurnSummary
 
 
 class TestGraniteToolParser:
@@ -55,3 +57,26 @@ class TestGraniteToolParser:
         assert (
             tool_parser.get_tool_calls(completion_message) == tool_calls
         ), f"get_tool_calls should return {tool_calls}"
+
+
+class TestTurnSummary:
+    """Test cases for the TurnSummary class."""
+
+    def test_extract_rag_chunks_from_json_response(self) -> None:
+        """Test that chunks are extracted from JSON tool response."""
+        summary = TurnSummary(llm_response="", tool_calls=[])
+        summary._extract_rag_chunks_from_response(  # pylint: disable=protected-access
+            '{"chunks": [{"content": "A", "source": "doc-1", "score": 0.5}]}'
+        )
+        assert summary.rag_chunks == [RAGChunk(content="A", source="doc-1", score=0.5)]
+
+    def test_extract_rag_chunks_from_text_response(self) -> None:
+        """Test that text tool response is treated as a single chunk."""
+        text = "Result 1\nContent: A\nMetadata: {'document_id': 'doc-1'}\n"
+        summary = TurnSummary(llm_response="", tool_calls=[])
+        summary._extract_rag_chunks_from_response(  # pylint: disable=protected-access
+            text
+        )
+        assert summary.rag_chunks == [
+            RAGChunk(content=text, source=DEFAULT_RAG_TOOL, score=None)
+        ]
@@ -0,0 +1,122 @@
+"""Unit tests for the write-behind queue."""
+
+import asyncio
+import threading
+from typing import AsyncIterator
+
+import pytest
+
+from models.config import WriteBehindConfiguration
+from utils.write_behind import WriteBehindQueue
+
+
+@pytest.fixture(name="write_behind")
+async def write_behind_fixture() -> AsyncIterator[WriteBehindQueue]:
+    """Provide configured write-behind queue, stopped after the test."""
+    queue = WriteBehindQueue()
+    queue.configure(WriteBehindConfiguration())
+    yield queue
+    await queue.stop()
+    queue.configure(WriteBehindConfiguration())
+
+
+@pytest.mark.asyncio
+async def test_write_behind_inline_when_not_started(
+    write_behind: WriteBehindQueue,
+) -> None:
+    """Test that the writes are performed inline until the queue is started."""
+    writes: list[tuple[int, str]] = []
+    await write_behind.submit("conv", lambda x, y: writes.append((x, y)), 1, y="a")
+    assert writes == [(1, "a")]
+    assert not write_behind.running
+
+
+@pytest.mark.asyncio
+async def test_write_behind_disabled(write_behind: WriteBehindQueue) -> None:
+    """Test that disabled queue is never started."""
+    write_behind.configure(WriteBehindConfiguration(enabled=False))
+    write_behind.start()
+    assert not write_behind.running
+
+
+@pytest.mark.asyncio
+async def test_write_behind_wait_for_ack(write_behind: WriteBehindQueue) -> None:
+    """Test that writes are performed in worker thread and acknowledged."""
+    threads: list[str] = []
+    write_behind.start()
+    await write_behind.submit(
+        "conv", lambda: threads.append(threading.current_thread().name)
+    )
+    assert len(threads) == 1
+    assert threads[0].startswith("write-behind")
+
+
+@pytest.mark.asyncio
+async def test_write_behind_wait_for_ack_error(
+    write_behind: WriteBehindQueue,
+) -> None:
+    """Test that error of acknowledged write is raised to the submitter."""
+
+    def failing_write() -> None:
+        raise ValueError("boom")
+
+    write_behind.start()
+    with pytest.raises(ValueError, match="boom"):
+        await write_behind.submit("conv", failing_write)
+
+
+@pytest.mark.asyncio
+async def test_write_behind_fire_and_forget_flush(
+    write_behind: WriteBehindQueue,
+) -> None:
+    """Test that queued writes are performed in order and flushed on stop."""
+    write_behind.configure(
+        WriteBehindConfiguration(durability="fire_and_forget", batch_size=2)
+    )
+    write_behind.start()
+    release = threading.Event()
+    writes: list[int] = []
+
+    def failing_write() -> None:
+        raise ValueError("boom")
+
+    await write_behind.submit("conv", release.wait)
+    await write_behind.submit("conv", failing_write)
+    for i in range(5):
+        await write_behind.submit("conv", writes.append, i)
+    # nothing is written until the blocked write finishes
+    assert not writes
+
+    release.set()
+    await write_behind.stop()
+    # failing write does not prevent the following ones
+    assert writes == [0, 1, 2, 3, 4]
+    assert not write_behind.running
+
+
+@pytest.mark.asyncio
+async def test_write_behind_backpressure(write_behind: WriteBehindQueue) -> None:
+    """Test that submitter waits while the queue is full."""
+    write_behind.configure(
+        WriteBehindConfiguration(
+            durability="fire_and_forget", queue_size=1, batch_size=1
+        )
+    )
+    write_behind.start()
+    release = threading.Event()
+    writes: list[int] = []
+
+    await write_behind.submit("conv", release.wait)
+    # wait until the worker takes the blocking write from the queue
+    queue = write_behind._queues[0]  # pylint: disable=protected-access
+    while not queue.empty():
+        await asyncio.sleep(0)
+    await write_behind.submit("conv", writes.append, 1)
+    blocked = asyncio.create_task(write_behind.submit("conv", writes.append, 2))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    await blocked
+    await write_behind.stop()
+    assert writes == [1, 2]